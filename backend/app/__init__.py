@@ -2,7 +2,6 @@
 from flask import Flask
 from flask_login import LoginManager
 from flask_migrate import Migrate
-from flask_cors import CORS
 from authlib.integrations.flask_client import OAuth
 import os
 
@@ -26,6 +25,10 @@ def create_app(config_name=None):
     instance_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'instance'))
     app = Flask(__name__, template_folder=template_dir, static_folder=static_dir, instance_path=instance_path)
     
+    # Stream uploaded files to disk with inline size limit/hashing
+    from app.utils.upload_stream import StreamingUploadRequest
+    app.request_class = StreamingUploadRequest
+    
     # Load configuration from new config system
     if config_name == 'production':
         from app.config.production import ProductionConfig
@@ -64,8 +67,17 @@ def create_app(config_name=None):
     cache.init_app(app)
     
     # Setup logging
-    from app.middlewares.logging_middleware import setup_logging
+    from app.middlewares.logging_middleware import setup_logging, RequestLoggingMiddleware
     setup_logging(app)
+    RequestLoggingMiddleware(app)
+    
+    # Request metrics (before JWT bypass so short-circuited requests are counted)
+    from app.middlewares.metrics_middleware import MetricsMiddleware
+    MetricsMiddleware(app)
+    
+    # Server-Timing header (auth/db/storage/render/serialization breakdown)
+    from app.middlewares.server_timing_middleware import ServerTimingMiddleware
+    ServerTimingMiddleware(app)
     
     # Setup JWT bypass for API routes
     from app.middleware.jwt_bypass import setup_jwt_bypass
@@ -83,95 +95,10 @@ def create_app(config_name=None):
         client_kwargs={'scope': 'openid email profile'}
     )
     
-    # Configure CORS for Shared Cookie approach between ports
-    cors_origins = [
-        'http://localhost:6805', 
-        'http://localhost:3000', 
-        'http://localhost:3002', 
-        'http://localhost:5001',
-        'https://pagemade.site',
-        'http://pagemade.site',
-        'https://app.pagemade.site',
-        'http://app.pagemade.site',
-        'https://editor.pagemade.site',
-        'http://editor.pagemade.site'
-    ]
-    
-    # Store in app.config so it's accessible in handlers
-    app.config['CORS_ORIGINS'] = cors_origins
-    
-    # CORS configuration for shared cookies across ports
-    CORS(app, 
-         origins=cors_origins, 
-         supports_credentials=True,  # Important: Allow cookies
-         allow_headers=['Content-Type', 'Authorization', 'X-Requested-With'],
-         methods=['GET', 'POST', 'PUT', 'DELETE', 'OPTIONS'],
-         expose_headers=['Set-Cookie'],  # Expose cookie headers
-         vary_header=True,  # Handle cross-origin properly
-         max_age=3600)  # Cache preflight for 1 hour
-    
-    # CRITICAL FIX: Handle CORS preflight OPTIONS requests
-    @app.before_request
-    def handle_preflight():
-        """
-        Handle CORS preflight OPTIONS requests.
-        Browser sends OPTIONS request before actual POST/PUT/DELETE to check CORS.
-        """
-        from flask import request, make_response, current_app
-        
-        if request.method == 'OPTIONS':
-            response = make_response()
-            origin = request.headers.get('Origin')
-            allowed_origins = current_app.config.get('CORS_ORIGINS', [])
-            
-            # Check if origin is allowed
-            if origin in allowed_origins:
-                response.headers['Access-Control-Allow-Origin'] = origin
-                response.headers['Access-Control-Allow-Credentials'] = 'true'
-                response.headers['Access-Control-Allow-Methods'] = 'GET, POST, PUT, DELETE, OPTIONS'
-                response.headers['Access-Control-Allow-Headers'] = 'Content-Type, Authorization, X-Requested-With'
-                response.headers['Access-Control-Max-Age'] = '3600'
-            
-            return response
-    
-    # CRITICAL FIX: Add CORS headers for static files (CSS, fonts, images)
-    # Flask-CORS does NOT automatically apply to static files - we need manual handler
-    @app.after_request
-    def add_cors_headers_for_static(response):
-        """
-        Add CORS headers to ALL responses, especially static files.
-        
-        This is CRITICAL for:
-        - Font files (.woff2, .ttf, .woff) loaded in canvas iframe
-        - CSS files loaded from Port 5000 into Port 5001 canvas
-        - Images and other assets
-        
-        Without this, browser blocks cross-origin font/CSS loading.
-        
-        🚨 IMPORTANT: Check route type FIRST before setting headers!
-        - API/auth routes: Use specific origin with credentials
-        - Static files: Use wildcard (no credentials needed)
-        """
-        from flask import request, current_app
-        
-        # Check if this is an API or auth route FIRST
-        if request.path.startswith('/api/') or request.path.startswith('/auth/'):
-            # For API routes, use specific origins with credentials
-            origin = request.headers.get('Origin')
-            allowed_origins = current_app.config.get('CORS_ORIGINS', [])
-            
-            if origin in allowed_origins:
-                response.headers['Access-Control-Allow-Origin'] = origin
-                response.headers['Access-Control-Allow-Credentials'] = 'true'
-                # 🚨 CRITICAL: Must include Authorization header for JWT tokens
-                response.headers['Access-Control-Allow-Headers'] = 'Content-Type, Authorization, X-Requested-With'
-                response.headers['Access-Control-Allow-Methods'] = 'GET, POST, PUT, DELETE, OPTIONS'
-        else:
-            # For static files (fonts, CSS, images), use wildcard
-            # Wildcard is ONLY safe when credentials are NOT included
-            response.headers['Access-Control-Allow-Origin'] = '*'
-        
-        return response
+    # Single CORS layer (origins in app.config['CORS_ORIGINS']).
+    # Header tuples and preflight responses are precomputed once here.
+    from app.middlewares.cors_middleware import configure_cors
+    configure_cors(app)
     
     # Import models for Flask-Login
     from app.models import User
@@ -179,8 +106,10 @@ def create_app(config_name=None):
     # User loader for Flask-Login
     @login_manager.user_loader
     def load_user(user_id):
+        from app.middlewares.server_timing_middleware import span
         try:
-            return User.query.get(int(user_id))
+            with span('auth'):
+                return User.query.get(int(user_id))
         except Exception as e:
             app.logger.error(f"Error loading user {user_id}: {e}")
             return None
@@ -28,6 +28,42 @@ class Config:
     APP_NAME = 'PageMade.site'
     DOMAIN = os.environ.get('DOMAIN', 'pagemade.site')
     
+    # CORS - Shared Cookie approach between ports/subdomains
+    CORS_ORIGINS = [
+        'http://localhost:6805',
+        'http://localhost:3000',
+        'http://localhost:3002',
+        'http://localhost:5001',
+        'https://pagemade.site',
+        'http://pagemade.site',
+        'https://app.pagemade.site',
+        'http://app.pagemade.site',
+        'https://editor.pagemade.site',
+        'http://editor.pagemade.site'
+    ]
+    CORS_ALLOWED_METHODS = ['GET', 'POST', 'PUT', 'DELETE', 'OPTIONS']
+    # Authorization must be allowed for JWT tokens
+    CORS_ALLOWED_HEADERS = ['Content-Type', 'Authorization', 'X-Requested-With']
+    CORS_EXPOSE_HEADERS = ['Set-Cookie']
+    CORS_MAX_AGE = 3600  # Cache preflight for 1 hour
+    CORS_SUPPORTS_CREDENTIALS = True
+    
+    # Request logging
+    # Fraction of successful (2xx/3xx), fast responses that get a log line.
+    # Errors and slow requests are always logged.
+    LOG_SUCCESS_SAMPLE_RATE = 1.0
+    # Records waiting for the background log writer; overflow is dropped
+    LOG_QUEUE_MAX_SIZE = 10000
+    
+    # Request metrics (/api/metrics)
+    SLOW_REQUEST_THRESHOLD = 1.0  # seconds; slower requests get stack samples
+    METRICS_SLOW_SAMPLES = 50  # slow request profiles kept per worker
+    METRICS_TOKEN = os.environ.get('METRICS_TOKEN')  # optional bearer token for scrapes
+    PROFILER_MAX_SECONDS = 60  # upper bound for /admin/api/profiler/start
+    
+    # Server-Timing response header; when off, span() is a no-op
+    SERVER_TIMING_ENABLED = os.environ.get('SERVER_TIMING_ENABLED', 'true').lower() == 'true'
+    
     # Redis Cache
     REDIS_HOST = os.environ.get('REDIS_HOST', 'localhost')
     REDIS_PORT = int(os.environ.get('REDIS_PORT', 6379))
@@ -36,9 +72,89 @@ class Config:
     
     # File Upload
     MAX_CONTENT_LENGTH = 5 * 1024 * 1024  # 5MB
+    UPLOAD_MAX_FILE_SIZE = 5 * 1024 * 1024  # per file, enforced while streaming the body
+    UPLOAD_MAX_BATCH_SIZE = 100 * 1024 * 1024  # whole body of batch upload requests
+    UPLOAD_MAX_BATCH_FILES = 50
+    UPLOAD_BATCH_WORKERS = 4  # threads storing/probing files of one batch request
     UPLOAD_FOLDER = os.path.join(os.path.dirname(__file__), '..', 'static', 'uploads')
+    
+    # Responsive image variants generated after upload
+    IMAGE_VARIANTS_ENABLED = True
+    IMAGE_VARIANT_WIDTHS = [320, 640, 960, 1280, 1920]
+    IMAGE_VARIANT_WORKERS = 2  # background threads per worker process
+    
+    # Lossless/near-lossless optimization after upload (see AssetOptimizer)
+    ASSET_OPTIMIZE_ENABLED = os.environ.get('ASSET_OPTIMIZE_ENABLED', 'true').lower() == 'true'
+    ASSET_OPTIMIZE_WORKERS = 1  # background threads per worker process
+    ASSET_OPTIMIZE_JPEG_QUALITY = os.environ.get('ASSET_OPTIMIZE_JPEG_QUALITY', 'keep')  # 'keep' = original tables, or 1-95
+    ASSET_OPTIMIZE_WEBP_QUALITY = 80  # animated WebP copies of GIFs; None = lossless
+    ASSET_OPTIMIZE_MIN_SAVING = 0.02  # keep an optimized file only if at least 2% smaller
+    
+    # On-demand resize (/api/assets/uploads/<site_id>/<file>?w=640&fmt=webp)
+    IMAGE_RESIZE_SIZES = [64, 128, 256, 320, 480, 640, 768, 960, 1280, 1600, 1920]
+    IMAGE_RESIZE_CACHE_DIR = None  # defaults to instance/image_cache
+    IMAGE_RESIZE_CACHE_MAX_BYTES = 512 * 1024 * 1024  # LRU budget per cache dir
     ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'webp'}
     
+    # Storage for uploads and published sites: 'local' (this node's disk) or
+    # 's3' (any S3-compatible service; requires boto3). Keys go under
+    # <S3_PREFIX>uploads/ and <S3_PREFIX>sites/ in S3_BUCKET.
+    STORAGE_BACKEND = os.environ.get('STORAGE_BACKEND', 'local')
+    S3_BUCKET = os.environ.get('S3_BUCKET')
+    S3_PREFIX = os.environ.get('S3_PREFIX', '')
+    S3_ENDPOINT_URL = os.environ.get('S3_ENDPOINT_URL')  # e.g. MinIO http://minio:9000
+    S3_REGION = os.environ.get('S3_REGION')
+    S3_ACCESS_KEY_ID = os.environ.get('S3_ACCESS_KEY_ID')
+    S3_SECRET_ACCESS_KEY = os.environ.get('S3_SECRET_ACCESS_KEY')
+    S3_MAX_POOL_CONNECTIONS = int(os.environ.get('S3_MAX_POOL_CONNECTIONS', 20))
+    S3_MULTIPART_THRESHOLD = 8 * 1024 * 1024
+    S3_MULTIPART_CHUNKSIZE = 8 * 1024 * 1024
+    
+    # Publish-time Tailwind build (see TailwindService). TAILWIND_CLI is the
+    # standalone binary or e.g. "npx tailwindcss@3.4.0"; default: tailwindcss
+    # on PATH. Without a CLI, published pages use the CDN script.
+    TAILWIND_COMPILE_ENABLED = os.environ.get('TAILWIND_COMPILE_ENABLED', 'true').lower() == 'true'
+    TAILWIND_CLI = os.environ.get('TAILWIND_CLI')
+    TAILWIND_CONFIG = os.environ.get('TAILWIND_CONFIG')  # optional tailwind.config.js
+    TAILWIND_CACHE_DIR = None  # defaults to instance/tailwind_cache
+    TAILWIND_TIMEOUT = 60  # seconds per CLI run
+    
+    # Publish-time page optimization (see PublishOptimizer): minified HTML,
+    # deduplicated CSS, critical CSS inlined when the page CSS is larger
+    # than PUBLISH_INLINE_CSS_MAX_BYTES (the rest is loaded async), and
+    # loading="lazy" on images after the first N top-level sections.
+    PUBLISH_OPTIMIZE_ENABLED = os.environ.get('PUBLISH_OPTIMIZE_ENABLED', 'true').lower() == 'true'
+    PUBLISH_INLINE_CSS_MAX_BYTES = 14 * 1024  # fits the first TCP round trip
+    PUBLISH_ABOVE_FOLD_ELEMENTS = 2
+    
+    # Published page layouts (see RenderEngine); default: templates/published
+    PUBLISHED_LAYOUT_FOLDER = os.environ.get('PUBLISHED_LAYOUT_FOLDER')
+    RENDER_SITE_CACHE_SIZE = 256  # per-site render contexts kept in memory
+    
+    # Starter template catalogue (see TemplateRegistry). Files are re-checked
+    # at most every TEMPLATE_REGISTRY_CHECK_INTERVAL seconds (None: load once).
+    TEMPLATES_DIR = os.environ.get('TEMPLATES_DIR')  # default: static/templates
+    TEMPLATE_REGISTRY_CHECK_INTERVAL = 2.0
+    TEMPLATE_BODY_CACHE_SIZE = 16  # full template JSON bodies kept in memory
+    TEMPLATE_LIST_MAX_AGE = 60  # Cache-Control max-age for /api/templates
+    
+    # Page previews are rendered once and kept server-side (see preview_store):
+    # 'disk' (PREVIEW_DIR, default instance/previews; shared by workers on a
+    # host) or 'cache' (the in-process cache layer; single worker only)
+    PREVIEW_STORE = os.environ.get('PREVIEW_STORE', 'disk')
+    PREVIEW_DIR = os.environ.get('PREVIEW_DIR')
+    PREVIEW_TTL = 1800  # seconds
+    PREVIEW_PURGE_INTERVAL = 300  # seconds between sweeps of expired previews
+    
+    # Page views are buffered per worker and added to the page_view_daily
+    # rollup in batches (see analytics_service)
+    ANALYTICS_ENABLED = os.environ.get('ANALYTICS_ENABLED', 'true').lower() == 'true'
+    ANALYTICS_FLUSH_INTERVAL = float(os.environ.get('ANALYTICS_FLUSH_INTERVAL', 10))  # seconds, 0 = flush at exit only
+    ANALYTICS_MAX_BUFFER = 100000  # unflushed hits kept per worker before dropping
+    
+    # sitemap.xml / robots.txt are regenerated on publish (see sitemap_service)
+    SITEMAP_MAX_AGE = 3600  # Cache-Control max-age, seconds
+    
     # JWT Configuration
     JWT_SECRET_KEY = os.environ.get('JWT_SECRET_KEY') or SECRET_KEY
     JWT_ACCESS_TOKEN_EXPIRES = timedelta(minutes=15)  # 15 minutes
@@ -7,5 +7,8 @@ class ProductionConfig(Config):
     TESTING = False
     SQLALCHEMY_ECHO = False
     
+    # Log 1 in 10 successful requests
+    LOG_SUCCESS_SAMPLE_RATE = 0.1
+    
     # Production-specific settings can be added here
     # e.g., different database, stricter security, etc.
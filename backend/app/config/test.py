@@ -10,6 +10,9 @@ class TestConfig(Config):
     WTF_CSRF_ENABLED = False
     SECRET_KEY = 'test-secret-key'
     
+    # Tests flush page views explicitly
+    ANALYTICS_FLUSH_INTERVAL = 0
+    
     # Disable OAuth for testing
     GOOGLE_CLIENT_ID = None
     GOOGLE_CLIENT_SECRET = None
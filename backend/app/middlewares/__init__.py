@@ -26,6 +26,10 @@ from .error_middleware import (
     ResourceNotFoundError,
     register_custom_error_handlers
 )
+from .metrics_middleware import (
+    MetricsMiddleware,
+    get_metrics
+)
 from .cors_middleware import (
     CORSMiddleware,
     cors_enabled,
@@ -38,6 +42,7 @@ __all__ = [
     'RequestLoggingMiddleware',
     'ErrorHandlingMiddleware',
     'CORSMiddleware',
+    'MetricsMiddleware',
     
     # Auth decorators
     'require_api_auth',
@@ -48,6 +53,9 @@ __all__ = [
     # Logging utilities
     'setup_logging',
     
+    # Metrics utilities
+    'get_metrics',
+    
     # Error classes
     'ValidationError',
     'AuthenticationError',
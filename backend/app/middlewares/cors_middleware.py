@@ -1,29 +1,53 @@
 """CORS middleware for handling cross-origin requests."""
 
 from flask import request, make_response
+from werkzeug.wrappers import Response as WSGIResponse
 from functools import wraps
 import logging
 
 logger = logging.getLogger(__name__)
 
 
+DEFAULT_CORS_ORIGINS = [
+    'http://localhost:3000',  # Next.js dev
+    'http://localhost:5000',  # Flask dev
+    'http://127.0.0.1:3000',
+    'http://127.0.0.1:5000'
+]
+
+
 class CORSMiddleware:
     """
     CORS (Cross-Origin Resource Sharing) middleware.
-    Handles preflight requests and adds CORS headers to responses.
+    
+    Single CORS layer for the whole app. Everything that depends only on
+    configuration is computed once in init_app():
+    
+    - allowed origins live in a frozenset for O(1) lookup
+    - response header tuples are prebuilt per allowed origin
+    - preflight responses are prebuilt per allowed origin and answered at
+      the WSGI layer, before any before_request hook (JWT bypass, session,
+      Flask-Login) runs
+    
+    Per response the after_request hook only does a dict lookup and a
+    header update. Requests without an Origin header (same-origin
+    navigation, crawlers) and requests for published subdomain pages are
+    skipped without touching the response.
     """
     
+    # Paths that use credentialed CORS (specific origin + cookies).
+    # Everything else (static files, fonts, uploads) gets a wildcard origin.
+    CREDENTIALED_PREFIXES = ('/api/', '/auth/')
+    
+    # Subdomains of DOMAIN that belong to the app itself, not to user sites
+    RESERVED_SUBDOMAINS = ('www', 'app', 'editor')
+    
     def __init__(self, app=None, config=None):
         self.app = app
         self.config = config or {}
         
         # Default configuration
-        self.allowed_origins = self.config.get('CORS_ALLOWED_ORIGINS', [
-            'http://localhost:3000',  # Next.js dev
-            'http://localhost:5000',  # Flask dev
-            'http://127.0.0.1:3000',
-            'http://127.0.0.1:5000'
-        ])
+        self.allowed_origins = self.config.get('CORS_ORIGINS', DEFAULT_CORS_ORIGINS)
         
         self.allowed_methods = self.config.get('CORS_ALLOWED_METHODS', [
             'GET', 'POST', 'PUT', 'DELETE', 'PATCH', 'OPTIONS'
@@ -44,6 +68,9 @@ class CORSMiddleware:
         
         self.max_age = self.config.get('CORS_MAX_AGE', 3600)  # 1 hour
         self.supports_credentials = self.config.get('CORS_SUPPORTS_CREDENTIALS', True)
+        self.domain = self.config.get('DOMAIN', 'pagemade.site')
+        
+        self._build_tables()
         
         if app:
             self.init_app(app)
@@ -51,15 +78,79 @@ class CORSMiddleware:
     def init_app(self, app):
         """Initialize CORS middleware with Flask app."""
         # Load config from app
-        if app.config.get('CORS_ALLOWED_ORIGINS'):
-            self.allowed_origins = app.config['CORS_ALLOWED_ORIGINS']
+        if app.config.get('CORS_ORIGINS'):
+            self.allowed_origins = app.config['CORS_ORIGINS']
+        if app.config.get('DOMAIN'):
+            self.domain = app.config['DOMAIN']
         
-        # Register handlers
-        app.before_request(self.handle_preflight)
+        self._build_tables()
+        
+        # Preflights never reach Flask; actual responses get headers here
+        app.wsgi_app = self.wrap_wsgi_app(app.wsgi_app)
         app.after_request(self.add_cors_headers)
         
         logger.info(f"✅ CORS middleware initialized")
-        logger.info(f"Allowed origins: {self.allowed_origins}")
+        logger.info(f"Allowed origins: {sorted(self._origins)}")
+    
+    def _build_tables(self):
+        """Precompute origin lookup set, header tuples and preflight responses."""
+        exact = [o for o in self.allowed_origins if not o.startswith('*.')]
+        self._allow_any = '*' in exact
+        self._origins = frozenset(o for o in exact if o != '*')
+        # Wildcard patterns (e.g., *.example.com) keep the leading dot so that
+        # "evilexample.com" does not match "*.example.com"
+        self._origin_suffixes = tuple(
+            o[1:] for o in self.allowed_origins if o.startswith('*.')
+        )
+        
+        self._methods_value = ', '.join(self.allowed_methods)
+        self._headers_value = ', '.join(self.allowed_headers)
+        self._expose_value = ', '.join(self.expose_headers)
+        
+        self._response_headers = {}
+        self._preflight_responses = {}
+        for origin in self._origins:
+            self._response_headers[origin] = self._build_response_headers(origin)
+            self._preflight_responses[origin] = self._build_preflight_response(origin)
+        
+        # Preflight from an unknown origin: no CORS headers, browser blocks it
+        self._rejected_preflight = WSGIResponse(status=204)
+        
+        # Hosts served by the app itself (app.pagemade.site, editor...), used to
+        # tell them apart from published user subdomains
+        self._domain_suffix = f'.{self.domain}'
+        self._app_hosts = frozenset(
+            [self.domain] +
+            [f'{sub}.{self.domain}' for sub in self.RESERVED_SUBDOMAINS] +
+            [o.split('://', 1)[-1] for o in self._origins]
+        )
+    
+    def _build_response_headers(self, origin):
+        """Header tuples added to credentialed responses for one origin."""
+        headers = [
+            ('Access-Control-Allow-Origin', origin),
+            # Must include Authorization header for JWT tokens
+            ('Access-Control-Allow-Headers', self._headers_value),
+            ('Access-Control-Allow-Methods', self._methods_value),
+        ]
+        if self.supports_credentials:
+            headers.append(('Access-Control-Allow-Credentials', 'true'))
+        if self._expose_value:
+            headers.append(('Access-Control-Expose-Headers', self._expose_value))
+        return tuple(headers)
+    
+    def _build_preflight_response(self, origin):
+        """Prebuilt 204 response answering a preflight from one origin."""
+        headers = [
+            ('Access-Control-Allow-Origin', origin),
+            ('Access-Control-Allow-Methods', self._methods_value),
+            ('Access-Control-Allow-Headers', self._headers_value),
+            ('Access-Control-Max-Age', str(self.max_age)),
+            ('Vary', 'Origin'),
+        ]
+        if self.supports_credentials:
+            headers.append(('Access-Control-Allow-Credentials', 'true'))
+        return WSGIResponse(status=204, headers=headers)
     
     def _get_origin(self):
         """Get the origin from the request headers."""
@@ -71,57 +162,76 @@ class CORSMiddleware:
         
         Args:
             origin: Origin URL from request header
-            
+        
         Returns:
             bool: True if origin is allowed
         """
         if not origin:
             return False
         
-        # Allow all origins if configured
-        if '*' in self.allowed_origins:
+        if self._allow_any or origin in self._origins:
             return True
         
-        # Check exact match
-        if origin in self.allowed_origins:
-            return True
+        return bool(self._origin_suffixes) and origin.endswith(self._origin_suffixes)
+    
+    def _headers_for(self, origin):
+        """Return prebuilt header tuples for an origin, or None if not allowed."""
+        headers = self._response_headers.get(origin)
+        if headers is None and self._is_origin_allowed(origin):
+            # Pattern-matched origin: build once and remember it
+            headers = self._build_response_headers(origin)
+            self._response_headers[origin] = headers
+        return headers
+    
+    def _preflight_for(self, origin):
+        """Return the cached preflight response for an origin."""
+        response = self._preflight_responses.get(origin)
+        if response is None:
+            if not self._is_origin_allowed(origin):
+                logger.warning(f"CORS: Blocked preflight from {origin}")
+                return self._rejected_preflight
+            response = self._build_preflight_response(origin)
+            self._preflight_responses[origin] = response
+        return response
+    
+    def is_page_host(self, host):
+        """Check if host is a published user subdomain (e.g. shop.pagemade.site)."""
+        host = host.split(':', 1)[0]
+        return host.endswith(self._domain_suffix) and host not in self._app_hosts
+    
+    def wrap_wsgi_app(self, wsgi_app):
+        """
+        Wrap the Flask WSGI app so preflights are answered from cache.
         
-        # Check wildcard patterns (e.g., *.example.com)
-        for allowed in self.allowed_origins:
-            if allowed.startswith('*.'):
-                domain = allowed[2:]
-                if origin.endswith(domain):
-                    return True
+        A preflight is an OPTIONS request carrying both Origin and
+        Access-Control-Request-Method. Plain OPTIONS requests fall through to
+        Flask's automatic OPTIONS handling.
+        """
+        def cors_wsgi_app(environ, start_response):
+            if (environ.get('REQUEST_METHOD') == 'OPTIONS'
+                    and 'HTTP_ACCESS_CONTROL_REQUEST_METHOD' in environ):
+                origin = environ.get('HTTP_ORIGIN')
+                if origin:
+                    return self._preflight_for(origin)(environ, start_response)
+            return wsgi_app(environ, start_response)
         
-        return False
+        return cors_wsgi_app
     
     def handle_preflight(self):
         """
-        Handle CORS preflight requests (OPTIONS).
+        Handle CORS preflight requests (OPTIONS) inside a request context.
+        
+        Preflights are normally answered by wrap_wsgi_app() before Flask
+        dispatches them; this is kept for apps that only register hooks.
         
         Returns:
             Response for OPTIONS requests, None otherwise
         """
         if request.method == 'OPTIONS':
             origin = self._get_origin()
-            
-            if not self._is_origin_allowed(origin):
-                logger.warning(f"CORS: Blocked preflight from {origin}")
-                return make_response('', 403)
-            
-            response = make_response('', 204)
-            
-            # Add CORS headers
-            response.headers['Access-Control-Allow-Origin'] = origin
-            response.headers['Access-Control-Allow-Methods'] = ', '.join(self.allowed_methods)
-            response.headers['Access-Control-Allow-Headers'] = ', '.join(self.allowed_headers)
-            response.headers['Access-Control-Max-Age'] = str(self.max_age)
-            
-            if self.supports_credentials:
-                response.headers['Access-Control-Allow-Credentials'] = 'true'
-            
-            logger.debug(f"CORS: Preflight from {origin} - OK")
-            return response
+            if origin and 'Access-Control-Request-Method' in request.headers:
+                cached = self._preflight_for(origin)
+                return make_response('', cached.status_code, list(cached.headers.items()))
         
         return None
     
@@ -129,33 +239,53 @@ class CORSMiddleware:
         """
         Add CORS headers to response.
         
+        - API/auth routes: specific origin with credentials
+        - Everything else (fonts, CSS, images loaded into the editor canvas):
+          wildcard origin, no credentials
+        
         Args:
             response: Flask response object
-            
+        
         Returns:
             Modified response with CORS headers
         """
-        origin = self._get_origin()
+        # One context-local lookup; everything else is plain dict access
+        environ = request.environ
+        origin = environ.get('HTTP_ORIGIN')
         
-        # Skip if no origin or not allowed
-        if not origin or not self._is_origin_allowed(origin):
-            if origin:
-                logger.debug(f"CORS: Origin {origin} not allowed")
+        # No Origin header: same-origin navigation or non-browser client
+        if origin is None:
             return response
         
-        # Add CORS headers
-        response.headers['Access-Control-Allow-Origin'] = origin
+        host = environ.get('HTTP_HOST') or environ.get('SERVER_NAME', '')
         
-        if self.supports_credentials:
-            response.headers['Access-Control-Allow-Credentials'] = 'true'
+        # Same-origin fetch (browsers send Origin on same-origin POSTs)
+        if origin.endswith('://' + host):
+            return response
         
-        if self.expose_headers:
-            response.headers['Access-Control-Expose-Headers'] = ', '.join(self.expose_headers)
+        # Published user pages never need CORS headers
+        if self.is_page_host(host):
+            return response
         
-        # Vary header for caching
-        vary = response.headers.get('Vary', '')
-        if 'Origin' not in vary:
-            response.headers['Vary'] = f"{vary}, Origin".strip(', ')
+        headers = response.headers
+        
+        if environ.get('PATH_INFO', '').startswith(self.CREDENTIALED_PREFIXES):
+            cors_headers = self._headers_for(origin)
+            if cors_headers is None:
+                logger.debug(f"CORS: Origin {origin} not allowed")
+                return response
+            
+            headers.extend(cors_headers)
+            
+            # Origin is echoed back, so caches must key on it
+            vary = headers.get('Vary')
+            if vary is None:
+                headers.add('Vary', 'Origin')
+            elif 'Origin' not in vary:
+                headers['Vary'] = f"{vary}, Origin"
+        else:
+            # Static files: wildcard is ONLY safe when credentials are NOT included
+            headers.add('Access-Control-Allow-Origin', '*')
         
         return response
 
@@ -234,12 +364,7 @@ def configure_cors(app):
     """
     # Get CORS configuration from app config
     cors_config = {
-        'CORS_ALLOWED_ORIGINS': app.config.get('CORS_ALLOWED_ORIGINS', [
-            'http://localhost:3000',
-            'http://localhost:5000',
-            'http://127.0.0.1:3000',
-            'http://127.0.0.1:5000'
-        ]),
+        'CORS_ORIGINS': app.config.get('CORS_ORIGINS', DEFAULT_CORS_ORIGINS),
         'CORS_ALLOWED_METHODS': app.config.get('CORS_ALLOWED_METHODS', [
             'GET', 'POST', 'PUT', 'DELETE', 'PATCH', 'OPTIONS'
         ]),
@@ -255,11 +380,13 @@ def configure_cors(app):
             'X-Page-Count'
         ]),
         'CORS_MAX_AGE': app.config.get('CORS_MAX_AGE', 3600),
-        'CORS_SUPPORTS_CREDENTIALS': app.config.get('CORS_SUPPORTS_CREDENTIALS', True)
+        'CORS_SUPPORTS_CREDENTIALS': app.config.get('CORS_SUPPORTS_CREDENTIALS', True),
+        'DOMAIN': app.config.get('DOMAIN', 'pagemade.site')
     }
     
     # Initialize middleware
     cors_middleware = CORSMiddleware(app, cors_config)
+    app.extensions['cors_middleware'] = cors_middleware
     
     logger.info("✅ CORS configured successfully")
     
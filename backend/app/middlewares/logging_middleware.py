@@ -1,7 +1,11 @@
 """Logging middleware for request/response tracking."""
 
 from flask import request, g
+from logging.handlers import QueueHandler, QueueListener
+import atexit
 import logging
+import queue
+import random
 import time
 import json
 from datetime import datetime
@@ -10,31 +14,107 @@ from datetime import datetime
 logger = logging.getLogger(__name__)
 
 
+class JSONLineFormatter(logging.Formatter):
+    """
+    Format log records as compact, single-line JSON.
+    
+    Structured data passed as ``extra={'fields': {...}}`` is merged into the
+    top-level object. Runs on the QueueListener thread, so serialization cost
+    never lands on request threads.
+    """
+    
+    def format(self, record):
+        entry = {
+            'ts': datetime.utcfromtimestamp(record.created).isoformat(timespec='milliseconds') + 'Z',
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+        }
+        
+        fields = getattr(record, 'fields', None)
+        if fields:
+            entry.update(fields)
+        
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry['exc'] = record.exc_text
+        
+        return json.dumps(entry, separators=(',', ':'), ensure_ascii=False, default=str)
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """
+    QueueHandler that never blocks the calling thread.
+    
+    Unlike the stdlib handler it does not format the record before enqueuing;
+    it only resolves the message string (so nothing request-scoped is
+    evaluated later on another thread) and leaves JSON/text formatting to the
+    listener. When the queue is full the record is dropped and counted.
+    
+    ``listener`` is the QueueListener draining the queue; close() stops it
+    and closes its handlers.
+    """
+    
+    def __init__(self, log_queue, listener=None):
+        super().__init__(log_queue)
+        self.listener = listener
+        self.dropped = 0
+    
+    def prepare(self, record):
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+    
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+    
+    def close(self):
+        listener, self.listener = self.listener, None
+        if listener is not None:
+            _stop_listener(listener)
+            for handler in listener.handlers:
+                handler.close()
+        super().close()
+
+
 class RequestLoggingMiddleware:
     """
     Middleware for comprehensive request/response logging.
     Tracks request details, timing, and errors.
+    
+    Detailed request data (query, user, sanitized body) is only collected
+    when DEBUG is enabled for this logger. Successful, fast responses are
+    sampled with LOG_SUCCESS_SAMPLE_RATE; errors and slow requests are always
+    logged.
     """
     
     def __init__(self, app=None):
         self.app = app
+        self.sample_rate = 1.0
         if app:
             self.init_app(app)
     
     def init_app(self, app):
         """Initialize middleware with Flask app."""
+        self.sample_rate = app.config.get('LOG_SUCCESS_SAMPLE_RATE', 1.0)
         app.before_request(self.log_request)
         app.after_request(self.log_response)
         app.teardown_request(self.teardown_request)
     
     def log_request(self):
-        """Log incoming request details."""
+        """Start request timing; collect request details only in DEBUG."""
         # Start timing
         g.start_time = time.time()
         
+        if not logger.isEnabledFor(logging.DEBUG):
+            return
+        
         # Prepare request data
         request_data = {
-            'timestamp': datetime.utcnow().isoformat(),
             'method': request.method,
             'path': request.path,
             'query_params': dict(request.args),
@@ -46,71 +126,67 @@ class RequestLoggingMiddleware:
         from flask_login import current_user
         if current_user.is_authenticated:
             request_data['user_id'] = current_user.id
-            request_data['user_email'] = current_user.email
         
         # Log request body for POST/PUT (excluding sensitive data)
         if request.method in ['POST', 'PUT', 'PATCH']:
             if request.is_json:
-                try:
-                    body = request.get_json()
-                    # Remove sensitive fields
-                    sanitized_body = self._sanitize_data(body)
-                    request_data['body'] = sanitized_body
-                except:
+                body = request.get_json(silent=True)
+                if body is None:
                     request_data['body'] = '<non-json data>'
+                else:
+                    # Remove sensitive fields
+                    request_data['body'] = self._sanitize_data(body)
             elif request.form:
-                sanitized_form = self._sanitize_data(dict(request.form))
-                request_data['body'] = sanitized_form
+                request_data['body'] = self._sanitize_data(request.form.to_dict())
         
-        # Store in g for later use
-        g.request_data = request_data
-        
-        # Log request
-        logger.info(
-            f"→ {request.method} {request.path} "
-            f"from {request.remote_addr}"
+        # Serialized by the listener thread, not here
+        logger.debug(
+            f"→ {request.method} {request.path}",
+            extra={'fields': {'event': 'request', **request_data}}
         )
-        
-        # Detailed debug logging
-        logger.debug(f"Request details: {json.dumps(request_data, indent=2)}")
     
     def log_response(self, response):
-        """Log outgoing response details."""
+        """Log outgoing response details (sampled for fast successes)."""
         # Calculate request duration
         duration = None
         if hasattr(g, 'start_time'):
             duration = time.time() - g.start_time
         
-        # Prepare response data
-        response_data = {
-            'status_code': response.status_code,
-            'duration_ms': round(duration * 1000, 2) if duration else None,
-            'content_type': response.content_type,
-            'content_length': response.content_length,
-        }
+        status = response.status_code
+        is_slow = duration is not None and duration > PerformanceMonitor.SLOW_REQUEST_THRESHOLD
         
         # Log response
-        log_level = logging.INFO
-        if response.status_code >= 500:
+        if status >= 500:
             log_level = logging.ERROR
-        elif response.status_code >= 400:
+        elif status >= 400:
             log_level = logging.WARNING
+        else:
+            log_level = logging.INFO
+            if not is_slow and self.sample_rate < 1.0 and random.random() >= self.sample_rate:
+                return response
+        
+        if not logger.isEnabledFor(log_level):
+            return response
+        
+        duration_ms = round(duration * 1000, 2) if duration is not None else None
         
         logger.log(
             log_level,
-            f"← {request.method} {request.path} "
-            f"- {response.status_code} "
-            f"({response_data['duration_ms']}ms)"
+            f"← {request.method} {request.path} - {status} ({duration_ms}ms)",
+            extra={'fields': {
+                'event': 'response',
+                'method': request.method,
+                'path': request.path,
+                'endpoint': request.endpoint,
+                'status': status,
+                'duration_ms': duration_ms,
+                'content_length': response.content_length,
+                'sample_rate': self.sample_rate if log_level == logging.INFO else 1.0,
+            }}
         )
         
-        # Debug logging for response body (API only)
-        if request.path.startswith('/api/') and response.status_code >= 400:
-            try:
-                if response.is_json:
-                    body = response.get_json()
-                    logger.debug(f"Response body: {json.dumps(body, indent=2)}")
-            except:
-                pass
+        if is_slow:
+            PerformanceMonitor.log_slow_request(duration, request.method, request.path)
         
         return response
     
@@ -128,7 +204,7 @@ class RequestLoggingMiddleware:
         
         Args:
             data: Dictionary to sanitize
-            
+        
         Returns:
             Dictionary with sensitive fields masked
         """
@@ -177,48 +253,84 @@ class PerformanceMonitor:
         pass
 
 
+def _stop_listener(listener):
+    """Stop a QueueListener, flushing queued records; safe to call twice."""
+    if listener._thread is not None:
+        listener.stop()
+
+
 def setup_logging(app):
     """
     Configure application logging.
     
+    Request threads only put records on an in-memory queue; a background
+    QueueListener owns the file and console handlers. app.log and
+    errors.log are written as compact JSON lines.
+    
     Args:
         app: Flask application instance
     """
     import os
+    from flask.logging import default_handler
     
     # Create logs directory if it doesn't exist
     log_dir = os.path.join(app.root_path, '..', 'logs')
     os.makedirs(log_dir, exist_ok=True)
     
+    level = logging.DEBUG if app.debug else logging.INFO
+    
     # Configure logging format
-    log_format = logging.Formatter(
+    json_format = JSONLineFormatter()
+    console_format = logging.Formatter(
         '[%(asctime)s] %(levelname)s in %(module)s: %(message)s'
     )
     
     # File handler for all logs
     all_logs_file = os.path.join(log_dir, 'app.log')
-    file_handler = logging.FileHandler(all_logs_file)
+    file_handler = logging.FileHandler(all_logs_file, delay=True)
     file_handler.setLevel(logging.INFO)
-    file_handler.setFormatter(log_format)
+    file_handler.setFormatter(json_format)
     
     # File handler for errors only
     error_logs_file = os.path.join(log_dir, 'errors.log')
-    error_handler = logging.FileHandler(error_logs_file)
+    error_handler = logging.FileHandler(error_logs_file, delay=True)
     error_handler.setLevel(logging.ERROR)
-    error_handler.setFormatter(log_format)
+    error_handler.setFormatter(json_format)
     
     # Console handler (for development)
     console_handler = logging.StreamHandler()
-    console_handler.setLevel(logging.DEBUG if app.debug else logging.INFO)
-    console_handler.setFormatter(log_format)
+    console_handler.setLevel(level)
+    console_handler.setFormatter(console_format)
     
-    # Add handlers to app logger
-    app.logger.addHandler(file_handler)
-    app.logger.addHandler(error_handler)
-    app.logger.addHandler(console_handler)
+    # Every app of this package shares the "app" logger, so the queue
+    # handler of a previous create_app() in this process is still attached:
+    # stop its listener thread and close its files before replacing it
+    app.logger.removeHandler(default_handler)
+    for handler in list(app.logger.handlers):
+        if isinstance(handler, NonBlockingQueueHandler):
+            app.logger.removeHandler(handler)
+            atexit.unregister(handler.close)
+            handler.close()
+    
+    # Background writer: the only place that touches disk or stdout
+    log_queue = queue.Queue(maxsize=app.config.get('LOG_QUEUE_MAX_SIZE', 10000))
+    listener = QueueListener(
+        log_queue, file_handler, error_handler, console_handler,
+        respect_handler_level=True
+    )
+    queue_handler = NonBlockingQueueHandler(log_queue, listener)
+    listener.start()
+    # Flush whatever is still queued on interpreter exit
+    atexit.register(queue_handler.close)
+    
+    # app.logger is the "app" logger, so app.* module loggers propagate here
+    app.logger.addHandler(queue_handler)
     
     # Set log level
-    app.logger.setLevel(logging.DEBUG if app.debug else logging.INFO)
+    app.logger.setLevel(level)
+    
+    app.extensions['log_listener'] = listener
+    app.extensions['log_queue_handler'] = queue_handler
     
     app.logger.info(f"✅ Logging configured - Logs dir: {log_dir}")
     
@@ -0,0 +1,357 @@
+"""Metrics middleware for request latency, throughput and slow-request profiling."""
+
+from flask import request, g
+from bisect import bisect_left
+from collections import deque
+import logging
+import os
+import sys
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+# Fixed log-scale latency buckets (seconds): 0.5ms doubling every two
+# buckets up to ~23s. Relative error of a percentile estimate is bounded by
+# the bucket width (~41%) and is much smaller in practice thanks to linear
+# interpolation inside the bucket.
+LATENCY_BUCKETS = tuple(round(0.0005 * 2 ** (i / 2), 6) for i in range(32))
+
+REPORTED_QUANTILES = (0.5, 0.95, 0.99)
+
+
+def collapse_stack(frame, limit=64):
+    """
+    Render a frame and its callers as one collapsed-stack line.
+    
+    Frames are ordered root first and separated by ';', which is the input
+    format of flamegraph.pl / speedscope.
+    
+    Args:
+        frame: Innermost frame object
+        limit: Maximum number of frames kept (innermost are kept)
+    
+    Returns:
+        str: e.g. "wsgi.py:app;pages.py:serve_user_page;page.py:generate_html"
+    """
+    names = []
+    while frame is not None and len(names) < limit:
+        code = frame.f_code
+        names.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+        frame = frame.f_back
+    names.reverse()
+    return ';'.join(names)
+
+
+class LatencyHistogram:
+    """
+    Latency histogram with fixed log-scale buckets.
+    
+    Observing is a bisect plus two additions, so it is cheap enough to run
+    on every request. Not thread-safe by itself; MetricsRegistry holds the
+    lock.
+    """
+    
+    __slots__ = ('bounds', 'counts', 'count', 'total')
+    
+    def __init__(self, bounds=LATENCY_BUCKETS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # last slot is +Inf
+        self.count = 0
+        self.total = 0.0
+    
+    def observe(self, seconds):
+        """Record one duration in seconds."""
+        self.counts[bisect_left(self.bounds, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+    
+    def percentile(self, q):
+        """
+        Estimate a quantile by interpolating inside its bucket.
+        
+        Args:
+            q: Quantile between 0 and 1 (e.g. 0.95)
+        
+        Returns:
+            float: Estimated latency in seconds, or None if empty
+        """
+        if not self.count:
+            return None
+        
+        rank = q * self.count
+        cumulative = 0
+        for index, bucket_count in enumerate(self.counts):
+            if not bucket_count:
+                continue
+            if cumulative + bucket_count >= rank:
+                if index >= len(self.bounds):
+                    # Overflow bucket has no upper bound
+                    return self.bounds[-1]
+                lower = self.bounds[index - 1] if index else 0.0
+                upper = self.bounds[index]
+                return lower + (upper - lower) * (rank - cumulative) / bucket_count
+            cumulative += bucket_count
+        
+        return self.bounds[-1]
+
+
+class MetricsRegistry:
+    """
+    Per-process request metrics.
+    
+    Holds one latency histogram per endpoint, request counters keyed by
+    (endpoint, method, status), in-flight gauges and the most recent slow
+    request profiles. Each gunicorn worker has its own registry; Prometheus
+    scrapes them individually.
+    """
+    
+    def __init__(self, max_slow_samples=50):
+        self._lock = threading.Lock()
+        self.histograms = {}
+        self.requests_total = {}
+        self.in_flight = {}
+        self.slow_samples = deque(maxlen=max_slow_samples)
+        self.started_at = time.time()
+    
+    def start_request(self, endpoint):
+        """Increment the in-flight gauge for an endpoint."""
+        with self._lock:
+            self.in_flight[endpoint] = self.in_flight.get(endpoint, 0) + 1
+    
+    def finish_request(self, endpoint, method, status, duration):
+        """Record a finished request and decrement its in-flight gauge."""
+        key = (endpoint, method, status)
+        with self._lock:
+            self.in_flight[endpoint] -= 1
+            self.requests_total[key] = self.requests_total.get(key, 0) + 1
+            histogram = self.histograms.get(endpoint)
+            if histogram is None:
+                histogram = self.histograms[endpoint] = LatencyHistogram()
+            histogram.observe(duration)
+    
+    def add_slow_sample(self, sample):
+        """Keep a slow request profile (oldest are discarded)."""
+        with self._lock:
+            self.slow_samples.append(sample)
+    
+    def snapshot(self):
+        """
+        Summarize latency per endpoint.
+        
+        Returns:
+            dict: endpoint -> {'count', 'avg_ms', 'p50_ms', 'p95_ms', 'p99_ms', 'in_flight'}
+        """
+        with self._lock:
+            summary = {}
+            for endpoint, histogram in self.histograms.items():
+                summary[endpoint] = {
+                    'count': histogram.count,
+                    'avg_ms': round(histogram.total / histogram.count * 1000, 2),
+                    'in_flight': self.in_flight.get(endpoint, 0),
+                }
+                for q in REPORTED_QUANTILES:
+                    summary[endpoint][f'p{int(q * 100)}_ms'] = round(histogram.percentile(q) * 1000, 2)
+            return summary
+    
+    def render_prometheus(self):
+        """
+        Render all metrics in the Prometheus text exposition format.
+        
+        Returns:
+            str: Exposition text (version 0.0.4)
+        """
+        lines = []
+        with self._lock:
+            lines.append('# HELP pagemade_http_requests_total Finished HTTP requests.')
+            lines.append('# TYPE pagemade_http_requests_total counter')
+            for (endpoint, method, status), count in sorted(self.requests_total.items()):
+                lines.append(
+                    f'pagemade_http_requests_total{{endpoint="{endpoint}",method="{method}",status="{status}"}} {count}'
+                )
+            
+            lines.append('# HELP pagemade_http_requests_in_flight Requests currently being handled.')
+            lines.append('# TYPE pagemade_http_requests_in_flight gauge')
+            for endpoint, count in sorted(self.in_flight.items()):
+                lines.append(f'pagemade_http_requests_in_flight{{endpoint="{endpoint}"}} {count}')
+            
+            lines.append('# HELP pagemade_http_request_duration_seconds Request latency.')
+            lines.append('# TYPE pagemade_http_request_duration_seconds histogram')
+            for endpoint, histogram in sorted(self.histograms.items()):
+                cumulative = 0
+                for bound, bucket_count in zip(histogram.bounds, histogram.counts):
+                    cumulative += bucket_count
+                    lines.append(
+                        f'pagemade_http_request_duration_seconds_bucket{{endpoint="{endpoint}",le="{bound}"}} {cumulative}'
+                    )
+                lines.append(
+                    f'pagemade_http_request_duration_seconds_bucket{{endpoint="{endpoint}",le="+Inf"}} {histogram.count}'
+                )
+                lines.append(f'pagemade_http_request_duration_seconds_sum{{endpoint="{endpoint}"}} {histogram.total:.6f}')
+                lines.append(f'pagemade_http_request_duration_seconds_count{{endpoint="{endpoint}"}} {histogram.count}')
+            
+            lines.append('# HELP pagemade_http_request_latency_seconds Estimated latency quantiles.')
+            lines.append('# TYPE pagemade_http_request_latency_seconds summary')
+            for endpoint, histogram in sorted(self.histograms.items()):
+                for q in REPORTED_QUANTILES:
+                    lines.append(
+                        f'pagemade_http_request_latency_seconds{{endpoint="{endpoint}",quantile="{q}"}} '
+                        f'{histogram.percentile(q):.6f}'
+                    )
+            
+            lines.append('# HELP pagemade_slow_requests_sampled Slow request profiles kept in memory.')
+            lines.append('# TYPE pagemade_slow_requests_sampled gauge')
+            lines.append(f'pagemade_slow_requests_sampled {len(self.slow_samples)}')
+        
+        return '\n'.join(lines) + '\n'
+
+
+class SlowRequestSampler:
+    """
+    Capture stacks of requests that run past a threshold.
+    
+    Request threads only register/unregister themselves in a dict. A daemon
+    thread wakes up every ``interval`` seconds and, only when some request
+    is overdue, reads ``sys._current_frames()`` and appends the collapsed
+    stack of each overdue request thread. A request that finishes fast costs
+    two dict operations.
+    """
+    
+    def __init__(self, registry, threshold=1.0, interval=None, max_stacks=20):
+        self.registry = registry
+        self.threshold = threshold
+        self.interval = interval or max(threshold / 4, 0.05)
+        self.max_stacks = max_stacks
+        self._active = {}
+        self._thread = None
+        self._pid = None
+    
+    def ensure_running(self):
+        """Start the sampler thread (again after a fork, e.g. gunicorn preload)."""
+        if self._pid == os.getpid() and self._thread is not None:
+            return
+        self._pid = os.getpid()
+        self._thread = threading.Thread(
+            target=self._run, name='slow-request-sampler', daemon=True
+        )
+        self._thread.start()
+    
+    def begin(self, start, endpoint, method, path):
+        """Register the current thread's request."""
+        self._active[threading.get_ident()] = {
+            'start': start,
+            'endpoint': endpoint,
+            'method': method,
+            'path': path,
+            'stacks': [],
+        }
+    
+    def end(self, duration, status):
+        """Unregister the current thread's request; keep its profile if slow."""
+        entry = self._active.pop(threading.get_ident(), None)
+        if entry is None or duration < self.threshold:
+            return None
+        
+        sample = {
+            'timestamp': time.time(),
+            'endpoint': entry['endpoint'],
+            'method': entry['method'],
+            'path': entry['path'],
+            'status': status,
+            'duration_ms': round(duration * 1000, 2),
+            'stacks': entry['stacks'],
+        }
+        self.registry.add_slow_sample(sample)
+        logger.warning(
+            f"Slow request profile: {entry['method']} {entry['path']} ({sample['duration_ms']}ms, "
+            f"{len(entry['stacks'])} stack samples)",
+            extra={'fields': {'event': 'slow_request', **sample}}
+        )
+        return sample
+    
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                self._sample()
+            except Exception:
+                logger.exception("Slow request sampler failed")
+    
+    def _sample(self):
+        now = time.perf_counter()
+        frames = None
+        for ident, entry in list(self._active.items()):
+            if now - entry['start'] < self.threshold or len(entry['stacks']) >= self.max_stacks:
+                continue
+            if frames is None:
+                frames = sys._current_frames()
+            frame = frames.get(ident)
+            if frame is not None:
+                entry['stacks'].append(collapse_stack(frame))
+
+
+class MetricsMiddleware:
+    """
+    Middleware that feeds MetricsRegistry from Flask request hooks.
+    
+    Register it before hooks that may short-circuit a request (JWT bypass),
+    so every request that reaches Flask is counted.
+    """
+    
+    def __init__(self, app=None):
+        self.app = app
+        self.registry = None
+        self.sampler = None
+        if app:
+            self.init_app(app)
+    
+    def init_app(self, app):
+        """Initialize metrics collection with Flask app."""
+        from app.middlewares.logging_middleware import PerformanceMonitor
+        
+        self.registry = MetricsRegistry(
+            max_slow_samples=app.config.get('METRICS_SLOW_SAMPLES', 50)
+        )
+        self.sampler = SlowRequestSampler(
+            self.registry,
+            threshold=app.config.get('SLOW_REQUEST_THRESHOLD', PerformanceMonitor.SLOW_REQUEST_THRESHOLD)
+        )
+        
+        app.before_request(self.start_timer)
+        app.after_request(self.record_status)
+        app.teardown_request(self.record_request)
+        
+        app.extensions['metrics'] = self
+    
+    def start_timer(self):
+        """Mark request start and bump the in-flight gauge."""
+        start = time.perf_counter()
+        endpoint = request.endpoint or 'unmatched'
+        g._metrics_start = start
+        g._metrics_endpoint = endpoint
+        self.registry.start_request(endpoint)
+        self.sampler.ensure_running()
+        self.sampler.begin(start, endpoint, request.method, request.path)
+    
+    def record_status(self, response):
+        """Remember the response status for record_request()."""
+        g._metrics_status = response.status_code
+        return response
+    
+    def record_request(self, exception=None):
+        """Record latency and status once the request is fully handled."""
+        start = g.pop('_metrics_start', None)
+        if start is None:
+            return
+        
+        duration = time.perf_counter() - start
+        # after_request does not run for unhandled exceptions
+        status = g.pop('_metrics_status', 500)
+        self.registry.finish_request(g._metrics_endpoint, request.method, status, duration)
+        self.sampler.end(duration, status)
+
+
+def get_metrics(app):
+    """Return the app's MetricsMiddleware, or None if metrics are disabled."""
+    return app.extensions.get('metrics')
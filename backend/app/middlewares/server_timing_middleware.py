@@ -0,0 +1,215 @@
+"""Server-Timing middleware with a lightweight span API."""
+
+from flask import g, has_request_context, template_rendered, before_render_template
+from flask.json.provider import DefaultJSONProvider
+from functools import wraps
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+# Flipped by ServerTimingMiddleware.init_app(); while False every span() call
+# returns a shared no-op object and the DB/template hooks return immediately.
+_enabled = False
+
+# Order of entries in the header; other span names follow in insertion order
+SPAN_ORDER = ('auth', 'db', 'storage', 'render', 'serialization')
+
+
+class _NullSpan:
+    """No-op span used when timing is disabled or outside a request."""
+    
+    __slots__ = ()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    """Times one block and adds it to the request's Server-Timing totals."""
+    
+    __slots__ = ('name', 'start', 'entry')
+    
+    def __init__(self, name):
+        self.name = name
+    
+    def __enter__(self):
+        timings = g.get('_server_timing')
+        if timings is None:
+            timings = g._server_timing = {}
+        entry = timings.get(self.name)
+        if entry is None:
+            # [total seconds, count, open depth]
+            entry = timings[self.name] = [0.0, 0, 0]
+        self.entry = entry
+        entry[2] += 1
+        self.start = time.perf_counter()
+        return self
+    
+    def __exit__(self, *exc):
+        entry = self.entry
+        entry[2] -= 1
+        # Nested spans with the same name (verify_token inside
+        # get_user_from_token) are only counted once
+        if entry[2] == 0:
+            entry[0] += time.perf_counter() - self.start
+            entry[1] += 1
+        return False
+
+
+def span(name):
+    """
+    Time a block of code under a Server-Timing metric name.
+    
+    Usage:
+        with span('storage'):
+            html = f.read()
+    
+    Args:
+        name: Metric name (auth, db, storage, render, serialization, ...)
+    
+    Returns:
+        Context manager; a shared no-op when timing is disabled
+    """
+    if not _enabled or not has_request_context():
+        return _NULL_SPAN
+    return _Span(name)
+
+
+def timed(name):
+    """Decorator form of span() for whole functions."""
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            with span(name):
+                return f(*args, **kwargs)
+        return decorated_function
+    return decorator
+
+
+def add_timing(name, seconds):
+    """Add an externally measured duration to the current request."""
+    if not _enabled or not has_request_context():
+        return
+    timings = g.get('_server_timing')
+    if timings is None:
+        timings = g._server_timing = {}
+    entry = timings.setdefault(name, [0.0, 0, 0])
+    entry[0] += seconds
+    entry[1] += 1
+
+
+class TimedJSONProvider(DefaultJSONProvider):
+    """JSON provider that reports jsonify() time as 'serialization'."""
+    
+    def dumps(self, obj, **kwargs):
+        with span('serialization'):
+            return super().dumps(obj, **kwargs)
+
+
+# The start time lives on the statement's execution context, not on the
+# pooled connection: a failing statement never reaches after_cursor_execute,
+# and its context is simply dropped with it
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _enabled and context is not None and has_request_context():
+        context._server_timing_start = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    start = getattr(context, '_server_timing_start', None)
+    if start is not None:
+        del context._server_timing_start
+        add_timing('db', time.perf_counter() - start)
+
+
+def _before_render(sender, template, context, **extra):
+    if _enabled:
+        g._server_timing_render_start = time.perf_counter()
+
+
+def _after_render(sender, template, context, **extra):
+    if _enabled:
+        start = g.pop('_server_timing_render_start', None)
+        if start is not None:
+            add_timing('render', time.perf_counter() - start)
+
+
+class ServerTimingMiddleware:
+    """
+    Add a Server-Timing header to every response.
+    
+    Breakdown:
+    - auth: JWT verification and user loading (span() in JWTService/user_loader)
+    - db: SQLAlchemy cursor execution time (engine events)
+    - storage: published file reads/writes (span() in routes)
+    - render: Jinja templates (Flask signals) and inline HTML assembly
+    - serialization: jsonify() via TimedJSONProvider
+    - total: time from the first before_request hook to after_request
+    
+    Spans may overlap (the user query inside auth is also counted in db).
+    With SERVER_TIMING_ENABLED off no hooks are registered and span()
+    returns a shared no-op.
+    """
+    
+    def __init__(self, app=None):
+        self.app = app
+        if app:
+            self.init_app(app)
+    
+    def init_app(self, app):
+        """Initialize Server-Timing with Flask app."""
+        global _enabled
+        _enabled = app.config.get('SERVER_TIMING_ENABLED', True)
+        if not _enabled:
+            return
+        
+        app.json = TimedJSONProvider(app)
+        
+        if not event.contains(Engine, 'before_cursor_execute', _before_cursor_execute):
+            event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+            event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+        
+        before_render_template.connect(_before_render, app)
+        template_rendered.connect(_after_render, app)
+        
+        app.before_request(self.start_timer)
+        app.after_request(self.add_header)
+    
+    def start_timer(self):
+        """Mark the start of the request."""
+        g._server_timing_start = time.perf_counter()
+    
+    def add_header(self, response):
+        """Render collected spans into the Server-Timing header."""
+        timings = g.get('_server_timing') or {}
+        parts = []
+        for name in SPAN_ORDER:
+            entry = timings.get(name)
+            if entry:
+                parts.append(self._format(name, entry))
+        for name, entry in timings.items():
+            if name not in SPAN_ORDER:
+                parts.append(self._format(name, entry))
+        
+        start = g.get('_server_timing_start')
+        if start is not None:
+            parts.append(f'total;dur={(time.perf_counter() - start) * 1000:.2f}')
+        
+        if parts:
+            response.headers.add('Server-Timing', ', '.join(parts))
+        return response
+    
+    @staticmethod
+    def _format(name, entry):
+        total, count = entry[0], entry[1]
+        if count > 1:
+            return f'{name};dur={total * 1000:.2f};desc="{count}x"'
+        return f'{name};dur={total * 1000:.2f}'
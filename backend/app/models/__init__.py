@@ -9,5 +9,7 @@ from .user import User
 from .site import Site  
 from .page import Page
 from .asset import Asset
+from .asset_usage import AssetUsage
+from .page_view import PageViewDaily
 
-__all__ = ['db', 'User', 'Site', 'Page', 'Asset']
+__all__ = ['db', 'User', 'Site', 'Page', 'Asset', 'AssetUsage', 'PageViewDaily']
@@ -1,4 +1,5 @@
 """Asset model."""
+import json
 from datetime import datetime
 from . import db
 
@@ -7,13 +8,17 @@ class Asset(db.Model):
     """Model for managing uploaded assets (images, files) for sites."""
     
     id = db.Column(db.Integer, primary_key=True)
-    filename = db.Column(db.String(255), nullable=False)  # Stored filename (UUID-based)
+    filename = db.Column(db.String(255), nullable=False, index=True)  # Stored filename (UUID-based)
     original_name = db.Column(db.String(255), nullable=False)  # Original upload filename
     file_size = db.Column(db.Integer, nullable=False)  # File size in bytes
     file_type = db.Column(db.String(50), nullable=False)  # MIME type (image/jpeg, etc.)
     width = db.Column(db.Integer)  # Image width (for images)
     height = db.Column(db.Integer)  # Image height (for images)
     url = db.Column(db.String(500), nullable=False)  # Full URL path to file
+    variants = db.Column(db.Text)  # JSON list of resized/re-encoded variants (see ImageVariantService)
+    content_hash = db.Column(db.String(64), index=True)  # SHA-256 of the file, key in ContentStore
+    original_size = db.Column(db.Integer)  # Uploaded size in bytes, before AssetOptimizer
+    optimized_size = db.Column(db.Integer)  # Bytes served after optimization (WebP copy for GIFs); NULL until optimized
     
     # Relationships
     site_id = db.Column(db.Integer, db.ForeignKey('site.id'), nullable=False)
@@ -41,6 +46,66 @@ class Asset(db.Model):
         """Check if asset is an image."""
         return self.file_type.startswith('image/')
     
+    @property
+    def variant_list(self):
+        """Parsed variants, empty while generation is pending or not applicable."""
+        if not self.variants:
+            return []
+        return json.loads(self.variants)
+    
+    def variant_url(self, variant_filename):
+        """URL of a variant file, next to the original URL."""
+        return f"{self.url.rsplit('/', 1)[0]}/variants/{variant_filename}"
+    
+    def srcset(self, fmt=None):
+        """
+        Build a srcset string for one variant format.
+        
+        Args:
+            fmt: Variant format (jpg, png, webp, avif); defaults to the
+                 fallback format used for <img src>
+        
+        Returns:
+            str: e.g. "https://.../abc_w320.jpg 320w, ..., https://.../abc.jpg 2400w"
+        """
+        variants = self.variant_list
+        if not variants:
+            return ''
+        
+        if fmt is None:
+            fmt = next((v['format'] for v in variants if v['format'] in ('jpg', 'png')), 'jpg')
+        
+        candidates = [
+            f"{self.variant_url(v['filename'])} {v['width']}w"
+            for v in variants if v['format'] == fmt
+        ]
+        # The original is the largest candidate of its own format
+        if fmt in ('jpg', 'png') and self.width:
+            candidates.append(f"{self.url} {self.width}w")
+        return ', '.join(candidates)
+    
+    def srcset_data(self):
+        """
+        Responsive image data for the editor and publisher.
+        
+        Returns:
+            dict: {'src', 'srcset', 'width', 'height', 'sources': [{'type', 'srcset'}]}
+                  where sources are listed best format first (AVIF, WebP)
+        """
+        variants = self.variant_list
+        sources = []
+        for fmt, mime in (('avif', 'image/avif'), ('webp', 'image/webp')):
+            if any(v['format'] == fmt for v in variants):
+                sources.append({'type': mime, 'srcset': self.srcset(fmt)})
+        
+        return {
+            'src': self.url,
+            'srcset': self.srcset(),
+            'width': self.width,
+            'height': self.height,
+            'sources': sources
+        }
+    
     def to_dict(self):
         """Convert asset to dictionary for API responses."""
         return {
@@ -49,11 +114,14 @@ class Asset(db.Model):
             'original_name': self.original_name,
             'file_size': self.file_size,
             'file_size_formatted': self.file_size_formatted,
+            'original_size': self.original_size,
+            'optimized_size': self.optimized_size,
             'file_type': self.file_type,
             'width': self.width,
             'height': self.height,
             'url': self.url,
             'is_image': self.is_image,
+            'variants': self.variant_list,
             'created_at': self.created_at.isoformat(),
             'site_id': self.site_id,
             'user_id': self.user_id
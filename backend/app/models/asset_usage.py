@@ -0,0 +1,25 @@
+"""Asset usage model."""
+from datetime import datetime
+from . import db
+
+
+class AssetUsage(db.Model):
+    """
+    One row per (asset, page) where the page content references the asset.
+    
+    Maintained by AssetUsageService whenever page content is saved. The
+    primary key starts with asset_id, so "is this asset used" and "which
+    pages use it" are single index lookups; page_id is indexed for the
+    per-page diff done on save.
+    """
+    
+    __tablename__ = 'asset_usage'
+    
+    asset_id = db.Column(db.Integer, db.ForeignKey('asset.id', ondelete='CASCADE'), primary_key=True)
+    page_id = db.Column(db.Integer, db.ForeignKey('page.id', ondelete='CASCADE'), primary_key=True, index=True)
+    site_id = db.Column(db.Integer, db.ForeignKey('site.id', ondelete='CASCADE'), nullable=False, index=True)  # site of the page
+    
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<AssetUsage asset={self.asset_id} page={self.page_id}>'
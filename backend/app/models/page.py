@@ -1,11 +1,14 @@
 """Page model."""
 import os
 import json
+import logging
 import re
 import unicodedata
 from datetime import datetime
 from . import db
 
+logger = logging.getLogger(__name__)
+
 
 class Page(db.Model):
     """Page model for managing website pages."""
@@ -25,6 +28,7 @@ class Page(db.Model):
     is_published = db.Column(db.Boolean, default=False)
     published_at = db.Column(db.DateTime)
     is_homepage = db.Column(db.Boolean, default=False)
+    assets_indexed_at = db.Column(db.DateTime)  # Last AssetUsage sync; NULL = never indexed
     
     # Foreign keys for data isolation
     site_id = db.Column(db.Integer, db.ForeignKey('site.id'), nullable=False)
@@ -68,7 +72,7 @@ class Page(db.Model):
             self.published_at = datetime.utcnow()
             return True
         except Exception as e:
-            print(f"Error publishing page from Silex: {e}")
+            logger.error("Error publishing page from Silex: %s", e)
             return False
     
     def publish(self, storage_path):
@@ -99,7 +103,7 @@ class Page(db.Model):
             
             return True
         except Exception as e:
-            print(f"Error publishing page: {e}")
+            logger.error("Error publishing page: %s", e)
             return False
     
     def generate_html(self):
@@ -122,62 +126,9 @@ class Page(db.Model):
             except json.JSONDecodeError:
                 html_body = self.content
         
-        # If no content, use default template
-        if not html_body:
-            html_body = f"""
-    <div class="hero-section text-center">
-        <div class="container">
-            <h1 class="display-4 mb-4">{self.title}</h1>
-            <p class="lead">{self.description or 'Trang được tạo bằng PageMade'}</p>
-        </div>
-    </div>
-    
-    <div class="content-section">
-        <div class="container">
-            <p>Nội dung đang được cập nhật...</p>
-        </div>
-    </div>
-    
-    <footer class="footer text-center">
-        <div class="container">
-            <p>&copy; 2025 {self.site.title} - 
-            <a href="https://pagemade.site" class="text-decoration-none">Được tạo bằng PageMade</a></p>
-        </div>
-    </footer>
-"""
-            css_styles = """
-        body { font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif; }
-        .hero-section { 
-            background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); 
-            color: white; 
-            padding: 100px 0; 
-        }
-        .content-section { padding: 60px 0; }
-        .footer { background: #2c3e50; color: white; padding: 40px 0; }
-"""
-        
-        return f"""<!DOCTYPE html>
-<html lang="vi">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>{self.title} - {self.site.title}</title>
-    <meta name="description" content="{self.description or 'Trang được tạo bằng PageMade'}">
-    <meta property="og:title" content="{self.title}">
-    <meta property="og:description" content="{self.description or 'Trang được tạo bằng PageMade'}">
-    <meta property="og:url" content="{self.get_url()}">
-    
-    <link href="https://cdn.jsdelivr.net/npm/bootstrap@5.1.3/dist/css/bootstrap.min.css" rel="stylesheet">
-    <link href="https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.0.0/css/all.min.css" rel="stylesheet">
-    <style>
-{css_styles}
-    </style>
-</head>
-<body>
-{html_body}
-    <script src="https://cdn.jsdelivr.net/npm/bootstrap@5.1.3/dist/js/bootstrap.bundle.min.js"></script>
-</body>
-</html>"""
+        # Layout supplies the placeholder body when there is no content
+        from app.services.render_engine import get_render_engine
+        return get_render_engine().render('legacy', self.site, self, body=html_body, css=css_styles)
     
     def to_dict(self):
         """Convert page to dictionary."""
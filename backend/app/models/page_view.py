@@ -0,0 +1,23 @@
+"""Daily page view rollup model."""
+from . import db
+
+
+class PageViewDaily(db.Model):
+    """
+    Number of views of a page on one (UTC) day.
+    
+    Written in batches by PageViewBuffer: each flush adds its counts to
+    the existing row with an upsert, so there is one row per page and day
+    however many workers serve the page.
+    """
+    
+    __tablename__ = 'page_view_daily'
+    
+    page_id = db.Column(db.Integer, db.ForeignKey('page.id', ondelete='CASCADE'), primary_key=True)
+    day = db.Column(db.Date, primary_key=True)
+    site_id = db.Column(db.Integer, db.ForeignKey('site.id', ondelete='CASCADE'), nullable=False, index=True)  # site of the page
+    
+    views = db.Column(db.Integer, nullable=False, default=0)
+    
+    def __repr__(self):
+        return f'<PageViewDaily page={self.page_id} day={self.day} views={self.views}>'
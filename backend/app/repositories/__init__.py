@@ -4,10 +4,14 @@ from .user_repository import UserRepository
 from .site_repository import SiteRepository
 from .page_repository import PageRepository
 from .asset_repository import AssetRepository
+from .asset_usage_repository import AssetUsageRepository
+from .page_view_repository import PageViewRepository
 
 __all__ = [
     'UserRepository',
     'SiteRepository',
     'PageRepository',
-    'AssetRepository'
+    'AssetRepository',
+    'AssetUsageRepository',
+    'PageViewRepository'
 ]
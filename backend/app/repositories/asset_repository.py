@@ -52,6 +52,19 @@ class AssetRepository:
             Asset.file_type.startswith('image/')
         ).order_by(Asset.created_at.desc()).all()
     
+    @staticmethod
+    def find_with_variants_by_site(site_id):
+        """Find assets of a site that have responsive variants."""
+        return Asset.query.filter(
+            Asset.site_id == site_id,
+            Asset.variants.isnot(None)
+        ).all()
+    
+    @staticmethod
+    def count_by_content_hash(content_hash):
+        """Count assets sharing the same file content."""
+        return Asset.query.filter_by(content_hash=content_hash).count()
+    
     @staticmethod
     def find_by_url(url):
         """Find asset by URL."""
@@ -100,6 +113,34 @@ class AssetRepository:
         assets = Asset.query.filter_by(site_id=site_id).all()
         return sum(asset.file_size or 0 for asset in assets)
     
+    @staticmethod
+    def get_storage_stats_by_site(site_id):
+        """
+        Storage totals of a site in one aggregate query.
+        
+        Returns:
+            dict: {'asset_count', 'stored_bytes', 'original_bytes',
+                   'optimized_bytes', 'optimized_count'}; assets not yet
+                  optimized count with their stored size
+        """
+        from sqlalchemy import func
+        
+        row = db.session.query(
+            func.count(Asset.id),
+            func.coalesce(func.sum(Asset.file_size), 0),
+            func.coalesce(func.sum(func.coalesce(Asset.original_size, Asset.file_size)), 0),
+            func.coalesce(func.sum(func.coalesce(Asset.optimized_size, Asset.file_size)), 0),
+            func.count(Asset.optimized_size),
+        ).filter(Asset.site_id == site_id).one()
+        
+        return {
+            'asset_count': row[0],
+            'stored_bytes': int(row[1]),
+            'original_bytes': int(row[2]),
+            'optimized_bytes': int(row[3]),
+            'optimized_count': row[4],
+        }
+    
     @staticmethod
     def get_total_size_by_user(user_id):
         """Calculate total storage used by a user."""
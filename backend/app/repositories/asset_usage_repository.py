@@ -0,0 +1,88 @@
+"""Asset usage repository for database operations."""
+from app.models import db, Asset, AssetUsage, Page
+
+
+class AssetUsageRepository:
+    """Repository for AssetUsage data access."""
+    
+    @staticmethod
+    def is_used(asset_id):
+        """Check if any page references an asset (primary key lookup)."""
+        return db.session.query(
+            AssetUsage.query.filter_by(asset_id=asset_id).exists()
+        ).scalar()
+    
+    @staticmethod
+    def find_pages_using(asset_id):
+        """Pages whose content references an asset."""
+        return Page.query.join(AssetUsage, AssetUsage.page_id == Page.id) \
+            .filter(AssetUsage.asset_id == asset_id) \
+            .order_by(Page.id).all()
+    
+    @staticmethod
+    def asset_ids_for_page(page_id):
+        """IDs of assets currently indexed for a page."""
+        rows = db.session.query(AssetUsage.asset_id).filter_by(page_id=page_id)
+        return {row.asset_id for row in rows}
+    
+    @staticmethod
+    def add_for_page(page, asset_ids):
+        """Index new references of a page (no commit)."""
+        db.session.add_all([
+            AssetUsage(asset_id=asset_id, page_id=page.id, site_id=page.site_id)
+            for asset_id in asset_ids
+        ])
+    
+    @staticmethod
+    def remove_for_page(page_id, asset_ids):
+        """Drop references a page no longer has (no commit)."""
+        if asset_ids:
+            AssetUsage.query.filter(
+                AssetUsage.page_id == page_id,
+                AssetUsage.asset_id.in_(list(asset_ids))
+            ).delete(synchronize_session=False)
+    
+    @staticmethod
+    def delete_by_page(page_id):
+        """Remove all references of a page (no commit)."""
+        AssetUsage.query.filter_by(page_id=page_id).delete(synchronize_session=False)
+    
+    @staticmethod
+    def delete_by_asset(asset_id):
+        """Remove all references to an asset (no commit)."""
+        AssetUsage.query.filter_by(asset_id=asset_id).delete(synchronize_session=False)
+    
+    @staticmethod
+    def delete_by_site(site_id):
+        """Remove references from a site's pages and to a site's assets (no commit)."""
+        site_assets = db.session.query(Asset.id).filter(Asset.site_id == site_id)
+        AssetUsage.query.filter(
+            (AssetUsage.site_id == site_id) | AssetUsage.asset_id.in_(site_assets.scalar_subquery())
+        ).delete(synchronize_session=False)
+    
+    @staticmethod
+    def find_unused(site_id=None, created_before=None):
+        """
+        Assets no page references.
+        
+        Args:
+            site_id: Limit to one site's assets
+            created_before: Only assets uploaded before this datetime
+        
+        Returns:
+            list: Asset rows, oldest first
+        """
+        query = Asset.query.filter(~AssetUsage.query.filter(AssetUsage.asset_id == Asset.id).exists())
+        if site_id is not None:
+            query = query.filter(Asset.site_id == site_id)
+        if created_before is not None:
+            query = query.filter(Asset.created_at < created_before)
+        return query.order_by(Asset.created_at, Asset.id).all()
+    
+    @staticmethod
+    def count_unindexed_pages(site_id=None):
+        """Pages whose references were never indexed."""
+        query = Page.query.filter(Page.assets_indexed_at.is_(None))
+        if site_id is not None:
+            query = query.filter(Page.site_id == site_id)
+        return query.count()
@@ -0,0 +1,113 @@
+"""Page view rollup repository for database operations."""
+from sqlalchemy import func
+
+from app.models import db, Page, PageViewDaily
+
+
+class PageViewRepository:
+    """Repository for PageViewDaily data access."""
+    
+    # Rows per INSERT; keeps SQLite under its bound-parameter limit
+    UPSERT_CHUNK_SIZE = 200
+    
+    @staticmethod
+    def add_counts(counts):
+        """
+        Add view counts to the daily rollup (no commit).
+        
+        Uses one INSERT ... ON CONFLICT DO UPDATE per chunk on PostgreSQL
+        and SQLite, and a read-modify-write per row elsewhere. Counts for
+        pages that no longer exist are dropped.
+        
+        Args:
+            counts: dict of (page_id, site_id, day) -> views
+        
+        Returns:
+            int: Number of views written
+        """
+        if not counts:
+            return 0
+        
+        page_ids = {page_id for page_id, _, _ in counts}
+        existing = {
+            row.id for row in db.session.query(Page.id).filter(Page.id.in_(list(page_ids)))
+        }
+        rows = [
+            {'page_id': page_id, 'site_id': site_id, 'day': day, 'views': views}
+            for (page_id, site_id, day), views in counts.items()
+            if page_id in existing
+        ]
+        if not rows:
+            return 0
+        
+        dialect = db.session.get_bind().dialect.name
+        if dialect == 'postgresql':
+            from sqlalchemy.dialects.postgresql import insert
+        elif dialect == 'sqlite':
+            from sqlalchemy.dialects.sqlite import insert
+        else:
+            insert = None
+        
+        if insert is None:
+            for row in rows:
+                current = db.session.get(PageViewDaily, (row['page_id'], row['day']))
+                if current is None:
+                    db.session.add(PageViewDaily(**row))
+                else:
+                    current.views += row['views']
+            db.session.flush()
+        else:
+            size = PageViewRepository.UPSERT_CHUNK_SIZE
+            for start in range(0, len(rows), size):
+                stmt = insert(PageViewDaily).values(rows[start:start + size])
+                stmt = stmt.on_conflict_do_update(
+                    index_elements=['page_id', 'day'],
+                    set_={'views': PageViewDaily.views + stmt.excluded.views}
+                )
+                db.session.execute(stmt)
+        return sum(row['views'] for row in rows)
+    
+    @staticmethod
+    def daily_counts(page_id=None, site_id=None, start=None, end=None):
+        """
+        Views per day for a page or a whole site.
+        
+        Args:
+            page_id: Page to count (or None with site_id)
+            site_id: Site whose pages are summed
+            start: First day included (date)
+            end: Last day included (date)
+        
+        Returns:
+            dict: date -> views, only days that have rows
+        """
+        query = db.session.query(PageViewDaily.day, func.sum(PageViewDaily.views))
+        if page_id is not None:
+            query = query.filter(PageViewDaily.page_id == page_id)
+        if site_id is not None:
+            query = query.filter(PageViewDaily.site_id == site_id)
+        if start is not None:
+            query = query.filter(PageViewDaily.day >= start)
+        if end is not None:
+            query = query.filter(PageViewDaily.day <= end)
+        return {day: int(views) for day, views in query.group_by(PageViewDaily.day)}
+    
+    @staticmethod
+    def total(page_id=None, site_id=None):
+        """All-time views of a page or a site."""
+        query = db.session.query(func.coalesce(func.sum(PageViewDaily.views), 0))
+        if page_id is not None:
+            query = query.filter(PageViewDaily.page_id == page_id)
+        if site_id is not None:
+            query = query.filter(PageViewDaily.site_id == site_id)
+        return int(query.scalar())
+    
+    @staticmethod
+    def delete_by_page(page_id):
+        """Remove the counts of a page (no commit)."""
+        PageViewDaily.query.filter_by(page_id=page_id).delete(synchronize_session=False)
+    
+    @staticmethod
+    def delete_by_site(site_id):
+        """Remove the counts of a site's pages (no commit)."""
+        PageViewDaily.query.filter_by(site_id=site_id).delete(synchronize_session=False)
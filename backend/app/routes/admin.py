@@ -1,8 +1,9 @@
 from app.utils.url_helpers import url_for_external
 """Admin blueprint - User management and admin panel."""
-from flask import Blueprint, render_template, redirect, url_for, flash, jsonify, current_app
+from flask import Blueprint, render_template, redirect, url_for, flash, jsonify, current_app, request, Response, abort
 from flask_login import login_required, current_user
 from functools import wraps
+from datetime import datetime
 import re
 import requests
 import html
@@ -204,3 +205,175 @@ def clear_cache():
     else:
         return Helpers.error_response('Failed to clear cache', 500)
 
+
+# ================================
+# PROFILING
+# ================================
+
+def _profiles_dir():
+    """Directory shared by all workers for finished profiles."""
+    import os
+    path = os.path.join(current_app.root_path, '..', 'logs', 'profiles')
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def _save_profile(profiles_dir, name):
+    """Build the on_finish callback that writes a profile to disk."""
+    import os
+    import json
+    
+    def save(profiler):
+        with open(os.path.join(profiles_dir, f'{name}.collapsed'), 'w') as f:
+            f.write(profiler.to_collapsed())
+        with open(os.path.join(profiles_dir, f'{name}.json'), 'w') as f:
+            json.dump(profiler.summary(), f)
+    
+    return save
+
+
+@admin_bp.route('/api/profiler/start', methods=['POST'])
+@admin_required
+def start_profiler():
+    """
+    Sample this worker for N seconds (admin only).
+    
+    Body (JSON or form):
+        seconds: Sampling duration in seconds (default 10); must not exceed
+                 PROFILER_MAX_SECONDS (60 in config/base.py)
+        interval_ms: Milliseconds between samples (default 5)
+        all_threads: Also sample threads that are not serving a request
+    """
+    import os
+    from app.utils.profiler import SamplingProfiler
+    from app.middlewares.metrics_middleware import get_metrics
+    
+    params = request.get_json(silent=True) or request.form
+    try:
+        seconds = float(params.get('seconds', 10))
+        interval = float(params.get('interval_ms', 5)) / 1000
+    except (TypeError, ValueError):
+        return Helpers.error_response('seconds/interval_ms không hợp lệ', 400)
+    
+    max_seconds = current_app.config.get('PROFILER_MAX_SECONDS', 60)
+    if not 0 < seconds <= max_seconds or not 0.001 <= interval <= 1:
+        return Helpers.error_response(f'seconds phải trong khoảng (0, {max_seconds}]', 400)
+    
+    current = current_app.extensions.get('profiler')
+    if current and current.running:
+        return Helpers.error_response('Profiler đang chạy trên worker này', 409)
+    
+    # Attribute samples to the endpoint each thread is serving
+    metrics = get_metrics(current_app)
+    active_requests = metrics.sampler._active if metrics else {}
+    
+    name = f"{datetime.utcnow().strftime('%Y%m%dT%H%M%S')}-{os.getpid()}"
+    profiler = SamplingProfiler(
+        seconds,
+        interval=interval,
+        active_requests=active_requests,
+        requests_only=str(params.get('all_threads', '')).lower() not in ('1', 'true', 'yes')
+    )
+    profiler.start(on_finish=_save_profile(_profiles_dir(), name))
+    current_app.extensions['profiler'] = profiler
+    
+    current_app.logger.info(f"Profiler started by user {current_user.id}: {name} ({seconds}s)")
+    
+    return Helpers.success_response(
+        data={'profile': name, 'pid': os.getpid(), 'seconds': seconds},
+        message='Profiler started',
+        status=202
+    )
+
+
+@admin_bp.route('/api/profiler', methods=['GET'])
+@admin_required
+def list_profiles():
+    """List finished profiles from all workers, newest first (admin only)."""
+    import os
+    
+    profiles_dir = _profiles_dir()
+    names = sorted(
+        (entry.name[:-len('.collapsed')] for entry in os.scandir(profiles_dir)
+         if entry.name.endswith('.collapsed')),
+        reverse=True
+    )
+    
+    current = current_app.extensions.get('profiler')
+    return Helpers.success_response(data={
+        'profiles': names,
+        'current': current.summary() if current else None
+    })
+
+
+@admin_bp.route('/api/profiler/<name>', methods=['GET'])
+@admin_required
+def get_profile(name):
+    """
+    Download a profile (admin only).
+    
+    ?format=collapsed (default) returns flamegraph.pl/speedscope input,
+    ?format=json returns per-endpoint sample counts and hottest frames.
+    """
+    import os
+    import json
+    from werkzeug.utils import secure_filename
+    
+    name = secure_filename(name)
+    fmt = request.args.get('format', 'collapsed')
+    if fmt not in ('collapsed', 'json'):
+        return Helpers.error_response('format phải là collapsed hoặc json', 400)
+    
+    path = os.path.join(_profiles_dir(), f'{name}.{fmt}')
+    if not os.path.exists(path):
+        abort(404)
+    
+    if fmt == 'json':
+        with open(path) as f:
+            return Helpers.success_response(data=json.load(f))
+    
+    with open(path) as f:
+        return Response(
+            f.read(),
+            mimetype='text/plain',
+            headers={'Content-Disposition': f'attachment; filename={name}.collapsed'}
+        )
+
+
+# ================================
+# UPLOAD RECONCILIATION
+# ================================
+
+@admin_bp.route('/api/uploads/reconcile', methods=['POST'])
+@admin_required
+def start_upload_reconcile():
+    """
+    Compare the uploads volume with Asset rows in the background (admin only).
+    
+    Body (JSON or form):
+        quarantine: Move orphaned files into uploads/.quarantine/
+    """
+    from app.services.upload_reconciler import start_reconcile_job
+    
+    params = request.get_json(silent=True) or request.form
+    quarantine = str(params.get('quarantine', '')).lower() in ('1', 'true', 'yes')
+    
+    job, started = start_reconcile_job(current_app._get_current_object(), quarantine)
+    if not started:
+        return Helpers.error_response('Reconcile đang chạy trên worker này', 409)
+    
+    current_app.logger.info(f"Upload reconcile started by user {current_user.id} (quarantine={quarantine})")
+    
+    return Helpers.success_response(data=job.status(), message='Reconcile started', status=202)
+
+
+@admin_bp.route('/api/uploads/reconcile', methods=['GET'])
+@admin_required
+def upload_reconcile_status():
+    """Progress of the running reconcile job, or the last report (admin only)."""
+    job = current_app.extensions.get('upload_reconcile')
+    if not job:
+        return Helpers.error_response('Chưa có reconcile nào trên worker này', 404)
+    
+    limit = request.args.get('limit', 100, type=int)
+    return Helpers.success_response(data=job.status(limit=limit))
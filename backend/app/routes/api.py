@@ -1,4 +1,4 @@
-from flask import Blueprint, request, jsonify, abort, current_app
+from flask import Blueprint, Response, request, jsonify, abort, current_app
 from flask_login import login_required, current_user
 from app.models.page import Page
 from app.models.site import Site
@@ -7,7 +7,6 @@ from app.middleware.jwt_auth import jwt_required, optional_jwt
 from app.services.jwt_service import JWTService
 from datetime import datetime
 import os
-import json
 
 api_bp = Blueprint('api', __name__, url_prefix='/api')
 
@@ -20,6 +19,23 @@ def health_check():
         'message': 'API is running'
     }), 200
 
+@api_bp.route('/metrics', methods=['GET'])
+def metrics():
+    """Prometheus metrics for this worker (latency histograms, counters, in-flight)."""
+    token = current_app.config.get('METRICS_TOKEN')
+    if token and request.headers.get('Authorization') != f'Bearer {token}':
+        return jsonify({'error': 'Unauthorized'}), 401
+    
+    from app.middlewares.metrics_middleware import get_metrics
+    collector = get_metrics(current_app)
+    if collector is None:
+        return jsonify({'error': 'Metrics are disabled'}), 404
+    
+    return Response(
+        collector.registry.render_prometheus(),
+        mimetype='text/plain; version=0.0.4'
+    )
+
 @api_bp.route('/pages', methods=['POST'])
 @jwt_required
 def create_page():
@@ -41,16 +57,10 @@ def create_page():
     css_content = ''
     
     if template_id and template_id != 'blank':
-        template_file = os.path.join(get_templates_dir(), f'{template_id}.json')
-        if os.path.exists(template_file):
-            try:
-                with open(template_file, 'r', encoding='utf-8') as f:
-                    template_data = json.load(f)
-                    content = template_data.get('content', {})
-                    html_content = content.get('html', '')
-                    css_content = content.get('css', '')
-            except (json.JSONDecodeError, IOError) as e:
-                current_app.logger.error(f"Error loading template {template_id}: {e}")
+        from app.services.template_registry import get_template_registry
+        template_html, template_css = get_template_registry().get_content(template_id)
+        if template_html is not None:
+            html_content, css_content = template_html, template_css
     
     # Create page with template content
     page = Page(
@@ -71,53 +81,67 @@ def create_page():
         page.is_homepage = True
     
     db.session.add(page)
+    db.session.flush()
+    
+    from app.services.search_service import SearchService
+    SearchService.index_page(page)
     db.session.commit()
     
     return jsonify(page.to_dict()), 201
 
 
+@api_bp.route('/search', methods=['GET'])
+@jwt_required
+def search():
+    """
+    Full-text search over the current user's pages and assets.
+    
+    Query params: q, type (page|asset), site_id, page, per_page (max 100).
+    Results are ranked best match first; each has a snippet with the
+    matched words in <mark>.
+    """
+    from app.services.search_service import SearchService
+    from app.utils.api_helpers import error_response, paginated_response
+    
+    query = request.args.get('q', '').strip()
+    kind = request.args.get('type') or None
+    if kind not in (None, 'page', 'asset'):
+        return error_response("type must be 'page' or 'asset'", 400)
+    site_id = request.args.get('site_id', type=int)
+    page = max(request.args.get('page', 1, type=int), 1)
+    per_page = min(max(request.args.get('per_page', 20, type=int), 1), 100)
+    
+    try:
+        items, total = SearchService.search(request.current_user.id, query, kind=kind, site_id=site_id,
+                                            page=page, per_page=per_page)
+    except Exception as e:
+        current_app.logger.error(f"Search error: {e}")
+        return error_response("Search failed", 500)
+    
+    return paginated_response(
+        data=items,
+        page=page,
+        per_page=per_page,
+        total=total,
+        message="Search results retrieved successfully"
+    )
+
+
 # ============================================
 # TEMPLATE ENDPOINTS
 # ============================================
 
-def get_templates_dir():
-    """Get the templates directory path."""
-    # Templates are in backend/static/templates/, not app/static/templates/
-    # current_app.root_path = backend/app/, so we go up one level
-    return os.path.join(current_app.root_path, '..', 'static', 'templates')
-
-
 @api_bp.route('/templates', methods=['GET'])
 def list_templates():
     """
     Get list of available templates.
     Returns template metadata (without full content for performance).
     """
-    templates_dir = get_templates_dir()
-    templates = []
-    
-    if not os.path.exists(templates_dir):
-        return jsonify({'templates': [], 'message': 'No templates directory found'}), 200
-    
-    for filename in os.listdir(templates_dir):
-        if filename.endswith('.json'):
-            filepath = os.path.join(templates_dir, filename)
-            try:
-                with open(filepath, 'r', encoding='utf-8') as f:
-                    template_data = json.load(f)
-                    # Return metadata only (exclude content for list view)
-                    templates.append({
-                        'id': template_data.get('id'),
-                        'name': template_data.get('name'),
-                        'description': template_data.get('description'),
-                        'category': template_data.get('category'),
-                        'thumbnail': template_data.get('thumbnail')
-                    })
-            except (json.JSONDecodeError, IOError) as e:
-                current_app.logger.error(f"Error reading template {filename}: {e}")
-                continue
-    
-    return jsonify({'templates': templates}), 200
+    from app.services.template_registry import get_template_registry
+    templates, etag = get_template_registry().list()
+    
+    response = jsonify({'templates': templates})
+    return _cacheable(response, etag, current_app.config.get('TEMPLATE_LIST_MAX_AGE', 60))
 
 
 @api_bp.route('/templates/<template_id>', methods=['GET'])
@@ -125,16 +149,45 @@ def get_template(template_id):
     """
     Get a specific template by ID (includes full content).
     """
-    templates_dir = get_templates_dir()
-    template_file = os.path.join(templates_dir, f'{template_id}.json')
+    from app.services.template_registry import get_template_registry
+    template_data, etag = get_template_registry().get(template_id)
     
-    if not os.path.exists(template_file):
+    if template_data is None:
         return jsonify({'error': 'Template not found'}), 404
     
+    return _cacheable(jsonify(template_data), etag, current_app.config.get('TEMPLATE_LIST_MAX_AGE', 60))
+
+
+@api_bp.route('/templates/thumbnails/<filename>', methods=['GET'])
+def get_template_thumbnail(filename):
+    """
+    Template thumbnail. URLs from the template list carry ?v=<version> and
+    are cached for a year; other requests get a short max-age.
+    """
+    from flask import send_from_directory
+    from app.services.template_registry import get_template_registry
+    registry = get_template_registry()
+    
     try:
-        with open(template_file, 'r', encoding='utf-8') as f:
-            template_data = json.load(f)
-        return jsonify(template_data), 200
-    except (json.JSONDecodeError, IOError) as e:
-        current_app.logger.error(f"Error reading template {template_id}: {e}")
-        return jsonify({'error': 'Failed to load template'}), 500
\ No newline at end of file
+        path = registry.thumbnail_path(filename)
+    except ValueError:
+        abort(404)
+    
+    version = request.args.get('v')
+    immutable = version is not None and version == registry.thumbnail_version(filename)
+    response = send_from_directory(
+        os.path.dirname(path), filename,
+        max_age=31536000 if immutable else current_app.config.get('TEMPLATE_LIST_MAX_AGE', 60)
+    )
+    response.cache_control.public = True
+    if immutable:
+        response.cache_control.immutable = True
+    return response
+
+
+def _cacheable(response, etag, max_age):
+    """Add an ETag and public max-age, answering 304 to matching requests."""
+    response.set_etag(etag)
+    response.cache_control.public = True
+    response.cache_control.max_age = max_age
+    return response.make_conditional(request)
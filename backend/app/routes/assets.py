@@ -11,15 +11,23 @@ import secrets
 from PIL import Image
 import mimetypes
 import stat
+import logging
 
 from app.models import db, Asset
-from app.services import AssetService
-from app.repositories import AssetRepository, SiteRepository
+from app.services import AssetService, ImageVariantService, ImageResizeCache
+from app.services.image_service import ResizeParamsError, UnreadableImageError
+from app.repositories import AssetRepository, SiteRepository, AssetUsageRepository
+from app.services.asset_usage_service import AssetUsageService
 from app.utils import FileHandler, Helpers
+from app.utils.upload_stream import upload_limit
+from app.services.storage_backend import get_storage, StorageNotFoundError
+from werkzeug.exceptions import NotFound
 
 # Create blueprint
 assets_bp = Blueprint('assets', __name__, url_prefix='/api/assets')
 
+logger = logging.getLogger(__name__)
+
 
 # ================================
 # ASSET UPLOAD & MANAGEMENT
@@ -29,61 +37,36 @@ assets_bp = Blueprint('assets', __name__, url_prefix='/api/assets')
 @login_required
 def upload_asset():
     """Upload asset file."""
-    print('='*80)
-    print('🔼 [BACKEND] /api/assets/upload endpoint called')
-    print(f'🔼 [BACKEND] User: {current_user.id} ({current_user.email})')
-    print(f'🔼 [BACKEND] Request method: {request.method}')
-    print(f'🔼 [BACKEND] Request headers: {dict(request.headers)}')
-    print(f'🔼 [BACKEND] Request form data: {dict(request.form)}')
-    print(f'🔼 [BACKEND] Request files: {list(request.files.keys())}')
-    
     # Get site_id
     site_id = request.form.get('site_id')
-    print(f'🔼 [BACKEND] Site ID from form: {site_id}')
     
     if not site_id:
-        print('❌ [BACKEND] Error: site_id is required')
         return Helpers.error_response('site_id là bắt buộc', 400)
     
     try:
         site_id = int(site_id)
-        print(f'🔼 [BACKEND] Site ID (int): {site_id}')
     except ValueError:
-        print('❌ [BACKEND] Error: site_id invalid format')
         return Helpers.error_response('site_id không hợp lệ', 400)
     
     # Verify site ownership
     site = SiteRepository.find_by_id(site_id)
-    print(f'🔼 [BACKEND] Site found: {site.title if site else "None"}')
-    print(f'🔼 [BACKEND] Site owner: {site.user_id if site else "N/A"}')
-    print(f'🔼 [BACKEND] Current user: {current_user.id}')
-    
     if not site or site.user_id != current_user.id:
-        print('❌ [BACKEND] Error: Unauthorized - user does not own this site')
         return Helpers.error_response('Unauthorized', 403)
     
     # Check if file exists in request
     if 'file' not in request.files:
-        print('❌ [BACKEND] Error: No file in request')
         return Helpers.error_response('Không có file được tải lên', 400)
     
     file = request.files['file']
-    print(f'🔼 [BACKEND] File object: {file}')
-    print(f'🔼 [BACKEND] Filename: {file.filename}')
-    print(f'🔼 [BACKEND] Content type: {file.content_type}')
     
     if not file or file.filename == '':
-        print('❌ [BACKEND] Error: Empty filename')
         return Helpers.error_response('Không có file được chọn', 400)
     
     # Upload using service
     static_folder = current_app.static_folder
-    print(f'🔼 [BACKEND] Static folder: {static_folder}')
-    print(f'🔼 [BACKEND] Calling AssetService.upload_asset()...')
     
     # Get base URL from request
     base_url = request.host_url.rstrip('/')  # e.g. https://app.pagemade.site
-    print(f'🔼 [BACKEND] Base URL: {base_url}')
     
     success, asset_dict, error = AssetService.upload_asset(
         file=file,
@@ -93,23 +76,64 @@ def upload_asset():
         base_url=base_url
     )
     
-    print(f'🔼 [BACKEND] Upload result: success={success}')
-    
     if success:
-        print(f'✅ [BACKEND] Upload successful!')
-        print(f'✅ [BACKEND] Asset: {asset_dict}')
-        print('='*80)
+        logger.info("[UPLOAD] Asset %s uploaded to site %s by user %s",
+                    asset_dict.get('id'), site_id, current_user.id)
         return Helpers.success_response(
             data={'asset': asset_dict},
             message='Upload thành công!',
             status=201
         )
     else:
-        print(f'❌ [BACKEND] Upload failed: {error}')
-        print('='*80)
+        logger.warning("[UPLOAD] Upload to site %s failed: %s", site_id, error)
         return Helpers.error_response(error, 400)
 
 
+@assets_bp.route('/upload/batch', methods=['POST'])
+@upload_limit('UPLOAD_MAX_BATCH_SIZE')
+@login_required
+def upload_assets_batch():
+    """Upload several files (form field 'files') in one request."""
+    site_id = request.form.get('site_id', type=int)
+    if not site_id:
+        return Helpers.error_response('site_id là bắt buộc', 400)
+    
+    # Verify site ownership
+    site = SiteRepository.find_by_id(site_id)
+    if not site or site.user_id != current_user.id:
+        return Helpers.error_response('Unauthorized', 403)
+    
+    files = request.files.getlist('files')
+    if not files:
+        return Helpers.error_response('Không có file được tải lên', 400)
+    
+    max_files = current_app.config.get('UPLOAD_MAX_BATCH_FILES', 50)
+    if len(files) > max_files:
+        return Helpers.error_response(f'Tối đa {max_files} file mỗi lần tải lên', 400)
+    
+    results = AssetService.upload_assets_batch(
+        files=files,
+        user_id=current_user.id,
+        site_id=site_id,
+        static_folder=current_app.static_folder,
+        base_url=request.host_url.rstrip('/'),
+        max_workers=current_app.config.get('UPLOAD_BATCH_WORKERS', 4)
+    )
+    
+    uploaded = sum(1 for result in results if result['success'])
+    logger.info("[UPLOAD] Batch to site %s by user %s: %s/%s uploaded",
+                site_id, current_user.id, uploaded, len(results))
+    
+    data = {'results': results, 'uploaded': uploaded, 'failed': len(results) - uploaded}
+    if not uploaded:
+        return Helpers.json_response(data=data, message='Upload thất bại', status=400, success=False)
+    return Helpers.success_response(
+        data=data,
+        message=f'Đã tải lên {uploaded}/{len(results)} file',
+        status=201 if uploaded == len(results) else 200
+    )
+
+
 @assets_bp.route('/<int:site_id>', methods=['GET'])
 @login_required
 def list_assets(site_id):
@@ -133,36 +157,17 @@ def list_assets(site_id):
 @login_required
 def delete_asset(asset_id):
     """Delete an asset."""
-    print('='*80)
-    print(f'🗑️ [BACKEND DELETE] Endpoint called: /api/assets/{asset_id}')
-    print(f'🗑️ [BACKEND DELETE] User: {current_user.id} ({current_user.email})')
-    print(f'🗑️ [BACKEND DELETE] Method: {request.method}')
-    
     asset = AssetRepository.find_by_id(asset_id)
     
     if not asset:
-        print(f'❌ [BACKEND DELETE] Asset not found: {asset_id}')
-        print('='*80)
         return Helpers.error_response('Asset không tồn tại!', 404)
     
-    print(f'🗑️ [BACKEND DELETE] Asset found:')
-    print(f'   - ID: {asset.id}')
-    print(f'   - Filename: {asset.filename}')
-    print(f'   - URL: {asset.url}')
-    print(f'   - User ID: {asset.user_id}')
-    print(f'   - Site ID: {asset.site_id}')
-    
     # Verify ownership
     if asset.user_id != current_user.id:
-        print(f'❌ [BACKEND DELETE] Unauthorized: asset.user_id={asset.user_id}, current_user.id={current_user.id}')
-        print('='*80)
         return Helpers.error_response('Unauthorized', 403)
     
-    print(f'🗑️ [BACKEND DELETE] Ownership verified. Calling AssetService.delete_asset()...')
-    
     # Delete using service
     static_folder = current_app.static_folder
-    print(f'🗑️ [BACKEND DELETE] Static folder: {static_folder}')
     
     success, error = AssetService.delete_asset(
         asset_id=asset_id,
@@ -170,15 +175,10 @@ def delete_asset(asset_id):
         static_folder=static_folder
     )
     
-    print(f'🗑️ [BACKEND DELETE] Service returned: success={success}, error={error}')
-    
     if success:
-        print(f'✅ [BACKEND DELETE] Asset deleted successfully!')
-        print('='*80)
         return Helpers.success_response(message='Ảnh đã được xóa thành công!')
     else:
-        print(f'❌ [BACKEND DELETE] Delete failed: {error}')
-        print('='*80)
+        logger.error("[DELETE] Asset %s delete failed: %s", asset_id, error)
         return Helpers.error_response(error, 500)
 
 
@@ -200,6 +200,78 @@ def get_asset_info(asset_id):
     )
 
 
+@assets_bp.route('/<int:asset_id>/srcset', methods=['GET'])
+@login_required
+def get_asset_srcset(asset_id):
+    """Get responsive image data (srcset, AVIF/WebP sources) for the editor."""
+    asset = AssetRepository.find_by_id(asset_id)
+    
+    if not asset:
+        return Helpers.error_response('Asset không tồn tại!', 404)
+    
+    # Verify ownership
+    if asset.user_id != current_user.id:
+        return Helpers.error_response('Unauthorized', 403)
+    
+    data = asset.srcset_data()
+    data['pending'] = asset.variants is None and ImageVariantService.is_resizable(asset.filename)
+    
+    return Helpers.success_response(data=data)
+
+
+@assets_bp.route('/<int:asset_id>/usage', methods=['GET'])
+@login_required
+def get_asset_usage(asset_id):
+    """List the pages that reference an asset (check before deleting it)."""
+    asset = AssetRepository.find_by_id(asset_id)
+    
+    if not asset:
+        return Helpers.error_response('Asset không tồn tại!', 404)
+    
+    # Verify ownership
+    if asset.user_id != current_user.id:
+        return Helpers.error_response('Unauthorized', 403)
+    
+    pages = AssetUsageRepository.find_pages_using(asset_id)
+    
+    return Helpers.success_response(
+        data={
+            'asset_id': asset_id,
+            'in_use': bool(pages),
+            'pages': [
+                {'id': page.id, 'title': page.title, 'slug': page.slug, 'site_id': page.site_id}
+                for page in pages
+            ]
+        }
+    )
+
+
+@assets_bp.route('/site/<int:site_id>/unused', methods=['GET'])
+@login_required
+def list_unused_assets(site_id):
+    """
+    List assets of a site that no page references.
+    
+    Query params:
+        min_age_days: Skip assets uploaded in the last N days (default 0)
+    """
+    # Verify site ownership
+    site = SiteRepository.find_by_id(site_id)
+    if not site or site.user_id != current_user.id:
+        return Helpers.error_response('Unauthorized', 403)
+    
+    min_age_days = request.args.get('min_age_days', 0, type=int)
+    assets, complete = AssetUsageService.find_unused(site_id, min_age_days)
+    
+    return Helpers.success_response(
+        data={
+            'assets': [asset.to_dict() for asset in assets],
+            'total_size_bytes': sum(asset.file_size or 0 for asset in assets),
+            'index_complete': complete
+        }
+    )
+
+
 @assets_bp.route('/site/<int:site_id>/storage', methods=['GET'])
 @login_required
 def get_site_storage(site_id):
@@ -209,15 +281,22 @@ def get_site_storage(site_id):
     if not site or site.user_id != current_user.id:
         return Helpers.error_response('Unauthorized', 403)
     
-    # Calculate storage
-    total_size = AssetRepository.get_total_size_by_site(site_id)
-    total_size_formatted = FileHandler.get_file_size_formatted(total_size)
+    # Calculate storage (and what optimization saved) in one query
+    stats = AssetRepository.get_storage_stats_by_site(site_id)
+    total_size = stats['stored_bytes']
+    saved_bytes = max(0, stats['original_bytes'] - stats['optimized_bytes'])
     
     return Helpers.success_response(
         data={
             'total_size_bytes': total_size,
-            'total_size_formatted': total_size_formatted,
-            'asset_count': AssetRepository.count_by_site(site_id)
+            'total_size_formatted': FileHandler.get_file_size_formatted(total_size),
+            'asset_count': stats['asset_count'],
+            'original_size_bytes': stats['original_bytes'],
+            'optimized_size_bytes': stats['optimized_bytes'],
+            'saved_bytes': saved_bytes,
+            'saved_formatted': FileHandler.get_file_size_formatted(saved_bytes),
+            'saved_percent': round(100.0 * saved_bytes / stats['original_bytes'], 1) if stats['original_bytes'] else 0.0,
+            'optimized_count': stats['optimized_count']
         }
     )
 
@@ -226,15 +305,116 @@ def get_site_storage(site_id):
 # FILE SERVING ROUTES
 # ================================
 
+RESIZE_PARAMS = ('w', 'h', 'fit', 'q', 'fmt')
+
+
 @assets_bp.route('/uploads/<int:site_id>/<filename>')
 def serve_uploaded_file(site_id, filename):
-    """Serve uploaded files."""
+    """
+    Serve uploaded files.
+    
+    Images accept on-demand resize parameters, e.g. ?w=640&fmt=webp
+    (w, h, fit=contain|cover, q, fmt=jpg|png|webp). Results are cached on
+    disk; see ImageResizeCache.
+    """
+    static_folder = getattr(current_app, 'static_folder', '') or ''
+    upload_dir = os.path.join(static_folder, 'uploads', str(site_id))
+    
+    if not any(param in request.args for param in RESIZE_PARAMS):
+        return _send_upload(upload_dir, f"{site_id}/{filename}", filename)
+    
+    filename = secure_filename(filename)
+    source_path = os.path.join(upload_dir, filename)
+    if not ImageVariantService.is_resizable(filename):
+        abort(404)
+    if not os.path.isfile(source_path):
+        # Resizing needs a local source; fetch it once from shared storage
+        storage = get_storage('uploads')
+        if storage.is_local:
+            abort(404)
+        try:
+            os.makedirs(upload_dir, exist_ok=True)
+            storage.download(f"{site_id}/{filename}", source_path)
+        except StorageNotFoundError:
+            abort(404)
+    
+    resize_cache = ImageResizeCache.for_app(current_app)
+    try:
+        params = resize_cache.parse_params(request.args, filename.rsplit('.', 1)[1].lower())
+    except ResizeParamsError as e:
+        return Helpers.error_response(str(e), 400)
+    
+    try:
+        cached_path = resize_cache.get(source_path, params)
+    except UnreadableImageError as e:
+        logger.warning("[RESIZE] Site %s file %s cannot be decoded: %s", site_id, filename, e)
+        return Helpers.error_response('Image cannot be decoded', 415)
+    
+    # send_file hands the open file to the server's file_wrapper (sendfile)
+    return send_file(
+        cached_path,
+        mimetype=ImageVariantService.ENCODERS[params[4]][2],
+        etag=os.path.basename(cached_path).split('.')[0],
+        max_age=31536000,
+        conditional=True
+    )
+
+
+@assets_bp.route('/uploads/<int:site_id>/variants/<filename>')
+def serve_variant_file(site_id, filename):
+    """Serve resized image variants (immutable, content never changes)."""
+    static_folder = getattr(current_app, 'static_folder', '') or ''
+    variant_dir = ImageVariantService.variant_dir(static_folder, site_id)
+    return _send_upload(variant_dir, f"{site_id}/variants/{filename}", filename, max_age=31536000)
+
+
+def _send_upload(directory, key, filename, max_age=None):
+    """
+    Send an upload from this node's disk, or stream it from shared storage.
+    
+    Local files keep using send_from_directory (sendfile, Range support).
+    With a remote backend, files not cached on this node are streamed from
+    the backend; Range requests are passed through as ranged reads.
+    """
     try:
-        static_folder = getattr(current_app, 'static_folder', '') or ''
-        upload_dir = os.path.join(static_folder, 'uploads', str(site_id))
-        return send_from_directory(upload_dir, filename)
-    except FileNotFoundError:
+        return send_from_directory(directory, filename, max_age=max_age)
+    except NotFound:
+        storage = get_storage('uploads')
+        if storage.is_local:
+            raise
+    
+    try:
+        info = storage.stat(key)
+    except (StorageNotFoundError, ValueError):
         abort(404)
+    
+    size = info['size']
+    mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+    byte_range = request.range.range_for_length(size) if request.range else None
+    if request.range and byte_range is None:
+        response = current_app.response_class(status=416)
+        response.headers['Content-Range'] = f'bytes */{size}'
+        return response
+    
+    if byte_range:
+        start, stop = byte_range
+        response = current_app.response_class(
+            storage.iter_chunks(key, start, stop - 1), status=206, mimetype=mimetype, direct_passthrough=True
+        )
+        response.headers['Content-Range'] = f'bytes {start}-{stop - 1}/{size}'
+        response.content_length = stop - start
+    else:
+        response = current_app.response_class(
+            storage.iter_chunks(key), mimetype=mimetype, direct_passthrough=True
+        )
+        response.content_length = size
+    
+    response.accept_ranges = 'bytes'
+    response.set_etag(info['etag'])
+    if max_age:
+        response.cache_control.public = True
+        response.cache_control.max_age = max_age
+    return response.make_conditional(request) if not byte_range else response
 
 
 # ================================
@@ -244,17 +424,20 @@ def serve_uploaded_file(site_id, filename):
 @assets_bp.route('/cleanup-orphaned', methods=['POST'])
 @login_required
 def cleanup_orphaned():
-    """Find and list orphaned files (admin only)."""
+    """
+    Start an orphaned-file scan in the background (admin only).
+    
+    Poll GET /admin/api/uploads/reconcile for progress and the report.
+    """
+    from app.services.upload_reconciler import start_reconcile_job
+    
     if not current_user.is_admin():
         return Helpers.error_response('Admin access required', 403)
     
-    static_folder = current_app.static_folder
-    orphaned_files = AssetService.cleanup_orphaned_files(static_folder)
+    job, started = start_reconcile_job(current_app._get_current_object())
     
     return Helpers.success_response(
-        data={
-            'orphaned_files': orphaned_files,
-            'count': len(orphaned_files)
-        },
-        message=f'Found {len(orphaned_files)} orphaned files'
+        data={**job.status(), 'status_url': '/admin/api/uploads/reconcile'},
+        message='Reconcile started' if started else 'Reconcile already running',
+        status=202
     )
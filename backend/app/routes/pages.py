@@ -3,7 +3,6 @@ from flask import Blueprint, render_template, request, redirect, url_for, flash,
 from flask_login import login_required, current_user
 from datetime import datetime
 import json
-import os
 import re
 import requests
 import html
@@ -12,13 +11,24 @@ import secrets
 from PIL import Image
 import mimetypes
 import stat
+import time
+import hashlib
 
 from app.models import db, Site, Page
-from app.services import PageService, SiteService
+from app.services import PageService, SiteService, AssetService
 from app.repositories import SiteRepository, PageRepository
 from app.utils import Validators, Helpers
 from app.utils.url_helpers import get_editor_url
 from app.middleware.jwt_auth import jwt_required  # Add JWT support
+from app.middlewares.server_timing_middleware import span
+from app.utils.upload_stream import upload_limit
+from app.services.storage_backend import get_storage, StorageNotFoundError
+from app.services.render_engine import get_render_engine
+from app.services.analytics_service import record_page_view
+from app.services.sitemap_service import SitemapService
+from app.services.host_map import HostMap
+from app.services.search_service import SearchService
+from markupsafe import Markup
 
 # Create blueprint - no prefix to match old routes
 pages_bp = Blueprint('pages', __name__)
@@ -46,46 +56,32 @@ def index():
 @pages_bp.route('/preview/<string:token>')
 def preview_page(token):
     """Display preview page using token."""
-    # Get preview data from session
-    previews = session.get('previews', {})
+    from flask import send_file
+    from app.services.preview_store import get_preview_store
     
-    if token not in previews:
+    # Previews are stored per user, so only their creator can open them
+    if not current_user.is_authenticated:
         return "Preview không tồn tại hoặc đã hết hạn", 404
     
-    preview_data = previews[token]
+    store = get_preview_store()
+    expires_at = store.expires_at(current_user.id, token)
+    if expires_at is None:
+        return "Preview không tồn tại hoặc đã hết hạn", 404
     
-    # Check if preview is expired
-    from datetime import datetime as dt
-    expires_at = dt.fromisoformat(preview_data['expires_at'])
-    if dt.utcnow() > expires_at:
-        # Remove expired preview
-        del previews[token]
-        session['previews'] = previews
-        session.modified = True
+    if time.time() > expires_at:
+        store.delete(current_user.id, token)
         return "Preview đã hết hạn", 410
     
-    # Get page content
     try:
-        content_data = {}
-        if preview_data['content']:
-            if isinstance(preview_data['content'], str) and preview_data['content'].strip().startswith('{'):
-                content_data = json.loads(preview_data['content'])
-            elif isinstance(preview_data['content'], dict):
-                content_data = preview_data['content']
-        
-        # Extract HTML and CSS
-        html_content = content_data.get('gjs-html', content_data.get('html', ''))
-        css_content = content_data.get('gjs-css', content_data.get('css', ''))
-        
-        return render_template('preview.html', 
-                             page_title=preview_data['title'],
-                             html_content=html_content,
-                             css_content=css_content,
-                             expires_at=expires_at)
-        
-    except Exception as e:
-        current_app.logger.error(f"Preview error: {str(e)}")
-        return "Lỗi khi tải preview", 500
+        with span('storage'):
+            stream = store.open(current_user.id, token)
+    except FileNotFoundError:
+        return "Preview không tồn tại hoặc đã hết hạn", 404
+    
+    # Rendered once in generate_preview; stream the stored document
+    response = send_file(stream, mimetype='text/html', conditional=False, max_age=0)
+    response.headers['Cache-Control'] = 'private, no-store'
+    return response
 
 
 @pages_bp.route('/view/<subdomain>/<int:page_id>')
@@ -124,10 +120,73 @@ def serve_page(page_slug):
         # Check if this is an existing main site route
         return redirect('http://localhost:3000/' + page_slug)
     
+    # Subdomain - Static files generated at publish (sitemap, robots.txt,
+    # compiled CSS)
+    if page_slug in SitemapService.SERVED_FILES:
+        return serve_site_root_file(subdomain, page_slug)
+    if page_slug.startswith('assets/'):
+        return serve_site_asset(subdomain, page_slug[len('assets/'):])
+    
     # Subdomain - Serve specific page
     return serve_user_page(subdomain, page_slug)
 
 
+def serve_site_asset(subdomain, filename):
+    """Serve a content-hashed file from a published site's assets/ folder."""
+    from flask import Response
+    from werkzeug.utils import secure_filename
+    
+    site = SiteRepository.find_by_subdomain(subdomain)
+    if not site or not site.is_published or secure_filename(filename) != filename:
+        abort(404)
+    
+    key = f"{site.id}/assets/{filename}"
+    storage = get_storage('sites')
+    try:
+        with span('storage'):
+            etag = storage.stat(key)['etag']
+            if request.if_none_match.contains(etag):
+                response = Response(status=304)
+            else:
+                response = Response(storage.read(key), mimetype=mimetypes.guess_type(filename)[0] or 'application/octet-stream')
+    except StorageNotFoundError:
+        abort(404)
+    
+    # Names change with the content, so browsers may cache them forever
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+    return response
+
+
+def serve_site_root_file(subdomain, filename):
+    """Serve sitemap.xml or robots.txt from a published site's storage."""
+    from flask import Response
+    
+    site = SiteRepository.find_by_subdomain(subdomain)
+    if not site or not site.is_published:
+        abort(404)
+    
+    key = f"{site.id}/{filename}"
+    storage = get_storage('sites')
+    try:
+        with span('storage'):
+            body = storage.read(key)
+    except StorageNotFoundError:
+        # Site published before these files were generated
+        SitemapService.sync(site)
+        try:
+            with span('storage'):
+                body = storage.read(key)
+        except StorageNotFoundError:
+            abort(404)
+    
+    # Rewritten in place on publish, so revalidate rather than cache forever
+    response = Response(body, content_type=SitemapService.SERVED_FILES[filename])
+    response.set_etag(hashlib.md5(body).hexdigest())
+    response.headers['Cache-Control'] = f"public, max-age={current_app.config.get('SITEMAP_MAX_AGE', 3600)}"
+    return response.make_conditional(request)
+
+
 def serve_user_site(subdomain):
     """Serve homepage for user subdomain."""
     # Find published site with this subdomain
@@ -141,26 +200,35 @@ def serve_user_site(subdomain):
     if not homepage or not homepage.is_published:
         return render_template('subdomain/no_homepage.html', site=site), 404
     
+    record_page_view(homepage, site)
+    
     # Read HTML file from storage - try index.html first (PageMaker published)
     try:
-        storage_base = os.path.join(current_app.root_path, 'storage', 'sites', str(site.id))
-        index_path = os.path.join(storage_base, 'index.html')
+        storage = get_storage('sites')
         
-        if os.path.exists(index_path):
+        try:
             # Serve published PageMaker content
-            with open(index_path, 'r', encoding='utf-8') as f:
-                return f.read()
-        elif homepage.content and os.path.exists(os.path.join(storage_base, homepage.content)):
+            with span('storage'):
+                return storage.read_text(f"{site.id}/index.html")
+        except StorageNotFoundError:
+            pass
+        
+        if homepage.content:
             # Fallback to old content field (for backward compatibility)
-            with open(os.path.join(storage_base, homepage.content), 'r', encoding='utf-8') as f:
-                return f.read()
-        else:
-            # Fallback to generated HTML from database
+            try:
+                with span('storage'):
+                    return storage.read_text(f"{site.id}/{homepage.content}")
+            except (StorageNotFoundError, ValueError):
+                pass
+        
+        # Fallback to generated HTML from database
+        with span('render'):
             return homepage.generate_html()
     except Exception as e:
         current_app.logger.error(f"❌ Error serving homepage: {e}")
         # Fallback to generated HTML if file read fails
-        return homepage.generate_html()
+        with span('render'):
+            return homepage.generate_html()
 
 
 def serve_user_page(subdomain, page_slug):
@@ -177,38 +245,26 @@ def serve_user_page(subdomain, page_slug):
     if not page or not page.is_published:
         return render_template('subdomain/page_not_found.html', site=site, slug=page_slug), 404
     
+    record_page_view(page, site)
+    
     # Serve content - try published HTML file first (PageMaker)
     try:
-        storage_base = os.path.join(current_app.root_path, 'storage', 'sites', str(site.id))
-        page_file = f"{page.slug}.html"
-        page_path = os.path.join(storage_base, page_file)
-        
-        if os.path.exists(page_path):
+        try:
             # Serve published PageMaker content
-            with open(page_path, 'r', encoding='utf-8') as f:
-                return f.read()
+            with span('storage'):
+                return get_storage('sites').read_text(f"{site.id}/{page.slug}.html")
+        except StorageNotFoundError:
+            pass
         
         # Fallback: Try cache (for old pages)
         try:
             from cache import cache
             cached_content = cache.get_cached_page_content(page.id)
             if cached_content:
-                cache.increment_page_views(page.id)
-                
-                complete_html = f"""<!DOCTYPE html>
-<html lang="en">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>{page.title}</title>
-    <style>
-{cached_content['css']}
-    </style>
-</head>
-<body>
-{cached_content['html']}
-</body>
-</html>"""
+                with span('render'):
+                    complete_html = get_render_engine().render(
+                        'editor', site, page, body=cached_content['html'], css=cached_content['css']
+                    )
                 return complete_html
         except ImportError:
             pass  # Cache not available
@@ -217,7 +273,6 @@ def serve_user_page(subdomain, page_slug):
         if page.html_content and page.css_content:
             try:
                 from cache import cache
-                cache.increment_page_views(page.id)
                 cache.cache_page_content(
                     page_id=page.id,
                     html_content=page.html_content,
@@ -228,46 +283,29 @@ def serve_user_page(subdomain, page_slug):
                 pass  # Cache not available
             
             # Create complete HTML document from database content
-            complete_html = f"""<!DOCTYPE html>
-<html lang="en">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>{page.title}</title>
-    <style>
-{page.css_content}
-    </style>
-</head>
-<body>
-{page.html_content}
-</body>
-</html>"""
+            with span('render'):
+                complete_html = get_render_engine().render(
+                    'editor', site, page, body=page.html_content, css=page.css_content
+                )
             return complete_html
         
         # Fallback to file-based storage for legacy content
         elif page.content:
-            storage_path = os.path.join(current_app.root_path, '..', 'storage', 'sites', str(site.id), page.content)
-            if os.path.exists(storage_path):
-                with open(storage_path, 'r', encoding='utf-8') as f:
-                    return f.read()
+            try:
+                with span('storage'):
+                    return get_storage('sites').read_text(f"{site.id}/{page.content}")
+            except (StorageNotFoundError, ValueError):
+                pass
         
         # Final fallback to generated HTML
-        try:
-            from cache import cache
-            cache.increment_page_views(page.id)
-        except ImportError:
-            pass  # Cache not available
-        return page.generate_html()
+        with span('render'):
+            return page.generate_html()
         
     except Exception as e:
         current_app.logger.error(f"Error serving page {page.id}: {e}")
         # Fallback to generated HTML if any error occurs
-        try:
-            from cache import cache
-            cache.increment_page_views(page.id)
-        except ImportError:
-            pass  # Cache not available
-        return page.generate_html()
+        with span('render'):
+            return page.generate_html()
 
 
 @pages_bp.route('/site/<int:site_id>/new-page', methods=['GET', 'POST'])
@@ -616,6 +654,7 @@ def pagemade_save(page_id):
 
 
 @pages_bp.route('/api/pages/<int:page_id>/upload-asset', methods=['POST'])
+@upload_limit('UPLOAD_MAX_BATCH_SIZE')
 @login_required
 def upload_asset(page_id):
     """Upload asset (image, video, etc.) for PageMaker."""
@@ -634,38 +673,46 @@ def upload_asset(page_id):
         if 'files' not in request.files:
             return jsonify({'success': False, 'message': 'No files uploaded'}), 400
         
-        files = request.files.getlist('files')
-        uploaded_assets = []
+        files = [file for file in request.files.getlist('files') if file and file.filename]
+        max_files = current_app.config.get('UPLOAD_MAX_BATCH_FILES', 50)
+        if len(files) > max_files:
+            return jsonify({'success': False, 'message': f'Too many files (max {max_files})'}), 400
         
-        # Create upload directory if it doesn't exist
-        import os
-        upload_dir = os.path.join(os.path.dirname(current_app.root_path), 'static', 'uploads', 'assets')
-        os.makedirs(upload_dir, exist_ok=True)
+        # Store concurrently as site assets, one transaction for all rows
+        results = AssetService.upload_assets_batch(
+            files=files,
+            user_id=current_user.id,
+            site_id=site.id,
+            static_folder=current_app.static_folder,
+            base_url=request.host_url.rstrip('/'),
+            max_workers=current_app.config.get('UPLOAD_BATCH_WORKERS', 4)
+        )
         
-        for file in files:
-            if file and file.filename:
-                from werkzeug.utils import secure_filename
-                import uuid
-                
-                # Secure filename and add unique prefix
-                filename = secure_filename(file.filename)
-                unique_filename = f"{uuid.uuid4().hex}_{filename}"
-                file_path = os.path.join(upload_dir, unique_filename)
-                
-                # Save file
-                file.save(file_path)
-                
-                # Generate URL
-                asset_url = url_for('static', filename=f'uploads/assets/{unique_filename}', _external=True)
-                
+        uploaded_assets = []
+        errors = []
+        for result in results:
+            if result['success']:
+                asset = result['asset']
                 uploaded_assets.append({
-                    'src': asset_url,
-                    'name': filename,
-                    'type': 'image' if file.content_type and file.content_type.startswith('image/') else 'file'
+                    'src': asset['url'],
+                    'name': asset['original_name'],
+                    'type': 'image' if asset['is_image'] else 'file',
+                    'width': asset['width'],
+                    'height': asset['height']
                 })
+            else:
+                errors.append({'name': result['filename'], 'message': result['error']})
+        
+        if errors and not uploaded_assets:
+            return jsonify({
+                'success': False,
+                'message': '; '.join(f"{e['name']}: {e['message']}" for e in errors),
+                'errors': errors
+            }), 400
         
         return jsonify({
-            'data': uploaded_assets
+            'data': uploaded_assets,
+            'errors': errors
         })
         
     except Exception as e:
@@ -692,26 +739,35 @@ def generate_preview(page_id):
     
     try:
         import secrets
-        from datetime import timedelta
+        from app.services.preview_store import get_preview_store
         
         # Generate secure preview token
         preview_token = secrets.token_urlsafe(32)
+        ttl = current_app.config.get('PREVIEW_TTL', 1800)
         
-        # Store preview data in session (temporary storage)
-        preview_data = {
-            'page_id': page_id,
-            'user_id': current_user.id,
-            'title': page.title,
-            'content': page.content,
-            'created_at': datetime.utcnow().isoformat(),
-            'expires_at': (datetime.utcnow() + timedelta(minutes=30)).isoformat()
-        }
+        # Extract HTML and CSS
+        content_data = {}
+        if page.content:
+            if isinstance(page.content, str) and page.content.strip().startswith('{'):
+                content_data = json.loads(page.content)
+            elif isinstance(page.content, dict):
+                content_data = page.content
         
-        # Store in session
-        if 'previews' not in session:
-            session['previews'] = {}
-        session['previews'][preview_token] = preview_data
-        session.modified = True
+        # Render once and keep the document server-side; only the token
+        # travels in the URL (the session cookie stays small)
+        with span('render'):
+            preview_html = render_template(
+                'preview.html',
+                page_title=page.title,
+                html_content=content_data.get('gjs-html', content_data.get('html', '')),
+                css_content=content_data.get('gjs-css', content_data.get('css', '')),
+                expires_at_ms=int((time.time() + ttl) * 1000),
+                ttl_minutes=ttl // 60
+            )
+        with span('storage'):
+            get_preview_store().save(current_user.id, preview_token, preview_html, ttl)
+        # Drop payloads left in the cookie by the old session-based previews
+        session.pop('previews', None)
         
         # Generate preview URL
         preview_url = url_for('pages.preview_page', token=preview_token, _external=True)
@@ -720,7 +776,7 @@ def generate_preview(page_id):
             data={
                 'preview_token': preview_token,
                 'preview_url': preview_url,
-                'expires_in': 1800  # 30 minutes
+                'expires_in': ttl
             }
         )
         
@@ -795,6 +851,14 @@ def api_publish_page(page_id):
                 'message': 'Trang trống. Vui lòng thêm nội dung trước khi xuất bản.'
             }), 400
         
+        # Point <img> tags at resized AVIF/WebP variants
+        from app.repositories import AssetRepository
+        from app.utils.html_helpers import add_responsive_images
+        html_content = add_responsive_images(html_content, {
+            asset.filename: asset.srcset_data()
+            for asset in AssetRepository.find_with_variants_by_site(site.id)
+        })
+        
         # Get site subdomain
         subdomain = site.subdomain
         
@@ -809,39 +873,55 @@ def api_publish_page(page_id):
             filename = f"{page.slug}.html"
             page_url = f"https://{subdomain}.pagemade.site/{page.slug}"
         
-        # Build complete HTML with Tailwind CDN
-        complete_html = f"""<!DOCTYPE html>
-<html lang="vi">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>{page.title} - {site.title}</title>
-    
-    <!-- Tailwind CSS -->
-    <script src="https://cdn.tailwindcss.com?3.4.0"></script>
-    
-    <!-- Custom Styles -->
-    <style>
-        {css_content}
-    </style>
-</head>
-<body>
-    {html_content}
-</body>
-</html>"""
+        # Purged Tailwind stylesheet shared by the site's pages (CDN script
+        # only when no Tailwind CLI is available)
+        from app.services.tailwind_service import TailwindService
+        with span('render'):
+            tailwind_tag = TailwindService.stylesheet_tag(
+                current_app._get_current_object(), site, page, html_content
+            )
         
-        # Deploy to storage folder
-        import os
-        storage_base = os.path.join(current_app.root_path, 'storage', 'sites', str(site.id))
+        # Minify, dedupe GrapesJS rules, inline critical CSS and lazy-load
+        # images below the fold
+        from app.services.publish_optimizer import PublishOptimizer
+        optimization = None
+        page_css, css_head = css_content, ''
+        if current_app.config.get('PUBLISH_OPTIMIZE_ENABLED', True):
+            with span('render'):
+                optimized = PublishOptimizer.optimize(
+                    current_app._get_current_object(), site.id, html_content, css_content
+                )
+            html_content = optimized['html']
+            page_css, css_head = '', optimized['head']
+            optimization = optimized['stats']
+        
+        # Build complete HTML
+        with span('render'):
+            complete_html = get_render_engine().render(
+                'editor', site, page, body=html_content, css=page_css, head=css_head,
+                site_overrides={'tailwind_tag': Markup(tailwind_tag)}
+            )
         
+        if optimization is not None:
+            # Baseline: the same document with the original CSS inlined
+            baseline_bytes = (
+                len(complete_html.encode('utf-8')) - len(css_head.encode('utf-8'))
+                + optimization['css_bytes_before']
+            )
+            complete_html = PublishOptimizer.minify_document(current_app._get_current_object(), complete_html)
+            optimization['html_bytes_before'] = baseline_bytes
+            optimization['html_bytes_after'] = len(complete_html.encode('utf-8'))
+            optimization['saved_bytes'] = baseline_bytes - optimization['html_bytes_after']
+            current_app.logger.info(
+                "Publish optimization for site %s/%s: %s", site.id, filename, optimization
+            )
+        
+        # Deploy to site storage (local disk or shared object storage)
         try:
-            os.makedirs(storage_base, exist_ok=True)
-            file_path = os.path.join(storage_base, filename)
-            
-            with open(file_path, 'w', encoding='utf-8') as f:
-                f.write(complete_html)
+            with span('storage'):
+                get_storage('sites').save(f"{site.id}/{filename}", complete_html, 'text/html; charset=utf-8')
             
-            current_app.logger.info(f"✅ Published: {file_path}")
+            current_app.logger.info(f"✅ Published: site {site.id}/{filename}")
             
         except Exception as deploy_error:
             return jsonify({
@@ -852,12 +932,15 @@ def api_publish_page(page_id):
         # Mark page as published
         page.is_published = True
         page.published_at = datetime.utcnow()
+        SearchService.index_page(page)
         
         # Auto-publish site if not already
         if not site.is_published:
             site.is_published = True
         
         db.session.commit()
+        SitemapService.sync(site, page)
+        HostMap.sync(site.id)
         
         return jsonify({
             'success': True,
@@ -867,7 +950,8 @@ def api_publish_page(page_id):
                 'url': page_url,
                 'subdomain': subdomain,
                 'filename': filename,
-                'site_published': True
+                'site_published': True,
+                'optimization': optimization
             }
         })
         
@@ -16,7 +16,7 @@ import mimetypes
 import stat
 
 from app.models import db, Site, Page
-from app.services import PageService, SiteService
+from app.services import PageService, SiteService, PageViewService
 from app.repositories import SiteRepository, PageRepository
 from app.utils import Validators, Helpers
 from app.utils.api_helpers import success_response, error_response, paginated_response
@@ -215,6 +215,31 @@ def get_page(page_id):
         return error_response("Failed to retrieve page", 500)
 
 
+@pages_api_bp.route('/pages/<int:page_id>/views', methods=['GET'])
+@jwt_required
+def get_page_views(page_id):
+    """Daily view counts of a page (?days=1..365, default 30)."""
+    try:
+        page = PageRepository.find_by_id(page_id)
+        
+        if not page:
+            return error_response("Page not found", 404)
+        
+        site = SiteRepository.find_by_id(page.site_id)
+        if not site or site.user_id != request.current_user.id:
+            return error_response("Access denied", 403)
+        
+        days = min(max(request.args.get('days', 30, type=int), 1), 365)
+        return success_response(
+            data={'page_id': page.id, 'days': days, **PageViewService.get_page_views(page.id, days)},
+            message="Page views retrieved successfully"
+        )
+        
+    except Exception as e:
+        current_app.logger.error(f"Get page views error: {e}")
+        return error_response("Failed to retrieve page views", 500)
+
+
 @pages_api_bp.route('/pages/<int:page_id>', methods=['PUT'])
 @jwt_required
 def update_page(page_id):
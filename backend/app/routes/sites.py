@@ -13,7 +13,7 @@ import mimetypes
 import stat
 
 from app.models import db, Site, Page
-from app.services import SiteService, PageService
+from app.services import SiteService, PageService, SitemapService, SearchService, HostMap
 from app.repositories import SiteRepository, PageRepository
 from app.utils import Validators, Helpers
 from app.utils.api_helpers import success_response, error_response, paginated_response
@@ -105,19 +105,13 @@ def new_site():
                 if homepage and action == 'pagemade' and template_id and template_id != 'blank':
                     current_app.logger.info(f"📦 Applying template '{template_id}' to homepage {homepage.id}")
                     try:
-                        import json
-                        # Templates are in backend/static/templates/, not app/static/templates/
-                        template_file = os.path.join(current_app.root_path, '..', 'static', 'templates', f'{template_id}.json')
-                        current_app.logger.info(f"📦 Template file: {template_file}, exists: {os.path.exists(template_file)}")
-                        if os.path.exists(template_file):
-                            with open(template_file, 'r', encoding='utf-8') as f:
-                                template_data = json.load(f)
-                                content = template_data.get('content', {})
-                                homepage.html_content = content.get('html', '')
-                                homepage.css_content = content.get('css', '')
-                                homepage.template = template_id
-                                db.session.commit()
-                                current_app.logger.info(f"Applied template '{template_id}' to homepage {homepage.id}")
+                        from app.services.template_registry import get_template_registry
+                        html, css = get_template_registry().get_content(template_id)
+                        if html is not None:
+                            homepage.html_content, homepage.css_content = html, css
+                            homepage.template = template_id
+                            db.session.commit()
+                            current_app.logger.info(f"Applied template '{template_id}' to homepage {homepage.id}")
                     except Exception as e:
                         current_app.logger.error(f"Error applying template: {e}")
                 
@@ -337,6 +331,7 @@ def site_from_template():
                     # Set template content
                     page.content = template_content
                     page.is_homepage = True
+                    SearchService.index_page(page)
                     db.session.commit()
                     
                     flash('Tạo site từ template thành công!', 'success')
@@ -625,6 +620,8 @@ def publish_page(page_id):
         page.is_published = True
         page.published_at = db.func.now()
         db.session.commit()
+        SitemapService.sync(page.site, page)
+        HostMap.sync(page.site_id)
         
         return Helpers.success_response(
             data={'page': page.to_dict()},
@@ -3,7 +3,7 @@ Sites API blueprint - Site management API endpoints
 JSON-only responses for decoupled frontend
 """
 
-from flask import Blueprint, request, jsonify, current_app, abort
+from flask import Blueprint, request, jsonify, current_app, abort, g
 from flask_login import login_required, current_user
 import os
 import re
@@ -15,7 +15,7 @@ import mimetypes
 import stat
 
 from app.models import db, Site, Page
-from app.services import SiteService, PageService
+from app.services import SiteService, PageService, PageViewService
 from app.repositories import SiteRepository, PageRepository
 from app.utils import Validators, Helpers
 from app.utils.api_helpers import success_response, error_response, paginated_response
@@ -201,6 +201,96 @@ def get_site(site_id):
         return error_response("Failed to retrieve site", 500)
 
 
+@sites_api_bp.route('/sites/<int:site_id>/views', methods=['GET'])
+@jwt_api_auth
+def get_site_views(site_id):
+    """Daily view counts summed over a site's pages (?days=1..365, default 30)."""
+    try:
+        site = SiteRepository.find_by_id(site_id)
+        
+        if not site:
+            return error_response("Site not found", 404)
+        
+        # jwt_api_auth puts the user on g
+        if site.user_id != g.current_user.id:
+            return error_response("Access denied", 403)
+        
+        days = min(max(request.args.get('days', 30, type=int), 1), 365)
+        return success_response(
+            data={'site_id': site.id, 'days': days, **PageViewService.get_site_views(site.id, days)},
+            message="Site views retrieved successfully"
+        )
+        
+    except Exception as e:
+        current_app.logger.error(f"Get site views error: {e}")
+        return error_response("Failed to retrieve site views", 500)
+
+
+@sites_api_bp.route('/sites/<int:site_id>/export', methods=['GET'])
+@jwt_api_auth
+def export_site(site_id):
+    """
+    Download a site's published pages, CSS and assets as a ZIP.
+    
+    The archive is streamed as it is built. Range requests (with If-Range)
+    resume an interrupted download; its ETag changes when the site does.
+    """
+    from app.services.site_export_service import SiteExportService, SiteExportError
+    
+    site = SiteRepository.find_by_id(site_id)
+    if not site:
+        return error_response("Site not found", 404)
+    
+    # jwt_api_auth puts the user on g
+    if site.user_id != g.current_user.id:
+        return error_response("Access denied", 403)
+    
+    try:
+        manifest = SiteExportService.get_manifest(site)
+    except SiteExportError as e:
+        return error_response(str(e), e.status)
+    except Exception as e:
+        current_app.logger.error(f"Export site error: {e}")
+        return error_response("Failed to export site", 500)
+    
+    size, etag = manifest['size'], manifest['fingerprint']
+    if request.if_none_match.contains(etag):
+        response = current_app.response_class(status=304)
+        response.set_etag(etag)
+        return response
+    
+    # A Range only applies to the archive the client started downloading
+    byte_range = None
+    if request.range and request.if_range.date is None and request.if_range.etag in (None, etag):
+        byte_range = request.range.range_for_length(size)
+        if byte_range is None:
+            response = current_app.response_class(status=416)
+            response.headers['Content-Range'] = f'bytes */{size}'
+            return response
+    
+    app = current_app._get_current_object()
+    if byte_range:
+        start, stop = byte_range
+        response = current_app.response_class(
+            SiteExportService.stream(manifest, start, stop, app=app),
+            status=206, mimetype='application/zip', direct_passthrough=True
+        )
+        response.headers['Content-Range'] = f'bytes {start}-{stop - 1}/{size}'
+        response.content_length = stop - start
+    else:
+        response = current_app.response_class(
+            SiteExportService.stream(manifest, app=app), mimetype='application/zip', direct_passthrough=True
+        )
+        response.content_length = size
+    
+    response.accept_ranges = 'bytes'
+    response.set_etag(etag)
+    response.headers['Content-Disposition'] = f'attachment; filename="{site.subdomain}.zip"'
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response
+
+
 @sites_api_bp.route('/sites/<int:site_id>', methods=['PUT'])
 @jwt_api_auth
 def update_site(site_id):
@@ -4,10 +4,52 @@ from .auth_service import AuthService
 from .asset_service import AssetService
 from .site_service import SiteService
 from .page_service import PageService
+from .image_service import ImageVariantService, ImageResizeCache
+from .content_store import ContentStore
+from .asset_optimizer import AssetOptimizer
+from .asset_usage_service import AssetUsageService
+from .upload_reconciler import UploadReconciler, ReconcileJob
+from .storage_backend import LocalStorage, S3Storage, get_storage
+from .tailwind_service import TailwindService
+from .publish_optimizer import PublishOptimizer
+from .render_engine import RenderEngine, get_render_engine
+from .template_registry import TemplateRegistry, get_template_registry
+from .preview_store import DiskPreviewStore, CachePreviewStore, get_preview_store
+from .analytics_service import PageViewBuffer, PageViewService, get_page_view_buffer
+from .sitemap_service import SitemapService
+from .search_service import SearchIndex, SearchService, get_search_index
+from .host_map import HostMap
 
 __all__ = [
     'AuthService',
     'AssetService', 
     'SiteService',
-    'PageService'
+    'PageService',
+    'ImageVariantService',
+    'ImageResizeCache',
+    'ContentStore',
+    'AssetOptimizer',
+    'AssetUsageService',
+    'UploadReconciler',
+    'ReconcileJob',
+    'LocalStorage',
+    'S3Storage',
+    'get_storage',
+    'TailwindService',
+    'PublishOptimizer',
+    'RenderEngine',
+    'get_render_engine',
+    'TemplateRegistry',
+    'get_template_registry',
+    'DiskPreviewStore',
+    'CachePreviewStore',
+    'get_preview_store',
+    'PageViewBuffer',
+    'PageViewService',
+    'get_page_view_buffer',
+    'SitemapService',
+    'SearchIndex',
+    'SearchService',
+    'get_search_index',
+    'HostMap'
 ]
@@ -0,0 +1,230 @@
+"""Page view counting: per-worker hit buffer and daily rollup queries."""
+import os
+import time
+import atexit
+import logging
+import threading
+from collections import Counter, deque
+from datetime import date, datetime, timedelta
+
+from app.models import db
+from app.repositories.page_view_repository import PageViewRepository
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+
+class PageViewBuffer:
+    """
+    Collect page hits in memory and write them to page_view_daily in batches.
+    
+    record() only appends a (page_id, site_id, day) tuple to a deque, which
+    is atomic without a lock, so counting adds well under a microsecond to
+    a request. A daemon thread drains the deque every ``flush_interval``
+    seconds (or sooner once it holds ``max_buffer`` / 2 hits), aggregates
+    it and adds the totals with one upsert per chunk. Hits beyond
+    ``max_buffer`` are dropped and counted in ``dropped`` rather than
+    growing memory while the database is unavailable; a failed flush is
+    kept and retried with the next one.
+    
+    Each worker process has its own buffer; after a fork the child starts
+    with an empty one and its own flush thread.
+    """
+    
+    def __init__(self, app, flush_interval=10.0, max_buffer=100000):
+        self.app = app
+        self.flush_interval = flush_interval
+        self.max_buffer = max_buffer
+        self.dropped = 0
+        self._hits = deque()
+        self._pending = Counter()  # counts of a failed flush
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopped = False
+        self._thread = None
+        self._pid = os.getpid()
+    
+    def record(self, page_id, site_id):
+        """
+        Count one view of a page.
+        
+        Args:
+            page_id: Viewed page ID
+            site_id: Site of the page
+        """
+        if self._pid != os.getpid():
+            self._reset_after_fork()
+        hits = self._hits
+        if len(hits) >= self.max_buffer:
+            self.dropped += 1
+            self._wake.set()
+            return
+        hits.append((page_id, site_id, int(time.time() // 86400)))
+        if self._thread is None and self.flush_interval:
+            self._start()
+        elif len(hits) >= self.max_buffer // 2:
+            self._wake.set()
+    
+    def pending(self):
+        """Number of hits not yet written."""
+        return len(self._hits) + sum(self._pending.values())
+    
+    def flush(self):
+        """
+        Write buffered hits to the database.
+        
+        Returns:
+            int: Number of views written
+        """
+        with self._flush_lock:
+            counts = self._pending
+            self._pending = Counter()
+            pop = self._hits.popleft
+            try:
+                while True:
+                    counts[pop()] += 1
+            except IndexError:
+                pass
+            if not counts:
+                return 0
+            
+            rows = {
+                (page_id, site_id, date.fromordinal(EPOCH_ORDINAL + day)): views
+                for (page_id, site_id, day), views in counts.items()
+            }
+            with self.app.app_context():
+                try:
+                    written = PageViewRepository.add_counts(rows)
+                    db.session.commit()
+                except Exception:
+                    logger.exception("Failed to write %d page view counts", len(counts))
+                    db.session.rollback()
+                    if len(counts) <= self.max_buffer:
+                        self._pending = counts + self._pending
+                    return 0
+                finally:
+                    db.session.remove()
+            
+            if self.dropped:
+                logger.warning("Dropped %d page views (buffer full)", self.dropped)
+                self.dropped = 0
+            return written
+    
+    def stop(self):
+        """Stop the flush thread and write what is left."""
+        self._stopped = True
+        self._wake.set()
+        thread = self._thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout=self.flush_interval or None)
+        if self._pid == os.getpid():
+            self.flush()
+    
+    def _start(self):
+        with self._flush_lock:
+            if self._thread is not None or self._stopped:
+                return
+            self._thread = threading.Thread(target=self._run, name='page-view-flush', daemon=True)
+            self._thread.start()
+    
+    def _run(self):
+        while not self._stopped:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Page view flush failed")
+    
+    def _reset_after_fork(self):
+        # The parent's hits and thread belong to the parent
+        self._pid = os.getpid()
+        self._hits = deque()
+        self._pending = Counter()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+        self.dropped = 0
+
+
+class PageViewService:
+    """Read page view statistics from the daily rollup."""
+    
+    @staticmethod
+    def _series(counts, days, today=None):
+        today = today or datetime.utcnow().date()
+        return {
+            (today - timedelta(days=offset)).isoformat(): counts.get(today - timedelta(days=offset), 0)
+            for offset in range(days - 1, -1, -1)
+        }
+    
+    @staticmethod
+    def get_page_views(page_id, days=7):
+        """
+        View statistics of a page.
+        
+        Args:
+            page_id: Page ID
+            days: Number of days in the series, ending today (UTC)
+        
+        Returns:
+            dict: {'daily': {'YYYY-MM-DD': views, ...} oldest first,
+                   'total': all-time views}
+        """
+        start = datetime.utcnow().date() - timedelta(days=days - 1)
+        counts = PageViewRepository.daily_counts(page_id=page_id, start=start)
+        return {
+            'daily': PageViewService._series(counts, days),
+            'total': PageViewRepository.total(page_id=page_id),
+        }
+    
+    @staticmethod
+    def get_site_views(site_id, days=7):
+        """View statistics summed over all pages of a site (same shape as get_page_views)."""
+        start = datetime.utcnow().date() - timedelta(days=days - 1)
+        counts = PageViewRepository.daily_counts(site_id=site_id, start=start)
+        return {
+            'daily': PageViewService._series(counts, days),
+            'total': PageViewRepository.total(site_id=site_id),
+        }
+
+
+def get_page_view_buffer(app=None):
+    """
+    Page view buffer for an app, created once per app.
+    
+    Settings: ANALYTICS_FLUSH_INTERVAL (seconds, 0 = only flush on
+    demand and at exit), ANALYTICS_MAX_BUFFER.
+    """
+    if app is None:
+        from flask import current_app
+        app = current_app._get_current_object()
+    
+    buffer = app.extensions.get('page_views')
+    if buffer is None:
+        with _lock:
+            buffer = app.extensions.get('page_views')
+            if buffer is None:
+                buffer = app.extensions['page_views'] = PageViewBuffer(
+                    app,
+                    flush_interval=app.config.get('ANALYTICS_FLUSH_INTERVAL', 10.0),
+                    max_buffer=app.config.get('ANALYTICS_MAX_BUFFER', 100000),
+                )
+                atexit.register(buffer.stop)
+    return buffer
+
+
+def record_page_view(page, site=None):
+    """Count a view of a published page, if analytics is enabled."""
+    from flask import current_app
+    app = current_app._get_current_object()
+    if not app.config.get('ANALYTICS_ENABLED', True):
+        return
+    try:
+        buffer = app.extensions['page_views']
+    except KeyError:
+        buffer = get_page_view_buffer(app)
+    buffer.record(page.id, site.id if site is not None else page.site_id)
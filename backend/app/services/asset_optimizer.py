@@ -0,0 +1,490 @@
+"""Lossless/near-lossless optimization of uploaded assets."""
+import os
+import re
+import json
+import hashlib
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from xml.etree import ElementTree as ET
+
+logger = logging.getLogger(__name__)
+
+SVG_NS = 'http://www.w3.org/2000/svg'
+XLINK_NS = 'http://www.w3.org/1999/xlink'
+
+# Keep the conventional prefix when serializing xlink:href
+ET.register_namespace('xlink', XLINK_NS)
+
+
+class SvgSanitizeError(ValueError):
+    """Raised for SVG files that cannot be parsed and cleaned safely."""
+
+
+def _split_tag(tag):
+    """Split an ElementTree '{namespace}local' name into (namespace, local)."""
+    if tag.startswith('{'):
+        namespace, local = tag[1:].split('}', 1)
+        return namespace, local
+    return None, tag
+
+
+class AssetOptimizer:
+    """
+    Shrink uploaded files without visible quality loss.
+    
+    - PNG: re-encoded with zlib optimization; fully opaque alpha channels
+      are dropped and images with at most 256 colors get an exact palette.
+      Pixels are unchanged.
+    - JPEG: re-encoded as optimized progressive JPEG reusing the original
+      quantization tables (``quality='keep'``), or at a configured quality.
+      EXIF and ICC profiles are kept.
+    - GIF: an animated WebP copy is added to Asset.variants, so <picture>
+      serves it to browsers that support WebP while the GIF URL still works.
+    - SVG: sanitized (scripts, event handlers, javascript: URLs and editor
+      metadata removed) and minified. This runs while the upload is stored,
+      before the file is ever served.
+    
+    Raster files are optimized in a background pool after the Asset row is
+    committed. A result is only kept when it saves at least
+    ASSET_OPTIMIZE_MIN_SAVING; the optimized file then replaces the original
+    at the same URL and moves to its own content-store blob.
+    """
+    
+    OPTIMIZABLE_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif'}
+    
+    # Elements removed from SVGs together with their content (lowercase)
+    UNSAFE_SVG_TAGS = {'script', 'foreignobject', 'iframe', 'embed', 'object', 'handler', 'listener'}
+    DROPPED_SVG_TAGS = {'metadata'}
+    # Whitespace inside these elements is content
+    WHITESPACE_SVG_TAGS = {'text', 'tspan', 'textpath', 'style', 'title', 'desc'}
+    EDITOR_NAMESPACES = {
+        'http://www.inkscape.org/namespaces/inkscape',
+        'http://sodipodi.sourceforge.net/DTD/sodipodi-0.dtd',
+        'http://ns.adobe.com/AdobeIllustrator/10.0/',
+        'http://ns.adobe.com/AdobeSVGViewerExtensions/3.0/',
+        'http://ns.adobe.com/Extensibility/1.0/',
+        'http://ns.adobe.com/SaveForWeb/1.0/',
+        'http://www.bohemiancoding.com/sketch/ns',
+        'http://purl.org/dc/elements/1.1/',
+        'http://creativecommons.org/ns#',
+        'http://www.w3.org/1999/02/22-rdf-syntax-ns#',
+    }
+    SCRIPT_URL_PREFIXES = ('javascript:', 'vbscript:', 'data:text/html')
+    
+    _executor = None
+    
+    @staticmethod
+    def is_optimizable(filename):
+        """Check if a background optimization applies to this file."""
+        return '.' in filename and \
+               filename.rsplit('.', 1)[1].lower() in AssetOptimizer.OPTIMIZABLE_EXTENSIONS
+    
+    # ---- SVG ----
+    
+    @staticmethod
+    def _is_script_url(value):
+        # Browsers ignore control characters and whitespace inside the scheme
+        normalized = re.sub(r'[\x00-\x20]+', '', value).lower()
+        return normalized.startswith(AssetOptimizer.SCRIPT_URL_PREFIXES)
+    
+    @staticmethod
+    def _is_unsafe_element(element):
+        namespace, local = _split_tag(element.tag)
+        local = local.lower()
+        if namespace in AssetOptimizer.EDITOR_NAMESPACES:
+            return True
+        if local in AssetOptimizer.UNSAFE_SVG_TAGS or local in AssetOptimizer.DROPPED_SVG_TAGS:
+            return True
+        # <animate>/<set> can rewrite href to a javascript: URL after load
+        if local in ('animate', 'set'):
+            target = element.get('attributeName', '').lower()
+            return target.rsplit(':', 1)[-1] == 'href'
+        return False
+    
+    @staticmethod
+    def _clean_svg_attributes(element):
+        for key, value in list(element.attrib.items()):
+            namespace, local = _split_tag(key)
+            local = local.lower()
+            if (namespace in AssetOptimizer.EDITOR_NAMESPACES
+                    or local.startswith('on')
+                    or (local == 'href' and AssetOptimizer._is_script_url(value))
+                    or (local == 'style' and ('javascript:' in value.lower() or 'expression(' in value.lower()))):
+                del element.attrib[key]
+    
+    @staticmethod
+    def _clean_svg_element(element, keep_whitespace=False):
+        AssetOptimizer._clean_svg_attributes(element)
+        
+        previous = None
+        for child in list(element):
+            if not isinstance(child.tag, str) or AssetOptimizer._is_unsafe_element(child):
+                # Keep text that followed the removed element
+                if keep_whitespace and child.tail:
+                    if previous is None:
+                        element.text = (element.text or '') + child.tail
+                    else:
+                        previous.tail = (previous.tail or '') + child.tail
+                element.remove(child)
+                continue
+            
+            local = _split_tag(child.tag)[1].lower()
+            AssetOptimizer._clean_svg_element(
+                child, keep_whitespace or local in AssetOptimizer.WHITESPACE_SVG_TAGS
+            )
+            if not keep_whitespace and child.tail and not child.tail.strip():
+                child.tail = None
+            previous = child
+        
+        if not keep_whitespace and element.text and not element.text.strip():
+            element.text = None
+    
+    @staticmethod
+    def sanitize_svg(data):
+        """
+        Sanitize and minify an SVG document.
+        
+        Comments, processing instructions, the XML declaration and
+        whitespace between elements are dropped; so are scripts, event
+        handler attributes, javascript: links and editor metadata.
+        
+        Args:
+            data: SVG file content (bytes)
+        
+        Returns:
+            bytes: Cleaned SVG (UTF-8)
+        
+        Raises:
+            SvgSanitizeError: If the file is not well-formed SVG or declares
+                entities (which could expand to huge documents)
+        """
+        if b'<!ENTITY' in data:
+            raise SvgSanitizeError("SVG files with entity declarations are not allowed")
+        
+        try:
+            root = ET.fromstring(data)
+        except ET.ParseError as e:
+            raise SvgSanitizeError(f"Invalid SVG file: {e}") from e
+        
+        namespace, local = _split_tag(root.tag)
+        if local != 'svg':
+            raise SvgSanitizeError("Invalid SVG file: root element is not <svg>")
+        
+        AssetOptimizer._clean_svg_element(root)
+        
+        # Serialize SVG elements unprefixed under a default xmlns (ElementTree
+        # would otherwise write ns0:svg)
+        if namespace == SVG_NS:
+            prefix = '{%s}' % SVG_NS
+            for element in root.iter():
+                if element.tag.startswith(prefix):
+                    element.tag = element.tag[len(prefix):]
+            root.attrib = {'xmlns': SVG_NS, **root.attrib}
+        
+        text = ET.tostring(root, encoding='unicode')
+        return text.encode('utf-8')
+    
+    @staticmethod
+    def optimize_svg_file(file_path):
+        """
+        Sanitize an SVG file in place.
+        
+        Returns:
+            dict: {'size', 'sha256'} of the cleaned file
+        
+        Raises:
+            SvgSanitizeError: See sanitize_svg()
+        """
+        with open(file_path, 'rb') as f:
+            cleaned = AssetOptimizer.sanitize_svg(f.read())
+        
+        tmp_path = f"{file_path}.opt"
+        with open(tmp_path, 'wb') as out:
+            out.write(cleaned)
+        os.replace(tmp_path, file_path)
+        
+        return {'size': len(cleaned), 'sha256': hashlib.sha256(cleaned).hexdigest()}
+    
+    # ---- Raster formats ----
+    
+    @staticmethod
+    def _reduce_png(image):
+        """Lossless mode reduction: drop opaque alpha, exact palette for <= 256 colors."""
+        from PIL import Image
+        
+        if 'transparency' in image.info:
+            return image
+        
+        if image.mode == 'RGBA' and image.getchannel('A').getextrema() == (255, 255):
+            image = image.convert('RGB')
+        
+        if image.mode == 'RGB':
+            colors = image.getcolors(256)
+            if colors is not None:
+                palette = []
+                for _, rgb in colors:
+                    palette.extend(rgb)
+                palette_image = Image.new('P', (1, 1))
+                palette_image.putpalette(palette)
+                # Every pixel color is in the palette, so mapping is exact
+                image = image.quantize(palette=palette_image, dither=Image.Dither.NONE)
+        
+        return image
+    
+    @staticmethod
+    def optimize_png(source_path, dest_path):
+        """
+        Losslessly re-encode a PNG.
+        
+        16-bit PNGs are left alone: Pillow reads 16-bit color as 8-bit, so
+        re-encoding them would lose precision.
+        
+        Returns:
+            bool: False if the file was left alone (e.g. animated PNG)
+        """
+        from PIL import Image
+        
+        # IHDR is always the first chunk; its bit depth byte is at offset 24
+        with open(source_path, 'rb') as f:
+            header = f.read(25)
+        if len(header) == 25 and header[24] == 16:
+            return False
+        
+        with Image.open(source_path) as image:
+            if image.format != 'PNG' or getattr(image, 'is_animated', False):
+                return False
+            if image.mode.startswith('I'):
+                return False
+            image.load()
+            
+            options = {'optimize': True}
+            for key in ('icc_profile', 'dpi', 'transparency'):
+                if key in image.info:
+                    options[key] = image.info[key]
+            
+            AssetOptimizer._reduce_png(image).save(dest_path, 'PNG', **options)
+        return True
+    
+    @staticmethod
+    def optimize_jpeg(source_path, dest_path, quality='keep'):
+        """
+        Re-encode a JPEG as optimized progressive JPEG.
+        
+        Args:
+            quality: 'keep' to reuse the original quantization tables
+                     (near-lossless), or a 1-95 quality
+        
+        Returns:
+            bool: False if the file is not a JPEG
+        """
+        from PIL import Image
+        
+        with Image.open(source_path) as image:
+            if image.format != 'JPEG':
+                return False
+            
+            options = {'optimize': True, 'progressive': True, 'subsampling': 'keep'}
+            options['quality'] = quality if quality == 'keep' else int(quality)
+            for key in ('exif', 'icc_profile', 'dpi'):
+                if key in image.info:
+                    options[key] = image.info[key]
+            
+            image.save(dest_path, 'JPEG', **options)
+        return True
+    
+    @staticmethod
+    def gif_to_webp(source_path, dest_path, quality=80):
+        """
+        Convert a (possibly animated) GIF to WebP.
+        
+        Args:
+            quality: WebP quality, or None for lossless
+        
+        Returns:
+            tuple: (width, height, animated)
+        """
+        from PIL import Image
+        
+        with Image.open(source_path) as image:
+            animated = getattr(image, 'n_frames', 1) > 1
+            options = {'save_all': animated, 'method': 4}
+            if quality is None:
+                options['lossless'] = True
+            else:
+                options['quality'] = int(quality)
+            if animated and 'loop' in image.info:
+                options['loop'] = image.info['loop']
+            
+            frame = image if animated else image.convert('RGBA')
+            frame.save(dest_path, 'WEBP', **options)
+            return image.width, image.height, animated
+    
+    # ---- Assets ----
+    
+    @staticmethod
+    def _file_sha256(path):
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+    
+    @staticmethod
+    def _add_webp_variant(asset, source_path, static_folder, quality, max_size, storage):
+        """Store an animated WebP copy of a GIF as a variant if it is small enough."""
+        from app.services.image_service import ImageVariantService
+        
+        variant_dir = ImageVariantService.variant_dir(static_folder, asset.site_id)
+        os.makedirs(variant_dir, exist_ok=True)
+        variant_name = f"{os.path.splitext(asset.filename)[0]}.webp"
+        variant_path = os.path.join(variant_dir, variant_name)
+        
+        width, height, animated = AssetOptimizer.gif_to_webp(source_path, variant_path, quality)
+        size = os.path.getsize(variant_path)
+        if size > max_size:
+            os.remove(variant_path)
+            return None
+        
+        variant = {
+            'width': width,
+            'height': height,
+            'format': 'webp',
+            'mime': 'image/webp',
+            'filename': variant_name,
+            'size': size,
+            'animated': animated,
+        }
+        if not storage.is_local:
+            storage.save_file(f"{asset.site_id}/variants/{variant_name}", variant_path, 'image/webp')
+        
+        variants = [v for v in asset.variant_list if v['filename'] != variant_name]
+        asset.variants = json.dumps(variants + [variant])
+        return variant
+    
+    @staticmethod
+    def optimize_asset(asset_id, static_folder, jpeg_quality='keep', webp_quality=80, min_saving=0.02):
+        """
+        Optimize an uploaded asset and record the sizes on its row.
+        
+        Must run inside an app context.
+        
+        Args:
+            asset_id: Asset ID
+            static_folder: Path to static folder
+            jpeg_quality: See optimize_jpeg()
+            webp_quality: Quality of WebP copies of GIFs (None: lossless)
+            min_saving: Minimum relative saving for a result to be kept
+        
+        Returns:
+            dict|None: {'original_size', 'optimized_size', 'saved_bytes'},
+                       or None if the asset is gone or not optimizable
+        """
+        from app.models import db, Asset
+        from app.services.content_store import ContentStore
+        from app.services.storage_backend import get_storage
+        
+        asset = Asset.query.get(asset_id)
+        if not asset or not AssetOptimizer.is_optimizable(asset.filename):
+            return None
+        
+        storage = get_storage('uploads')
+        key = f"{asset.site_id}/{asset.filename}"
+        source_path = os.path.join(static_folder, 'uploads', str(asset.site_id), asset.filename)
+        if not os.path.exists(source_path) and not storage.is_local:
+            storage.download(key, source_path)
+        
+        size = os.path.getsize(source_path)
+        if asset.original_size is None:
+            asset.original_size = size
+        max_size = int(size * (1 - min_saving))
+        extension = asset.filename.rsplit('.', 1)[1].lower()
+        old_hash = None
+        
+        if extension == 'gif':
+            variant = AssetOptimizer._add_webp_variant(
+                asset, source_path, static_folder, webp_quality, max_size, storage
+            )
+            asset.optimized_size = variant['size'] if variant else size
+        else:
+            tmp_path = f"{source_path}.opt"
+            try:
+                if extension == 'png':
+                    encoded = AssetOptimizer.optimize_png(source_path, tmp_path)
+                else:
+                    encoded = AssetOptimizer.optimize_jpeg(source_path, tmp_path, jpeg_quality)
+                
+                if encoded and os.path.getsize(tmp_path) <= max_size:
+                    new_hash = AssetOptimizer._file_sha256(tmp_path)
+                    new_size = os.path.getsize(tmp_path)
+                    # New inode at the same URL path; other links to the old blob are untouched
+                    os.replace(tmp_path, source_path)
+                    ContentStore.adopt(static_folder, source_path, new_hash)
+                    if not storage.is_local:
+                        storage.save_file(key, source_path, asset.file_type)
+                    
+                    old_hash = asset.content_hash
+                    asset.content_hash = new_hash
+                    asset.file_size = new_size
+                asset.optimized_size = asset.file_size
+            finally:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+        
+        db.session.commit()
+        if old_hash and old_hash != asset.content_hash:
+            ContentStore.release(static_folder, old_hash)
+        
+        result = {
+            'original_size': asset.original_size,
+            'optimized_size': asset.optimized_size,
+            'saved_bytes': asset.original_size - asset.optimized_size,
+        }
+        logger.info("Optimized asset %s: %d -> %d bytes", asset_id,
+                    result['original_size'], result['optimized_size'])
+        return result
+    
+    @staticmethod
+    def _get_executor(app):
+        if AssetOptimizer._executor is None:
+            AssetOptimizer._executor = ThreadPoolExecutor(
+                max_workers=app.config.get('ASSET_OPTIMIZE_WORKERS', 1),
+                thread_name_prefix='asset-optimize'
+            )
+        return AssetOptimizer._executor
+    
+    @staticmethod
+    def schedule(app, asset_id, static_folder, filename):
+        """
+        Optimize an asset in the background after an upload.
+        
+        Args:
+            app: Flask application (the worker pushes its own app context)
+            asset_id: Uploaded Asset ID
+            static_folder: Path to static folder
+            filename: Stored filename, used to skip other formats
+        
+        Returns:
+            Future|None
+        """
+        if not app.config.get('ASSET_OPTIMIZE_ENABLED', True):
+            return None
+        if not AssetOptimizer.is_optimizable(filename):
+            return None
+        
+        options = {
+            'jpeg_quality': app.config.get('ASSET_OPTIMIZE_JPEG_QUALITY', 'keep'),
+            'webp_quality': app.config.get('ASSET_OPTIMIZE_WEBP_QUALITY', 80),
+            'min_saving': app.config.get('ASSET_OPTIMIZE_MIN_SAVING', 0.02),
+        }
+        
+        def job():
+            with app.app_context():
+                try:
+                    return AssetOptimizer.optimize_asset(asset_id, static_folder, **options)
+                except Exception:
+                    logger.exception("Optimization failed for asset %s", asset_id)
+                    from app.models import db
+                    db.session.rollback()
+                    return None
+        
+        return AssetOptimizer._get_executor(app).submit(job)
@@ -1,9 +1,12 @@
 """Asset service for file management."""
 import os
 import uuid
+import logging
 from werkzeug.utils import secure_filename
 from app.models import db, Asset
 
+logger = logging.getLogger(__name__)
+
 
 class AssetService:
     """Service for asset operations."""
@@ -25,9 +28,87 @@ class AssetService:
         file.seek(0)  # Reset to beginning
         return size
     
+    @staticmethod
+    def get_max_file_size():
+        """Per-file upload limit from config (falls back to MAX_FILE_SIZE)."""
+        from flask import current_app, has_app_context
+        if has_app_context():
+            return current_app.config.get('UPLOAD_MAX_FILE_SIZE', AssetService.MAX_FILE_SIZE)
+        return AssetService.MAX_FILE_SIZE
+    
+    @staticmethod
+    def store_upload(file, dest_path, max_size=None):
+        """
+        Move an uploaded file into place, verifying size and content.
+        
+        Uploads parsed by StreamingUploadRequest were already written to a
+        temp file chunk by chunk, with the size limit, SHA-256 and magic
+        bytes handled in that single pass; they are committed with an
+        atomic rename. Parts that were drained for being too large are
+        reported as an error. Other FileStorage objects are checked for
+        size before anything is written, then copied in chunks the same
+        way.
+        
+        Args:
+            file: FileStorage object from request
+            dest_path: Final path of the file
+            max_size: Size limit in bytes (default: get_max_file_size())
+            
+        Returns:
+            tuple: (info: dict|None, error: str|None) where info has
+                   'size', 'mime_type' and 'sha256'
+        """
+        import hashlib
+        from app.utils.upload_stream import HashingUploadFile, sniff_mime, SNIFF_BYTES
+        
+        if max_size is None:
+            max_size = AssetService.get_max_file_size()
+        stream = file.stream
+        
+        if isinstance(stream, HashingUploadFile):
+            if stream.too_large:
+                return None, stream.size_error
+            mime_type = stream.mime_type
+            if not mime_type:
+                stream.discard()
+                return None, "File content is not a supported image"
+            stream.commit(dest_path)
+            return {'size': stream.size, 'mime_type': mime_type, 'sha256': stream.sha256}, None
+        
+        size = AssetService.get_file_size(file)
+        if size > max_size:
+            return None, f"File too large. Max size: {max_size / 1024 / 1024:g}MB"
+        
+        head = stream.read(SNIFF_BYTES)
+        stream.seek(0)
+        mime_type = sniff_mime(head)
+        if not mime_type:
+            return None, "File content is not a supported image"
+        
+        digest = hashlib.sha256()
+        tmp_path = f"{dest_path}.part"
+        with open(tmp_path, 'wb') as out:
+            for chunk in iter(lambda: stream.read(64 * 1024), b''):
+                digest.update(chunk)
+                out.write(chunk)
+        os.replace(tmp_path, dest_path)
+        
+        return {'size': size, 'mime_type': mime_type, 'sha256': digest.hexdigest()}, None
+    
     @staticmethod
     def get_image_dimensions(filepath):
-        """Get image dimensions if file is an image - match older folder."""
+        """
+        Get displayed image dimensions (EXIF rotation applied).
+        
+        Reads only the file header (see probe_image); Pillow is the fallback
+        for formats the probe does not know. SVGs without width/height or
+        viewBox have no dimensions.
+        """
+        from app.utils.image_probe import probe_image
+        info = probe_image(filepath)
+        if info is not None:
+            return info.display_size
+        
         try:
             from PIL import Image
             with Image.open(filepath) as img:
@@ -35,6 +116,117 @@ class AssetService:
         except Exception:
             return None, None
     
+    @staticmethod
+    def _store_file(file, static_folder, site_id, max_size=None, storage=None):
+        """
+        Validate, store and probe one uploaded file.
+        
+        Does not touch the database, so it can run in worker threads. The
+        file is always written under static_folder first (Pillow, variants
+        and resizing work on local files); with a remote storage backend it
+        is then uploaded there, and the local file acts as a cache.
+        
+        Returns:
+            tuple: (info: dict|None, error: str|None); info extends
+                   store_upload()'s with 'filename', 'original_name',
+                   'file_path', 'width' and 'height'
+        """
+        if not file or file.filename == '':
+            return None, "No file selected"
+        
+        if not AssetService.is_allowed_file(file.filename):
+            return None, f"File type not allowed. Allowed: {', '.join(AssetService.ALLOWED_EXTENSIONS)}"
+        
+        # Secure filename - match older folder logic
+        original_filename = file.filename
+        filename = secure_filename(original_filename)
+        file_extension = filename.rsplit('.', 1)[1].lower() if '.' in filename else ''
+        unique_filename = f"{uuid.uuid4().hex}.{file_extension}"
+        
+        # Create upload directory for this site
+        upload_dir = os.path.join(static_folder, 'uploads', str(site_id))
+        os.makedirs(upload_dir, exist_ok=True)
+        
+        # Save file (size limit, hash and content sniffing in one pass)
+        file_path = os.path.join(upload_dir, unique_filename)
+        upload_info, error = AssetService.store_upload(file, file_path, max_size)
+        if error:
+            return None, error
+        
+        # SVGs are sanitized before they can be served (rasters are
+        # optimized later in the background, see AssetOptimizer)
+        if upload_info['mime_type'] == 'image/svg+xml':
+            from app.services.asset_optimizer import AssetOptimizer, SvgSanitizeError
+            try:
+                cleaned = AssetOptimizer.optimize_svg_file(file_path)
+            except SvgSanitizeError as e:
+                os.remove(file_path)
+                return None, str(e)
+            upload_info.update(original_size=upload_info['size'], **cleaned)
+        
+        # Share bytes with identical uploads (any site); URL path stays the same
+        from app.services.content_store import ContentStore
+        ContentStore.adopt(static_folder, file_path, upload_info['sha256'])
+        
+        # Get image dimensions if it's an image - match older folder
+        width, height = AssetService.get_image_dimensions(file_path)
+        
+        if storage is not None and not storage.is_local:
+            storage.save_file(f"{site_id}/{unique_filename}", file_path, upload_info['mime_type'])
+        
+        upload_info.update(
+            filename=unique_filename,
+            original_name=original_filename,
+            file_path=file_path,
+            width=width,
+            height=height
+        )
+        return upload_info, None
+    
+    @staticmethod
+    def _build_asset(info, user_id, site_id, base_url=None):
+        """Create the (unsaved) Asset row for a stored file."""
+        # Use FULL URL for cross-domain access
+        # Editor runs on editor.pagemade.site, API on app.pagemade.site
+        # So we need absolute URL
+        if base_url:
+            # Use provided base URL
+            file_url = f"{base_url}/api/assets/uploads/{site_id}/{info['filename']}"
+        else:
+            # Default for production
+            file_url = f"https://app.pagemade.site/api/assets/uploads/{site_id}/{info['filename']}"
+        
+        return Asset(
+            filename=info['filename'],
+            original_name=info['original_name'],
+            url=file_url,
+            file_size=info['size'],
+            file_type=info['mime_type'],
+            width=info['width'],
+            height=info['height'],
+            content_hash=info['sha256'],
+            original_size=info.get('original_size', info['size']),
+            optimized_size=info['size'] if 'original_size' in info else None,
+            site_id=site_id,
+            user_id=user_id
+        )
+    
+    @staticmethod
+    def _discard_stored(static_folder, infos):
+        """Remove files stored for uploads whose rows were not committed."""
+        from app.services.content_store import ContentStore
+        from app.services.storage_backend import get_storage
+        storage = get_storage('uploads')
+        for info in infos:
+            try:
+                os.remove(info['file_path'])
+            except FileNotFoundError:
+                pass
+            if not storage.is_local:
+                site_dir = os.path.basename(os.path.dirname(info['file_path']))
+                storage.delete(f"{site_dir}/{info['filename']}")
+            ContentStore.release(static_folder, info['sha256'])
+    
     @staticmethod
     def upload_asset(file, user_id, site_id, static_folder, base_url=None):
         """
@@ -50,73 +242,128 @@ class AssetService:
         Returns:
             tuple: (success: bool, asset: Asset|None, error: str|None)
         """
-        if not file or file.filename == '':
-            return False, None, "No file selected"
-        
-        if not AssetService.is_allowed_file(file.filename):
-            return False, None, f"File type not allowed. Allowed: {', '.join(AssetService.ALLOWED_EXTENSIONS)}"
-        
         try:
-            # Secure filename - match older folder logic
-            original_filename = file.filename
-            filename = secure_filename(original_filename)
-            file_extension = filename.rsplit('.', 1)[1].lower() if '.' in filename else ''
-            unique_filename = f"{uuid.uuid4().hex}.{file_extension}"
-            
-            # Create upload directory for this site
-            upload_dir = os.path.join(static_folder, 'uploads', str(site_id))
-            os.makedirs(upload_dir, exist_ok=True)
-            
-            # Save file
-            file_path = os.path.join(upload_dir, unique_filename)
-            file.save(file_path)
-            
-            # Get file size - match older folder logic
-            file_size = AssetService.get_file_size(file)
-            
-            # Check file size
-            if file_size > AssetService.MAX_FILE_SIZE:
-                os.remove(file_path)
-                return False, None, f"File too large. Max size: {AssetService.MAX_FILE_SIZE / 1024 / 1024}MB"
-            
-            # Create asset record - use FULL URL for cross-domain access
-            # Editor runs on editor.pagemade.site, API on app.pagemade.site
-            # So we need absolute URL
-            if base_url:
-                # Use provided base URL
-                file_url = f"{base_url}/api/assets/uploads/{site_id}/{unique_filename}"
-            else:
-                # Default for production
-                file_url = f"https://app.pagemade.site/api/assets/uploads/{site_id}/{unique_filename}"
-            
-            # Get image dimensions if it's an image - match older folder
-            width, height = AssetService.get_image_dimensions(file_path)
-            
-            asset = Asset(
-                filename=unique_filename,
-                original_name=original_filename,
-                url=file_url,
-                file_size=file_size,
-                file_type=file.content_type,
-                width=width,
-                height=height,
-                site_id=site_id,
-                user_id=user_id
+            from app.services.storage_backend import get_storage
+            info, error = AssetService._store_file(
+                file, static_folder, site_id, storage=get_storage('uploads')
             )
+            if error:
+                return False, None, error
+            
+            asset = AssetService._build_asset(info, user_id, site_id, base_url)
             
             db.session.add(asset)
+            db.session.flush()
+            from app.services.search_service import SearchService
+            SearchService.index_asset(asset)
             db.session.commit()
             
             # Convert to dict - match older folder to_dict format
             asset_dict = asset.to_dict()
             db.session.expunge(asset)
             
+            # Responsive variants and optimization run off the request thread
+            from flask import current_app
+            from app.services.image_service import ImageVariantService
+            from app.services.asset_optimizer import AssetOptimizer
+            app = current_app._get_current_object()
+            ImageVariantService.schedule(app, asset_dict['id'], static_folder, info['filename'])
+            AssetOptimizer.schedule(app, asset_dict['id'], static_folder, info['filename'])
+            
             return True, asset_dict, None
             
         except Exception as e:
             db.session.rollback()
             return False, None, f"Upload failed: {str(e)}"
     
+    @staticmethod
+    def upload_assets_batch(files, user_id, site_id, static_folder, base_url=None, max_workers=4):
+        """
+        Upload several files at once.
+        
+        Files are stored and probed concurrently in a bounded thread pool
+        (file I/O, hashing and Pillow decoding release the GIL). All Asset
+        rows are then inserted in one transaction. A file that fails does
+        not affect the others.
+        
+        Args:
+            files: List of FileStorage objects
+            user_id: User ID who owns the assets
+            site_id: Site ID where assets belong
+            static_folder: Path to static folder
+            base_url: Base URL for assets (e.g. https://app.pagemade.site)
+            max_workers: Maximum threads used for this batch
+            
+        Returns:
+            list: One result per file, in input order:
+                  {'index', 'filename', 'success', 'asset'} or
+                  {'index', 'filename', 'success', 'error'}
+        """
+        from concurrent.futures import ThreadPoolExecutor
+        from flask import current_app
+        from app.services.image_service import ImageVariantService
+        from app.services.asset_optimizer import AssetOptimizer
+        from app.services.storage_backend import get_storage
+        
+        # Worker threads have no app context
+        max_size = AssetService.get_max_file_size()
+        storage = get_storage('uploads')
+        
+        def store(file):
+            try:
+                return AssetService._store_file(file, static_folder, site_id, max_size, storage)
+            except Exception as e:
+                logger.exception("[UPLOAD] Storing %s failed", getattr(file, 'filename', None))
+                return None, f"Upload failed: {str(e)}"
+        
+        workers = max(1, min(max_workers, len(files)))
+        if workers == 1:
+            stored = [store(file) for file in files]
+        else:
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='asset-upload') as pool:
+                stored = list(pool.map(store, files))
+        
+        results = []
+        pending = []
+        for index, (file, (info, error)) in enumerate(zip(files, stored)):
+            result = {'index': index, 'filename': getattr(file, 'filename', None) or '', 'success': error is None}
+            if error:
+                result['error'] = error
+            else:
+                pending.append((result, info, AssetService._build_asset(info, user_id, site_id, base_url)))
+            results.append(result)
+        
+        if not pending:
+            return results
+        
+        try:
+            db.session.add_all([asset for _, _, asset in pending])
+            # Flush populates ids and defaults, so to_dict() needs no
+            # per-row refresh after the commit
+            db.session.flush()
+            asset_dicts = [asset.to_dict() for _, _, asset in pending]
+            from app.services.search_service import SearchService
+            for _, _, asset in pending:
+                SearchService.index_asset(asset)
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            logger.error("[UPLOAD] Batch commit failed for site %s: %s", site_id, e)
+            AssetService._discard_stored(static_folder, [info for _, info, _ in pending])
+            for result, _, _ in pending:
+                result['success'] = False
+                result['error'] = f"Database commit failed: {str(e)}"
+            return results
+        
+        app = current_app._get_current_object()
+        for (result, info, asset), asset_dict in zip(pending, asset_dicts):
+            db.session.expunge(asset)
+            result['asset'] = asset_dict
+            ImageVariantService.schedule(app, asset_dict['id'], static_folder, info['filename'])
+            AssetOptimizer.schedule(app, asset_dict['id'], static_folder, info['filename'])
+        
+        return results
+    
     @staticmethod
     def get_assets_by_site(site_id, user_id):
         """
@@ -155,18 +402,17 @@ class AssetService:
         asset = Asset.query.get(asset_id)
         
         if not asset:
-            print(f"❌ [DELETE] Asset not found: {asset_id}")
+            logger.warning("[DELETE] Asset not found: %s", asset_id)
             return False, "Asset not found"
         
         # Verify ownership
         if asset.user_id != user_id:
-            print(f"❌ [DELETE] Unauthorized: asset.user_id={asset.user_id}, user_id={user_id}")
+            logger.warning("[DELETE] Unauthorized: asset.user_id=%s, user_id=%s", asset.user_id, user_id)
             return False, "Unauthorized: You don't own this asset"
         
         try:
-            print(f"🗑️ [DELETE] Deleting asset {asset_id}: {asset.filename}")
-            print(f"🗑️ [DELETE] Asset URL: {asset.url}")
-            print(f"🗑️ [DELETE] Site ID: {asset.site_id}")
+            logger.debug("[DELETE] Deleting asset %s: %s (url=%s, site_id=%s)",
+                         asset_id, asset.filename, asset.url, asset.site_id)
             
             # Delete physical file
             # Handle both absolute and relative URLs
@@ -179,7 +425,7 @@ class AssetService:
                 # Split by '/api/assets/uploads/' to get the path part
                 if '/api/assets/uploads/' in url:
                     url = '/api/assets/uploads/' + url.split('/api/assets/uploads/', 1)[1]
-                    print(f"🗑️ [DELETE] Converted absolute URL to relative: {url}")
+                    logger.debug("[DELETE] Converted absolute URL to relative: %s", url)
             
             # Now handle relative URL formats
             file_path = None
@@ -192,58 +438,64 @@ class AssetService:
                     site_id = url_parts[4]
                     filename = url_parts[5]
                     file_path = os.path.join(static_folder, 'uploads', site_id, filename)
-                    print(f"🗑️ [DELETE] Format 1 detected - File path: {file_path}")
+                    logger.debug("[DELETE] Format 1 detected - File path: %s", file_path)
             
             # Format 2: /static/uploads/{site_id}/{filename} (old format)
             elif url.startswith('/static/'):
                 relative_path = url.replace('/static/', '')
                 file_path = os.path.join(static_folder, relative_path)
-                print(f"🗑️ [DELETE] Format 2 detected - File path: {file_path}")
+                logger.debug("[DELETE] Format 2 detected - File path: %s", file_path)
             
             # Format 3: Direct filename (fallback using site_id from asset)
             else:
                 file_path = os.path.join(static_folder, 'uploads', str(asset.site_id), asset.filename)
-                print(f"🗑️ [DELETE] Format 3 detected - File path: {file_path}")
+                logger.debug("[DELETE] Format 3 detected - File path: %s", file_path)
             
             # Delete file if it exists
             if file_path:
                 if os.path.exists(file_path):
                     os.remove(file_path)
-                    print(f"✅ [DELETE] Physical file deleted: {file_path}")
+                    logger.debug("[DELETE] Physical file deleted: %s", file_path)
                 else:
-                    print(f"⚠️ [DELETE] File not found on disk: {file_path}")
+                    logger.warning("[DELETE] File not found on disk: %s", file_path)
             else:
-                print(f"⚠️ [DELETE] Could not determine file path from URL: {asset.url}")
+                logger.warning("[DELETE] Could not determine file path from URL: %s", asset.url)
             
-            # Delete database record
-            print(f"🗑️ [DELETE] Calling db.session.delete()...")
+            # Delete from the shared storage backend (local files are the backend itself)
+            from app.services.storage_backend import get_storage
+            storage = get_storage('uploads')
+            if not storage.is_local and file_path:
+                storage.delete(os.path.relpath(file_path, os.path.join(static_folder, 'uploads')).replace(os.sep, '/'))
+            
+            # Delete responsive variants
+            from app.services.image_service import ImageVariantService
+            ImageVariantService.delete_variants(static_folder, asset.site_id, asset.variants)
+            
+            # Delete database record (and its usage index rows)
+            from app.repositories.asset_usage_repository import AssetUsageRepository
+            AssetUsageRepository.delete_by_asset(asset_id)
+            from app.services.search_service import SearchService
+            SearchService.remove('asset', asset_id)
+            content_hash = asset.content_hash
             db.session.delete(asset)
             
-            print(f"🗑️ [DELETE] Asset marked for deletion. Calling db.session.commit()...")
             try:
                 db.session.commit()
-                print(f"✅ [DELETE] db.session.commit() SUCCESS!")
-                print(f"✅ [DELETE] Asset deleted successfully from database: {asset.filename}")
+                logger.info("[DELETE] Asset %s deleted: %s", asset_id, asset.filename)
                 
-                # Verify deletion
-                from sqlalchemy import inspect
-                if inspect(asset).deleted:
-                    print(f"✅ [DELETE] Asset object state: DELETED")
-                else:
-                    print(f"⚠️ [DELETE] Asset object state: NOT DELETED (this is a problem!)")
+                # Drop the shared blob once no other asset references it
+                from app.services.content_store import ContentStore
+                ContentStore.release(static_folder, content_hash)
                 
                 return True, None
             except Exception as commit_error:
-                print(f"❌ [DELETE] db.session.commit() FAILED!")
-                print(f"❌ [DELETE] Commit error: {str(commit_error)}")
+                logger.error("[DELETE] db.session.commit() failed: %s", commit_error)
                 db.session.rollback()
                 return False, f"Database commit failed: {str(commit_error)}"
             
         except Exception as e:
             db.session.rollback()
-            print(f"❌ [DELETE] Error: {str(e)}")
-            import traceback
-            traceback.print_exc()
+            logger.exception("[DELETE] Error deleting asset %s", asset_id)
             return False, f"Delete failed: {str(e)}"
     
     @staticmethod
@@ -255,42 +507,12 @@ class AssetService:
     @staticmethod
     def cleanup_orphaned_files(static_folder):
         """
-        Find and optionally remove files without database records.
+        Find files without database records.
         
         Returns:
             list: List of orphaned file paths
         """
-        orphaned_files = []
+        from app.services.upload_reconciler import UploadReconciler
+        report = UploadReconciler(static_folder).run()
         uploads_dir = os.path.join(static_folder, 'uploads')
-        
-        if not os.path.exists(uploads_dir):
-            return orphaned_files
-        
-        # Get all files in uploads directory
-        for root, dirs, files in os.walk(uploads_dir):
-            for filename in files:
-                file_path = os.path.join(root, filename)
-                relative_path = os.path.relpath(file_path, static_folder)
-                
-                # Check if file has database record
-                # Try both new and old URL formats
-                relative_url = relative_path.replace(os.sep, '/')
-                
-                # New format: /api/assets/uploads/{site_id}/{filename}
-                if relative_url.startswith('uploads/'):
-                    parts = relative_url.split('/')
-                    if len(parts) >= 3:
-                        site_id = parts[1]
-                        filename = parts[2]
-                        file_url_new = f"/api/assets/uploads/{site_id}/{filename}"
-                        asset = Asset.query.filter_by(url=file_url_new).first()
-                        if asset:
-                            continue  # File has record, skip
-                
-                # Old format: /static/uploads/{site_id}/{filename}
-                file_url_old = f"/static/{relative_url}"
-                asset = Asset.query.filter_by(url=file_url_old).first()
-                if not asset:
-                    orphaned_files.append(file_path)
-        
-        return orphaned_files
+        return [os.path.join(uploads_dir, path) for path in report['orphaned']]
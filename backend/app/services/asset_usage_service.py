@@ -0,0 +1,185 @@
+"""Index of which pages reference which assets."""
+import re
+import logging
+from datetime import datetime, timedelta
+from app.models import db, Asset, Page
+from app.repositories.asset_usage_repository import AssetUsageRepository
+
+logger = logging.getLogger(__name__)
+
+# /api/assets/uploads/<site_id>/<uuid>.<ext>, its variants
+# (variants/<uuid>_w640.webp, variants/<uuid>.webp) and resize URLs
+# (?w=...) all carry the site ID and the UUID stem of the stored filename.
+ASSET_URL_PATTERN = re.compile(r'/uploads/(\d+)/(?:variants/)?([0-9a-f]{32})[._]')
+
+
+class AssetUsageService:
+    """
+    Keep AssetUsage rows in sync with page content.
+    
+    References are found by scanning the stored content for upload URLs.
+    The GrapesJS JSON holds every place an asset can appear (gjs-assets,
+    component src/srcset attributes, inline styles, gjs-html and gjs-css
+    url()), so one regex pass over the raw string covers all of them
+    without walking the component tree. On save only the difference with
+    the rows already indexed for the page is written.
+    """
+    
+    RESOLVE_CHUNK = 200
+    
+    @staticmethod
+    def extract_refs(*texts):
+        """
+        Find asset references in page content.
+        
+        Args:
+            *texts: Content strings (JSON, HTML or CSS); None is skipped
+        
+        Returns:
+            set: {(site_id, filename_stem), ...}
+        """
+        refs = set()
+        for text in texts:
+            if not text:
+                continue
+            # JSON encoders may escape slashes
+            text = text.replace('\\/', '/')
+            refs.update((int(site_id), stem) for site_id, stem in ASSET_URL_PATTERN.findall(text))
+        return refs
+    
+    @staticmethod
+    def resolve(refs):
+        """
+        Map references to Asset IDs.
+        
+        Stored filenames are ``<stem>.<ext>``, so each reference becomes a
+        lookup on the indexed filename column.
+        
+        Returns:
+            set: Asset IDs (references to deleted assets are ignored)
+        """
+        from app.services.asset_service import AssetService
+        
+        refs = list(refs)
+        asset_ids = set()
+        for start in range(0, len(refs), AssetUsageService.RESOLVE_CHUNK):
+            chunk = refs[start:start + AssetUsageService.RESOLVE_CHUNK]
+            # A copied site can hold the same stored filename as the original
+            wanted = set(chunk)
+            filenames = [
+                f"{stem}.{ext}" for stem in {stem for _, stem in chunk}
+                for ext in AssetService.ALLOWED_EXTENSIONS
+            ]
+            rows = db.session.query(Asset.id, Asset.filename, Asset.site_id) \
+                .filter(Asset.filename.in_(filenames))
+            for row in rows:
+                if (row.site_id, row.filename.rsplit('.', 1)[0]) in wanted:
+                    asset_ids.add(row.id)
+        return asset_ids
+    
+    @staticmethod
+    def sync_page(page):
+        """
+        Update the index for a page after its content changed.
+        
+        Does not commit, so the index is saved in the same transaction as
+        the content.
+        
+        Returns:
+            tuple: (added: set, removed: set) asset IDs
+        """
+        refs = AssetUsageService.extract_refs(page.content, page.html_content, page.css_content)
+        current = AssetUsageService.resolve(refs) if refs else set()
+        indexed = AssetUsageRepository.asset_ids_for_page(page.id)
+        
+        added, removed = current - indexed, indexed - current
+        AssetUsageRepository.add_for_page(page, added)
+        AssetUsageRepository.remove_for_page(page.id, removed)
+        page.assets_indexed_at = datetime.utcnow()
+        
+        if added or removed:
+            logger.debug("Asset usage for page %s: +%d -%d", page.id, len(added), len(removed))
+        return added, removed
+    
+    @staticmethod
+    def rebuild(batch_size=200, all_pages=False):
+        """
+        Index pages saved before the usage index existed.
+        
+        Args:
+            batch_size: Pages committed per transaction
+            all_pages: Re-sync every page, not only never-indexed ones
+        
+        Returns:
+            dict: {'pages', 'added', 'removed'}
+        """
+        query = db.session.query(Page.id)
+        if not all_pages:
+            query = query.filter(Page.assets_indexed_at.is_(None))
+        page_ids = [row.id for row in query.order_by(Page.id)]
+        
+        stats = {'pages': 0, 'added': 0, 'removed': 0}
+        for start in range(0, len(page_ids), batch_size):
+            for page in Page.query.filter(Page.id.in_(page_ids[start:start + batch_size])):
+                added, removed = AssetUsageService.sync_page(page)
+                stats['pages'] += 1
+                stats['added'] += len(added)
+                stats['removed'] += len(removed)
+            db.session.commit()
+        return stats
+    
+    @staticmethod
+    def find_unused(site_id=None, min_age_days=0):
+        """
+        Assets that no page references.
+        
+        Args:
+            site_id: Limit to one site
+            min_age_days: Skip assets uploaded more recently (they may be
+                          about to be used by an unsaved editor session)
+        
+        Returns:
+            tuple: (assets: list, complete: bool) where complete is False
+                   while some pages in scope were never indexed
+        """
+        created_before = datetime.utcnow() - timedelta(days=min_age_days) if min_age_days else None
+        assets = AssetUsageRepository.find_unused(site_id, created_before)
+        complete = AssetUsageRepository.count_unindexed_pages(site_id) == 0
+        return assets, complete
+    
+    @staticmethod
+    def collect_garbage(static_folder, site_id=None, min_age_days=7, delete=False):
+        """
+        Report (and optionally delete) unused assets.
+        
+        Deleting is refused while the index is incomplete, since an asset
+        used only by a never-indexed page would look unused.
+        
+        Returns:
+            dict: {'unused', 'unused_bytes', 'deleted', 'failed', 'complete'}
+        """
+        from app.services.asset_service import AssetService
+        
+        assets, complete = AssetUsageService.find_unused(site_id, min_age_days)
+        report = {
+            'unused': [asset.to_dict() for asset in assets],
+            'unused_bytes': sum(asset.file_size or 0 for asset in assets),
+            'deleted': 0,
+            'failed': [],
+            'complete': complete,
+        }
+        if not delete:
+            return report
+        if not complete:
+            raise RuntimeError("Asset usage index is incomplete; run a rebuild first")
+        
+        # Each delete commits (expiring loaded rows), so keep plain values
+        for asset_id, user_id in [(asset.id, asset.user_id) for asset in assets]:
+            success, error = AssetService.delete_asset(asset_id, user_id, static_folder)
+            if success:
+                report['deleted'] += 1
+            else:
+                report['failed'].append({'id': asset_id, 'error': error})
+        
+        logger.info("Deleted %d unused assets (%d failed)", report['deleted'], len(report['failed']))
+        return report
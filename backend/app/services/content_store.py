@@ -0,0 +1,149 @@
+"""Content-addressed storage for uploaded asset files."""
+import os
+import logging
+from app.models import db, Asset
+from app.repositories.asset_repository import AssetRepository
+
+logger = logging.getLogger(__name__)
+
+
+class ContentStore:
+    """
+    Deduplicate uploads by SHA-256.
+    
+    Every distinct file content is kept once under
+    ``uploads/.blobs/<aa>/<bb>/<sha256>``. The per-site URL paths
+    (``uploads/<site_id>/<uuid>.<ext>``) stay as they are, but are hard links
+    to the blob, so existing URLs, send_from_directory() and Nginx keep
+    working unchanged while the bytes are stored once.
+    
+    The reference count of a blob is the number of Asset rows with its
+    ``content_hash`` (an indexed column). Because the site paths are hard
+    links, losing a race with a concurrent delete can only cost
+    deduplication for that content, never the data of a live asset.
+    """
+    
+    BLOB_DIR = '.blobs'
+    
+    @staticmethod
+    def blob_path(static_folder, content_hash):
+        """Path of the blob for a SHA-256 hex digest."""
+        return os.path.join(
+            static_folder, 'uploads', ContentStore.BLOB_DIR,
+            content_hash[:2], content_hash[2:4], content_hash
+        )
+    
+    @staticmethod
+    def refcount(content_hash):
+        """Number of Asset rows referencing a blob."""
+        return AssetRepository.count_by_content_hash(content_hash)
+    
+    @staticmethod
+    def adopt(static_folder, file_path, content_hash):
+        """
+        Put a freshly stored upload under content-addressed storage.
+        
+        If the content is new, the blob becomes a second name of the
+        uploaded file. If a blob already exists, the uploaded copy is
+        atomically replaced with a link to it and its own bytes are freed.
+        
+        Args:
+            static_folder: Path to static folder
+            file_path: Path the upload was stored at (its public URL path)
+            content_hash: SHA-256 hex digest of the file
+            
+        Returns:
+            bool: True if the content was already stored (deduplicated)
+        """
+        blob = ContentStore.blob_path(static_folder, content_hash)
+        os.makedirs(os.path.dirname(blob), exist_ok=True)
+        
+        try:
+            os.link(file_path, blob)
+            return False
+        except FileExistsError:
+            pass
+        except OSError as e:
+            # Filesystem without hard links: keep the plain copy
+            logger.warning("Content store disabled for %s: %s", file_path, e)
+            return False
+        
+        tmp_path = f"{file_path}.link"
+        try:
+            os.link(blob, tmp_path)
+            os.replace(tmp_path, file_path)
+        except OSError as e:
+            logger.warning("Could not link %s to blob %s: %s", file_path, content_hash, e)
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return False
+        
+        logger.debug("Deduplicated %s -> %s", file_path, content_hash)
+        return True
+    
+    @staticmethod
+    def release(static_folder, content_hash):
+        """
+        Drop one reference to a blob, deleting it when no Asset uses it.
+        
+        Call after the Asset row has been deleted and committed, so the
+        count no longer includes it.
+        
+        Returns:
+            bool: True if the blob was removed
+        """
+        if not content_hash or ContentStore.refcount(content_hash) > 0:
+            return False
+        
+        try:
+            os.remove(ContentStore.blob_path(static_folder, content_hash))
+            logger.debug("Removed unreferenced blob %s", content_hash)
+            return True
+        except FileNotFoundError:
+            return False
+    
+    @staticmethod
+    def dedupe_existing(static_folder, batch_size=500):
+        """
+        Backfill content_hash for assets stored before the content store.
+        
+        Args:
+            static_folder: Path to static folder
+            batch_size: Rows committed per transaction
+            
+        Returns:
+            dict: {'hashed', 'deduplicated', 'missing', 'bytes_saved'}
+        """
+        stats = {'hashed': 0, 'deduplicated': 0, 'missing': 0, 'bytes_saved': 0}
+        asset_ids = [
+            row.id for row in
+            db.session.query(Asset.id).filter(Asset.content_hash.is_(None)).order_by(Asset.id)
+        ]
+        
+        for start in range(0, len(asset_ids), batch_size):
+            batch = Asset.query.filter(Asset.id.in_(asset_ids[start:start + batch_size])).all()
+            for asset in batch:
+                ContentStore._backfill_asset(static_folder, asset, stats)
+            db.session.commit()
+        
+        return stats
+    
+    @staticmethod
+    def _backfill_asset(static_folder, asset, stats):
+        import hashlib
+        
+        file_path = os.path.join(static_folder, 'uploads', str(asset.site_id), asset.filename)
+        if not os.path.isfile(file_path):
+            stats['missing'] += 1
+            return
+        
+        digest = hashlib.sha256()
+        with open(file_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(chunk)
+        
+        asset.content_hash = digest.hexdigest()
+        stats['hashed'] += 1
+        if ContentStore.adopt(static_folder, file_path, asset.content_hash):
+            stats['deduplicated'] += 1
+            stats['bytes_saved'] += asset.file_size or 0
@@ -0,0 +1,132 @@
+"""Host -> site directory map read by the static mirror (mirror_wsgi.py)."""
+import json
+import logging
+
+from app.services.storage_backend import get_storage, StorageNotFoundError
+
+logger = logging.getLogger(__name__)
+
+
+class HostMap:
+    """
+    ``_hosts.json`` at the root of site storage, listing every published
+    site by host name:
+        
+        {"hosts": {"shop.pagemade.site": {"dir": "3", "home": true,
+                                          "pages": ["about", "contact"]}}}
+    
+    ``dir`` is the site's folder in storage, ``home`` whether it has a
+    published homepage (index.html) and ``pages`` the slugs of its other
+    published pages. The mirror serves nothing else, so unpublished pages
+    whose files are still in storage stay hidden, as they are in the app.
+    
+    After a publish event only the entry of the site that changed is
+    re-read from the database and merged into the file (see update_site),
+    so the cost does not grow with the number of sites. build()/write()
+    regenerate the whole map when the file is missing or unreadable and
+    from scripts/maintenance/host_map.py. Mirror processes pick the file
+    up by its modification time.
+    """
+    
+    KEY = '_hosts.json'
+    DOMAIN = 'pagemade.site'
+    
+    @staticmethod
+    def _collect(site_ids=None):
+        """Entries by host for published sites (all, or only site_ids)."""
+        from app.models import db, Site, Page
+        
+        rows = db.session.query(Site.id, Site.subdomain, Page.slug, Page.is_homepage) \
+            .outerjoin(Page, db.and_(Page.site_id == Site.id, Page.is_published.is_(True))) \
+            .filter(Site.is_published.is_(True), Site.subdomain.isnot(None))
+        if site_ids is not None:
+            rows = rows.filter(Site.id.in_(site_ids))
+        
+        hosts = {}
+        for site_id, subdomain, slug, is_homepage in rows:
+            host = hosts.setdefault(f"{subdomain.lower()}.{HostMap.DOMAIN}",
+                                    {'dir': str(site_id), 'home': False, 'pages': []})
+            if is_homepage:
+                host['home'] = True
+            elif slug:
+                host['pages'].append(slug)
+        for host in hosts.values():
+            host['pages'].sort()
+        return hosts
+    
+    @staticmethod
+    def _dumps(hosts):
+        return json.dumps({'hosts': hosts}, sort_keys=True, separators=(',', ':'))
+    
+    @staticmethod
+    def build():
+        """
+        Returns:
+            dict: Map of all published sites
+        """
+        return {'hosts': HostMap._collect()}
+    
+    @staticmethod
+    def write():
+        """
+        Rebuild the whole map and save it if it changed.
+        
+        Returns:
+            bool: True if the file was rewritten
+        """
+        storage = get_storage('sites')
+        data = HostMap._dumps(HostMap._collect())
+        try:
+            if storage.read_text(HostMap.KEY) == data:
+                return False
+        except StorageNotFoundError:
+            pass
+        storage.save(HostMap.KEY, data, 'application/json')
+        return True
+    
+    @staticmethod
+    def _load():
+        """Hosts from the stored map, or None if it is missing or unreadable."""
+        try:
+            hosts = json.loads(get_storage('sites').read_text(HostMap.KEY))['hosts']
+        except StorageNotFoundError:
+            return None
+        except (ValueError, KeyError, TypeError) as e:
+            logger.warning("Host map is unreadable, rebuilding it: %s", e)
+            return None
+        if not isinstance(hosts, dict) or not all(isinstance(entry, dict) for entry in hosts.values()):
+            return None
+        return hosts
+    
+    @staticmethod
+    def update_site(site_id):
+        """
+        Replace one site's entry after it changed.
+        
+        Entries pointing at the site's folder are dropped (covers renamed,
+        unpublished and deleted sites) and its current entry, if it is
+        published, is added.
+        
+        Returns:
+            bool: True if the file was rewritten
+        """
+        hosts = HostMap._load()
+        if hosts is None:
+            return HostMap.write()
+        
+        site_dir = str(site_id)
+        updated = {host: entry for host, entry in hosts.items() if entry.get('dir') != site_dir}
+        updated.update(HostMap._collect([site_id]))
+        if updated == hosts:
+            return False
+        get_storage('sites').save(HostMap.KEY, HostMap._dumps(updated), 'application/json')
+        return True
+    
+    @staticmethod
+    def sync(site_id):
+        """Best-effort update_site() after a publish event; errors are logged, never raised."""
+        try:
+            return HostMap.update_site(site_id)
+        except Exception:
+            logger.exception("Failed to update the mirror host map for site %s", site_id)
+            return False
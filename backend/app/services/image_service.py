@@ -0,0 +1,473 @@
+"""Image service for responsive derivatives of uploaded assets."""
+import os
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+# AVIF needs the optional pillow-avif-plugin; WebP is built into Pillow
+try:
+    import pillow_avif  # noqa: F401 - registers the AVIF codec with Pillow
+    AVIF_AVAILABLE = True
+except ImportError:
+    AVIF_AVAILABLE = False
+
+
+class ImageVariantService:
+    """
+    Service for resized/re-encoded image variants.
+    
+    For every configured width smaller than the original, an upload gets a
+    copy in its own format plus WebP (and AVIF when the plugin is
+    installed). EXIF orientation is applied and all metadata is dropped.
+    Variants live in uploads/<site_id>/variants/ and are recorded on
+    Asset.variants as JSON.
+    """
+    
+    DEFAULT_WIDTHS = (320, 640, 960, 1280, 1920)
+    
+    # Formats Pillow can resize without losing animation or vector data
+    RESIZABLE_EXTENSIONS = {'png', 'jpg', 'jpeg', 'webp', 'bmp'}
+    
+    # Output encoders: extension -> (Pillow format, save kwargs, MIME type)
+    ENCODERS = {
+        'jpg': ('JPEG', {'quality': 82, 'optimize': True, 'progressive': True}, 'image/jpeg'),
+        'png': ('PNG', {'optimize': True}, 'image/png'),
+        'webp': ('WEBP', {'quality': 80, 'method': 4}, 'image/webp'),
+        'avif': ('AVIF', {'quality': 60, 'speed': 6}, 'image/avif'),
+    }
+    
+    _executor = None
+    
+    @staticmethod
+    def variant_dir(static_folder, site_id):
+        """Directory holding variants of a site's uploads."""
+        return os.path.join(static_folder, 'uploads', str(site_id), 'variants')
+    
+    @staticmethod
+    def is_resizable(filename):
+        """Check if variants can be generated for this file."""
+        return '.' in filename and \
+               filename.rsplit('.', 1)[1].lower() in ImageVariantService.RESIZABLE_EXTENSIONS
+    
+    @staticmethod
+    def output_formats(source_extension, has_alpha=False):
+        """
+        Formats generated for a source file.
+        
+        Args:
+            source_extension: Extension of the original (png, jpg, ...)
+            has_alpha: Whether the image has transparency
+        
+        Returns:
+            list: Output extensions, fallback (img src) format first
+        """
+        fallback = 'png' if source_extension == 'png' or has_alpha else 'jpg'
+        formats = [fallback, 'webp']
+        if AVIF_AVAILABLE:
+            formats.append('avif')
+        return formats
+    
+    @staticmethod
+    def generate_variants(source_path, output_dir, widths=None):
+        """
+        Generate resized variants of an image.
+        
+        Args:
+            source_path: Path to the original image
+            output_dir: Directory to write variants into
+            widths: Target widths (defaults to DEFAULT_WIDTHS)
+        
+        Returns:
+            list: [{'width', 'height', 'format', 'mime', 'filename', 'size'}, ...]
+                  sorted by format then width
+        """
+        from PIL import Image, ImageOps
+        
+        widths = sorted(widths or ImageVariantService.DEFAULT_WIDTHS)
+        filename = os.path.basename(source_path)
+        stem, extension = os.path.splitext(filename)
+        extension = extension.lstrip('.').lower()
+        
+        os.makedirs(output_dir, exist_ok=True)
+        variants = []
+        
+        with Image.open(source_path) as original:
+            # Bake EXIF orientation into pixels; metadata is not copied below
+            image = ImageOps.exif_transpose(original)
+            has_alpha = image.mode in ('RGBA', 'LA') or \
+                (image.mode == 'P' and 'transparency' in image.info)
+            
+            targets = [w for w in widths if w < image.width]
+            
+            for width in targets:
+                height = max(1, round(image.height * width / image.width))
+                resized = image.resize((width, height), Image.LANCZOS)
+                
+                for output in ImageVariantService.output_formats(extension, has_alpha):
+                    pil_format, options, mime = ImageVariantService.ENCODERS[output]
+                    frame = resized
+                    if output == 'jpg':
+                        frame = resized.convert('RGB')
+                    elif frame.mode not in ('RGB', 'RGBA', 'L', 'LA'):
+                        frame = resized.convert('RGBA' if has_alpha else 'RGB')
+                    
+                    variant_name = f"{stem}_w{width}.{output}"
+                    variant_path = os.path.join(output_dir, variant_name)
+                    frame.save(variant_path, pil_format, **options)
+                    
+                    variants.append({
+                        'width': width,
+                        'height': height,
+                        'format': output,
+                        'mime': mime,
+                        'filename': variant_name,
+                        'size': os.path.getsize(variant_path),
+                    })
+        
+        variants.sort(key=lambda v: (v['format'], v['width']))
+        return variants
+    
+    @staticmethod
+    def generate_for_asset(asset_id, static_folder, widths=None):
+        """
+        Generate variants for an asset and store them on its row.
+        
+        Must run inside an app context.
+        
+        Returns:
+            list|None: Variants, or None if the asset is gone or not resizable
+        """
+        from app.models import db, Asset
+        from app.services.storage_backend import get_storage
+        
+        asset = Asset.query.get(asset_id)
+        if not asset or not ImageVariantService.is_resizable(asset.filename):
+            return None
+        
+        storage = get_storage('uploads')
+        source_path = os.path.join(static_folder, 'uploads', str(asset.site_id), asset.filename)
+        if not os.path.exists(source_path) and not storage.is_local:
+            storage.download(f"{asset.site_id}/{asset.filename}", source_path)
+        
+        variant_dir = ImageVariantService.variant_dir(static_folder, asset.site_id)
+        variants = ImageVariantService.generate_variants(source_path, variant_dir, widths)
+        
+        if not storage.is_local:
+            for variant in variants:
+                storage.save_file(
+                    f"{asset.site_id}/variants/{variant['filename']}",
+                    os.path.join(variant_dir, variant['filename']),
+                    variant['mime']
+                )
+        
+        asset.variants = json.dumps(variants)
+        db.session.commit()
+        
+        logger.info("Generated %d variants for asset %s", len(variants), asset_id)
+        return variants
+    
+    @staticmethod
+    def _get_executor(app):
+        if ImageVariantService._executor is None:
+            ImageVariantService._executor = ThreadPoolExecutor(
+                max_workers=app.config.get('IMAGE_VARIANT_WORKERS', 2),
+                thread_name_prefix='image-variants'
+            )
+        return ImageVariantService._executor
+    
+    @staticmethod
+    def schedule(app, asset_id, static_folder, filename):
+        """
+        Generate variants in the background after an upload.
+        
+        Args:
+            app: Flask application (the worker pushes its own app context)
+            asset_id: Uploaded Asset ID
+            static_folder: Path to static folder
+            filename: Stored filename, used to skip non-resizable uploads
+        
+        Returns:
+            Future|None
+        """
+        if not app.config.get('IMAGE_VARIANTS_ENABLED', True):
+            return None
+        if not ImageVariantService.is_resizable(filename):
+            return None
+        
+        widths = app.config.get('IMAGE_VARIANT_WIDTHS')
+        
+        def job():
+            with app.app_context():
+                try:
+                    return ImageVariantService.generate_for_asset(asset_id, static_folder, widths)
+                except Exception:
+                    logger.exception("Variant generation failed for asset %s", asset_id)
+                    from app.models import db
+                    db.session.rollback()
+                    return None
+        
+        return ImageVariantService._get_executor(app).submit(job)
+    
+    @staticmethod
+    def delete_variants(static_folder, site_id, variants_json):
+        """Remove variant files recorded for an asset."""
+        if not variants_json:
+            return
+        from app.services.storage_backend import get_storage
+        
+        storage = get_storage('uploads')
+        variant_dir = ImageVariantService.variant_dir(static_folder, site_id)
+        for variant in json.loads(variants_json):
+            try:
+                os.remove(os.path.join(variant_dir, variant['filename']))
+            except FileNotFoundError:
+                pass
+            if not storage.is_local:
+                storage.delete(f"{site_id}/variants/{variant['filename']}")
+
+
+class ResizeParamsError(ValueError):
+    """Raised for resize query parameters outside the whitelist."""
+
+
+class UnreadableImageError(ValueError):
+    """Raised when Pillow cannot decode a source image (truncated, corrupt, too large)."""
+
+
+class ImageResizeCache:
+    """
+    On-demand resized images with a disk-backed LRU cache.
+    
+    A request like ``?w=640&fmt=webp`` is resized once with Pillow and
+    written to ``cache_dir/<key[:2]>/<key>.<fmt>`` where the key hashes the
+    source path, its mtime/size and the normalized parameters, so editing
+    the original naturally invalidates old entries. Later requests are
+    answered with send_file() straight from disk.
+    
+    - Only whitelisted sizes and qualities are accepted, so query strings
+      cannot be used to fill the disk.
+    - Concurrent requests for the same key wait for the first one instead
+      of resizing in parallel (per process; writes use atomic rename, so a
+      duplicate resize in another worker is harmless). If the source cannot
+      be decoded, the waiters get the same UnreadableImageError.
+    - Total cache size is kept under ``max_bytes`` by evicting the least
+      recently used entries. Hits touch the file so the order survives a
+      restart (entries are reloaded by mtime).
+    """
+    
+    FITS = ('contain', 'cover')
+    QUALITIES = (50, 60, 70, 80, 90)
+    DEFAULT_QUALITY = 80
+    
+    def __init__(self, cache_dir, max_bytes, sizes):
+        import threading
+        from collections import OrderedDict
+        
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.sizes = frozenset(sizes)
+        self._lock = threading.Lock()
+        self._inflight = {}
+        self._entries = OrderedDict()  # path -> size, least recently used first
+        self.total_bytes = 0
+        self._load()
+    
+    def _load(self):
+        """Rebuild the LRU order from files already on disk."""
+        os.makedirs(self.cache_dir, exist_ok=True)
+        found = []
+        for bucket in os.scandir(self.cache_dir):
+            if not bucket.is_dir():
+                continue
+            for entry in os.scandir(bucket.path):
+                if entry.name.endswith('.tmp'):
+                    continue
+                stat = entry.stat()
+                found.append((stat.st_mtime, entry.path, stat.st_size))
+        for _, path, size in sorted(found):
+            self._entries[path] = size
+            self.total_bytes += size
+    
+    def parse_params(self, args, source_extension):
+        """
+        Validate and normalize resize parameters.
+        
+        Args:
+            args: Request query args (w, h, fit, q, fmt)
+            source_extension: Extension of the original file
+        
+        Returns:
+            tuple: (width|None, height|None, fit, quality, fmt)
+        
+        Raises:
+            ResizeParamsError: For values outside the whitelist
+        """
+        def dimension(name):
+            value = args.get(name)
+            if value in (None, ''):
+                return None
+            if not value.isdigit() or int(value) not in self.sizes:
+                raise ResizeParamsError(f"{name} must be one of {sorted(self.sizes)}")
+            return int(value)
+        
+        width, height = dimension('w'), dimension('h')
+        
+        fit = args.get('fit', 'contain')
+        if fit not in self.FITS:
+            raise ResizeParamsError(f"fit must be one of {', '.join(self.FITS)}")
+        
+        quality = args.get('q', str(self.DEFAULT_QUALITY))
+        if not quality.isdigit() or int(quality) not in self.QUALITIES:
+            raise ResizeParamsError(f"q must be one of {list(self.QUALITIES)}")
+        
+        fmt = args.get('fmt', source_extension).lower()
+        if fmt == 'jpeg':
+            fmt = 'jpg'
+        if fmt not in ImageVariantService.ENCODERS or (fmt == 'avif' and not AVIF_AVAILABLE):
+            raise ResizeParamsError("fmt must be one of jpg, png, webp" + (", avif" if AVIF_AVAILABLE else ""))
+        
+        return width, height, fit, int(quality), fmt
+    
+    def cache_path(self, source_path, params):
+        """Cache file for a source file and normalized parameters."""
+        import hashlib
+        
+        stat = os.stat(source_path)
+        raw = f"{source_path}|{stat.st_mtime_ns}|{stat.st_size}|{params}"
+        key = hashlib.sha256(raw.encode('utf-8')).hexdigest()[:40]
+        return os.path.join(self.cache_dir, key[:2], f"{key}.{params[4]}")
+    
+    def get(self, source_path, params):
+        """
+        Return the path of the resized image, computing it if needed.
+        
+        Args:
+            source_path: Original image path
+            params: Tuple from parse_params()
+        
+        Returns:
+            str: Path to the cached variant
+        
+        Raises:
+            UnreadableImageError: If the source cannot be decoded
+        """
+        import threading
+        
+        path = self.cache_path(source_path, params)
+        
+        while True:
+            with self._lock:
+                if path in self._entries:
+                    self._entries.move_to_end(path)
+                    hit = True
+                else:
+                    hit = False
+                    waiter = self._inflight.get(path)
+                    if waiter is None:
+                        event = self._inflight[path] = threading.Event()
+                        event.error = None
+            
+            if hit:
+                if os.path.exists(path):
+                    try:
+                        os.utime(path)
+                    except OSError:
+                        pass
+                    return path
+                # Evicted by another worker: forget it and recompute
+                with self._lock:
+                    self.total_bytes -= self._entries.pop(path, 0)
+                continue
+            
+            if waiter is not None:
+                # Someone else is resizing the same thing
+                waiter.wait()
+                if waiter.error is not None:
+                    raise waiter.error
+                continue
+            
+            break
+        
+        try:
+            if not os.path.exists(path):
+                self._render(source_path, path, params)
+            size = os.path.getsize(path)
+            with self._lock:
+                self._entries[path] = size
+                self.total_bytes += size
+                self._evict()
+            return path
+        except UnreadableImageError as e:
+            event.error = e
+            raise
+        finally:
+            # Always release waiters, even if rendering failed
+            with self._lock:
+                self._inflight.pop(path).set()
+    
+    def _render(self, source_path, path, params):
+        from PIL import Image, ImageOps
+        
+        width, height, fit, quality, fmt = params
+        pil_format, options, _ = ImageVariantService.ENCODERS[fmt]
+        options = dict(options)
+        if 'quality' in options:
+            options['quality'] = quality
+        
+        # Decode errors surface from open() or the first load(); everything
+        # up to the save is decoding, so OSError there means a bad source
+        try:
+            with Image.open(source_path) as original:
+                original.load()
+                image = ImageOps.exif_transpose(original)
+                box_w = width or image.width
+                box_h = height or image.height
+                
+                if fit == 'cover' and width and height:
+                    image = ImageOps.fit(image, (width, height), Image.LANCZOS)
+                elif box_w < image.width or box_h < image.height:
+                    # contain: fit inside the box, never upscale
+                    image = image.copy()
+                    image.thumbnail((box_w, box_h), Image.LANCZOS)
+                
+                if fmt == 'jpg':
+                    image = image.convert('RGB')
+                elif image.mode not in ('RGB', 'RGBA', 'L', 'LA'):
+                    image = image.convert('RGBA')
+        except (OSError, SyntaxError, Image.DecompressionBombError) as e:
+            raise UnreadableImageError(f"Cannot decode {os.path.basename(source_path)}: {e}") from e
+        
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            image.save(tmp_path, pil_format, **options)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+    
+    def _evict(self):
+        """Drop least recently used entries until under budget (lock held)."""
+        while self.total_bytes > self.max_bytes and len(self._entries) > 1:
+            path, size = self._entries.popitem(last=False)
+            self.total_bytes -= size
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+    
+    @staticmethod
+    def for_app(app):
+        """Return the app's resize cache, creating it on first use."""
+        cache = app.extensions.get('image_resize_cache')
+        if cache is None:
+            cache = ImageResizeCache(
+                app.config.get('IMAGE_RESIZE_CACHE_DIR') or os.path.join(app.instance_path, 'image_cache'),
+                app.config.get('IMAGE_RESIZE_CACHE_MAX_BYTES', 512 * 1024 * 1024),
+                app.config.get('IMAGE_RESIZE_SIZES', [64, 128, 256, 320, 480, 640, 768, 960, 1280, 1600, 1920])
+            )
+            cache = app.extensions.setdefault('image_resize_cache', cache)
+        return cache
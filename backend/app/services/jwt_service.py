@@ -8,6 +8,7 @@ from typing import Optional, Dict, Any
 import jwt
 from flask import current_app
 from app.models.user import User
+from app.middlewares.server_timing_middleware import timed
 
 
 class JWTService:
@@ -64,6 +65,7 @@ class JWTService:
         }
     
     @staticmethod
+    @timed('auth')
     def verify_token(token: str, token_type: str = 'access') -> Optional[Dict[str, Any]]:
         """
         Verify and decode a JWT token
@@ -96,6 +98,7 @@ class JWTService:
             return None
     
     @staticmethod
+    @timed('auth')
     def get_user_from_token(token: str) -> Optional[User]:
         """
         Get user from valid access token
@@ -196,6 +199,7 @@ class JWTService:
             return False
     
     @staticmethod
+    @timed('auth')
     def is_token_revoked(token: str) -> bool:
         """
         Check if a token is revoked
@@ -1,9 +1,14 @@
 """Page service for page management."""
 import os
-import json
 from datetime import datetime
 from flask import current_app
 from app.models import db, Page, Site
+from app.repositories.asset_usage_repository import AssetUsageRepository
+from app.repositories.page_view_repository import PageViewRepository
+from app.services.sitemap_service import SitemapService
+from app.services.host_map import HostMap
+from app.services.search_service import SearchService
+from app.services.asset_usage_service import AssetUsageService
 
 
 class PageService:
@@ -43,30 +48,17 @@ class PageService:
             
             # Apply template content if template is specified and not blank/default
             if template and template not in ['blank', 'default', '']:
-                try:
-                    # Template files are in backend/static/templates/
-                    # current_app.root_path = /backend/app, so we need '..' to go to /backend/static/
-                    template_file = os.path.join(current_app.root_path, '..', 'static', 'templates', f'{template}.json')
-                    current_app.logger.info(f"📦 [PageService] Looking for template: {template}")
-                    current_app.logger.info(f"📦 [PageService] root_path: {current_app.root_path}")
-                    current_app.logger.info(f"📦 [PageService] template_file: {template_file}")
-                    current_app.logger.info(f"📦 [PageService] file exists: {os.path.exists(template_file)}")
-                    
-                    if os.path.exists(template_file):
-                        with open(template_file, 'r', encoding='utf-8') as f:
-                            template_data = json.load(f)
-                            content = template_data.get('content', {})
-                            page.html_content = content.get('html', '')
-                            page.css_content = content.get('css', '')
-                            current_app.logger.info(f"✅ Applied template '{template}' to new page")
-                            current_app.logger.info(f"✅ html_content length: {len(page.html_content)}")
-                            current_app.logger.info(f"✅ css_content length: {len(page.css_content)}")
-                    else:
-                        current_app.logger.error(f"❌ Template file NOT FOUND: {template_file}")
-                except Exception as e:
-                    current_app.logger.error(f"❌ Error applying template '{template}': {e}")
+                from app.services.template_registry import get_template_registry
+                html, css = get_template_registry().get_content(template)
+                if html is not None:
+                    page.html_content, page.css_content = html, css
+                    current_app.logger.info(f"✅ Applied template '{template}' to new page")
+                else:
+                    current_app.logger.error(f"❌ Template not found: {template}")
             
             db.session.add(page)
+            db.session.flush()
+            SearchService.index_page(page)
             db.session.commit()
             
             return True, page, None
@@ -128,7 +120,11 @@ class PageService:
             if 'title' in kwargs:
                 page.slug = page.generate_slug()
             
+            SearchService.index_page(page)
             db.session.commit()
+            if 'title' in kwargs:
+                SitemapService.sync(page.site, page)
+                HostMap.sync(page.site_id)
             return True, page, None
             
         except Exception as e:
@@ -159,6 +155,8 @@ class PageService:
         
         try:
             page.content = content
+            AssetUsageService.sync_page(page)
+            SearchService.index_page(page)
             db.session.commit()
             return True, None
             
@@ -193,6 +191,8 @@ class PageService:
             page.html_content = content_data.get('html', '')
             page.css_content = content_data.get('css', '')
             page.content = content_data.get('gjs-html', '')  # GrapesJS format
+            AssetUsageService.sync_page(page)
+            SearchService.index_page(page)
             
             db.session.commit()
             return True, None
@@ -237,7 +237,10 @@ class PageService:
             else:
                 return False, "Page has no content to publish"
             
+            SearchService.index_page(page)
             db.session.commit()
+            SitemapService.sync(page.site, page)
+            HostMap.sync(page.site_id)
             return True, None
             
         except Exception as e:
@@ -259,6 +262,8 @@ class PageService:
         try:
             page.is_published = False
             db.session.commit()
+            SitemapService.sync(page.site, page)
+            HostMap.sync(page.site_id)
             return True, None
             
         except Exception as e:
@@ -295,8 +300,14 @@ class PageService:
             if page.html_path and os.path.exists(page.html_path):
                 os.remove(page.html_path)
             
+            site = page.site
+            AssetUsageRepository.delete_by_page(page_id)
+            PageViewRepository.delete_by_page(page_id)
+            SearchService.remove('page', page_id)
             db.session.delete(page)
             db.session.commit()
+            SitemapService.sync(site, page_id=page_id)
+            HostMap.sync(site.id)
             
             return True, None
             
@@ -334,6 +345,9 @@ class PageService:
             page.slug = 'index'
             
             db.session.commit()
+            # Two pages changed URL
+            SitemapService.sync(page.site)
+            HostMap.sync(page.site_id)
             return True, None
             
         except Exception as e:
@@ -0,0 +1,192 @@
+"""Server-side storage for rendered page previews."""
+import os
+import re
+import time
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+
+TOKEN_PATTERN = re.compile(r'^[A-Za-z0-9_-]{16,128}$')
+
+
+class DiskPreviewStore:
+    """
+    Previews as files: ``<directory>/<owner id>/<token>.html``.
+    
+    The file's mtime is set to the expiry time, so a stat is all a lookup
+    needs. Files are shared by all workers on the host; expired ones are
+    removed on lookup and by a sweep at most every ``purge_interval``
+    seconds when new previews are saved.
+    """
+    
+    def __init__(self, directory, purge_interval=300):
+        self.directory = directory
+        self.purge_interval = purge_interval
+        self._purged_at = 0
+    
+    def _path(self, owner_id, token):
+        if not TOKEN_PATTERN.match(token or ''):
+            raise ValueError(f"Invalid preview token: {token!r}")
+        return os.path.join(self.directory, str(int(owner_id)), f"{token}.html")
+    
+    def save(self, owner_id, token, html, ttl):
+        """
+        Store a rendered preview.
+        
+        Args:
+            owner_id: User allowed to view it
+            token: Preview token (URL-safe)
+            html: Rendered document (str)
+            ttl: Seconds until it expires
+        
+        Returns:
+            float: Expiry as a Unix timestamp
+        """
+        path = self._path(owner_id, token)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        expires_at = time.time() + ttl
+        
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(html)
+        os.utime(tmp_path, (expires_at, expires_at))
+        os.replace(tmp_path, path)
+        
+        if time.time() - self._purged_at > self.purge_interval:
+            self.purge_expired()
+        return expires_at
+    
+    def expires_at(self, owner_id, token):
+        """Expiry timestamp of a preview, or None if there is none."""
+        try:
+            return os.stat(self._path(owner_id, token)).st_mtime
+        except (OSError, ValueError):
+            return None
+    
+    def open(self, owner_id, token):
+        """
+        Binary file object with the rendered preview.
+        
+        Raises:
+            FileNotFoundError: If the preview does not exist
+        """
+        return open(self._path(owner_id, token), 'rb')
+    
+    def delete(self, owner_id, token):
+        """Remove a preview if it exists."""
+        try:
+            os.remove(self._path(owner_id, token))
+        except (OSError, ValueError):
+            pass
+    
+    def purge_expired(self):
+        """
+        Delete expired previews.
+        
+        Returns:
+            int: Number of previews removed
+        """
+        self._purged_at = time.time()
+        removed = 0
+        try:
+            owners = os.listdir(self.directory)
+        except FileNotFoundError:
+            return 0
+        
+        for owner in owners:
+            owner_dir = os.path.join(self.directory, owner)
+            try:
+                with os.scandir(owner_dir) as it:
+                    for item in it:
+                        try:
+                            mtime = item.stat().st_mtime
+                            # Leftover temp files from interrupted saves
+                            stale = item.name.endswith('.tmp') and mtime < self._purged_at - 3600
+                            if stale or (item.name.endswith('.html') and mtime < self._purged_at):
+                                os.remove(item.path)
+                                removed += item.name.endswith('.html')
+                        except OSError:
+                            continue
+            except (NotADirectoryError, FileNotFoundError):
+                continue
+        
+        if removed:
+            logger.info("Removed %d expired previews", removed)
+        return removed
+
+
+class CachePreviewStore:
+    """
+    Previews in the app cache layer (cache.py).
+    
+    Only suitable for a single worker unless the cache is shared.
+    """
+    
+    def __init__(self, cache):
+        self.cache = cache
+    
+    @staticmethod
+    def _key(owner_id, token):
+        return f"preview:{int(owner_id)}:{token}"
+    
+    def save(self, owner_id, token, html, ttl):
+        """Store a rendered preview; returns its expiry timestamp."""
+        expires_at = time.time() + ttl
+        self.cache.set_value(self._key(owner_id, token), (html.encode('utf-8'), expires_at), ttl)
+        return expires_at
+    
+    def expires_at(self, owner_id, token):
+        """Expiry timestamp of a preview, or None if there is none."""
+        entry = self.cache.get_value(self._key(owner_id, token))
+        return entry[1] if entry else None
+    
+    def open(self, owner_id, token):
+        """
+        Rendered preview as a binary file object.
+        
+        Raises:
+            FileNotFoundError: If the preview does not exist
+        """
+        from io import BytesIO
+        
+        entry = self.cache.get_value(self._key(owner_id, token))
+        if entry is None:
+            raise FileNotFoundError(token)
+        return BytesIO(entry[0])
+    
+    def delete(self, owner_id, token):
+        """Remove a preview if it exists."""
+        self.cache.delete_value(self._key(owner_id, token))
+    
+    def purge_expired(self):
+        """Expired entries are dropped by the cache itself."""
+        return 0
+
+
+def get_preview_store(app=None):
+    """
+    Preview store for an app, created once.
+    
+    PREVIEW_STORE selects 'disk' (default, PREVIEW_DIR or
+    instance/previews) or 'cache'.
+    """
+    if app is None:
+        from flask import current_app
+        app = current_app._get_current_object()
+    
+    store = app.extensions.get('preview_store')
+    if store is None:
+        with _lock:
+            store = app.extensions.get('preview_store')
+            if store is None:
+                if app.config.get('PREVIEW_STORE', 'disk') == 'cache':
+                    from cache import cache
+                    store = CachePreviewStore(cache)
+                else:
+                    directory = app.config.get('PREVIEW_DIR') or os.path.join(app.instance_path, 'previews')
+                    store = DiskPreviewStore(directory, app.config.get('PREVIEW_PURGE_INTERVAL', 300))
+                app.extensions['preview_store'] = store
+    return store
@@ -0,0 +1,116 @@
+"""Publish-time HTML/CSS minification and critical-CSS inlining."""
+import hashlib
+import logging
+
+from app.utils.css_optimizer import parse_css, dedupe_rules, critical_rules
+from app.utils.html_helpers import minify_html, find_fold_offset, collect_selectors, add_lazy_loading
+
+logger = logging.getLogger(__name__)
+
+
+class PublishOptimizer:
+    """
+    Shrink a page's markup and styles before it is written to site storage.
+    
+    GrapesJS emits one rule per component id, often with identical bodies,
+    plus whitespace-heavy markup. At publish time the page CSS is minified
+    and deduplicated. Small stylesheets are inlined whole; larger ones are
+    split: the rules that can match the first screen (header and hero
+    sections) are inlined and the full stylesheet is stored as a
+    content-hashed file under ``<site_id>/assets/`` and loaded without
+    blocking render. Images below the fold get ``loading="lazy"``.
+    """
+    
+    ASSET_PREFIX = 'assets/'
+    
+    @staticmethod
+    def store_stylesheet(site_id, stem, css):
+        """
+        Store a stylesheet next to a site's pages under a content hash.
+        
+        Args:
+            site_id: Site the stylesheet belongs to
+            stem: File name prefix (e.g. 'tailwind')
+            css: Stylesheet text
+        
+        Returns:
+            str: Site-relative URL (/assets/<stem>.<hash>.css)
+        """
+        from app.services.storage_backend import get_storage
+        
+        name = f"{stem}.{hashlib.sha256(css.encode('utf-8')).hexdigest()[:16]}.css"
+        key = f"{site_id}/{PublishOptimizer.ASSET_PREFIX}{name}"
+        storage = get_storage('sites')
+        # Content-addressed: an existing file already holds these bytes
+        if not storage.exists(key):
+            storage.save(key, css, 'text/css; charset=utf-8')
+        return f"/{PublishOptimizer.ASSET_PREFIX}{name}"
+    
+    @staticmethod
+    def optimize(app, site_id, html, css):
+        """
+        Optimize a page body and its CSS.
+        
+        Args:
+            app: Flask application (for PUBLISH_* settings)
+            site_id: Site being published (deferred stylesheet location)
+            html: Page body HTML (gjs-html)
+            css: Page CSS (gjs-css)
+        
+        Returns:
+            dict: {
+                'html': optimized body HTML,
+                'head': <style>/<link> tags for the page CSS,
+                'stats': {'css_bytes_before', 'css_bytes_after',
+                          'inline_css_bytes', 'deferred_css_bytes',
+                          'rules_before', 'rules_after', 'lazy_images'}
+            }
+        """
+        html = html or ''
+        css = css or ''
+        fold_offset = find_fold_offset(html, app.config.get('PUBLISH_ABOVE_FOLD_ELEMENTS', 2))
+        html, lazy_images = add_lazy_loading(html, fold_offset)
+        
+        sheet = parse_css(css)
+        rules_before = sheet.rule_count()
+        sheet.items = dedupe_rules(sheet.items)
+        full_css = sheet.serialize()
+        
+        stats = {
+            'css_bytes_before': len(css.encode('utf-8')),
+            'css_bytes_after': len(full_css.encode('utf-8')),
+            'inline_css_bytes': 0,
+            'deferred_css_bytes': 0,
+            'rules_before': rules_before,
+            'rules_after': sheet.rule_count(),
+            'lazy_images': lazy_images,
+        }
+        
+        if not full_css:
+            return {'html': html, 'head': '', 'stats': stats}
+        
+        if stats['css_bytes_after'] <= app.config.get('PUBLISH_INLINE_CSS_MAX_BYTES', 14 * 1024):
+            stats['inline_css_bytes'] = stats['css_bytes_after']
+            return {'html': html, 'head': f'<style>{full_css}</style>', 'stats': stats}
+        
+        tags, ids, classes = collect_selectors(html[:fold_offset])
+        critical_css = sheet.serialize(critical_rules(sheet.items, tags, ids, classes))
+        href = PublishOptimizer.store_stylesheet(site_id, 'styles', full_css)
+        
+        # The full sheet repeats the critical rules, so once it applies the
+        # cascade is exactly the original one
+        head = (
+            f'<style>{critical_css}</style>'
+            f'<link rel="preload" href="{href}" as="style" onload="this.onload=null;this.rel=\'stylesheet\'">'
+            f'<noscript><link rel="stylesheet" href="{href}"></noscript>'
+        )
+        stats['inline_css_bytes'] = len(critical_css.encode('utf-8'))
+        stats['deferred_css_bytes'] = stats['css_bytes_after']
+        return {'html': html, 'head': head, 'stats': stats}
+    
+    @staticmethod
+    def minify_document(app, document):
+        """Minify the final HTML document if publish optimization is enabled."""
+        if not app.config.get('PUBLISH_OPTIMIZE_ENABLED', True):
+            return document
+        return minify_html(document)
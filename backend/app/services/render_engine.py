@@ -0,0 +1,172 @@
+"""Jinja render engine for published page documents."""
+import os
+import logging
+import threading
+from collections import OrderedDict
+
+from jinja2 import Environment, FileSystemLoader, select_autoescape
+from markupsafe import Markup
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+
+
+class RenderEngine:
+    """
+    Render full HTML documents for published pages.
+    
+    Layouts live in ``templates/published/<kind>/<template type>.html`` and
+    extend ``base.html``. ``kind`` is the content format ('editor' for
+    GrapesJS pages, 'legacy' for pages without editor content); the
+    template type is ``Page.template``, falling back to
+    ``<kind>/default.html``, so a template pack can ship its own layout by
+    adding a file. Compiled layouts are kept in the Jinja environment and
+    the resolved layout per (kind, template type) is memoized, so a render
+    is a dict lookup plus template execution. The per-site part of the
+    context (title, subdomain, shared assets) is built once per site
+    version and reused across its pages.
+    
+    Page HTML and CSS are trusted (they come from the editor) and inserted
+    as-is; titles and descriptions are escaped.
+    """
+    
+    DEFAULT_TEMPLATE_TYPE = 'default'
+    
+    def __init__(self, layout_folder, auto_reload=False, site_cache_size=256):
+        self.env = Environment(
+            loader=FileSystemLoader(layout_folder),
+            autoescape=select_autoescape(['html']),
+            auto_reload=auto_reload,
+            trim_blocks=True,
+            lstrip_blocks=True,
+        )
+        self.site_cache_size = site_cache_size
+        self._layouts = {}
+        self._site_contexts = OrderedDict()
+        self._site_lock = threading.Lock()
+    
+    def get_layout(self, kind, template_type=None):
+        """
+        Compiled layout for a content kind and page template type.
+        
+        Returns:
+            jinja2.Template
+        
+        Raises:
+            jinja2.TemplateNotFound: If <kind>/default.html is missing too
+        """
+        key = (kind, template_type or self.DEFAULT_TEMPLATE_TYPE)
+        layout = self._layouts.get(key)
+        if layout is None or (self.env.auto_reload and not layout.is_up_to_date):
+            candidates = [f"{kind}/{self.DEFAULT_TEMPLATE_TYPE}.html"]
+            if template_type and os.path.basename(template_type) == template_type:
+                candidates.insert(0, f"{kind}/{template_type}.html")
+            layout = self._layouts[key] = self.env.select_template(candidates)
+        return layout
+    
+    def site_context(self, site):
+        """
+        Render context shared by all pages of a site.
+        
+        Cached per (site id, updated_at), so edits to the site are picked
+        up on the next render.
+        
+        Returns:
+            dict: title, subdomain, url, lang, tailwind_tag
+        """
+        from app.services.tailwind_service import TailwindService
+        
+        key = (site.id, site.updated_at)
+        with self._site_lock:
+            context = self._site_contexts.get(key)
+            if context is not None:
+                self._site_contexts.move_to_end(key)
+                return context
+        
+        context = {
+            'id': site.id,
+            'title': site.title,
+            'subdomain': site.subdomain,
+            'url': f"https://{site.subdomain}.pagemade.site",
+            'lang': 'vi',
+            # Pages served without a published file have no compiled
+            # stylesheet; the publisher overrides this per page
+            'tailwind_tag': Markup(TailwindService.CDN_TAG),
+        }
+        with self._site_lock:
+            self._site_contexts[key] = context
+            while len(self._site_contexts) > self.site_cache_size:
+                self._site_contexts.popitem(last=False)
+        return context
+    
+    @staticmethod
+    def page_context(page, site_context):
+        """Per-page render context (no lazy-loaded relationships)."""
+        url = site_context['url'] if page.is_homepage else f"{site_context['url']}/{page.slug}"
+        return {
+            'id': page.id,
+            'title': page.title,
+            'slug': page.slug,
+            'description': page.description,
+            'url': url,
+        }
+    
+    def render(self, kind, site, page, body='', css='', head='', site_overrides=None, **extra):
+        """
+        Render a complete HTML document.
+        
+        Args:
+            kind: 'editor' or 'legacy'
+            site: Site the page belongs to
+            page: Page being rendered
+            body: Page body HTML (trusted)
+            css: Page CSS, wrapped in <style> by the layout (trusted)
+            head: Extra <head> markup (trusted)
+            site_overrides: Per-render changes to the site context
+                (e.g. the compiled tailwind_tag)
+            **extra: Additional layout context
+        
+        Returns:
+            str: HTML document
+        """
+        site_context = self.site_context(site)
+        context = {
+            'site': site_context,
+            'page': self.page_context(page, site_context),
+            'body': Markup(body or ''),
+            'css': Markup(css or ''),
+            'head': Markup(head or ''),
+        }
+        if site_overrides:
+            context['site'] = {**site_context, **site_overrides}
+        context.update(extra)
+        return self.get_layout(kind, page.template).render(context)
+
+
+def get_render_engine(app=None):
+    """
+    Render engine for an app, created once.
+    
+    PUBLISHED_LAYOUT_FOLDER points at the layouts (default:
+    <template folder>/published); another engine can be installed by
+    setting app.extensions['render_engine'].
+    """
+    if app is None:
+        from flask import current_app
+        app = current_app._get_current_object()
+    
+    engine = app.extensions.get('render_engine')
+    if engine is None:
+        with _lock:
+            engine = app.extensions.get('render_engine')
+            if engine is None:
+                folder = app.config.get('PUBLISHED_LAYOUT_FOLDER') or os.path.join(
+                    app.root_path, app.template_folder, 'published'
+                )
+                engine = app.extensions['render_engine'] = RenderEngine(
+                    folder,
+                    auto_reload=app.config.get('TEMPLATES_AUTO_RELOAD') or app.debug,
+                    site_cache_size=app.config.get('RENDER_SITE_CACHE_SIZE', 256),
+                )
+    return engine
@@ -0,0 +1,347 @@
+"""Full-text search over page text and asset names."""
+import re
+import json
+import logging
+import threading
+
+from markupsafe import escape
+from sqlalchemy import text
+
+from app.models import db
+from app.utils.html_helpers import extract_text
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+
+TERM_PATTERN = re.compile(r'\w+')
+
+# Highlight markers; replaced by <mark> once the snippet is escaped
+MARK_START, MARK_END = '\x02', '\x03'
+
+
+class SearchIndex:
+    """
+    One ``search_index`` table holding a document per page and per asset.
+    
+    Documents are keyed by ``object_id * 4 + kind code`` so a page and an
+    asset with the same ID do not collide, and each has title,
+    description and body text plus site_id and user_id for filtering.
+    Subclasses implement the storage for one database dialect.
+    """
+    
+    TABLE = 'search_index'
+    KINDS = ('page', 'asset')
+    MAX_TERMS = 8
+    SCHEMA = ()
+    
+    def __init__(self):
+        self.ready = False
+    
+    @staticmethod
+    def doc_id(kind, object_id):
+        return int(object_id) * 4 + SearchIndex.KINDS.index(kind) + 1
+    
+    @classmethod
+    def terms(cls, query):
+        """Lower-cased search terms of a user query (at most MAX_TERMS)."""
+        return [term.lower() for term in TERM_PATTERN.findall(query or '')][:cls.MAX_TERMS]
+    
+    def ensure_schema(self):
+        """Create the index table if needed (in the current transaction)."""
+        if not self.ready:
+            for statement in self.SCHEMA:
+                db.session.execute(text(statement))
+            self.ready = True
+    
+    def upsert(self, doc):
+        raise NotImplementedError
+    
+    def delete(self, kind, object_id):
+        db.session.execute(text(f"DELETE FROM {self.TABLE} WHERE {self.KEY} = :id"),
+                           {'id': self.doc_id(kind, object_id)})
+    
+    def delete_site(self, site_id):
+        db.session.execute(text(f"DELETE FROM {self.TABLE} WHERE site_id = :site_id"), {'site_id': site_id})
+    
+    @staticmethod
+    def _filters(kind, site_id):
+        sql, params = '', {}
+        if kind:
+            sql += ' AND kind = :kind'
+            params['kind'] = kind
+        if site_id is not None:
+            sql += ' AND site_id = :site_id'
+            params['site_id'] = site_id
+        return sql, params
+    
+    def search(self, terms, user_id, kind=None, site_id=None, limit=20, offset=0):
+        """
+        Ranked matches of all terms (prefix match on each).
+        
+        Returns:
+            tuple: (rows: list of mappings with object_id, kind, site_id,
+                    title, snippet, score), total: int)
+        """
+        raise NotImplementedError
+
+
+class SqliteSearchIndex(SearchIndex):
+    """
+    FTS5 virtual table, ranked with bm25 (title > description > body).
+    
+    The unicode61 tokenizer folds diacritics, so "trang chu" finds
+    "Trang chủ".
+    """
+    
+    KEY = 'rowid'
+    SCHEMA = (
+        "CREATE VIRTUAL TABLE IF NOT EXISTS search_index USING fts5("
+        "title, description, body, "
+        "kind UNINDEXED, object_id UNINDEXED, site_id UNINDEXED, user_id UNINDEXED, "
+        "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')",
+    )
+    
+    def upsert(self, doc):
+        params = {**doc, 'id': self.doc_id(doc['kind'], doc['object_id'])}
+        db.session.execute(text("DELETE FROM search_index WHERE rowid = :id"), params)
+        db.session.execute(text(
+            "INSERT INTO search_index (rowid, title, description, body, kind, object_id, site_id, user_id) "
+            "VALUES (:id, :title, :description, :body, :kind, :object_id, :site_id, :user_id)"
+        ), params)
+    
+    def search(self, terms, user_id, kind=None, site_id=None, limit=20, offset=0):
+        filters, params = self._filters(kind, site_id)
+        # Terms are \w+ only, so quoting each one is enough
+        params.update({
+            'match': ' '.join(f'"{term}"*' for term in terms),
+            'user_id': user_id, 'limit': limit, 'offset': offset,
+            'start': MARK_START, 'end': MARK_END,
+        })
+        where = f"search_index MATCH :match AND user_id = :user_id{filters}"
+        total = db.session.execute(text(f"SELECT count(*) FROM search_index WHERE {where}"), params).scalar()
+        rows = db.session.execute(text(
+            "SELECT object_id, kind, site_id, title, "
+            "snippet(search_index, 2, :start, :end, '…', 16) AS snippet, "
+            "-bm25(search_index, 10.0, 4.0, 1.0) AS score "
+            f"FROM search_index WHERE {where} ORDER BY score DESC LIMIT :limit OFFSET :offset"
+        ), params).mappings().all()
+        return rows, total
+
+
+class PostgresSearchIndex(SearchIndex):
+    """
+    Table with a stored, weighted tsvector column and a GIN index, ranked
+    with ts_rank_cd. Uses the 'simple' configuration (no stemming), which
+    suits Vietnamese content.
+    """
+    
+    KEY = 'id'
+    SCHEMA = (
+        "CREATE TABLE IF NOT EXISTS search_index ("
+        "id BIGINT PRIMARY KEY, kind VARCHAR(10) NOT NULL, object_id INTEGER NOT NULL, "
+        "site_id INTEGER NOT NULL, user_id INTEGER NOT NULL, "
+        "title TEXT, description TEXT, body TEXT, "
+        "tsv tsvector GENERATED ALWAYS AS ("
+        "setweight(to_tsvector('simple', coalesce(title, '')), 'A') || "
+        "setweight(to_tsvector('simple', coalesce(description, '')), 'B') || "
+        "setweight(to_tsvector('simple', coalesce(body, '')), 'C')) STORED)",
+        "CREATE INDEX IF NOT EXISTS ix_search_index_tsv ON search_index USING GIN (tsv)",
+        "CREATE INDEX IF NOT EXISTS ix_search_index_user_id ON search_index (user_id)",
+        "CREATE INDEX IF NOT EXISTS ix_search_index_site_id ON search_index (site_id)",
+    )
+    
+    def upsert(self, doc):
+        db.session.execute(text(
+            "INSERT INTO search_index (id, kind, object_id, site_id, user_id, title, description, body) "
+            "VALUES (:id, :kind, :object_id, :site_id, :user_id, :title, :description, :body) "
+            "ON CONFLICT (id) DO UPDATE SET site_id = excluded.site_id, user_id = excluded.user_id, "
+            "title = excluded.title, description = excluded.description, body = excluded.body"
+        ), {**doc, 'id': self.doc_id(doc['kind'], doc['object_id'])})
+    
+    def search(self, terms, user_id, kind=None, site_id=None, limit=20, offset=0):
+        filters, params = self._filters(kind, site_id)
+        params.update({
+            'query': ' & '.join(f"{term}:*" for term in terms),
+            'user_id': user_id, 'limit': limit, 'offset': offset,
+            'options': f"StartSel={MARK_START}, StopSel={MARK_END}, MaxWords=24, MinWords=8",
+        })
+        where = f"tsv @@ to_tsquery('simple', :query) AND user_id = :user_id{filters}"
+        total = db.session.execute(text(f"SELECT count(*) FROM search_index WHERE {where}"), params).scalar()
+        # Headlines are computed for the returned page of results only
+        rows = db.session.execute(text(
+            "SELECT object_id, kind, site_id, title, "
+            "ts_headline('simple', coalesce(body, ''), to_tsquery('simple', :query), :options) AS snippet, score "
+            "FROM (SELECT object_id, kind, site_id, title, body, "
+            "ts_rank_cd(tsv, to_tsquery('simple', :query)) AS score "
+            f"FROM search_index WHERE {where} ORDER BY score DESC LIMIT :limit OFFSET :offset) AS hits "
+            "ORDER BY score DESC"
+        ), params).mappings().all()
+        return rows, total
+
+
+def get_search_index(app=None):
+    """
+    Search index for the app's database dialect, created once.
+    
+    Returns:
+        SearchIndex|None: None when the dialect has no full-text support here
+    """
+    if app is None:
+        from flask import current_app
+        app = current_app._get_current_object()
+    
+    if 'search_index' not in app.extensions:
+        with _lock:
+            if 'search_index' not in app.extensions:
+                dialect = db.engine.dialect.name
+                index = {'sqlite': SqliteSearchIndex, 'postgresql': PostgresSearchIndex}.get(dialect)
+                if index is None:
+                    logger.warning("Full-text search is not available on %s", dialect)
+                app.extensions['search_index'] = index() if index else None
+    return app.extensions['search_index']
+
+
+class SearchService:
+    """
+    Keep the search index in step with pages and assets, and query it.
+    
+    Index writes run in a savepoint of the caller's transaction, so they
+    are committed together with the change that caused them, and a
+    failing index write is logged without losing that change.
+    """
+    
+    BODY_MAX_CHARS = 100000
+    
+    @staticmethod
+    def page_html(page):
+        """
+        Editor HTML of a page.
+        
+        The editor saves gjs-html into ``content``; ``html_content`` keeps
+        whatever the page was created with (a template), so it is only used
+        for legacy pages without editor content.
+        """
+        content = page.content
+        html = ''
+        if content:
+            try:
+                data = json.loads(content) if isinstance(content, str) else content
+            except ValueError:
+                # Some editors store the gjs-html string itself
+                html = content if content.lstrip().startswith('<') else ''
+            else:
+                html = data.get('gjs-html', '') if isinstance(data, dict) else ''
+        return html or page.html_content or ''
+    
+    @staticmethod
+    def page_document(page):
+        return {
+            'kind': 'page', 'object_id': page.id, 'site_id': page.site_id, 'user_id': page.user_id,
+            'title': page.title or '', 'description': page.description or '',
+            'body': extract_text(SearchService.page_html(page), SearchService.BODY_MAX_CHARS),
+        }
+    
+    @staticmethod
+    def asset_document(asset):
+        return {
+            'kind': 'asset', 'object_id': asset.id, 'site_id': asset.site_id, 'user_id': asset.user_id,
+            'title': asset.original_name or '', 'description': '', 'body': '',
+        }
+    
+    @staticmethod
+    def _write(action, *args):
+        index = get_search_index()
+        if index is None:
+            return False
+        try:
+            with db.session.begin_nested():
+                index.ensure_schema()
+                getattr(index, action)(*args)
+            return True
+        except Exception:
+            # The table may have been created in the rolled-back savepoint
+            index.ready = False
+            logger.exception("Search index %s failed", action)
+            return False
+    
+    @staticmethod
+    def index_page(page):
+        """Index a page's title, description and visible text (no commit; page must have an id)."""
+        return SearchService._write('upsert', SearchService.page_document(page))
+    
+    @staticmethod
+    def index_asset(asset):
+        """Index an asset's original file name (no commit)."""
+        return SearchService._write('upsert', SearchService.asset_document(asset))
+    
+    @staticmethod
+    def remove(kind, object_id):
+        """Drop a deleted page or asset (no commit)."""
+        return SearchService._write('delete', kind, object_id)
+    
+    @staticmethod
+    def remove_site(site_id):
+        """Drop everything of a deleted site (no commit)."""
+        return SearchService._write('delete_site', site_id)
+    
+    @staticmethod
+    def search(user_id, query, kind=None, site_id=None, page=1, per_page=20):
+        """
+        Search a user's pages and assets.
+        
+        Args:
+            user_id: Owner whose documents are searched
+            query: User query; every word must match (as a prefix)
+            kind: 'page', 'asset' or None for both
+            site_id: Limit to one site
+            page: 1-based result page
+            per_page: Results per page
+        
+        Returns:
+            tuple: (items: list of dicts with type, id, site_id, title,
+                    snippet (HTML, matches in <mark>), score), total: int)
+        """
+        index = get_search_index()
+        terms = SearchIndex.terms(query)
+        if index is None or not terms:
+            return [], 0
+        
+        index.ensure_schema()
+        rows, total = index.search(terms, user_id, kind=kind, site_id=site_id,
+                                   limit=per_page, offset=(page - 1) * per_page)
+        items = [{
+            'type': row['kind'],
+            'id': row['object_id'],
+            'site_id': row['site_id'],
+            'title': row['title'],
+            'snippet': str(escape(row['snippet'] or ''))
+            .replace(MARK_START, '<mark>').replace(MARK_END, '</mark>'),
+            'score': round(float(row['score']), 4),
+        } for row in rows]
+        return items, total
+    
+    @staticmethod
+    def rebuild(batch_size=200):
+        """
+        Index every page and asset (for data saved before the index existed).
+        
+        Returns:
+            dict: {'pages': int, 'assets': int}
+        """
+        from app.models import Page, Asset
+        
+        stats = {'pages': 0, 'assets': 0}
+        for model, key, index_one in ((Page, 'pages', SearchService.index_page),
+                                      (Asset, 'assets', SearchService.index_asset)):
+            last_id = 0
+            while True:
+                batch = model.query.filter(model.id > last_id).order_by(model.id).limit(batch_size).all()
+                if not batch:
+                    break
+                for item in batch:
+                    stats[key] += bool(index_one(item))
+                last_id = batch[-1].id
+                db.session.commit()
+        logger.info("Search index rebuilt: %s", stats)
+        return stats
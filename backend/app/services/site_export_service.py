@@ -0,0 +1,370 @@
+"""Whole-site static export, streamed as a ZIP archive."""
+import re
+import json
+import time
+import calendar
+import zlib
+import struct
+import hashlib
+import logging
+
+from app.services.storage_backend import get_storage, StorageNotFoundError
+
+logger = logging.getLogger(__name__)
+
+# Upload URLs in published HTML and CSS, absolute or site-relative, with
+# their variants and resize query strings:
+# https://app.pagemade.site/api/assets/uploads/7/<uuid>.png?w=640
+UPLOAD_URL_PATTERN = re.compile(
+    r'(?:https?://[\w.-]+(?::\d+)?)?/(?:api/assets|static)/uploads/(\d+)/((?:variants/)?[\w-]+\.\w+)'
+    r'(?:\?[^"\'\s()<>,]*)?'
+)
+
+ZIP_LIMIT = 0xFFFFFFFF  # sizes and offsets without ZIP64
+ZIP_MAX_ENTRIES = 0xFFFF
+
+# Local file header, central directory header and end of central directory
+_LOCAL = struct.Struct('<4s5H3L2H')
+_CENTRAL = struct.Struct('<4s6H3L5H2L')
+_END = struct.Struct('<4s4H2LH')
+_UTF8_FLAG = 0x0800
+
+
+class SiteExportError(Exception):
+    """Raised when a site cannot be exported; ``status`` is the HTTP status to answer with."""
+    
+    def __init__(self, message, status=500):
+        super().__init__(message)
+        self.status = status
+
+
+def _dos_time(timestamp):
+    t = time.gmtime(max(timestamp, 315532800))  # ZIP dates start in 1980
+    return ((t.tm_hour << 11) | (t.tm_min << 5) | (t.tm_sec // 2),
+            ((t.tm_year - 1980) << 9) | (t.tm_mon << 5) | t.tm_mday)
+
+
+class SiteExportService:
+    """
+    Export a site's published pages, compiled CSS and referenced uploads
+    as a self-contained ZIP with relative URLs.
+    
+    Entries are stored uncompressed, so the byte layout of the archive is
+    known before any data is read: a manifest of entries (name, source,
+    size, CRC-32) fixes every offset. The archive is then streamed straight
+    from storage in chunks, without a temp file, and any byte range of it
+    can be produced on its own, which makes downloads resumable. Pages and
+    CSS are rewritten while streaming; only their sizes and CRCs are kept.
+    
+    The manifest is cached in site storage (``_export.json``) under a
+    fingerprint of the published pages and the site's assets, so repeated
+    and resumed downloads skip the scan. When it is rebuilt, CRCs of
+    unchanged uploads are carried over from the previous one.
+    """
+    
+    MANIFEST_KEY = '_export.json'
+    FORMAT_VERSION = 1
+    UPLOADS_DIR = 'assets/uploads/'
+    
+    @staticmethod
+    def page_filename(page):
+        return 'index.html' if page.is_homepage else f"{page.slug}.html"
+    
+    @staticmethod
+    def fingerprint(site):
+        """Digest of what the export depends on, from the database only."""
+        from app.models import db, Asset
+        from app.repositories.page_repository import PageRepository
+        
+        pages = sorted(
+            (page.id, page.slug, bool(page.is_homepage), page.published_at.isoformat() if page.published_at else '')
+            for page in PageRepository.find_published_by_site(site.id)
+        )
+        assets = db.session.query(
+            db.func.count(Asset.id), db.func.max(Asset.id), db.func.max(Asset.updated_at)
+        ).filter(Asset.site_id == site.id).one()
+        data = json.dumps([SiteExportService.FORMAT_VERSION, site.id, site.subdomain, pages,
+                           [assets[0], assets[1], str(assets[2])]])
+        return hashlib.sha1(data.encode('utf-8')).hexdigest()
+    
+    # -- URL rewriting --------------------------------------------------
+    
+    @staticmethod
+    def rewrite(text, links, prefix=''):
+        """
+        Point a page's or stylesheet's URLs at the files in the archive.
+        
+        Args:
+            text: HTML or CSS
+            links: Manifest 'links' (site_id, subdomain, pages, assets, uploads)
+            prefix: Path from the file's folder to the archive root
+                    ('' for pages, '../' for assets/)
+        
+        Returns:
+            str: Text with relative URLs; files not in the archive keep
+                 their original URL
+        """
+        site_id = str(links['site_id'])
+        uploads, assets, pages = set(links['uploads']), set(links['assets']), set(links['pages'])
+        
+        def upload(match):
+            if match.group(1) == site_id and match.group(2) in uploads:
+                return f"{prefix}{SiteExportService.UPLOADS_DIR}{match.group(2)}"
+            return match.group(0)
+        
+        def asset(match):
+            return f"{prefix}assets/{match.group(1)}" if match.group(1) in assets else match.group(0)
+        
+        def page(match):
+            slug = match.group(1)
+            if not slug:
+                return f"{prefix}index.html"
+            return f"{prefix}{slug}.html" if slug in pages else match.group(0)
+        
+        asset_pattern, page_pattern = SiteExportService._site_patterns(links['subdomain'])
+        text = UPLOAD_URL_PATTERN.sub(upload, text)
+        text = asset_pattern.sub(asset, text)
+        return page_pattern.sub(page, text)
+    
+    @staticmethod
+    def _site_patterns(subdomain):
+        """Patterns for the site's /assets/ files and page links (optionally absolute)."""
+        site_url = rf"(?:https?://{re.escape(subdomain)}\.pagemade\.site)?"
+        return (re.compile(rf"(?<=[\"'(\s=,]){site_url}/assets/([\w.-]+)"),
+                re.compile(rf"(?<=href=[\"']){site_url}/([\w-]*)/?(?=[\"'#?])"))
+    
+    @staticmethod
+    def _find_refs(text, site):
+        """Site asset names and upload paths referenced by a page or stylesheet."""
+        assets = set(SiteExportService._site_patterns(site.subdomain)[0].findall(text))
+        uploads = {path for owner, path in UPLOAD_URL_PATTERN.findall(text) if owner == str(site.id)}
+        return assets, uploads
+    
+    # -- Manifest ---------------------------------------------------------
+    
+    @staticmethod
+    def _entry_data(entry, links, storages):
+        """Bytes of a rewritten (text) entry."""
+        text = storages['sites'].read_text(entry['key'])
+        return SiteExportService.rewrite(text, links, entry['prefix']).encode('utf-8')
+    
+    @staticmethod
+    def _checksum(storage, key):
+        crc = 0
+        for chunk in storage.iter_chunks(key):
+            crc = zlib.crc32(chunk, crc)
+        return crc
+    
+    @staticmethod
+    def build_manifest(site, fingerprint, previous=None):
+        """
+        Scan a site's published files and lay out its archive.
+        
+        Args:
+            site: Site
+            fingerprint: fingerprint() of the site
+            previous: Earlier manifest whose upload CRCs may be reused
+        
+        Returns:
+            dict: Manifest ('entries' with offsets, 'size', 'links', ...)
+        
+        Raises:
+            SiteExportError: No published page files, or the archive
+                             would need ZIP64
+        """
+        from app.repositories.page_repository import PageRepository
+        
+        sites, uploads = get_storage('sites'), get_storage('uploads')
+        storages = {'sites': sites, 'uploads': uploads}
+        now = int(time.time())
+        
+        entries, asset_names, upload_paths, slugs = [], set(), set(), []
+        pages = sorted(PageRepository.find_published_by_site(site.id), key=lambda p: (not p.is_homepage, p.slug or ''))
+        for page in pages:
+            name = SiteExportService.page_filename(page)
+            if any(entry['name'] == name for entry in entries):
+                continue  # a second homepage
+            try:
+                refs = SiteExportService._find_refs(sites.read_text(f"{site.id}/{name}"), site)
+            except StorageNotFoundError:
+                continue  # published before files were written to storage
+            if not page.is_homepage:
+                slugs.append(page.slug)
+            asset_names |= refs[0]
+            upload_paths |= refs[1]
+            # published_at is stored as naive UTC
+            mtime = calendar.timegm(page.published_at.timetuple()) if page.published_at else now
+            entries.append({'name': name, 'source': 'sites', 'key': f"{site.id}/{name}", 'prefix': '',
+                            'rewrite': True, 'mtime': mtime})
+        if not entries:
+            raise SiteExportError("Site has no published pages", 404)
+        
+        # Compiled stylesheets (and other publish-time files) under assets/
+        for name in sorted(asset_names):
+            key = f"{site.id}/assets/{name}"
+            try:
+                info = sites.stat(key)
+            except StorageNotFoundError:
+                asset_names.discard(name)
+                continue
+            entry = {'name': f"assets/{name}", 'source': 'sites', 'key': key, 'prefix': '../',
+                     'rewrite': name.endswith('.css'), 'mtime': now}
+            if entry['rewrite']:
+                upload_paths |= SiteExportService._find_refs(sites.read_text(key), site)[1]
+            else:
+                entry.update(size=info['size'], etag=info['etag'])
+            entries.append(entry)
+        
+        # Uploads referenced by pages and stylesheets; CRCs of unchanged
+        # files are reused from the previous manifest
+        known = {(entry['key'], entry.get('etag')): entry['crc']
+                 for entry in (previous or {}).get('entries', []) if entry['source'] == 'uploads'}
+        for path in sorted(upload_paths):
+            key = f"{site.id}/{path}"
+            try:
+                info = uploads.stat(key)
+            except StorageNotFoundError:
+                upload_paths.discard(path)
+                continue
+            crc = known.get((key, info['etag']))
+            entries.append({
+                'name': f"{SiteExportService.UPLOADS_DIR}{path}", 'source': 'uploads', 'key': key,
+                'rewrite': False, 'size': info['size'], 'etag': info['etag'], 'mtime': now,
+                'crc': crc if crc is not None else SiteExportService._checksum(uploads, key),
+            })
+        
+        links = {'site_id': site.id, 'subdomain': site.subdomain, 'pages': sorted(slugs),
+                 'assets': sorted(asset_names), 'uploads': sorted(upload_paths)}
+        root = f"{site.subdomain}/"
+        offset = 0
+        for entry in entries:
+            if entry['rewrite']:
+                data = SiteExportService._entry_data(entry, links, storages)
+                entry.update(size=len(data), crc=zlib.crc32(data))
+            elif 'crc' not in entry:
+                entry['crc'] = SiteExportService._checksum(storages[entry['source']], entry['key'])
+            entry['path'] = root + entry['name']
+            entry['offset'] = offset
+            offset += _LOCAL.size + len(entry['path'].encode('utf-8')) + entry['size']
+        
+        central_size = sum(_CENTRAL.size + len(entry['path'].encode('utf-8')) for entry in entries)
+        if len(entries) > ZIP_MAX_ENTRIES or offset + central_size > ZIP_LIMIT:
+            raise SiteExportError("Site is too large to export", 413)
+        
+        return {
+            'version': SiteExportService.FORMAT_VERSION,
+            'fingerprint': fingerprint,
+            'links': links,
+            'entries': entries,
+            'central_offset': offset,
+            'size': offset + central_size + _END.size,
+        }
+    
+    @staticmethod
+    def get_manifest(site):
+        """
+        Cached manifest of a site's archive, rebuilt when the site changed.
+        
+        Raises:
+            SiteExportError: see build_manifest()
+        """
+        storage = get_storage('sites')
+        key = f"{site.id}/{SiteExportService.MANIFEST_KEY}"
+        fingerprint = SiteExportService.fingerprint(site)
+        try:
+            cached = json.loads(storage.read_text(key))
+        except (StorageNotFoundError, ValueError):
+            cached = None
+        if cached and cached.get('fingerprint') == fingerprint and cached.get('version') == SiteExportService.FORMAT_VERSION:
+            return cached
+        
+        manifest = SiteExportService.build_manifest(site, fingerprint, previous=cached)
+        storage.save(key, json.dumps(manifest), 'application/json')
+        logger.info("Export manifest for site %s: %d files, %d bytes",
+                    site.id, len(manifest['entries']), manifest['size'])
+        return manifest
+    
+    @staticmethod
+    def invalidate(site_id, storage=None):
+        """Drop a cached manifest found to be out of date."""
+        try:
+            (storage or get_storage('sites')).delete(f"{site_id}/{SiteExportService.MANIFEST_KEY}")
+        except StorageNotFoundError:
+            pass
+    
+    # -- Archive ----------------------------------------------------------
+    
+    @staticmethod
+    def _local_header(entry):
+        name = entry['path'].encode('utf-8')
+        dos_time, dos_date = _dos_time(entry['mtime'])
+        return _LOCAL.pack(b'PK\x03\x04', 20, _UTF8_FLAG, 0, dos_time, dos_date,
+                           entry['crc'], entry['size'], entry['size'], len(name), 0) + name
+    
+    @staticmethod
+    def _central_directory(manifest):
+        parts = []
+        for entry in manifest['entries']:
+            name = entry['path'].encode('utf-8')
+            dos_time, dos_date = _dos_time(entry['mtime'])
+            parts.append(_CENTRAL.pack(b'PK\x01\x02', 20, 20, _UTF8_FLAG, 0, dos_time, dos_date,
+                                       entry['crc'], entry['size'], entry['size'], len(name), 0, 0, 0, 0,
+                                       0o100644 << 16, entry['offset']) + name)
+        directory = b''.join(parts)
+        count = len(manifest['entries'])
+        return directory + _END.pack(b'PK\x05\x06', 0, 0, count, count, len(directory),
+                                     manifest['central_offset'], 0)
+    
+    @staticmethod
+    def stream(manifest, start=0, stop=None, app=None):
+        """
+        Yield the bytes ``[start, stop)`` of the archive.
+        
+        Only the entries overlapping the range are read; uploads are read
+        as ranged chunks, pages and stylesheets are rewritten one at a time.
+        
+        Args:
+            manifest: get_manifest() result
+            start: First byte
+            stop: End (exclusive); default: end of archive
+            app: Flask app whose storage backends are read (resolved now,
+                 so the generator can run outside the request context)
+        """
+        storages = {'sites': get_storage('sites', app), 'uploads': get_storage('uploads', app)}
+        stop = manifest['size'] if stop is None else stop
+        links = manifest['links']
+        
+        def generate():
+            for entry in manifest['entries']:
+                header = SiteExportService._local_header(entry)
+                entry_start = entry['offset']
+                data_start = entry_start + len(header)
+                data_end = data_start + entry['size']
+                if data_end <= start:
+                    continue
+                if entry_start >= stop:
+                    return
+                if entry_start < stop and data_start > start:
+                    yield header[max(start - entry_start, 0):stop - entry_start]
+                
+                lo, hi = max(start, data_start) - data_start, min(stop, data_end) - data_start
+                if lo >= hi:
+                    continue
+                if entry['rewrite']:
+                    data = SiteExportService._entry_data(entry, links, storages)
+                    if len(data) != entry['size'] or zlib.crc32(data) != entry['crc']:
+                        # Republished without a database change the
+                        # fingerprint sees; the next request rebuilds
+                        logger.error("Export of site %s aborted: %s changed", links['site_id'], entry['key'])
+                        SiteExportService.invalidate(links['site_id'], storages['sites'])
+                        raise SiteExportError(f"{entry['key']} changed during export")
+                    yield data[lo:hi]
+                else:
+                    yield from storages[entry['source']].iter_chunks(entry['key'], lo, hi - 1)
+            
+            central = SiteExportService._central_directory(manifest)
+            offset = manifest['central_offset']
+            if stop > offset:
+                yield central[max(start - offset, 0):stop - offset]
+        
+        return generate()
@@ -1,5 +1,13 @@
 """Site service for website management."""
+import logging
 from app.models import db, Site, Page
+from app.repositories.asset_usage_repository import AssetUsageRepository
+from app.repositories.page_view_repository import PageViewRepository
+from app.services.sitemap_service import SitemapService
+from app.services.host_map import HostMap
+from app.services.search_service import SearchService
+
+logger = logging.getLogger(__name__)
 
 
 class SiteService:
@@ -52,9 +60,7 @@ class SiteService:
             
         except Exception as e:
             db.session.rollback()
-            import traceback
-            error_details = f"Lỗi tạo website: {str(e)}\n{traceback.format_exc()}"
-            print(error_details)  # Debug output
+            logger.exception("Lỗi tạo website: %s", e)
             return False, None, f"Lỗi tạo website: {str(e)}"
     
     @staticmethod
@@ -102,6 +108,8 @@ class SiteService:
                     setattr(site, field, value)
             
             db.session.commit()
+            if 'is_published' in kwargs:
+                HostMap.sync(site.id)
             return True, site, None
             
         except Exception as e:
@@ -131,11 +139,15 @@ class SiteService:
         
         try:
             # Delete all pages (cascade will handle this automatically if set up)
+            AssetUsageRepository.delete_by_site(site_id)
+            PageViewRepository.delete_by_site(site_id)
+            SearchService.remove_site(site_id)
             Page.query.filter_by(site_id=site_id).delete()
             
             # Delete site
             db.session.delete(site)
             db.session.commit()
+            HostMap.sync(site_id)
             
             return True, None
             
@@ -176,6 +188,8 @@ class SiteService:
         try:
             site.is_published = True
             db.session.commit()
+            SitemapService.sync(site)
+            HostMap.sync(site_id)
             return True, None
             
         except Exception as e:
@@ -197,6 +211,7 @@ class SiteService:
         try:
             site.is_published = False
             db.session.commit()
+            HostMap.sync(site_id)
             return True, None
             
         except Exception as e:
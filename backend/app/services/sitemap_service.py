@@ -0,0 +1,183 @@
+"""Per-site sitemap.xml and robots.txt, written to site storage at publish."""
+import json
+import logging
+from xml.sax.saxutils import escape
+
+from app.services.storage_backend import get_storage, StorageNotFoundError
+
+logger = logging.getLogger(__name__)
+
+
+class SitemapService:
+    """
+    Keep ``<site_id>/sitemap.xml`` and ``<site_id>/robots.txt`` in sync
+    with a site's published pages.
+    
+    The sitemap is rendered from a small manifest (``_sitemap.json``,
+    page id -> loc/lastmod) stored next to it, so publishing, unpublishing
+    or renaming one page only rewrites that page's entry instead of
+    querying every page of the site. A missing or unreadable manifest
+    triggers a full rebuild from the database.
+    """
+    
+    SITEMAP_KEY = 'sitemap.xml'
+    ROBOTS_KEY = 'robots.txt'
+    MANIFEST_KEY = '_sitemap.json'
+    
+    # Files served at the site root, with their content types
+    SERVED_FILES = {
+        SITEMAP_KEY: 'application/xml; charset=utf-8',
+        ROBOTS_KEY: 'text/plain; charset=utf-8',
+    }
+    
+    @staticmethod
+    def site_url(site):
+        return f"https://{site.subdomain}.pagemade.site"
+    
+    @staticmethod
+    def page_entry(site, page):
+        """Sitemap entry of a published page."""
+        base = SitemapService.site_url(site)
+        entry = {'loc': base if page.is_homepage else f"{base}/{page.slug}"}
+        if page.published_at:
+            # published_at is stored as naive UTC
+            entry['lastmod'] = page.published_at.replace(microsecond=0).isoformat() + '+00:00'
+        return entry
+    
+    @staticmethod
+    def render_sitemap(entries):
+        """
+        sitemaps.org XML for a set of entries.
+        
+        Args:
+            entries: Iterable of {'loc', 'lastmod'?} dicts
+        
+        Returns:
+            str: XML document, site root first then by URL
+        """
+        lines = [
+            '<?xml version="1.0" encoding="UTF-8"?>',
+            '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">',
+        ]
+        for entry in sorted(entries, key=lambda e: (e['loc'].count('/') > 2, e['loc'])):
+            lines.append(f"  <url><loc>{escape(entry['loc'])}</loc>"
+                         + (f"<lastmod>{entry['lastmod']}</lastmod>" if entry.get('lastmod') else '')
+                         + '</url>')
+        lines.append('</urlset>')
+        return '\n'.join(lines) + '\n'
+    
+    @staticmethod
+    def render_robots(site):
+        return (
+            "User-agent: *\n"
+            "Allow: /\n"
+            "\n"
+            f"Sitemap: {SitemapService.site_url(site)}/{SitemapService.SITEMAP_KEY}\n"
+        )
+    
+    @staticmethod
+    def _write(site, manifest):
+        storage = get_storage('sites')
+        storage.save(f"{site.id}/{SitemapService.MANIFEST_KEY}", json.dumps(manifest, sort_keys=True),
+                     'application/json')
+        storage.save(f"{site.id}/{SitemapService.SITEMAP_KEY}",
+                     SitemapService.render_sitemap(manifest['pages'].values()),
+                     SitemapService.SERVED_FILES[SitemapService.SITEMAP_KEY])
+        
+        robots = SitemapService.render_robots(site)
+        robots_key = f"{site.id}/{SitemapService.ROBOTS_KEY}"
+        try:
+            current = storage.read_text(robots_key)
+        except StorageNotFoundError:
+            current = None
+        if current != robots:
+            storage.save(robots_key, robots, SitemapService.SERVED_FILES[SitemapService.ROBOTS_KEY])
+    
+    @staticmethod
+    def _load_manifest(site):
+        try:
+            manifest = json.loads(get_storage('sites').read_text(f"{site.id}/{SitemapService.MANIFEST_KEY}"))
+        except (StorageNotFoundError, ValueError):
+            return None
+        if manifest.get('subdomain') != site.subdomain or not isinstance(manifest.get('pages'), dict):
+            return None
+        return manifest
+    
+    @staticmethod
+    def rebuild(site):
+        """
+        Regenerate a site's sitemap and robots.txt from the database.
+        
+        Returns:
+            int: Number of URLs in the sitemap
+        """
+        from app.repositories.page_repository import PageRepository
+        
+        manifest = {
+            'subdomain': site.subdomain,
+            'pages': {
+                str(page.id): SitemapService.page_entry(site, page)
+                for page in PageRepository.find_published_by_site(site.id)
+            },
+        }
+        SitemapService._write(site, manifest)
+        return len(manifest['pages'])
+    
+    @staticmethod
+    def update_page(site, page):
+        """
+        Add, refresh or remove one page's entry after it changed.
+        
+        Args:
+            site: Site of the page
+            page: Page (its entry is removed unless it is published)
+        
+        Returns:
+            bool: True if the files were rewritten
+        """
+        manifest = SitemapService._load_manifest(site)
+        if manifest is None:
+            SitemapService.rebuild(site)
+            return True
+        
+        key = str(page.id)
+        entry = SitemapService.page_entry(site, page) if page.is_published else None
+        if manifest['pages'].get(key) == entry:
+            return False
+        if entry is None:
+            del manifest['pages'][key]
+        else:
+            manifest['pages'][key] = entry
+        SitemapService._write(site, manifest)
+        return True
+    
+    @staticmethod
+    def remove_page(site, page_id):
+        """Drop a deleted page's entry; returns True if the files were rewritten."""
+        manifest = SitemapService._load_manifest(site)
+        if manifest is None:
+            SitemapService.rebuild(site)
+            return True
+        if manifest['pages'].pop(str(page_id), None) is None:
+            return False
+        SitemapService._write(site, manifest)
+        return True
+    
+    @staticmethod
+    def sync(site, page=None, page_id=None):
+        """
+        Best-effort update after a change: the entry of ``page`` (published,
+        unpublished or renamed), the removal of deleted ``page_id``, or a
+        full rebuild when neither is given. Errors are logged, never
+        raised, so they cannot fail the request that changed the page.
+        """
+        try:
+            if page is not None:
+                return SitemapService.update_page(site, page)
+            if page_id is not None:
+                return SitemapService.remove_page(site, page_id)
+            SitemapService.rebuild(site)
+            return True
+        except Exception:
+            logger.exception("Failed to update sitemap of site %s", getattr(site, 'id', None))
+            return False
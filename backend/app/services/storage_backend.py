@@ -0,0 +1,381 @@
+"""Pluggable storage for uploaded assets and published sites."""
+import os
+import shutil
+import tempfile
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Storage namespaces and their local roots (relative to the Flask app)
+NAMESPACES = ('uploads', 'sites')
+
+DEFAULT_CHUNK_SIZE = 256 * 1024
+
+
+class StorageNotFoundError(FileNotFoundError):
+    """Raised when a key does not exist in the storage backend."""
+
+
+class StorageBackend:
+    """
+    Key/value file storage.
+    
+    Keys are '/'-separated paths relative to the namespace root, e.g.
+    ``"7/3f2a....png"`` for uploads or ``"7/index.html"`` for sites.
+    """
+    
+    # True when files are plain paths on this node (send_file, sendfile)
+    is_local = False
+    
+    def save(self, key, data, content_type=None):
+        """Store bytes or str under key, replacing it atomically."""
+        raise NotImplementedError
+    
+    def save_file(self, key, path, content_type=None):
+        """Store the contents of a local file under key."""
+        raise NotImplementedError
+    
+    def read(self, key, start=None, end=None):
+        """
+        Read a whole object or an inclusive byte range of it.
+        
+        Raises:
+            StorageNotFoundError: if the key does not exist
+        """
+        raise NotImplementedError
+    
+    def read_text(self, key, encoding='utf-8'):
+        """Read an object as text."""
+        return self.read(key).decode(encoding)
+    
+    def iter_chunks(self, key, start=None, end=None, chunk_size=DEFAULT_CHUNK_SIZE):
+        """Yield an object (or inclusive byte range) in chunks."""
+        raise NotImplementedError
+    
+    def stat(self, key):
+        """
+        Returns:
+            dict: {'size', 'etag'}
+        
+        Raises:
+            StorageNotFoundError: if the key does not exist
+        """
+        raise NotImplementedError
+    
+    def exists(self, key):
+        try:
+            self.stat(key)
+            return True
+        except StorageNotFoundError:
+            return False
+    
+    def delete(self, key):
+        """Delete a key; missing keys are ignored."""
+        raise NotImplementedError
+    
+    def download(self, key, path):
+        """Copy an object to a local file (atomically)."""
+        raise NotImplementedError
+    
+    def list(self, prefix=''):
+        """Yield keys starting with prefix."""
+        raise NotImplementedError
+    
+    def local_path(self, key):
+        """Filesystem path of key, or None for remote backends."""
+        return None
+
+
+class LocalStorage(StorageBackend):
+    """Files under a directory on this node's disk."""
+    
+    is_local = True
+    
+    def __init__(self, root):
+        self.root = os.path.abspath(root)
+    
+    def _path(self, key):
+        path = os.path.abspath(os.path.join(self.root, *key.split('/')))
+        if not path.startswith(self.root + os.sep):
+            raise ValueError(f"Invalid storage key: {key!r}")
+        return path
+    
+    def local_path(self, key):
+        return self._path(key)
+    
+    def save(self, key, data, content_type=None):
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+    
+    def save_file(self, key, path, content_type=None):
+        dest = self._path(key)
+        if os.path.abspath(path) == dest:
+            return
+        os.makedirs(os.path.dirname(dest), exist_ok=True)
+        shutil.copyfile(path, dest + '.tmp')
+        os.replace(dest + '.tmp', dest)
+    
+    def read(self, key, start=None, end=None):
+        try:
+            with open(self._path(key), 'rb') as f:
+                if start is None:
+                    return f.read()
+                f.seek(start)
+                return f.read(-1 if end is None else end - start + 1)
+        except FileNotFoundError:
+            raise StorageNotFoundError(key)
+    
+    def iter_chunks(self, key, start=None, end=None, chunk_size=DEFAULT_CHUNK_SIZE):
+        try:
+            f = open(self._path(key), 'rb')
+        except FileNotFoundError:
+            raise StorageNotFoundError(key)
+        with f:
+            f.seek(start or 0)
+            remaining = None if end is None else end - (start or 0) + 1
+            while remaining is None or remaining > 0:
+                chunk = f.read(chunk_size if remaining is None else min(chunk_size, remaining))
+                if not chunk:
+                    break
+                if remaining is not None:
+                    remaining -= len(chunk)
+                yield chunk
+    
+    def stat(self, key):
+        try:
+            st = os.stat(self._path(key))
+        except FileNotFoundError:
+            raise StorageNotFoundError(key)
+        return {'size': st.st_size, 'etag': f"{int(st.st_mtime)}-{st.st_size}"}
+    
+    def delete(self, key):
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+    
+    def download(self, key, path):
+        source = self._path(key)
+        if os.path.abspath(path) == source:
+            return
+        try:
+            shutil.copyfile(source, path + '.tmp')
+        except FileNotFoundError:
+            raise StorageNotFoundError(key)
+        os.replace(path + '.tmp', path)
+    
+    def list(self, prefix=''):
+        base = self._path(prefix.rstrip('/')) if prefix.rstrip('/') else self.root
+        if not os.path.isdir(base):
+            return
+        for dirpath, _, filenames in os.walk(base):
+            for filename in filenames:
+                yield os.path.relpath(os.path.join(dirpath, filename), self.root).replace(os.sep, '/')
+
+
+class S3Storage(StorageBackend):
+    """
+    Objects in an S3-compatible bucket (AWS S3, MinIO, R2, ...).
+    
+    One boto3 client is shared by all threads of the process; its urllib3
+    pool keeps up to ``max_pool_connections`` connections alive. Files
+    above ``multipart_threshold`` are uploaded in parallel parts by the
+    boto3 transfer manager, and reads can request byte ranges.
+    
+    boto3 is an optional dependency, imported only when this driver is
+    configured without an injected client.
+    """
+    
+    NOT_FOUND_CODES = {'404', 'NoSuchKey', 'NotFound'}
+    
+    def __init__(self, bucket, prefix='', client=None, endpoint_url=None, region=None,
+                 access_key=None, secret_key=None, max_pool_connections=20,
+                 multipart_threshold=8 * 1024 * 1024, multipart_chunksize=8 * 1024 * 1024,
+                 transfer_config=None):
+        """
+        Args:
+            bucket: Bucket name
+            prefix: Key prefix inside the bucket (e.g. 'uploads/')
+            client: Existing S3 client (tests pass a fake here)
+            endpoint_url: Custom endpoint for S3-compatible services
+            region, access_key, secret_key: Credentials (default boto3 chain if None)
+            max_pool_connections: HTTP connection pool size of the client
+            multipart_threshold, multipart_chunksize: Multipart upload tuning
+            transfer_config: boto3 TransferConfig (built from the above if None)
+        """
+        self.bucket = bucket
+        self.prefix = prefix
+        self.transfer_config = transfer_config
+        
+        if client is None:
+            try:
+                import boto3
+                from boto3.s3.transfer import TransferConfig
+                from botocore.config import Config
+            except ImportError:
+                raise RuntimeError("STORAGE_BACKEND=s3 requires boto3 (pip install boto3)")
+            
+            client = boto3.client(
+                's3',
+                endpoint_url=endpoint_url,
+                region_name=region,
+                aws_access_key_id=access_key,
+                aws_secret_access_key=secret_key,
+                config=Config(max_pool_connections=max_pool_connections, retries={'mode': 'standard'})
+            )
+            if self.transfer_config is None:
+                self.transfer_config = TransferConfig(
+                    multipart_threshold=multipart_threshold,
+                    multipart_chunksize=multipart_chunksize,
+                    max_concurrency=max(1, max_pool_connections // 2)
+                )
+        self.client = client
+    
+    def _key(self, key):
+        return f"{self.prefix}{key}"
+    
+    def _not_found(self, error):
+        code = getattr(error, 'response', {}).get('Error', {}).get('Code')
+        return str(code) in self.NOT_FOUND_CODES
+    
+    @staticmethod
+    def _range(start, end):
+        if start is None:
+            return {}
+        return {'Range': f"bytes={start}-{'' if end is None else end}"}
+    
+    def save(self, key, data, content_type=None):
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+        extra = {'ContentType': content_type} if content_type else {}
+        self.client.put_object(Bucket=self.bucket, Key=self._key(key), Body=data, **extra)
+    
+    def save_file(self, key, path, content_type=None):
+        kwargs = {}
+        if content_type:
+            kwargs['ExtraArgs'] = {'ContentType': content_type}
+        if self.transfer_config is not None:
+            kwargs['Config'] = self.transfer_config
+        self.client.upload_file(path, self.bucket, self._key(key), **kwargs)
+    
+    def _get(self, key, start=None, end=None):
+        try:
+            return self.client.get_object(Bucket=self.bucket, Key=self._key(key), **self._range(start, end))
+        except Exception as e:
+            if self._not_found(e):
+                raise StorageNotFoundError(key)
+            raise
+    
+    def read(self, key, start=None, end=None):
+        return self._get(key, start, end)['Body'].read()
+    
+    def iter_chunks(self, key, start=None, end=None, chunk_size=DEFAULT_CHUNK_SIZE):
+        body = self._get(key, start, end)['Body']
+        try:
+            for chunk in body.iter_chunks(chunk_size):
+                yield chunk
+        finally:
+            body.close()
+    
+    def stat(self, key):
+        try:
+            head = self.client.head_object(Bucket=self.bucket, Key=self._key(key))
+        except Exception as e:
+            if self._not_found(e):
+                raise StorageNotFoundError(key)
+            raise
+        return {'size': head['ContentLength'], 'etag': head.get('ETag', '').strip('"')}
+    
+    def delete(self, key):
+        self.client.delete_object(Bucket=self.bucket, Key=self._key(key))
+    
+    def download(self, key, path):
+        tmp_path = path + '.tmp'
+        try:
+            with open(tmp_path, 'wb') as f:
+                for chunk in self.iter_chunks(key):
+                    f.write(chunk)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        os.replace(tmp_path, path)
+    
+    def list(self, prefix=''):
+        paginator = self.client.get_paginator('list_objects_v2')
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=self._key(prefix)):
+            for obj in page.get('Contents', []):
+                yield obj['Key'][len(self.prefix):]
+
+
+_lock = threading.Lock()
+
+
+def create_storage(app, namespace):
+    """
+    Build the backend for one namespace from app config.
+    
+    Args:
+        app: Flask application
+        namespace: 'uploads' (asset files) or 'sites' (published HTML)
+    
+    Returns:
+        StorageBackend
+    """
+    if namespace not in NAMESPACES:
+        raise ValueError(f"Unknown storage namespace: {namespace}")
+    
+    config = app.config
+    if config.get('STORAGE_BACKEND', 'local') == 's3':
+        return S3Storage(
+            bucket=config['S3_BUCKET'],
+            prefix=f"{config.get('S3_PREFIX', '')}{namespace}/",
+            endpoint_url=config.get('S3_ENDPOINT_URL'),
+            region=config.get('S3_REGION'),
+            access_key=config.get('S3_ACCESS_KEY_ID'),
+            secret_key=config.get('S3_SECRET_ACCESS_KEY'),
+            max_pool_connections=config.get('S3_MAX_POOL_CONNECTIONS', 20),
+            multipart_threshold=config.get('S3_MULTIPART_THRESHOLD', 8 * 1024 * 1024),
+            multipart_chunksize=config.get('S3_MULTIPART_CHUNKSIZE', 8 * 1024 * 1024)
+        )
+    
+    if namespace == 'uploads':
+        return LocalStorage(os.path.join(app.static_folder, 'uploads'))
+    return LocalStorage(os.path.join(app.root_path, 'storage', 'sites'))
+
+
+def get_storage(namespace, app=None):
+    """
+    Storage backend for a namespace, created once per app.
+    
+    Args:
+        namespace: 'uploads' or 'sites'
+        app: Flask application (default: current_app)
+    
+    Returns:
+        StorageBackend
+    """
+    if app is None:
+        from flask import current_app
+        app = current_app._get_current_object()
+    
+    backends = app.extensions.setdefault('storage', {})
+    backend = backends.get(namespace)
+    if backend is None:
+        with _lock:
+            backend = backends.get(namespace)
+            if backend is None:
+                backend = backends[namespace] = create_storage(app, namespace)
+    return backend
@@ -0,0 +1,204 @@
+"""Publish-time Tailwind CSS compilation."""
+import os
+import re
+import json
+import shlex
+import shutil
+import hashlib
+import logging
+import tempfile
+import subprocess
+
+logger = logging.getLogger(__name__)
+
+
+class TailwindBuildError(RuntimeError):
+    """Raised when the Tailwind CLI fails or times out."""
+
+
+class TailwindService:
+    """
+    Replace the Tailwind CDN JIT script with a static, purged stylesheet.
+    
+    At publish time the class names used by the site's published pages
+    (plus the page being published) are collected from their gjs-html and
+    compiled once with the Tailwind CLI. The result is cached on disk by
+    the hash of the sorted class set, so republishing without new classes
+    never runs the CLI. The stylesheet is stored in the site's storage as
+    ``<site_id>/assets/tailwind.<content hash>.css`` and shared by all its
+    pages; old files are kept so pages published earlier still resolve.
+    
+    When no CLI is configured or installed, pages keep the CDN script.
+    """
+    
+    CDN_TAG = '<script src="https://cdn.tailwindcss.com?3.4.0"></script>'
+    INPUT_CSS = '@tailwind base;\n@tailwind components;\n@tailwind utilities;\n'
+    
+    CLASS_ATTR_PATTERN = re.compile(r'''\bclass\s*=\s*(?:"([^"]*)"|'([^']*)')''', re.IGNORECASE)
+    
+    @staticmethod
+    def extract_classes(html):
+        """
+        Class names used in an HTML fragment.
+        
+        Returns:
+            set: Individual class tokens (variants like md:flex included)
+        """
+        classes = set()
+        if not html:
+            return classes
+        for double, single in TailwindService.CLASS_ATTR_PATTERN.findall(html):
+            classes.update((double or single).split())
+        return classes
+    
+    @staticmethod
+    def get_cli(app):
+        """
+        Command line for the Tailwind CLI, or None if unavailable.
+        
+        TAILWIND_CLI may be a path to the standalone binary or a command
+        such as ``npx tailwindcss@3.4.0``; by default ``tailwindcss`` is
+        looked up on PATH.
+        """
+        if not app.config.get('TAILWIND_COMPILE_ENABLED', True):
+            return None
+        
+        configured = app.config.get('TAILWIND_CLI')
+        if configured:
+            return shlex.split(configured)
+        
+        found = shutil.which('tailwindcss')
+        return [found] if found else None
+    
+    @staticmethod
+    def cache_key(classes, cli, config_path=None):
+        """Hash of the class set and everything else that affects the output."""
+        digest = hashlib.sha256()
+        digest.update(' '.join(cli).encode('utf-8'))
+        digest.update(TailwindService.INPUT_CSS.encode('utf-8'))
+        if config_path:
+            with open(config_path, 'rb') as f:
+                digest.update(f.read())
+        digest.update('\n'.join(sorted(classes)).encode('utf-8'))
+        return digest.hexdigest()
+    
+    @staticmethod
+    def compile(classes, cli, config_path=None, timeout=60):
+        """
+        Run the Tailwind CLI for a set of class names.
+        
+        Returns:
+            str: Minified CSS
+        
+        Raises:
+            TailwindBuildError: If the CLI fails or times out
+        """
+        with tempfile.TemporaryDirectory(prefix='tailwind-') as tmp_dir:
+            input_path = os.path.join(tmp_dir, 'input.css')
+            content_path = os.path.join(tmp_dir, 'content.html')
+            output_path = os.path.join(tmp_dir, 'output.css')
+            
+            with open(input_path, 'w', encoding='utf-8') as f:
+                f.write(TailwindService.INPUT_CSS)
+            # Only the class names matter; one element per class keeps
+            # tokens separate for Tailwind's extractor
+            with open(content_path, 'w', encoding='utf-8') as f:
+                for name in sorted(classes):
+                    f.write(f'<div class="{name}"></div>\n')
+            
+            command = cli + ['-i', input_path, '-o', output_path, '--content', content_path, '--minify']
+            if config_path:
+                command += ['-c', config_path]
+            
+            try:
+                result = subprocess.run(command, capture_output=True, timeout=timeout, cwd=tmp_dir)
+            except (OSError, subprocess.TimeoutExpired) as e:
+                raise TailwindBuildError(f"Tailwind CLI failed: {e}") from e
+            
+            if result.returncode != 0 or not os.path.exists(output_path):
+                stderr = result.stderr.decode('utf-8', 'replace').strip()
+                raise TailwindBuildError(f"Tailwind CLI exited with {result.returncode}: {stderr[-500:]}")
+            
+            with open(output_path, 'r', encoding='utf-8') as f:
+                return f.read()
+    
+    @staticmethod
+    def get_css(app, classes, cli):
+        """
+        Compiled CSS for a class set, from the disk cache when possible.
+        
+        Returns:
+            str: Minified CSS
+        """
+        config_path = app.config.get('TAILWIND_CONFIG')
+        key = TailwindService.cache_key(classes, cli, config_path)
+        cache_dir = app.config.get('TAILWIND_CACHE_DIR') or os.path.join(app.instance_path, 'tailwind_cache')
+        cache_path = os.path.join(cache_dir, key[:2], f"{key}.css")
+        
+        try:
+            with open(cache_path, 'r', encoding='utf-8') as f:
+                return f.read()
+        except FileNotFoundError:
+            pass
+        
+        css = TailwindService.compile(classes, cli, config_path, app.config.get('TAILWIND_TIMEOUT', 60))
+        
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(css)
+        os.replace(tmp_path, cache_path)
+        logger.info("Compiled Tailwind CSS for %d classes (%d bytes)", len(classes), len(css))
+        return css
+    
+    @staticmethod
+    def site_classes(site_id, exclude_page_id=None):
+        """Classes used by the published pages of a site."""
+        from app.models import Page
+        
+        classes = set()
+        pages = Page.query.filter_by(site_id=site_id, is_published=True)
+        for page in pages:
+            if page.id == exclude_page_id or not page.content:
+                continue
+            try:
+                content = json.loads(page.content)
+            except (TypeError, ValueError):
+                continue
+            if isinstance(content, dict):
+                classes |= TailwindService.extract_classes(content.get('gjs-html', ''))
+        return classes
+    
+    @staticmethod
+    def stylesheet_tag(app, site, page, html):
+        """
+        <head> tag loading Tailwind for a page being published.
+        
+        Compiles (or reuses) the site stylesheet and stores it next to the
+        site's pages. Falls back to the CDN script if no CLI is available
+        or the build fails, so publishing never breaks on it.
+        
+        Args:
+            app: Flask application
+            site: Site being published
+            page: Page being published
+            html: The page's gjs-html
+        
+        Returns:
+            str: <link rel="stylesheet"> or the CDN <script> tag
+        """
+        cli = TailwindService.get_cli(app)
+        if cli is None:
+            return TailwindService.CDN_TAG
+        
+        from app.services.publish_optimizer import PublishOptimizer
+        
+        classes = TailwindService.extract_classes(html) | TailwindService.site_classes(site.id, page.id)
+        try:
+            css = TailwindService.get_css(app, classes, cli)
+        except TailwindBuildError as e:
+            logger.error("Tailwind build failed for site %s, using CDN: %s", site.id, e)
+            return TailwindService.CDN_TAG
+        
+        href = PublishOptimizer.store_stylesheet(site.id, 'tailwind', css)
+        return f'<link rel="stylesheet" href="{href}">'
@@ -0,0 +1,247 @@
+"""Cached catalogue of starter page templates (static/templates/*.json)."""
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+
+
+class TemplateRegistry:
+    """
+    In-memory index of the template JSON files.
+    
+    Metadata (id, name, description, category, thumbnail) is read once per
+    file version: a refresh only stats the directory and re-parses files
+    whose mtime or size changed, and refreshes are throttled to one per
+    ``check_interval`` seconds (0 = every call, None = only on reload()).
+    Full template bodies are kept in an LRU of ``body_cache_size`` entries.
+    
+    Every listing and template carries an ETag derived from the file
+    versions, and thumbnail URLs get a ``?v=`` version so they can be
+    cached for a year.
+    """
+    
+    METADATA_FIELDS = ('id', 'name', 'description', 'category', 'thumbnail')
+    THUMBNAIL_URL_PREFIX = '/static/templates/thumbnails/'
+    THUMBNAIL_ROUTE = '/api/templates/thumbnails/'
+    
+    def __init__(self, directory, check_interval=2.0, body_cache_size=16):
+        self.directory = directory
+        self.check_interval = check_interval
+        self.body_cache_size = body_cache_size
+        self._entries = {}  # template id -> entry dict
+        self._files = {}  # file name -> (mtime_ns, size, template id)
+        self._found = None  # last directory scan
+        self._list_etag = None
+        self._bodies = OrderedDict()  # template id -> (version, data)
+        self._checked_at = None
+        self._lock = threading.RLock()
+    
+    def _scan(self):
+        """(mtime_ns, size) of every template file and thumbnail."""
+        found = {}
+        for subdir in ('', 'thumbnails'):
+            try:
+                with os.scandir(os.path.join(self.directory, subdir)) as it:
+                    for item in it:
+                        if subdir or item.name.endswith('.json'):
+                            if item.is_file():
+                                info = item.stat()
+                                found[os.path.join(subdir, item.name)] = (info.st_mtime_ns, info.st_size)
+            except FileNotFoundError:
+                pass
+        return found
+    
+    def _load_entry(self, name, version):
+        path = os.path.join(self.directory, name)
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        
+        # Looked up by file name, as template ids are used in paths
+        template_id = name[:-len('.json')]
+        metadata = {field: data.get(field) for field in self.METADATA_FIELDS}
+        metadata['id'] = metadata['id'] or template_id
+        entry = {
+            'path': path,
+            'version': version,
+            'etag': hashlib.sha1(f"{name}:{version[0]}:{version[1]}".encode()).hexdigest()[:20],
+            'thumbnail': metadata['thumbnail'],
+            'metadata': metadata,
+        }
+        self._cache_body(template_id, version, data)
+        return template_id, entry
+    
+    def _versioned_thumbnail(self, url, found):
+        """Serve thumbnails from the cacheable route with a version parameter."""
+        if not url or not url.startswith(self.THUMBNAIL_URL_PREFIX):
+            return url
+        name = url[len(self.THUMBNAIL_URL_PREFIX):]
+        version = found.get(os.path.join('thumbnails', name))
+        if version is None:
+            return url
+        return f"{self.THUMBNAIL_ROUTE}{name}?v={version[0]:x}"
+    
+    def thumbnail_path(self, name):
+        """
+        Path of a thumbnail file.
+        
+        Raises:
+            ValueError: If name is not a plain file name
+        """
+        if not name or os.path.basename(name) != name or name.startswith('.'):
+            raise ValueError(f"Invalid thumbnail name: {name!r}")
+        return os.path.join(self.directory, 'thumbnails', name)
+    
+    def thumbnail_version(self, name):
+        """Current ``?v=`` value for a thumbnail, or None if it is missing."""
+        self.refresh()
+        version = (self._found or {}).get(os.path.join('thumbnails', name))
+        return f"{version[0]:x}" if version else None
+    
+    def refresh(self, force=False):
+        """
+        Re-read changed template files.
+        
+        Args:
+            force: Ignore check_interval
+        """
+        now = time.monotonic()
+        if not force and self._checked_at is not None and (
+            self.check_interval is None or now - self._checked_at < self.check_interval
+        ):
+            return
+        
+        with self._lock:
+            if not force and self._checked_at is not None and self.check_interval is not None \
+                    and now - self._checked_at < self.check_interval:
+                return
+            found = self._scan()
+            if found == self._found:
+                self._checked_at = now
+                return
+            
+            files, entries = {}, {}
+            for name, version in sorted(found.items()):
+                if not name.endswith('.json') or os.path.dirname(name):
+                    continue
+                previous = self._files.get(name)
+                if previous and previous[:2] == version and previous[2] in self._entries:
+                    template_id = previous[2]
+                    entry = self._entries[template_id]
+                else:
+                    try:
+                        template_id, entry = self._load_entry(name, version)
+                    except (OSError, ValueError) as e:
+                        logger.error("Error reading template %s: %s", name, e)
+                        continue
+                metadata = {**entry['metadata'], 'thumbnail': self._versioned_thumbnail(entry['thumbnail'], found)}
+                entry = {**entry, 'metadata': metadata}
+                files[name] = (*version, template_id)
+                entries[template_id] = entry
+            
+            for template_id in set(self._bodies) - set(entries):
+                del self._bodies[template_id]
+            self._files, self._entries, self._found = files, entries, found
+            self._list_etag = hashlib.sha1(
+                '|'.join(f"{entry['etag']}:{entry['metadata']['thumbnail']}" for entry in entries.values()).encode()
+            ).hexdigest()[:20]
+            self._checked_at = now
+            logger.info("Template registry loaded %d templates from %s", len(entries), self.directory)
+    
+    def reload(self):
+        """Drop everything and re-read the directory."""
+        with self._lock:
+            self._files, self._entries, self._found, self._list_etag = {}, {}, None, None
+            self._bodies.clear()
+            self.refresh(force=True)
+    
+    def list(self):
+        """
+        Metadata of all templates.
+        
+        Returns:
+            tuple: (list of metadata dicts sorted by id, etag)
+        """
+        self.refresh()
+        entries = self._entries
+        return [entries[key]['metadata'] for key in sorted(entries)], self._list_etag
+    
+    def get(self, template_id):
+        """
+        Full template data (shared with the cache; do not modify).
+        
+        Returns:
+            tuple: (dict, etag), or (None, None) if the template is unknown
+        """
+        self.refresh()
+        entry = self._entries.get(template_id)
+        if entry is None:
+            return None, None
+        
+        with self._lock:
+            cached = self._bodies.get(template_id)
+            if cached and cached[0] == entry['version']:
+                self._bodies.move_to_end(template_id)
+                return cached[1], entry['etag']
+        
+        try:
+            with open(entry['path'], 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.error("Error reading template %s: %s", template_id, e)
+            return None, None
+        self._cache_body(template_id, entry['version'], data)
+        return data, entry['etag']
+    
+    def get_content(self, template_id):
+        """
+        Editor content of a template.
+        
+        Returns:
+            tuple: (html, css), or (None, None) if the template is unknown
+        """
+        data, _ = self.get(template_id)
+        if data is None:
+            return None, None
+        content = data.get('content') or {}
+        return content.get('html', ''), content.get('css', '')
+    
+    def _cache_body(self, template_id, version, data):
+        if not self.body_cache_size:
+            return
+        with self._lock:
+            self._bodies[template_id] = (version, data)
+            self._bodies.move_to_end(template_id)
+            while len(self._bodies) > self.body_cache_size:
+                self._bodies.popitem(last=False)
+
+
+def get_template_registry(app=None):
+    """
+    Template registry for an app, created once.
+    
+    Settings: TEMPLATES_DIR (default static/templates next to the app),
+    TEMPLATE_REGISTRY_CHECK_INTERVAL, TEMPLATE_BODY_CACHE_SIZE.
+    """
+    if app is None:
+        from flask import current_app
+        app = current_app._get_current_object()
+    
+    registry = app.extensions.get('template_registry')
+    if registry is None:
+        with _lock:
+            registry = app.extensions.get('template_registry')
+            if registry is None:
+                directory = app.config.get('TEMPLATES_DIR') or os.path.join(app.root_path, '..', 'static', 'templates')
+                registry = app.extensions['template_registry'] = TemplateRegistry(
+                    os.path.abspath(directory),
+                    check_interval=app.config.get('TEMPLATE_REGISTRY_CHECK_INTERVAL', 2.0),
+                    body_cache_size=app.config.get('TEMPLATE_BODY_CACHE_SIZE', 16),
+                )
+    return registry
@@ -0,0 +1,333 @@
+"""Reconcile files on the uploads volume with Asset rows."""
+import os
+import json
+import time
+import threading
+import logging
+from datetime import datetime
+from app.models import db, Asset
+
+logger = logging.getLogger(__name__)
+
+
+class UploadReconciler:
+    """
+    Find orphaned and missing upload files.
+    
+    Every path an Asset points at (the original file, its variants and its
+    content store blob) is loaded in one streamed query into sets. The
+    uploads volume is then walked with os.scandir() and compared in memory,
+    so a run costs one query regardless of the number of files.
+    
+    Layout under ``static/uploads``:
+    
+        <site_id>/<file>             Asset originals (URL path)
+        <site_id>/variants/<file>    responsive variants
+        .blobs/<aa>/<bb>/<sha256>    content store
+        .incoming/                   uploads in progress (stale *.part files are deleted)
+        .quarantine/                 earlier reconcile runs (skipped)
+        assets/                      legacy editor uploads without Asset rows (skipped)
+        avatars/                     user avatars, referenced by User rows (skipped)
+    """
+    
+    INCOMING_DIR = '.incoming'
+    QUARANTINE_DIR = '.quarantine'
+    SKIP_DIRS = {INCOMING_DIR, QUARANTINE_DIR, 'assets', 'avatars'}
+    PROGRESS_EVERY = 1000
+    
+    def __init__(self, static_folder, batch_size=1000, progress=None, grace_seconds=300):
+        """
+        Args:
+            static_folder: Path to static folder
+            batch_size: Rows fetched per round trip while streaming assets
+            progress: Optional callable(dict) receiving progress updates
+            grace_seconds: Files written or linked this recently are left
+                alone, since their Asset row may not be committed yet
+        """
+        self.static_folder = static_folder
+        self.uploads_dir = os.path.join(static_folder, 'uploads')
+        self.batch_size = batch_size
+        self.progress = progress
+        self.grace_seconds = grace_seconds
+        self.cutoff = None
+        self.recent = set()
+        self.stats = {'phase': 'pending', 'assets': 0, 'scanned': 0, 'skipped_recent': 0}
+    
+    def _report(self, **changes):
+        self.stats.update(changes)
+        if self.progress:
+            self.progress(dict(self.stats))
+    
+    @staticmethod
+    def _relative_path(site_id, filename, url):
+        """Path of an asset file relative to uploads/, from its URL when possible."""
+        for marker in ('/api/assets/uploads/', '/static/uploads/'):
+            if url and marker in url:
+                return url.split(marker, 1)[1]
+        return f"{site_id}/{filename}"
+    
+    def load_known(self):
+        """
+        Collect every path referenced by Asset rows.
+        
+        Returns:
+            tuple: (files: set of paths relative to uploads/, blobs: set of hashes)
+        """
+        self._report(phase='loading')
+        files = set()
+        blobs = set()
+        
+        query = db.session.query(
+            Asset.site_id, Asset.filename, Asset.url, Asset.variants, Asset.content_hash
+        ).execution_options(yield_per=self.batch_size)
+        
+        for count, (site_id, filename, url, variants, content_hash) in enumerate(query, 1):
+            files.add(self._relative_path(site_id, filename, url))
+            if variants:
+                for variant in json.loads(variants):
+                    files.add(f"{site_id}/variants/{variant['filename']}")
+            if content_hash:
+                blobs.add(content_hash)
+            if count % self.PROGRESS_EVERY == 0:
+                self._report(assets=count)
+            self.stats['assets'] = count
+        
+        return files, blobs
+    
+    def _scan_dir(self, path, prefix, found):
+        with os.scandir(path) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    self._scan_dir(entry.path, f"{prefix}{entry.name}/", found)
+                elif entry.is_file(follow_symlinks=False):
+                    st = entry.stat(follow_symlinks=False)
+                    # ctime also moves when a hard link is added (dedup)
+                    if self.cutoff is not None and max(st.st_mtime, st.st_ctime) > self.cutoff:
+                        self.recent.add(f"{prefix}{entry.name}")
+                        self.stats['skipped_recent'] += 1
+                        continue
+                    found[f"{prefix}{entry.name}"] = st.st_size
+                    self.stats['scanned'] += 1
+                    if self.stats['scanned'] % self.PROGRESS_EVERY == 0:
+                        self._report()
+    
+    def scan(self):
+        """
+        List upload files and content store blobs on disk.
+        
+        Returns:
+            tuple: (files: dict relative path -> size, blobs: dict hash -> size)
+        """
+        self._report(phase='scanning')
+        files = {}
+        blobs = {}
+        if not os.path.isdir(self.uploads_dir):
+            return files, blobs
+        
+        with os.scandir(self.uploads_dir) as entries:
+            for entry in entries:
+                if entry.name in self.SKIP_DIRS:
+                    continue
+                if entry.name == '.blobs':
+                    found = {}
+                    self._scan_dir(entry.path, '', found)
+                    blobs = {path.rsplit('/', 1)[-1]: size for path, size in found.items()}
+                elif entry.is_dir(follow_symlinks=False):
+                    self._scan_dir(entry.path, f"{entry.name}/", files)
+        
+        return files, blobs
+    
+    def purge_incoming(self):
+        """
+        Delete temp files of uploads that never finished.
+        
+        A .part file is written continuously while its upload streams in,
+        so one untouched for longer than the grace period belongs to a
+        request that died without cleaning up (worker killed, crash).
+        
+        Returns:
+            tuple: (files removed, bytes freed)
+        """
+        removed = freed = 0
+        incoming_dir = os.path.join(self.uploads_dir, self.INCOMING_DIR)
+        if not os.path.isdir(incoming_dir):
+            return removed, freed
+        
+        with os.scandir(incoming_dir) as entries:
+            for entry in entries:
+                if not entry.name.endswith('.part') or not entry.is_file(follow_symlinks=False):
+                    continue
+                st = entry.stat(follow_symlinks=False)
+                if st.st_mtime > self.cutoff:
+                    continue
+                try:
+                    os.remove(entry.path)
+                except FileNotFoundError:
+                    continue
+                removed += 1
+                freed += st.st_size
+        return removed, freed
+    
+    def quarantine(self, paths):
+        """
+        Move files (relative to uploads/) into uploads/.quarantine/<timestamp>/.
+        
+        Returns:
+            str: Quarantine directory of this run
+        """
+        target_root = os.path.join(
+            self.uploads_dir, self.QUARANTINE_DIR, datetime.utcnow().strftime('%Y%m%dT%H%M%S')
+        )
+        for path in paths:
+            target = os.path.join(target_root, path)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            try:
+                os.replace(os.path.join(self.uploads_dir, path), target)
+            except FileNotFoundError:
+                pass
+        return target_root
+    
+    def run(self, quarantine=False):
+        """
+        Reconcile the uploads volume.
+        
+        Args:
+            quarantine: Move orphaned files into uploads/.quarantine/
+        
+        Returns:
+            dict: Report with orphaned/missing paths (relative to uploads/)
+        """
+        started = time.perf_counter()
+        self.cutoff = time.time() - self.grace_seconds
+        known_files, known_blobs = self.load_known()
+        disk_files, disk_blobs = self.scan()
+        
+        self._report(phase='comparing')
+        orphaned = sorted(set(disk_files) - known_files)
+        orphaned += sorted(f".blobs/{h[:2]}/{h[2:4]}/{h}" for h in set(disk_blobs) - known_blobs)
+        missing = sorted(known_files - set(disk_files) - self.recent)
+        orphaned_bytes = sum(disk_files.get(path, 0) for path in orphaned)
+        orphaned_bytes += sum(disk_blobs[h] for h in set(disk_blobs) - known_blobs)
+        
+        incoming_removed, incoming_bytes = self.purge_incoming()
+        
+        quarantine_dir = None
+        if quarantine and orphaned:
+            self._report(phase='quarantining')
+            quarantine_dir = self.quarantine(orphaned)
+        
+        report = {
+            'assets': self.stats['assets'],
+            'scanned_files': len(disk_files) + len(disk_blobs),
+            'skipped_recent': self.stats['skipped_recent'],
+            'orphaned': orphaned,
+            'orphaned_bytes': orphaned_bytes,
+            'missing': missing,
+            'quarantine_dir': quarantine_dir,
+            'incoming_removed': incoming_removed,
+            'incoming_bytes': incoming_bytes,
+            'duration_ms': round((time.perf_counter() - started) * 1000, 2),
+        }
+        self._report(phase='done')
+        logger.info(
+            "Upload reconcile: %s assets, %s files, %s orphaned (%s bytes), %s missing, "
+            "%s stale temp files removed",
+            report['assets'], report['scanned_files'], len(orphaned), orphaned_bytes, len(missing),
+            incoming_removed
+        )
+        return report
+
+
+class ReconcileJob:
+    """
+    Run an UploadReconciler in a background thread of this worker.
+    
+    status() can be polled while it runs; the finished report stays
+    available until the next job replaces it.
+    """
+    
+    def __init__(self, app, quarantine=False):
+        self.app = app
+        self.quarantine = quarantine
+        self.progress = {'phase': 'pending'}
+        self.report = None
+        self.error = None
+        self.started_at = None
+        self.finished_at = None
+        self._thread = None
+    
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+    
+    def start(self):
+        """Start reconciling in a daemon thread."""
+        self.started_at = datetime.utcnow()
+        self._thread = threading.Thread(target=self._run, name='upload-reconcile', daemon=True)
+        self._thread.start()
+        return self
+    
+    def wait(self, timeout=None):
+        """Block until the job has finished."""
+        if self._thread is not None:
+            self._thread.join(timeout)
+    
+    def _set_progress(self, progress):
+        self.progress = progress
+    
+    def _run(self):
+        with self.app.app_context():
+            try:
+                reconciler = UploadReconciler(self.app.static_folder, progress=self._set_progress)
+                self.report = reconciler.run(quarantine=self.quarantine)
+            except Exception as e:
+                logger.exception("Upload reconcile job failed")
+                self.error = str(e)
+                db.session.rollback()
+            finally:
+                db.session.remove()
+                self.finished_at = datetime.utcnow()
+    
+    def status(self, limit=100):
+        """
+        Job status for the admin API.
+        
+        Args:
+            limit: Maximum orphaned/missing paths included
+        
+        Returns:
+            dict: Progress while running, report summary once done
+        """
+        status = {
+            'running': self.running,
+            'quarantine': self.quarantine,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None,
+            'progress': self.progress,
+            'error': self.error,
+        }
+        if self.report:
+            report = dict(self.report)
+            report['orphaned_count'] = len(report['orphaned'])
+            report['missing_count'] = len(report['missing'])
+            report['orphaned'] = report['orphaned'][:limit]
+            report['missing'] = report['missing'][:limit]
+            status['report'] = report
+        return status
+
+
+def start_reconcile_job(app, quarantine=False):
+    """
+    Start a background upload reconcile job on this worker.
+    
+    Returns:
+        tuple: (job: ReconcileJob, started: bool) - started is False if a
+               job was already running and is returned instead
+    """
+    current = app.extensions.get('upload_reconcile')
+    if current and current.running:
+        return current, False
+    
+    job = ReconcileJob(app, quarantine=quarantine).start()
+    app.extensions['upload_reconcile'] = job
+    return job, True
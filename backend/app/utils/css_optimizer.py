@@ -0,0 +1,291 @@
+"""CSS minification, rule deduplication and critical-CSS selection."""
+import re
+
+COMMENT_PATTERN = re.compile(r'/\*.*?\*/', re.DOTALL)
+# Strings and unquoted url(...) are swapped for placeholders while parsing,
+# so braces, semicolons and whitespace inside them are never touched
+PROTECTED_PATTERN = re.compile(r'"(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\'|url\(\s*[^)"\'\s][^)]*\)', re.IGNORECASE)
+PLACEHOLDER_PATTERN = re.compile(r'\x00(\d+)\x00')
+
+# At-rules whose block holds declarations rather than nested rules
+DECLARATION_AT_RULES = ('@font-face', '@page', '@property', '@counter-style', '@font-palette-values')
+
+ID_SELECTOR_PATTERN = re.compile(r'^#[A-Za-z_][\w-]*$')
+ID_REFERENCE_PATTERN = re.compile(r'#([A-Za-z_][\w-]*)')
+PSEUDO_PATTERN = re.compile(r'::?[\w-]+(\([^)]*\))?')
+ATTRIBUTE_PATTERN = re.compile(r'\[[^\]]*\]')
+COMPOUND_TOKEN_PATTERN = re.compile(r'([#.]?)(-?[A-Za-z_][\w-]*|\*)')
+
+# Selectors that apply to the document itself, always critical
+ROOT_SELECTORS = {'*', 'html', 'body', ':root'}
+
+
+class Stylesheet:
+    """
+    Parsed stylesheet.
+    
+    ``items`` is a list of ('rule', selector, declarations),
+    ('block', at-rule prelude, [child items]) and ('stmt', at-rule) tuples,
+    in source order. Strings and url() values stay as placeholders until
+    serialize() restores them.
+    """
+    
+    def __init__(self, items, protected):
+        self.items = items
+        self.protected = protected
+    
+    def rule_count(self):
+        """Number of style rules, including nested ones."""
+        return _count_rules(self.items)
+    
+    def serialize(self, items=None):
+        """Minified CSS text for items (default: the whole stylesheet)."""
+        text = _serialize(self.items if items is None else items)
+        return PLACEHOLDER_PATTERN.sub(lambda m: self.protected[int(m.group(1))], text)
+
+
+def parse_css(css):
+    """
+    Parse CSS into a Stylesheet.
+    
+    Lenient like browsers: unbalanced braces end the current block and
+    comments are dropped.
+    """
+    protected = []
+    
+    def protect(match):
+        protected.append(match.group(0))
+        return f'\x00{len(protected) - 1}\x00'
+    
+    css = COMMENT_PATTERN.sub('', css or '')
+    css = PROTECTED_PATTERN.sub(protect, css)
+    items, _ = _parse_block(css, 0, nested=False)
+    return Stylesheet(items, protected)
+
+
+def _parse_block(css, pos, nested):
+    items = []
+    length = len(css)
+    
+    while pos < length:
+        open_brace = css.find('{', pos)
+        close_brace = css.find('}', pos)
+        semicolon = css.find(';', pos)
+        
+        if close_brace != -1 and (open_brace == -1 or close_brace < open_brace):
+            if nested:
+                _add_statements(items, css[pos:close_brace])
+                return items, close_brace + 1
+            pos = close_brace + 1
+            continue
+        
+        if open_brace == -1:
+            _add_statements(items, css[pos:])
+            break
+        
+        # Statement at-rules (@import, @charset, @layer a, b;) before the block
+        if semicolon != -1 and semicolon < open_brace and css[pos:semicolon].strip().startswith('@'):
+            items.append(('stmt', _collapse(css[pos:semicolon])))
+            pos = semicolon + 1
+            continue
+        
+        prelude = _collapse(css[pos:open_brace])
+        if prelude.startswith('@') and not prelude.lower().startswith(DECLARATION_AT_RULES):
+            children, pos = _parse_block(css, open_brace + 1, nested=True)
+            items.append(('block', prelude, children))
+        else:
+            end = css.find('}', open_brace)
+            if end == -1:
+                end = length
+            items.append(('rule', prelude, css[open_brace + 1:end]))
+            pos = end + 1
+    
+    return items, length
+
+
+def _add_statements(items, text):
+    for statement in text.split(';'):
+        statement = _collapse(statement)
+        if statement.startswith('@'):
+            items.append(('stmt', statement))
+
+
+def _collapse(text):
+    return ' '.join(text.split())
+
+
+def _count_rules(items):
+    count = 0
+    for item in items:
+        if item[0] == 'rule':
+            count += 1
+        elif item[0] == 'block':
+            count += _count_rules(item[2])
+    return count
+
+
+def minify_selector(selector):
+    """Collapse whitespace and drop it around commas and combinators."""
+    selector = _collapse(selector)
+    return re.sub(r'\s*([,>+~])\s*', r'\1', selector)
+
+
+def minify_declarations(body):
+    """
+    Minify a declaration block body.
+    
+    Returns:
+        str: 'prop:value;prop:value' (empty if there are no declarations)
+    """
+    declarations = []
+    for declaration in body.split(';'):
+        prop, colon, value = declaration.partition(':')
+        prop = prop.strip()
+        value = _collapse(value)
+        if not colon or not prop or not value:
+            continue
+        value = re.sub(r'\s*,\s*', ',', value)
+        value = re.sub(r'\s*!\s*important$', '!important', value, flags=re.IGNORECASE)
+        declarations.append(f"{prop}:{value}")
+    return ';'.join(declarations)
+
+
+def _serialize(items):
+    parts = []
+    for item in items:
+        if item[0] == 'rule':
+            declarations = minify_declarations(item[2])
+            if declarations:
+                parts.append(f"{minify_selector(item[1])}{{{declarations}}}")
+        elif item[0] == 'block':
+            inner = _serialize(item[2])
+            if inner:
+                parts.append(f"{item[1]}{{{inner}}}")
+        else:
+            parts.append(f"{item[1]};")
+    return ''.join(parts)
+
+
+def dedupe_rules(items):
+    """
+    Remove duplicate rules and merge per-component id rules.
+    
+    - A rule with the same selector and declarations as a later rule in
+      the same block is dropped (the later copy decides the cascade).
+    - Rules whose selector is a single id (``#ixk3``, as GrapesJS emits per
+      component) and whose declarations equal an earlier id rule's are
+      merged into that rule's selector list, unless a rule in between
+      also targets the id (which would change the cascade).
+    
+    Args:
+        items: Stylesheet.items (or a block's children)
+    
+    Returns:
+        list: New item list
+    """
+    items = [
+        ('block', item[1], dedupe_rules(item[2])) if item[0] == 'block' else item
+        for item in items
+    ]
+    
+    # Exact duplicates: keep the last occurrence
+    seen = set()
+    kept = []
+    for item in reversed(items):
+        if item[0] == 'rule':
+            key = (minify_selector(item[1]), minify_declarations(item[2]))
+            if key in seen:
+                continue
+            seen.add(key)
+        kept.append(item)
+    kept.reverse()
+    
+    # Merge single-id rules with identical declarations
+    merged = []
+    target_by_body = {}  # declarations -> index in merged
+    last_reference = {}  # id -> index in merged of the last rule mentioning it
+    for item in kept:
+        if item[0] != 'rule':
+            merged.append(item)
+            continue
+        
+        selector = minify_selector(item[1])
+        body = minify_declarations(item[2])
+        if ID_SELECTOR_PATTERN.match(selector) and body:
+            element_id = selector[1:]
+            target = target_by_body.get(body)
+            if target is not None and last_reference.get(element_id, -1) < target:
+                _, target_selector, target_body = merged[target]
+                merged[target] = ('rule', f"{target_selector},{selector}", target_body)
+                last_reference[element_id] = target
+                continue
+            target_by_body.setdefault(body, len(merged))
+        
+        for element_id in ID_REFERENCE_PATTERN.findall(selector):
+            last_reference[element_id] = len(merged)
+        merged.append(('rule', selector, body))
+    
+    return merged
+
+
+def _selector_is_critical(selector, tags, ids, classes):
+    selector = selector.strip()
+    if selector in ROOT_SELECTORS:
+        return True
+    
+    # Only the rightmost compound selects the element; drop states,
+    # pseudo-elements and attribute tests
+    compound = re.split(r'\s*[\s>+~]\s*', selector)[-1]
+    compound = ATTRIBUTE_PATTERN.sub('', PSEUDO_PATTERN.sub('', compound))
+    tokens = COMPOUND_TOKEN_PATTERN.findall(compound)
+    if not tokens:
+        return True
+    
+    for prefix, name in tokens:
+        if prefix == '#' and name not in ids:
+            return False
+        if prefix == '.' and name not in classes:
+            return False
+        if not prefix and name != '*' and name.lower() not in tags and name.lower() not in ROOT_SELECTORS:
+            return False
+    return True
+
+
+def critical_rules(items, tags, ids, classes):
+    """
+    Rules that can apply to the above-the-fold elements.
+    
+    A rule is kept if any of its selectors' rightmost compound only uses
+    tags, ids and classes present above the fold. Blocks (@media, @supports)
+    keep their critical children; @font-face stays because visible text
+    needs it, while @keyframes and @import are left to the full stylesheet.
+    
+    Args:
+        items: Stylesheet.items
+        tags, ids, classes: Sets found in the above-the-fold HTML
+    
+    Returns:
+        list: Items for Stylesheet.serialize()
+    """
+    selected = []
+    for item in items:
+        if item[0] == 'rule':
+            if item[1].lower().startswith('@font-face'):
+                selected.append(item)
+            elif any(_selector_is_critical(s, tags, ids, classes) for s in item[1].split(',')):
+                selected.append(item)
+        elif item[0] == 'block':
+            prelude = item[1].lower()
+            if prelude.startswith(('@keyframes', '@-webkit-keyframes')):
+                continue
+            children = critical_rules(item[2], tags, ids, classes)
+            if children:
+                selected.append(('block', item[1], children))
+    return selected
+
+
+def minify_css(css):
+    """Minify CSS and remove duplicate rules."""
+    sheet = parse_css(css)
+    sheet.items = dedupe_rules(sheet.items)
+    return sheet.serialize()
@@ -1,9 +1,12 @@
 """File handler utilities for file operations."""
 import os
 import hashlib
+import logging
 from datetime import datetime
 from werkzeug.utils import secure_filename
 
+logger = logging.getLogger(__name__)
+
 
 class FileHandler:
     """Utility class for file handling operations."""
@@ -98,7 +101,7 @@ class FileHandler:
             os.makedirs(directory_path, exist_ok=True)
             return True
         except Exception as e:
-            print(f"Error creating directory {directory_path}: {e}")
+            logger.error("Error creating directory %s: %s", directory_path, e)
             return False
     
     @staticmethod
@@ -118,7 +121,7 @@ class FileHandler:
                 return True
             return True  # File doesn't exist, consider success
         except Exception as e:
-            print(f"Error deleting file {file_path}: {e}")
+            logger.error("Error deleting file %s: %s", file_path, e)
             return False
     
     @staticmethod
@@ -166,7 +169,7 @@ class FileHandler:
             return is_valid, actual_size
             
         except Exception as e:
-            print(f"Error validating file size: {e}")
+            logger.error("Error validating file size: %s", e)
             return False, 0
     
     @staticmethod
@@ -3,8 +3,12 @@ import re
 import html
 import os
 import stat
+import logging
+from html.parser import HTMLParser
 from flask import current_app
 
+logger = logging.getLogger(__name__)
+
 
 def clean_html_for_production(html_content):
     """Clean and optimize HTML for production"""
@@ -35,7 +39,7 @@ def clean_html_for_production(html_content):
         return cleaned
         
     except Exception as e:
-        print(f"HTML cleaning error: {e}")
+        logger.error("HTML cleaning error: %s", e)
         return html_content  # Return original if cleaning fails
 
 
@@ -53,18 +57,18 @@ def save_html_to_storage(page, html_content):
         with open(file_path, 'w', encoding='utf-8') as f:
             f.write(html_content)
             
-        print(f"HTML saved to storage: {file_path}")
+        logger.debug("HTML saved to storage: %s", file_path)
         return True
         
     except Exception as e:
-        print(f"Storage save error: {e}")
+        logger.error("Storage save error: %s", e)
         return False
 
 
 def deploy_static_website(subdomain, html_content, css_content=''):
     """Deploy static HTML/CSS files to subdomain directory for Nginx serving"""
     try:
-        print(f"🚀 Deploying static website for subdomain: {subdomain}")
+        logger.debug("Deploying static website for subdomain: %s", subdomain)
         
         # 1. Create subdomain directory structure
         static_dir = os.path.join('/var/www/subdomains', subdomain)
@@ -88,7 +92,7 @@ def deploy_static_website(subdomain, html_content, css_content=''):
         if os.path.exists(os.path.join(static_dir, 'styles.css')):
             os.chmod(os.path.join(static_dir, 'styles.css'), stat.S_IRUSR | stat.S_IWUSR | stat.S_IRGRP | stat.S_IROTH)
         
-        print(f"✅ Static files deployed successfully to: {static_dir}")
+        logger.info("✅ Static files deployed successfully to: %s", static_dir)
         
         return {
             'success': True,
@@ -100,8 +104,321 @@ def deploy_static_website(subdomain, html_content, css_content=''):
         }
         
     except Exception as e:
-        print(f"❌ Static deployment error: {e}")
+        logger.error("❌ Static deployment error: %s", e)
         return {
             'success': False,
             'error': str(e)
-        }
\ No newline at end of file
+        }
+
+
+IMG_TAG_PATTERN = re.compile(r'<img\b[^>]*>', re.IGNORECASE)
+IMG_SRC_PATTERN = re.compile(r'\bsrc\s*=\s*(["\'])(.*?)\1', re.IGNORECASE | re.DOTALL)
+UPLOAD_FILENAME_PATTERN = re.compile(r'/api/assets/uploads/\d+/([^/"\'?#]+)$')
+
+
+def add_responsive_images(html_content, srcset_by_filename):
+    """
+    Add srcset/sizes to <img> tags that point at uploaded assets.
+    
+    Images with AVIF/WebP variants are wrapped in <picture> with one
+    <source> per format; the <img> keeps its original src as fallback.
+    Tags that already carry a srcset are left alone.
+    
+    Args:
+        html_content: Page HTML (gjs-html)
+        srcset_by_filename: {stored filename: Asset.srcset_data()}
+    
+    Returns:
+        str: HTML with responsive image markup
+    """
+    if not html_content or not srcset_by_filename:
+        return html_content
+    
+    def rewrite(match):
+        tag = match.group(0)
+        if re.search(r'\bsrcset\s*=', tag, re.IGNORECASE):
+            return tag
+        
+        src = IMG_SRC_PATTERN.search(tag)
+        if not src:
+            return tag
+        filename = UPLOAD_FILENAME_PATTERN.search(src.group(2))
+        data = srcset_by_filename.get(filename.group(1)) if filename else None
+        if not data or not data.get('srcset'):
+            return tag
+        
+        width = data.get('width')
+        sizes = f'(max-width: {width}px) 100vw, {width}px' if width else '100vw'
+        
+        attributes = f' srcset="{html.escape(data["srcset"])}" sizes="{sizes}"'
+        if width and data.get('height') and not re.search(r'\bwidth\s*=', tag, re.IGNORECASE):
+            # Intrinsic size lets the browser reserve space before loading
+            attributes += f' width="{width}" height="{data["height"]}"'
+        
+        closing = '/>' if tag.endswith('/>') else '>'
+        new_tag = tag[:-len(closing)].rstrip() + attributes + closing
+        
+        if not data.get('sources'):
+            return new_tag
+        
+        sources = ''.join(
+            f'<source type="{source["type"]}" srcset="{html.escape(source["srcset"])}" sizes="{sizes}">'
+            for source in data['sources']
+        )
+        return f'<picture>{sources}{new_tag}</picture>'
+    
+    return IMG_TAG_PATTERN.sub(rewrite, html_content)
+
+
+# Contents of these elements are kept byte for byte by minify_html()
+PRESERVED_BLOCK_PATTERN = re.compile(r'<(pre|textarea|script|style)\b[^>]*>.*?</\1\s*>', re.IGNORECASE | re.DOTALL)
+HTML_COMMENT_PATTERN = re.compile(r'<!--(?!\[if|<!|>).*?-->', re.DOTALL)
+# Whitespace next to these (block-level or head) tags never renders
+BLOCK_TAG_PATTERN = re.compile(
+    r'\s*(</?(?:html|head|body|title|meta|link|base|div|section|header|footer|main|nav|article|aside|'
+    r'p|h[1-6]|ul|ol|li|dl|dt|dd|table|thead|tbody|tfoot|tr|td|th|form|fieldset|figure|figcaption|'
+    r'source|br|hr|blockquote)\b[^>]*>)\s*',
+    re.IGNORECASE
+)
+
+
+def minify_html(html_content):
+    """
+    Minify HTML without changing how it renders.
+    
+    Comments (except conditional ones) are removed, whitespace runs become
+    one space and whitespace around block-level tags is dropped. <pre>,
+    <textarea>, <script> and <style> contents are left untouched.
+    
+    Args:
+        html_content: HTML document or fragment
+    
+    Returns:
+        str: Minified HTML
+    """
+    if not html_content:
+        return html_content
+    
+    preserved = []
+    
+    def protect(match):
+        preserved.append(match.group(0))
+        return f'\x00{len(preserved) - 1}\x00'
+    
+    text = PRESERVED_BLOCK_PATTERN.sub(protect, html_content)
+    text = HTML_COMMENT_PATTERN.sub('', text)
+    text = re.sub(r'\s+', ' ', text)
+    text = BLOCK_TAG_PATTERN.sub(r'\1', text)
+    text = re.sub(r'\x00(\d+)\x00', lambda m: preserved[int(m.group(1))], text)
+    return text.strip()
+
+
+class _FoldFinder(HTMLParser):
+    """
+    Find where the first N top-level elements of a fragment end.
+    
+    Wrapper elements opened before any counted element (GrapesJS getHtml()
+    returns the page inside <body>) are descended into, so their children
+    are the top-level elements.
+    """
+    
+    VOID_ELEMENTS = {'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input',
+                     'link', 'meta', 'source', 'track', 'wbr'}
+    IGNORED_ELEMENTS = {'script', 'style', 'link', 'meta', 'noscript', 'template'}
+    WRAPPER_ELEMENTS = {'html', 'body'}
+    
+    def __init__(self, html_content, limit):
+        super().__init__(convert_charrefs=True)
+        self.html_content = html_content
+        self.limit = limit
+        self.depth = 0
+        self.top_depth = 0
+        self.count = 0
+        self.fold_offset = None
+        self._line_starts = [0]
+        for line in html_content.splitlines(keepends=True):
+            self._line_starts.append(self._line_starts[-1] + len(line))
+    
+    def _position(self):
+        line, column = self.getpos()
+        return self._line_starts[line - 1] + column
+    
+    def _top_level_done(self, tag, end):
+        if tag in self.IGNORED_ELEMENTS:
+            return
+        self.count += 1
+        if self.count == self.limit and self.fold_offset is None:
+            self.fold_offset = end
+    
+    def handle_starttag(self, tag, attrs):
+        if tag in self.VOID_ELEMENTS:
+            if self.depth == self.top_depth:
+                self._top_level_done(tag, self._position() + len(self.get_starttag_text()))
+            return
+        if tag in self.WRAPPER_ELEMENTS and self.depth == self.top_depth and self.count == 0:
+            self.top_depth += 1
+        self.depth += 1
+    
+    def handle_startendtag(self, tag, attrs):
+        if self.depth == self.top_depth:
+            self._top_level_done(tag, self._position() + len(self.get_starttag_text()))
+    
+    def handle_endtag(self, tag):
+        if tag in self.VOID_ELEMENTS or self.depth == 0:
+            return
+        self.depth -= 1
+        if self.depth < self.top_depth:
+            # Wrapper closed
+            self.top_depth = self.depth
+        elif self.depth == self.top_depth:
+            start = self._position()
+            self._top_level_done(tag, self.html_content.find('>', start) + 1)
+
+
+def find_fold_offset(html_content, top_level_elements=2):
+    """
+    Approximate the end of the above-the-fold content.
+    
+    Page builders stack full-width sections, so the first few top-level
+    elements (header, hero) are what the first screen shows. A <body>
+    wrapper around the whole fragment is not counted as one of them.
+    
+    Args:
+        html_content: Page body HTML (gjs-html)
+        top_level_elements: Number of top-level elements counted as visible
+    
+    Returns:
+        int: Offset in html_content where below-the-fold content starts
+             (len(html_content) if the page is shorter)
+    """
+    finder = _FoldFinder(html_content or '', top_level_elements)
+    try:
+        finder.feed(html_content or '')
+        finder.close()
+    except Exception as e:
+        logger.debug("Fold detection failed: %s", e)
+        return len(html_content or '')
+    return finder.fold_offset if finder.fold_offset is not None else len(html_content or '')
+
+
+class _SelectorCollector(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.tags, self.ids, self.classes = {'html', 'body'}, set(), set()
+    
+    def handle_starttag(self, tag, attrs):
+        self.tags.add(tag)
+        for name, value in attrs:
+            if name == 'id' and value:
+                self.ids.add(value)
+            elif name == 'class' and value:
+                self.classes.update(value.split())
+    
+    handle_startendtag = handle_starttag
+
+
+def collect_selectors(html_content):
+    """
+    Tags, ids and classes used in an HTML fragment.
+    
+    Returns:
+        tuple: (tags: set, ids: set, classes: set); html and body are
+               always included
+    """
+    collector = _SelectorCollector()
+    collector.feed(html_content or '')
+    collector.close()
+    return collector.tags, collector.ids, collector.classes
+
+
+def add_lazy_loading(html_content, fold_offset):
+    """
+    Defer images below the fold.
+    
+    <img> tags starting at or after fold_offset get loading="lazy" and
+    decoding="async" unless they already set those attributes.
+    
+    Returns:
+        tuple: (html: str, count: int) with the number of images changed
+    """
+    count = 0
+    
+    def rewrite(match):
+        nonlocal count
+        tag = match.group(0)
+        if match.start() < fold_offset:
+            return tag
+        attributes = ''
+        if not re.search(r'\sloading\s*=', tag, re.IGNORECASE):
+            attributes += ' loading="lazy"'
+        if not re.search(r'\sdecoding\s*=', tag, re.IGNORECASE):
+            attributes += ' decoding="async"'
+        if not attributes:
+            return tag
+        count += 1
+        closing = '/>' if tag.endswith('/>') else '>'
+        return tag[:-len(closing)].rstrip() + attributes + closing
+    
+    return IMG_TAG_PATTERN.sub(rewrite, html_content or ''), count
+
+
+class _TextExtractor(HTMLParser):
+    # Elements whose content is never shown as text
+    HIDDEN_TAGS = {'script', 'style', 'template', 'noscript', 'svg', 'head'}
+    # Elements that do not separate words
+    INLINE_TAGS = {'a', 'abbr', 'b', 'code', 'em', 'i', 'mark', 'q', 's', 'small', 'span',
+                   'strong', 'sub', 'sup', 'u'}
+    
+    def __init__(self, max_chars):
+        super().__init__(convert_charrefs=True)
+        self.max_chars = max_chars
+        self.parts = []
+        self.size = 0
+        self.hidden = 0
+    
+    def handle_starttag(self, tag, attrs):
+        if tag in self.HIDDEN_TAGS:
+            self.hidden += 1
+        elif tag == 'img':
+            alt = dict(attrs).get('alt')
+            if alt:
+                self.handle_data(f" {alt} ")
+        elif tag not in self.INLINE_TAGS:
+            self.handle_data(' ')
+    
+    def handle_startendtag(self, tag, attrs):
+        if tag not in self.HIDDEN_TAGS:
+            self.handle_starttag(tag, attrs)
+    
+    def handle_endtag(self, tag):
+        if tag in self.HIDDEN_TAGS:
+            self.hidden = max(self.hidden - 1, 0)
+        elif tag not in self.INLINE_TAGS:
+            self.handle_data(' ')
+    
+    def handle_data(self, data):
+        if not self.hidden and self.size < self.max_chars:
+            self.parts.append(data)
+            self.size += len(data)
+
+
+def extract_text(html_content, max_chars=100000):
+    """
+    Visible text of an HTML fragment, for search indexing.
+    
+    Script, style and similar element contents are skipped, image alt
+    texts are kept and whitespace is collapsed.
+    
+    Args:
+        html_content: HTML (may be None)
+        max_chars: Stop collecting after about this many characters
+    
+    Returns:
+        str: Plain text
+    """
+    if not html_content:
+        return ''
+    extractor = _TextExtractor(max_chars)
+    extractor.feed(html_content)
+    extractor.close()
+    return ' '.join(''.join(extractor.parts).split())[:max_chars].rstrip()
@@ -0,0 +1,225 @@
+"""Header-only image metadata probe."""
+import os
+import re
+import struct
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Enough for every fixed-position header below; JPEG and SVG read further
+HEADER_BYTES = 64
+SVG_READ_BYTES = 64 * 1024
+
+# EXIF orientations that rotate the image by 90/270 degrees
+TRANSPOSED_ORIENTATIONS = {5, 6, 7, 8}
+
+# JPEG start-of-frame markers (baseline, progressive, lossless, ...)
+_JPEG_SOF = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+
+_SVG_TAG = re.compile(rb'<svg\b[^>]*>', re.IGNORECASE | re.DOTALL)
+_SVG_ATTR = re.compile(rb'''([\w:-]+)\s*=\s*(?:"([^"]*)"|'([^']*)')''')
+_SVG_LENGTH = re.compile(r'^\s*([0-9]*\.?[0-9]+)\s*(px)?\s*$')
+
+
+class ImageInfo:
+    """Result of probe_image()."""
+    
+    __slots__ = ('format', 'mime', 'width', 'height', 'orientation')
+    
+    def __init__(self, format, mime, width, height, orientation=None):
+        self.format = format
+        self.mime = mime
+        self.width = width
+        self.height = height
+        self.orientation = orientation
+    
+    @property
+    def display_size(self):
+        """(width, height) as displayed, with EXIF rotation applied."""
+        if self.orientation in TRANSPOSED_ORIENTATIONS:
+            return self.height, self.width
+        return self.width, self.height
+    
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+    
+    def __repr__(self):
+        return f'<ImageInfo {self.format} {self.width}x{self.height}>'
+
+
+def probe_image(path):
+    """
+    Read an image's format, dimensions and EXIF orientation from its header.
+    
+    Only the first bytes are read for PNG, GIF, BMP, ICO and WebP. JPEG
+    reads marker headers up to the first frame header, seeking over segment
+    data. SVG sizes come from width/height or the viewBox of the root
+    element.
+    
+    Args:
+        path: Path to the image file
+    
+    Returns:
+        ImageInfo|None: None if the format is unknown or the header is damaged
+    """
+    try:
+        with open(path, 'rb') as f:
+            head = f.read(HEADER_BYTES)
+            return _probe(f, head)
+    except (OSError, struct.error, ValueError) as e:
+        logger.debug("Image probe failed for %s: %s", path, e)
+        return None
+
+
+def _probe(f, head):
+    if head.startswith(b'\x89PNG\r\n\x1a\n') and head[12:16] == b'IHDR':
+        width, height = struct.unpack('>II', head[16:24])
+        return ImageInfo('png', 'image/png', width, height)
+    
+    if head[:6] in (b'GIF87a', b'GIF89a'):
+        width, height = struct.unpack('<HH', head[6:10])
+        return ImageInfo('gif', 'image/gif', width, height)
+    
+    if head.startswith(b'\xff\xd8'):
+        return _probe_jpeg(f)
+    
+    if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+        return _probe_webp(head)
+    
+    if head.startswith(b'BM'):
+        header_size = struct.unpack('<I', head[14:18])[0]
+        if header_size == 12:
+            width, height = struct.unpack('<HH', head[18:22])
+        else:
+            width, height = struct.unpack('<ii', head[18:26])
+        return ImageInfo('bmp', 'image/bmp', width, abs(height))
+    
+    if head.startswith(b'\x00\x00\x01\x00'):
+        # Largest directory entry (like Pillow); a size byte of 0 means 256
+        count = struct.unpack('<H', head[4:6])[0]
+        f.seek(6)
+        entries = f.read(16 * count)
+        sizes = [(entries[i] or 256, entries[i + 1] or 256) for i in range(0, len(entries) - 15, 16)]
+        if not sizes:
+            return None
+        width, height = max(sizes)
+        return ImageInfo('ico', 'image/x-icon', width, height)
+    
+    if b'<' in head:
+        f.seek(0)
+        return _probe_svg(f.read(SVG_READ_BYTES))
+    
+    return None
+
+
+def _probe_webp(head):
+    chunk = head[12:16]
+    if chunk == b'VP8 ':
+        # Lossy: 14-bit sizes after the 3-byte start code
+        width, height = struct.unpack('<HH', head[26:30])
+        return ImageInfo('webp', 'image/webp', width & 0x3FFF, height & 0x3FFF)
+    if chunk == b'VP8L':
+        b0, b1, b2, b3 = head[21:25]
+        width = 1 + (((b1 & 0x3F) << 8) | b0)
+        height = 1 + (((b3 & 0x0F) << 10) | (b2 << 2) | ((b1 & 0xC0) >> 6))
+        return ImageInfo('webp', 'image/webp', width, height)
+    if chunk == b'VP8X':
+        # Extended (alpha/animation/EXIF): 24-bit canvas size minus one
+        width = 1 + int.from_bytes(head[24:27], 'little')
+        height = 1 + int.from_bytes(head[27:30], 'little')
+        return ImageInfo('webp', 'image/webp', width, height)
+    return None
+
+
+def _probe_jpeg(f):
+    f.seek(2)
+    orientation = None
+    while True:
+        marker = f.read(2)
+        if len(marker) < 2 or marker[0] != 0xFF:
+            return None
+        code = marker[1]
+        # Fill bytes and standalone markers carry no length
+        if code == 0xFF:
+            f.seek(-1, os.SEEK_CUR)
+            continue
+        if code == 0x01 or 0xD0 <= code <= 0xD7:
+            continue
+        if code in (0xD9, 0xDA):
+            return None
+        
+        length = struct.unpack('>H', f.read(2))[0]
+        if length < 2:
+            return None
+        
+        if code in _JPEG_SOF:
+            segment = f.read(5)
+            height, width = struct.unpack('>HH', segment[1:5])
+            return ImageInfo('jpeg', 'image/jpeg', width, height, orientation)
+        
+        if code == 0xE1 and orientation is None:
+            segment = f.read(length - 2)
+            orientation = _exif_orientation(segment)
+            continue
+        
+        f.seek(length - 2, os.SEEK_CUR)
+
+
+def _exif_orientation(segment):
+    """Orientation tag (0x0112) from an APP1 Exif segment, or None."""
+    if not segment.startswith(b'Exif\x00\x00'):
+        return None
+    tiff = segment[6:]
+    if tiff[:2] == b'II':
+        endian = '<'
+    elif tiff[:2] == b'MM':
+        endian = '>'
+    else:
+        return None
+    
+    ifd_offset = struct.unpack(endian + 'I', tiff[4:8])[0]
+    count = struct.unpack(endian + 'H', tiff[ifd_offset:ifd_offset + 2])[0]
+    for i in range(count):
+        entry = ifd_offset + 2 + i * 12
+        tag, _, _, value = struct.unpack(endian + 'HHI4s', tiff[entry:entry + 12])
+        if tag == 0x0112:
+            orientation = struct.unpack(endian + 'H', value[:2])[0]
+            return orientation if 1 <= orientation <= 8 else None
+    return None
+
+
+def _svg_length(value):
+    match = _SVG_LENGTH.match(value or '')
+    return float(match.group(1)) if match else None
+
+
+def _probe_svg(data):
+    tag = _SVG_TAG.search(data)
+    if not tag:
+        return None
+    
+    attrs = {
+        name.decode('ascii', 'replace').lower(): (double or single).decode('utf-8', 'replace')
+        for name, double, single in _SVG_ATTR.findall(tag.group(0))
+    }
+    width = _svg_length(attrs.get('width'))
+    height = _svg_length(attrs.get('height'))
+    
+    viewbox = attrs.get('viewbox', '').replace(',', ' ').split()
+    if len(viewbox) == 4:
+        try:
+            vb_width, vb_height = float(viewbox[2]), float(viewbox[3])
+        except ValueError:
+            vb_width = vb_height = None
+        if vb_width and vb_height:
+            # Missing (or percentage) sizes follow the viewBox aspect ratio
+            if width is None and height is None:
+                width, height = vb_width, vb_height
+            elif width is None:
+                width = height * vb_width / vb_height
+            elif height is None:
+                height = width * vb_height / vb_width
+    
+    if width is None or height is None:
+        return ImageInfo('svg', 'image/svg+xml', None, None)
+    return ImageInfo('svg', 'image/svg+xml', round(width), round(height))
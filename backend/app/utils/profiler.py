@@ -0,0 +1,158 @@
+"""Statistical sampling profiler for running workers."""
+import os
+import sys
+import threading
+import time
+import logging
+from collections import Counter
+from datetime import datetime
+
+from app.middlewares.metrics_middleware import collapse_stack
+
+logger = logging.getLogger(__name__)
+
+
+class SamplingProfiler:
+    """
+    Thread-based statistical profiler.
+    
+    A daemon thread wakes up every ``interval`` seconds, reads
+    ``sys._current_frames()`` and counts the collapsed stack of every other
+    thread. Stacks are prefixed with the Flask endpoint the thread is
+    serving (taken from the metrics request registry), so the output can be
+    fed straight into flamegraph.pl or speedscope and split per endpoint.
+    
+    A thread is used rather than SIGPROF because signal handlers only run
+    in the main thread, which is not where requests run under threaded
+    servers.
+    
+    The counters are updated by the sampler thread while requests may read
+    them (an admin polling a running profile), so both sides hold
+    ``_lock``; readers work on copies.
+    """
+    
+    IDLE = '<no request>'
+    
+    def __init__(self, seconds, interval=0.005, active_requests=None, requests_only=True):
+        """
+        Args:
+            seconds: How long to sample
+            interval: Seconds between samples
+            active_requests: dict thread ident -> {'endpoint': ...} of requests
+                in flight (SlowRequestSampler._active), used for attribution
+            requests_only: Skip threads that are not serving a request
+        """
+        self.seconds = seconds
+        self.interval = interval
+        self.active_requests = active_requests if active_requests is not None else {}
+        self.requests_only = requests_only
+        self.stacks = Counter()
+        self.endpoint_samples = Counter()
+        self.sample_count = 0
+        self.started_at = None
+        self.finished_at = None
+        self._thread = None
+        self._done = threading.Event()
+        self._lock = threading.Lock()
+    
+    @property
+    def running(self):
+        return self._thread is not None and not self._done.is_set()
+    
+    def start(self, on_finish=None):
+        """
+        Start sampling in a background thread.
+        
+        Args:
+            on_finish: Optional callable(profiler) run when sampling ends
+        """
+        self.started_at = datetime.utcnow()
+        self._thread = threading.Thread(
+            target=self._run, args=(on_finish,), name='sampling-profiler', daemon=True
+        )
+        self._thread.start()
+        return self
+    
+    def wait(self, timeout=None):
+        """Block until sampling has finished."""
+        return self._done.wait(timeout)
+    
+    def _run(self, on_finish):
+        own_ident = threading.get_ident()
+        deadline = time.monotonic() + self.seconds
+        try:
+            while time.monotonic() < deadline:
+                self._sample(own_ident)
+                time.sleep(self.interval)
+        finally:
+            self.finished_at = datetime.utcnow()
+            self._done.set()
+        
+        if on_finish:
+            try:
+                on_finish(self)
+            except Exception:
+                logger.exception("Profiler on_finish callback failed")
+    
+    def _sample(self, own_ident):
+        # Collapse stacks outside the lock; only the counter updates hold it
+        samples = []
+        for ident, frame in sys._current_frames().items():
+            if ident == own_ident:
+                continue
+            entry = self.active_requests.get(ident)
+            if entry is None:
+                if self.requests_only:
+                    continue
+                endpoint = self.IDLE
+            else:
+                endpoint = entry['endpoint']
+            samples.append((endpoint, f"{endpoint};{collapse_stack(frame)}"))
+        
+        with self._lock:
+            self.sample_count += 1
+            for endpoint, stack in samples:
+                self.stacks[stack] += 1
+                self.endpoint_samples[endpoint] += 1
+    
+    def _snapshot(self):
+        """Copies of the counters, safe to iterate while sampling continues."""
+        with self._lock:
+            return Counter(self.stacks), Counter(self.endpoint_samples), self.sample_count
+    
+    def to_collapsed(self):
+        """
+        Collapsed stacks, one "frame;frame;frame count" line each.
+        
+        Returns:
+            str: flamegraph.pl / speedscope input
+        """
+        stacks = self._snapshot()[0]
+        return ''.join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+    
+    def summary(self, top=20):
+        """
+        Summarize where samples landed.
+        
+        Args:
+            top: Number of leaf frames to report
+        
+        Returns:
+            dict: Sampling metadata, samples per endpoint and hottest leaf frames
+        """
+        stacks, endpoint_samples, sample_count = self._snapshot()
+        leaves = Counter()
+        for stack, count in stacks.items():
+            leaves[stack.rsplit(';', 1)[-1]] += count
+        
+        return {
+            'pid': os.getpid(),
+            'seconds': self.seconds,
+            'interval_ms': round(self.interval * 1000, 2),
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None,
+            'running': self.running,
+            'ticks': sample_count,
+            'samples_by_endpoint': dict(endpoint_samples.most_common()),
+            'top_frames': [{'frame': frame, 'samples': count} for frame, count in leaves.most_common(top)],
+        }
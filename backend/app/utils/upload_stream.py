@@ -0,0 +1,240 @@
+"""Streaming file uploads with inline size limit, hashing and MIME sniffing."""
+import io
+import os
+import hashlib
+import tempfile
+import logging
+from flask import Request, current_app, has_app_context
+from werkzeug.exceptions import RequestEntityTooLarge
+
+logger = logging.getLogger(__name__)
+
+# Bytes kept from the start of the file for magic-byte sniffing
+SNIFF_BYTES = 512
+
+
+def sniff_mime(head):
+    """
+    Detect an image MIME type from the first bytes of a file.
+    
+    Args:
+        head: Leading bytes of the file (SNIFF_BYTES is enough)
+    
+    Returns:
+        str|None: MIME type, or None if the content is not a known image
+    """
+    if head.startswith(b'\x89PNG\r\n\x1a\n'):
+        return 'image/png'
+    if head.startswith(b'\xff\xd8\xff'):
+        return 'image/jpeg'
+    if head[:6] in (b'GIF87a', b'GIF89a'):
+        return 'image/gif'
+    if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+        return 'image/webp'
+    if head.startswith(b'BM'):
+        return 'image/bmp'
+    if head.startswith(b'\x00\x00\x01\x00'):
+        return 'image/x-icon'
+    
+    text = head.lstrip(b'\xef\xbb\xbf \t\r\n').lower()
+    if text.startswith(b'<') and b'<svg' in text:
+        return 'image/svg+xml'
+    
+    return None
+
+
+class HashingUploadFile:
+    """
+    Writable temp file for one uploaded part.
+    
+    Werkzeug's multipart parser writes each chunk here as it reads the
+    request body. In the same pass we count bytes, update a SHA-256 and
+    keep the first bytes for MIME sniffing. commit() then moves the temp
+    file into place with an atomic rename instead of copying it. If the
+    request ends without a commit, close() removes the temp file.
+    
+    Once ``max_size`` is exceeded the request aborts with 413, or, with
+    ``drain_oversize``, the temp file is deleted and the rest of the part
+    is read and dropped so the other parts of the request still parse;
+    ``too_large`` is then set for the caller to report.
+    """
+    
+    def __init__(self, tmp_dir, max_size, drain_oversize=False):
+        os.makedirs(tmp_dir, exist_ok=True)
+        self._file = tempfile.NamedTemporaryFile(dir=tmp_dir, suffix='.part', delete=False)
+        self.path = self._file.name
+        self.max_size = max_size
+        self.drain_oversize = drain_oversize
+        self.too_large = False
+        self.size = 0
+        self.head = b''
+        self._hash = hashlib.sha256()
+        self.committed = False
+    
+    @property
+    def sha256(self):
+        """Hex SHA-256 of everything written so far."""
+        return self._hash.hexdigest()
+    
+    @property
+    def mime_type(self):
+        """MIME type sniffed from magic bytes (None if unknown)."""
+        return sniff_mime(self.head)
+    
+    @property
+    def size_error(self):
+        """Error message for a part over ``max_size``."""
+        return f"File too large. Max size: {self.max_size / 1024 / 1024:g}MB"
+    
+    def write(self, data):
+        self.size += len(data)
+        if self.too_large:
+            return len(data)
+        if self.max_size is not None and self.size > self.max_size:
+            self.discard()
+            if not self.drain_oversize:
+                raise RequestEntityTooLarge(self.size_error)
+            self.too_large = True
+            # Empty stand-in so the parser's seek(0) and later reads still work
+            self._file = io.BytesIO()
+            return len(data)
+        if len(self.head) < SNIFF_BYTES:
+            self.head += data[:SNIFF_BYTES - len(self.head)]
+        self._hash.update(data)
+        return self._file.write(data)
+    
+    def commit(self, dest_path):
+        """
+        Atomically move the upload to its final path.
+        
+        The temp directory lives next to the destination, so this is a
+        rename on the same filesystem, not a copy.
+        """
+        self._file.flush()
+        self._file.close()
+        os.replace(self.path, dest_path)
+        self.path = dest_path
+        self.committed = True
+        return dest_path
+    
+    def discard(self):
+        """Close and delete the temp file."""
+        if not self._file.closed:
+            self._file.close()
+        if not self.committed:
+            try:
+                os.remove(self.path)
+            except FileNotFoundError:
+                pass
+    
+    def close(self):
+        self.discard()
+    
+    # File API used by FileStorage.save(), Pillow etc.
+    def read(self, *args):
+        return self._file.read(*args)
+    
+    def readline(self, *args):
+        return self._file.readline(*args)
+    
+    def seek(self, *args):
+        return self._file.seek(*args)
+    
+    def tell(self):
+        return self._file.tell()
+    
+    def seekable(self):
+        return True
+    
+    def readable(self):
+        return True
+    
+    def writable(self):
+        return True
+    
+    def flush(self):
+        return self._file.flush()
+    
+    @property
+    def closed(self):
+        return self._file.closed
+    
+    def __iter__(self):
+        return iter(self._file)
+
+
+def upload_limit(config_key):
+    """
+    Raise the request body limit for one view.
+    
+    MAX_CONTENT_LENGTH stays small for every other endpoint; views that
+    accept many files at once use a separate limit from ``config_key``.
+    Place it directly under the route decorator. Files over
+    UPLOAD_MAX_FILE_SIZE do not abort these requests; they are drained
+    and flagged (HashingUploadFile.too_large) so the view can report them
+    per file and still store the others.
+    """
+    def decorator(f):
+        f.max_content_length_key = config_key
+        return f
+    return decorator
+
+
+class StreamingUploadRequest(Request):
+    """
+    Request class that streams uploaded files through HashingUploadFile.
+    
+    Temp files go to ``<static>/uploads/.incoming`` so commit() can rename
+    them into ``uploads/<site_id>/``. The per-file limit is
+    UPLOAD_MAX_FILE_SIZE (MAX_CONTENT_LENGTH still caps the whole body,
+    unless the view raised it with upload_limit(); only that whole-body
+    limit answers 413 for those views).
+    
+    Every temp file created for the request is tracked, so close() can
+    remove the ones parsing never handed over in ``files`` (a 413 on a
+    later part, a client disconnect).
+    """
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._upload_streams = []
+    
+    def _upload_limit_key(self):
+        """Config key set with upload_limit() on this request's view, if any."""
+        view = current_app.view_functions.get(self.endpoint) if self.endpoint else None
+        return getattr(view, 'max_content_length_key', None)
+    
+    @property
+    def max_content_length(self):
+        """MAX_CONTENT_LENGTH, or the limit set with upload_limit() for this view."""
+        if not has_app_context():
+            return None
+        key = self._upload_limit_key()
+        if key:
+            return current_app.config.get(key)
+        return current_app.config['MAX_CONTENT_LENGTH']
+    
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        if not has_app_context() or not filename:
+            return super()._get_file_stream(total_content_length, content_type, filename, content_length)
+        
+        tmp_dir = os.path.join(current_app.static_folder, 'uploads', '.incoming')
+        max_size = current_app.config.get('UPLOAD_MAX_FILE_SIZE')
+        drain_oversize = self._upload_limit_key() is not None
+        
+        # Reject early when the browser told us the size
+        if not drain_oversize and max_size is not None and content_length and content_length > max_size:
+            raise RequestEntityTooLarge(f"File too large. Max size: {max_size / 1024 / 1024:g}MB")
+        
+        stream = HashingUploadFile(tmp_dir, max_size, drain_oversize)
+        self._upload_streams.append(stream)
+        return stream
+    
+    def close(self):
+        """Close the parsed files and discard every uncommitted temp file."""
+        try:
+            super().close()
+        finally:
+            for stream in self._upload_streams:
+                stream.discard()
+            self._upload_streams.clear()
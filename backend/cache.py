@@ -143,7 +143,7 @@ class SimpleCacheManager:
             return False
     
     def increment_page_views(self, page_id):
-        """Increment page view counter"""
+        """Increment page view counter (in-process only; served pages are counted by app.services.analytics_service)"""
         try:
             # Daily counter
             today = datetime.utcnow().strftime('%Y-%m-%d')
@@ -162,7 +162,7 @@ class SimpleCacheManager:
             return False
     
     def get_page_views(self, page_id, days=7):
-        """Get page view statistics"""
+        """Get page view statistics counted by increment_page_views"""
         try:
             stats = {'daily': {}, 'total': 0}
             
@@ -182,6 +182,28 @@ class SimpleCacheManager:
             current_app.logger.error(f"❌ Failed to get page {page_id} views: {e}")
             return {'daily': {}, 'total': 0}
     
+    def set_value(self, key, value, ttl=3600):
+        """Store an arbitrary value with a TTL"""
+        self.cache_data[key] = {
+            'value': value,
+            'expires_at': datetime.utcnow() + timedelta(seconds=ttl)
+        }
+        return True
+    
+    def get_value(self, key):
+        """Get a value stored with set_value (None if missing or expired)"""
+        entry = self.cache_data.get(key)
+        if not isinstance(entry, dict) or 'value' not in entry:
+            return None
+        if datetime.utcnow() >= entry['expires_at']:
+            self.cache_data.pop(key, None)
+            return None
+        return entry['value']
+    
+    def delete_value(self, key):
+        """Delete a value stored with set_value"""
+        return self.cache_data.pop(key, None) is not None
+    
     def clear_all_cache(self):
         """Clear all PageMade cache"""
         try:
@@ -0,0 +1,26 @@
+"""Add variants to asset table
+
+Revision ID: 3b7e1c2d9a41
+Revises: 25c59c183ca5
+Create Date: 2026-10-19 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3b7e1c2d9a41'
+down_revision = '25c59c183ca5'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('asset', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('variants', sa.Text(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('asset', schema=None) as batch_op:
+        batch_op.drop_column('variants')
@@ -0,0 +1,28 @@
+"""Add original_size and optimized_size to asset table
+
+Revision ID: 5f2a9c3e7b18
+Revises: 8c4d2e6f1a57
+Create Date: 2026-10-19 16:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5f2a9c3e7b18'
+down_revision = '8c4d2e6f1a57'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('asset', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('original_size', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('optimized_size', sa.Integer(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('asset', schema=None) as batch_op:
+        batch_op.drop_column('optimized_size')
+        batch_op.drop_column('original_size')
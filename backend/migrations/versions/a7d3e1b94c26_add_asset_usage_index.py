@@ -0,0 +1,52 @@
+"""Add asset_usage table, page.assets_indexed_at and asset.filename index
+
+Revision ID: a7d3e1b94c26
+Revises: 5f2a9c3e7b18
+Create Date: 2026-10-19 17:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a7d3e1b94c26'
+down_revision = '5f2a9c3e7b18'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('asset_usage',
+    sa.Column('asset_id', sa.Integer(), nullable=False),
+    sa.Column('page_id', sa.Integer(), nullable=False),
+    sa.Column('site_id', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['asset_id'], ['asset.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['page_id'], ['page.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['site_id'], ['site.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('asset_id', 'page_id')
+    )
+    with op.batch_alter_table('asset_usage', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_asset_usage_page_id'), ['page_id'], unique=False)
+        batch_op.create_index(batch_op.f('ix_asset_usage_site_id'), ['site_id'], unique=False)
+    
+    with op.batch_alter_table('page', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('assets_indexed_at', sa.DateTime(), nullable=True))
+    
+    with op.batch_alter_table('asset', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_asset_filename'), ['filename'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('asset', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_asset_filename'))
+    
+    with op.batch_alter_table('page', schema=None) as batch_op:
+        batch_op.drop_column('assets_indexed_at')
+    
+    with op.batch_alter_table('asset_usage', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_asset_usage_site_id'))
+        batch_op.drop_index(batch_op.f('ix_asset_usage_page_id'))
+    
+    op.drop_table('asset_usage')
@@ -0,0 +1,37 @@
+"""Add page_view_daily table
+
+Revision ID: d41b7a2c9e63
+Revises: a7d3e1b94c26
+Create Date: 2026-10-19 18:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd41b7a2c9e63'
+down_revision = 'a7d3e1b94c26'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('page_view_daily',
+    sa.Column('page_id', sa.Integer(), nullable=False),
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('site_id', sa.Integer(), nullable=False),
+    sa.Column('views', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['page_id'], ['page.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['site_id'], ['site.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('page_id', 'day')
+    )
+    with op.batch_alter_table('page_view_daily', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_page_view_daily_site_id'), ['site_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('page_view_daily', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_page_view_daily_site_id'))
+    
+    op.drop_table('page_view_daily')
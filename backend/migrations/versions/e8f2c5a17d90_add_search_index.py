@@ -0,0 +1,48 @@
+"""Add full-text search_index (FTS5 on SQLite, tsvector on PostgreSQL)
+
+Revision ID: e8f2c5a17d90
+Revises: d41b7a2c9e63
+Create Date: 2026-10-19 19:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e8f2c5a17d90'
+down_revision = 'd41b7a2c9e63'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Same DDL as SqliteSearchIndex / PostgresSearchIndex in
+    # app/services/search_service.py; fill it with
+    # scripts/maintenance/search_index.py
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        op.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS search_index USING fts5("
+            "title, description, body, "
+            "kind UNINDEXED, object_id UNINDEXED, site_id UNINDEXED, user_id UNINDEXED, "
+            "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+        )
+    elif dialect == 'postgresql':
+        op.execute(
+            "CREATE TABLE IF NOT EXISTS search_index ("
+            "id BIGINT PRIMARY KEY, kind VARCHAR(10) NOT NULL, object_id INTEGER NOT NULL, "
+            "site_id INTEGER NOT NULL, user_id INTEGER NOT NULL, "
+            "title TEXT, description TEXT, body TEXT, "
+            "tsv tsvector GENERATED ALWAYS AS ("
+            "setweight(to_tsvector('simple', coalesce(title, '')), 'A') || "
+            "setweight(to_tsvector('simple', coalesce(description, '')), 'B') || "
+            "setweight(to_tsvector('simple', coalesce(body, '')), 'C')) STORED)"
+        )
+        op.execute("CREATE INDEX IF NOT EXISTS ix_search_index_tsv ON search_index USING GIN (tsv)")
+        op.execute("CREATE INDEX IF NOT EXISTS ix_search_index_user_id ON search_index (user_id)")
+        op.execute("CREATE INDEX IF NOT EXISTS ix_search_index_site_id ON search_index (site_id)")
+
+
+def downgrade():
+    op.execute("DROP TABLE IF EXISTS search_index")
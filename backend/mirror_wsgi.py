@@ -0,0 +1,206 @@
+"""
+Static mirror for published sites: a WSGI app that serves files from site
+storage (app/storage/sites/<site_id>/) by Host header, without Flask,
+SQLAlchemy or any of the app's request hooks.
+
+Hosts and their pages come from ``_hosts.json`` at the storage root (see
+app/services/host_map.py), which the app rewrites on every publish event.
+Each worker re-reads it when its modification time changes, checked at
+most every MIRROR_RELOAD_INTERVAL seconds.
+
+Anything the mirror does not have answers 404, so a proxy can fall back
+to the app (pages never written to storage are still rendered there; see
+config/nginx_subdomain.conf). Page views served here are not counted.
+
+Usage:
+    gunicorn --workers 4 --bind 127.0.0.1:5001 mirror_wsgi:application
+
+Environment:
+    MIRROR_SITES_ROOT       Site storage folder (default: app/storage/sites)
+    MIRROR_RELOAD_INTERVAL  Seconds between host map checks (default: 1)
+"""
+import os
+import re
+import json
+import hashlib
+import time
+import logging
+import mimetypes
+import threading
+
+logger = logging.getLogger(__name__)
+
+HOST_MAP_KEY = '_hosts.json'
+SLUG_PATTERN = re.compile(r'^[\w-]+$')
+ASSET_PATTERN = re.compile(r'^\w[\w.-]*$')
+
+# Same headers as the app's routes for these files
+ROOT_FILES = {
+    'sitemap.xml': ('application/xml; charset=utf-8', 'public, max-age=3600'),
+    'robots.txt': ('text/plain; charset=utf-8', 'public, max-age=3600'),
+}
+HTML_TYPE = 'text/html; charset=utf-8'
+ASSET_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+
+class SiteMirror:
+    """WSGI application serving published site files by host."""
+    
+    def __init__(self, root, reload_interval=1.0):
+        self.root = os.path.abspath(root)
+        self.map_path = os.path.join(self.root, HOST_MAP_KEY)
+        self.reload_interval = reload_interval
+        self.hosts = {}
+        self._map_mtime = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        self.reload()
+    
+    @classmethod
+    def from_env(cls):
+        default_root = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'app', 'storage', 'sites')
+        return cls(os.environ.get('MIRROR_SITES_ROOT', default_root),
+                   float(os.environ.get('MIRROR_RELOAD_INTERVAL', 1)))
+    
+    def reload(self):
+        """
+        Re-read the host map if it changed since the last load.
+        
+        Returns:
+            bool: True if a new map was loaded
+        """
+        try:
+            mtime = os.stat(self.map_path).st_mtime_ns
+        except FileNotFoundError:
+            mtime = None
+        if mtime == self._map_mtime:
+            return False
+        
+        hosts = {}
+        if mtime is not None:
+            try:
+                with open(self.map_path, encoding='utf-8') as f:
+                    for host, entry in json.load(f)['hosts'].items():
+                        hosts[host] = (entry['dir'], entry['home'], frozenset(entry['pages']))
+            except (OSError, ValueError, KeyError, TypeError) as e:
+                # Keep serving the previous map; retried on the next check
+                logger.error("Could not load host map %s: %s", self.map_path, e)
+                return False
+        self.hosts, self._map_mtime = hosts, mtime
+        logger.info("Loaded host map: %d sites", len(hosts))
+        return True
+    
+    def _maybe_reload(self):
+        now = time.monotonic()
+        if now - self._checked_at < self.reload_interval or not self._lock.acquire(blocking=False):
+            return
+        try:
+            self._checked_at = now
+            self.reload()
+        finally:
+            self._lock.release()
+    
+    def resolve(self, host, path):
+        """
+        File to serve for a request.
+        
+        Returns:
+            tuple|None: (file path, content type, Cache-Control or None)
+        """
+        site = self.hosts.get(host.split(':', 1)[0].lower())
+        if site is None:
+            return None
+        site_dir, has_home, pages = site
+        
+        name = path[1:]
+        if name == '':
+            if not has_home:
+                return None
+            filename, content_type, cache_control = 'index.html', HTML_TYPE, None
+        elif name in ROOT_FILES:
+            filename = name
+            content_type, cache_control = ROOT_FILES[name]
+        elif name.startswith('assets/'):
+            asset = name[len('assets/'):]
+            if not ASSET_PATTERN.match(asset):
+                return None
+            filename, cache_control = name, ASSET_CACHE_CONTROL
+            content_type = mimetypes.guess_type(asset)[0] or 'application/octet-stream'
+            if content_type.startswith('text/'):
+                content_type += '; charset=utf-8'
+        elif SLUG_PATTERN.match(name) and name in pages:
+            filename, content_type, cache_control = f"{name}.html", HTML_TYPE, None
+        else:
+            return None
+        return os.path.join(self.root, site_dir, filename), content_type, cache_control
+    
+    def __call__(self, environ, start_response):
+        self._maybe_reload()
+        
+        method = environ['REQUEST_METHOD']
+        if method not in ('GET', 'HEAD'):
+            return self._error(start_response, '405 Method Not Allowed', [('Allow', 'GET, HEAD')])
+        
+        path_info = environ.get('PATH_INFO', '/')
+        target = self.resolve(environ.get('HTTP_HOST', ''), path_info)
+        if target is None:
+            return self._error(start_response, '404 Not Found')
+        path, content_type, cache_control = target
+        
+        try:
+            f = open(path, 'rb')
+        except (FileNotFoundError, IsADirectoryError, NotADirectoryError):
+            return self._error(start_response, '404 Not Found')
+        
+        st = os.fstat(f.fileno())
+        if path_info[1:] in ROOT_FILES:
+            # Small files the app validates by an MD5 of the body
+            with f:
+                body = f.read()
+            etag = f'"{hashlib.md5(body).hexdigest()}"'
+        else:
+            # Same validator format as LocalStorage.stat()
+            body = None
+            etag = f'"{int(st.st_mtime)}-{st.st_size}"'
+        headers = [('ETag', etag)]
+        if cache_control:
+            headers.append(('Cache-Control', cache_control))
+        
+        if etag in [tag.strip() for tag in environ.get('HTTP_IF_NONE_MATCH', '').split(',')]:
+            f.close()
+            start_response('304 Not Modified', headers)
+            return []
+        
+        size = st.st_size if body is None else len(body)
+        headers += [('Content-Type', content_type), ('Content-Length', str(size))]
+        start_response('200 OK', headers)
+        if method == 'HEAD':
+            f.close()
+            return []
+        if body is not None:
+            return [body]
+        
+        # Lets the server use sendfile() where it can
+        file_wrapper = environ.get('wsgi.file_wrapper')
+        if file_wrapper is not None:
+            return file_wrapper(f, 256 * 1024)
+        return _iter_file(f)
+    
+    @staticmethod
+    def _error(start_response, status, headers=()):
+        body = status.split(' ', 1)[1].encode('ascii')
+        start_response(status, [('Content-Type', 'text/plain; charset=utf-8'),
+                                ('Content-Length', str(len(body))), *headers])
+        return [body]
+
+
+def _iter_file(f, chunk_size=256 * 1024):
+    with f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+
+
+application = SiteMirror.from_env()
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Benchmark per-response CORS overhead.
+
+Compares the legacy after_request hook (origin list scan + header strings
+built on every response) with CORSMiddleware (frozenset lookup + prebuilt
+header tuples), and the legacy before_request preflight handler with the
+cached WSGI preflight response.
+
+Usage:
+    python scripts/benchmarks/bench_cors.py
+    python scripts/benchmarks/bench_cors.py --iterations 200000
+"""
+
+import argparse
+import os
+import sys
+import timeit
+
+# Add backend root to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from flask import Flask, Response, make_response, request
+
+from app.config.base import Config
+from app.middlewares.cors_middleware import configure_cors
+
+
+def legacy_add_cors_headers(response):
+    """Copy of the old create_app() after_request hook."""
+    if request.path.startswith('/api/') or request.path.startswith('/auth/'):
+        origin = request.headers.get('Origin')
+        allowed_origins = Config.CORS_ORIGINS
+        
+        if origin in allowed_origins:
+            response.headers['Access-Control-Allow-Origin'] = origin
+            response.headers['Access-Control-Allow-Credentials'] = 'true'
+            response.headers['Access-Control-Allow-Headers'] = 'Content-Type, Authorization, X-Requested-With'
+            response.headers['Access-Control-Allow-Methods'] = 'GET, POST, PUT, DELETE, OPTIONS'
+    else:
+        response.headers['Access-Control-Allow-Origin'] = '*'
+    return response
+
+
+def legacy_handle_preflight():
+    """Copy of the old create_app() before_request preflight handler."""
+    response = make_response()
+    origin = request.headers.get('Origin')
+    if origin in Config.CORS_ORIGINS:
+        response.headers['Access-Control-Allow-Origin'] = origin
+        response.headers['Access-Control-Allow-Credentials'] = 'true'
+        response.headers['Access-Control-Allow-Methods'] = 'GET, POST, PUT, DELETE, OPTIONS'
+        response.headers['Access-Control-Allow-Headers'] = 'Content-Type, Authorization, X-Requested-With'
+        response.headers['Access-Control-Max-Age'] = '3600'
+    return response
+
+
+SCENARIOS = [
+    # (label, path, host, origin)
+    ('api, allowed origin', '/api/pages/1', 'app.pagemade.site', 'https://editor.pagemade.site'),
+    ('static font, cross-origin', '/static/fonts/a.woff2', 'app.pagemade.site', 'https://shop.pagemade.site'),
+    ('same-origin (no Origin)', '/dashboard', 'app.pagemade.site', None),
+    ('published subdomain page', '/about', 'shop.pagemade.site', 'https://shop.pagemade.site'),
+]
+
+
+def _per_call_us(fn, iterations):
+    """Best-of-5 per-call time in microseconds."""
+    return min(timeit.repeat(fn, number=iterations, repeat=5)) / iterations * 1e6
+
+
+def bench_responses(app, middleware, iterations):
+    print(f"{'scenario':<30} {'legacy µs':>10} {'new µs':>10} {'speedup':>8}")
+    for label, path, host, origin in SCENARIOS:
+        headers = {'Host': host}
+        if origin:
+            headers['Origin'] = origin
+        with app.test_request_context(path, headers=headers):
+            # Each call gets a fresh response; the cost of building it is
+            # measured separately and subtracted
+            base = _per_call_us(lambda: Response('ok'), iterations)
+            legacy = _per_call_us(lambda: legacy_add_cors_headers(Response('ok')), iterations) - base
+            new = _per_call_us(lambda: middleware.add_cors_headers(Response('ok')), iterations) - base
+        print(f"{label:<30} {legacy:>10.3f} {new:>10.3f} {legacy / max(new, 0.001):>7.1f}x")
+
+
+def bench_preflight(app, middleware, iterations):
+    environ_headers = {
+        'Host': 'app.pagemade.site',
+        'Origin': 'https://editor.pagemade.site',
+        'Access-Control-Request-Method': 'POST',
+    }
+    with app.test_request_context('/api/pages/1', method='OPTIONS', headers=environ_headers):
+        legacy = _per_call_us(legacy_handle_preflight, iterations)
+        origin = request.headers['Origin']
+        new = _per_call_us(lambda: middleware._preflight_for(origin), iterations)
+    print(f"{'preflight (handler only)':<30} {legacy:>10.3f} {new:>10.3f} {legacy / new:>7.1f}x")
+    
+    # End-to-end through the WSGI stack
+    client = app.test_client()
+    
+    def run():
+        client.options('/api/pages/1', headers=environ_headers)
+    
+    e2e_iterations = max(iterations // 20, 1)
+    new_e2e = _per_call_us(run, e2e_iterations)
+    print(f"{'preflight (end-to-end)':<30} {'':>10} {new_e2e:>10.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--iterations', type=int, default=50000)
+    args = parser.parse_args()
+    
+    app = Flask(__name__)
+    app.config.from_object(Config)
+    middleware = configure_cors(app)
+    
+    print(f"CORS per-response overhead ({args.iterations} iterations, best of 5)\n")
+    bench_responses(app, middleware, args.iterations)
+    print()
+    bench_preflight(app, middleware, args.iterations)
+
+
+if __name__ == '__main__':
+    main()
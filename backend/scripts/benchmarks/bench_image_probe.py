@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Benchmark image dimension extraction.
+
+Compares the old AssetService.get_image_dimensions path (Image.open +
+.width/.height) with the header-only probe_image() on a corpus of large
+files. Without --corpus, a corpus of large PNG/JPEG/WebP/GIF/BMP files
+(including a progressive JPEG with EXIF orientation) is generated in a
+temp directory. Also reports how many bytes each path reads per file.
+
+Usage:
+    python scripts/benchmarks/bench_image_probe.py
+    python scripts/benchmarks/bench_image_probe.py --corpus /srv/static/uploads/7 --iterations 50
+"""
+
+import argparse
+import builtins
+import os
+import random
+import sys
+import tempfile
+import timeit
+
+# Add backend root to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from PIL import Image
+
+from app.utils.image_probe import probe_image
+
+
+def pillow_dimensions(path):
+    """Copy of the old get_image_dimensions()."""
+    try:
+        with Image.open(path) as img:
+            return img.width, img.height
+    except Exception:
+        return None, None
+
+
+def build_corpus(directory, size):
+    """Write noisy (hard to compress) large images in several formats."""
+    random.seed(42)
+    width, height = size
+    noise = Image.frombytes('RGB', (width, height), random.randbytes(width * height * 3))
+    exif = Image.Exif()
+    exif[0x0112] = 6
+    
+    files = {
+        'large.png': dict(format='PNG'),
+        'large.jpg': dict(format='JPEG', quality=90, exif=exif.tobytes()),
+        'progressive.jpg': dict(format='JPEG', quality=90, progressive=True),
+        'large.webp': dict(format='WEBP', quality=80),
+        'large.bmp': dict(format='BMP'),
+    }
+    paths = []
+    for name, options in files.items():
+        path = os.path.join(directory, name)
+        noise.save(path, **options)
+        paths.append(path)
+    
+    gif_path = os.path.join(directory, 'large.gif')
+    noise.convert('P').save(gif_path, format='GIF')
+    paths.append(gif_path)
+    
+    svg_path = os.path.join(directory, 'logo.svg')
+    with open(svg_path, 'w') as f:
+        f.write('<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 240 80">' + '<rect/>' * 5000 + '</svg>')
+    paths.append(svg_path)
+    return paths
+
+
+class ReadCounter:
+    """Count bytes read through open() while active."""
+    
+    def __init__(self):
+        self.bytes = 0
+        self._open = builtins.open
+    
+    def __enter__(self):
+        counter = self
+        original_open = self._open
+        
+        def counting_open(*args, **kwargs):
+            f = original_open(*args, **kwargs)
+            if 'b' not in (args[1] if len(args) > 1 else kwargs.get('mode', 'r')):
+                return f
+            read, readinto = f.read, getattr(f, 'readinto', None)
+            
+            def counted_read(*a):
+                data = read(*a)
+                counter.bytes += len(data)
+                return data
+            
+            f.read = counted_read
+            if readinto is not None:
+                def counted_readinto(buffer):
+                    n = readinto(buffer)
+                    counter.bytes += n or 0
+                    return n
+                f.readinto = counted_readinto
+            return f
+        
+        builtins.open = counting_open
+        return self
+    
+    def __exit__(self, *exc):
+        builtins.open = self._open
+        return False
+
+
+def _per_call_us(fn, iterations):
+    """Best-of-5 per-call time in microseconds."""
+    return min(timeit.repeat(fn, number=iterations, repeat=5)) / iterations * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--corpus', help='Directory of images (default: generated)')
+    parser.add_argument('--size', default='4000x3000', help='Generated image size')
+    parser.add_argument('--iterations', type=int, default=200)
+    args = parser.parse_args()
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.corpus:
+            paths = [entry.path for entry in os.scandir(args.corpus) if entry.is_file()]
+        else:
+            width, height = (int(v) for v in args.size.split('x'))
+            print(f"Generating {width}x{height} corpus...")
+            paths = build_corpus(tmp, (width, height))
+        
+        print(f"\nImage dimensions ({args.iterations} iterations, best of 5)\n")
+        print(f"{'file':<22} {'MB':>6} {'pillow µs':>10} {'probe µs':>9} {'speedup':>8} "
+              f"{'pillow KB read':>15} {'probe KB read':>14}  result")
+        total_pillow = total_probe = 0.0
+        for path in sorted(paths):
+            pillow = _per_call_us(lambda: pillow_dimensions(path), args.iterations)
+            probe = _per_call_us(lambda: probe_image(path), args.iterations)
+            total_pillow += pillow
+            total_probe += probe
+            
+            with ReadCounter() as pillow_reads:
+                pillow_dimensions(path)
+            with ReadCounter() as probe_reads:
+                info = probe_image(path)
+            
+            result = f"{info.width}x{info.height}" if info else 'unknown'
+            if info and info.orientation:
+                result += f" (orientation {info.orientation})"
+            print(f"{os.path.basename(path)[:22]:<22} {os.path.getsize(path) / 1e6:>6.1f} "
+                  f"{pillow:>10.1f} {probe:>9.1f} {pillow / probe:>7.1f}x "
+                  f"{pillow_reads.bytes / 1024:>15.1f} {probe_reads.bytes / 1024:>14.1f}  {result}")
+        
+        print(f"\n{'total':<22} {'':>6} {total_pillow:>10.1f} {total_probe:>9.1f} {total_pillow / total_probe:>7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
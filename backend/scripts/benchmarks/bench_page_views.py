@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Benchmark the cost of counting page views while serving pages.
+
+Compares the legacy in-process counter (SimpleCacheManager, two dict
+updates and a strftime per hit) with PageViewBuffer.record() (one deque
+append), measures record() under concurrent writers with the flush thread
+running, and serves a published page end-to-end with counting off and on.
+
+Usage:
+    python scripts/benchmarks/bench_page_views.py
+    python scripts/benchmarks/bench_page_views.py --iterations 200000 --threads 8
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import timeit
+
+# Add backend root to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+# The config reads these at import time
+WORKDIR = tempfile.mkdtemp(prefix='bench_page_views_')
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(WORKDIR, 'bench.db')}"
+os.environ['ANALYTICS_FLUSH_INTERVAL'] = '1'
+os.environ['SERVER_TIMING_ENABLED'] = 'false'
+
+from app import create_app
+from app.models import db, User, Site, Page, PageViewDaily
+from app.services.analytics_service import PageViewBuffer, get_page_view_buffer
+from app.services.storage_backend import LocalStorage
+from cache import SimpleCacheManager
+
+
+def _per_call_us(fn, iterations):
+    """Best-of-5 per-call time in microseconds."""
+    return min(timeit.repeat(fn, number=iterations, repeat=5)) / iterations * 1e6
+
+
+def make_app(workdir):
+    app = create_app('production')  # no SQL echo or debug logging
+    app.logger.disabled = True
+    
+    sites_dir = os.path.join(workdir, 'sites')
+    app.extensions['storage'] = {'sites': LocalStorage(sites_dir)}
+    with app.app_context():
+        db.create_all()
+        user = User(email='bench@example.com', name='Bench')
+        db.session.add(user)
+        db.session.flush()
+        site = Site(title='Bench', subdomain='bench', user_id=user.id, is_published=True)
+        db.session.add(site)
+        db.session.flush()
+        page = Page(title='About', slug='about', site_id=site.id, user_id=user.id, is_published=True)
+        db.session.add(page)
+        db.session.commit()
+        site_id, page_id = site.id, page.id
+    os.makedirs(os.path.join(sites_dir, str(site_id)))
+    with open(os.path.join(sites_dir, str(site_id), 'about.html'), 'w') as f:
+        f.write('<!DOCTYPE html><html><body>' + '<p>Lorem ipsum</p>' * 200 + '</body></html>')
+    return app, page_id
+
+
+def bench_record(app, page_id, iterations):
+    legacy = SimpleCacheManager()
+    buffer = PageViewBuffer(app, flush_interval=0, max_buffer=10 ** 9)
+    
+    print(f"{'counter':<30} {'µs/hit':>10}")
+    print(f"{'SimpleCacheManager (legacy)':<30} {_per_call_us(lambda: legacy.increment_page_views(page_id), iterations):>10.3f}")
+    print(f"{'PageViewBuffer.record':<30} {_per_call_us(lambda: buffer.record(page_id, 1), iterations):>10.3f}")
+    
+    start = time.perf_counter()
+    written = buffer.flush()
+    print(f"{'flush (1 row, upsert)':<30} {(time.perf_counter() - start) * 1e3:>9.1f}ms  ({written} hits)")
+
+
+def bench_concurrent(app, page_id, iterations, threads):
+    buffer = PageViewBuffer(app, flush_interval=0.05, max_buffer=10 ** 9)
+    per_thread = iterations // threads
+    with app.app_context():
+        before = db.session.query(db.func.sum(PageViewDaily.views)).scalar() or 0
+    
+    def worker():
+        record = buffer.record
+        for _ in range(per_thread):
+            record(page_id, 1)
+    
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    start = time.perf_counter()
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    elapsed = time.perf_counter() - start
+    buffer.stop()
+    
+    with app.app_context():
+        counted = (db.session.query(db.func.sum(PageViewDaily.views)).scalar() or 0) - before
+    print(f"{threads} threads x {per_thread} hits: {per_thread * threads / elapsed / 1e6:.2f}M hits/s, "
+          f"{counted} counted (flush thread running), {buffer.dropped} dropped")
+
+
+def bench_serving(app, page_id, iterations):
+    client = app.test_client()
+    headers = {'Host': 'bench.pagemade.site'}
+    
+    def run():
+        client.get('/about', headers=headers)
+    
+    assert client.get('/about', headers=headers).status_code == 200
+    
+    # Alternate the two modes so drift affects both equally
+    timings = {False: [], True: []}
+    for _ in range(5):
+        for enabled in (False, True):
+            app.config['ANALYTICS_ENABLED'] = enabled
+            timings[enabled].append(timeit.timeit(run, number=iterations) / iterations * 1e6)
+    off, on = min(timings[False]), min(timings[True])
+    get_page_view_buffer(app).stop()
+    
+    print(f"{'serving /about':<30} {'off µs':>10} {'on µs':>10} {'overhead':>9}")
+    print(f"{'':<30} {off:>10.1f} {on:>10.1f} {(on - off) / off * 100:>8.1f}%")
+    print(f"{'':<30} {1e6 / off:>8.0f}/s {1e6 / on:>8.0f}/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--iterations', type=int, default=100000)
+    parser.add_argument('--threads', type=int, default=4)
+    args = parser.parse_args()
+    
+    try:
+        app, page_id = make_app(WORKDIR)
+        
+        print(f"Page view counting ({args.iterations} iterations, best of 5)\n")
+        bench_record(app, page_id, args.iterations)
+        print()
+        bench_concurrent(app, page_id, args.iterations, args.threads)
+        print()
+        bench_serving(app, page_id, max(args.iterations // 200, 1))
+    finally:
+        shutil.rmtree(WORKDIR, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
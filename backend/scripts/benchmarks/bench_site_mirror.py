@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Benchmark serving a published site through the Flask app vs the static mirror.
+
+Publishes a site with a homepage and one page into a temporary storage
+folder, writes the host map, then requests both URLs through the full app
+(serve_user_site / serve_user_page) and through mirror_wsgi.SiteMirror,
+with the same in-process WSGI test client so only the server side differs.
+
+Usage:
+    python scripts/benchmarks/bench_site_mirror.py
+    python scripts/benchmarks/bench_site_mirror.py --iterations 5000 --page-kb 50
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import timeit
+from datetime import datetime
+
+# Add backend root to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+# The config reads these at import time
+WORKDIR = tempfile.mkdtemp(prefix='bench_site_mirror_')
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(WORKDIR, 'bench.db')}"
+os.environ['ANALYTICS_FLUSH_INTERVAL'] = '0'
+os.environ['SERVER_TIMING_ENABLED'] = 'false'
+os.environ['MIRROR_SITES_ROOT'] = os.path.join(WORKDIR, 'sites')
+
+from werkzeug.test import Client
+
+from app import create_app
+from app.models import db, User, Site, Page
+from app.services.analytics_service import get_page_view_buffer
+from app.services.host_map import HostMap
+from app.services.storage_backend import LocalStorage
+from mirror_wsgi import SiteMirror
+
+
+def _per_request_us(client, path, iterations):
+    """Best-of-5 per-request time in microseconds."""
+    headers = {'Host': 'bench.pagemade.site'}
+    response = client.get(path, headers=headers)
+    assert response.status_code == 200, (path, response.status_code)
+    return min(timeit.repeat(lambda: client.get(path, headers=headers).close(),
+                             number=iterations, repeat=5)) / iterations * 1e6
+
+
+def make_app(workdir, page_kb):
+    app = create_app('production')  # no SQL echo or debug logging
+    app.logger.disabled = True
+    
+    sites_dir = os.path.join(workdir, 'sites')
+    storage = LocalStorage(sites_dir)
+    app.extensions['storage'] = {'sites': storage}
+    html = '<!DOCTYPE html><html><body>' + '<p>Lorem ipsum dolor sit amet.</p>' * (page_kb * 32) + '</body></html>'
+    with app.app_context():
+        db.create_all()
+        user = User(email='bench@example.com', name='Bench')
+        db.session.add(user)
+        db.session.flush()
+        site = Site(title='Bench', subdomain='bench', user_id=user.id, is_published=True)
+        db.session.add(site)
+        db.session.flush()
+        now = datetime.utcnow()
+        db.session.add_all([
+            Page(title='Home', slug='home', site_id=site.id, user_id=user.id, is_homepage=True,
+                 is_published=True, published_at=now),
+            Page(title='About', slug='about', site_id=site.id, user_id=user.id, is_published=True, published_at=now),
+        ])
+        db.session.commit()
+        storage.save(f"{site.id}/index.html", html)
+        storage.save(f"{site.id}/about.html", html)
+        HostMap.write()
+    return app, sites_dir
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--iterations', type=int, default=2000)
+    parser.add_argument('--page-kb', type=int, default=20, help='Approximate size of each page')
+    args = parser.parse_args()
+    
+    try:
+        app, sites_dir = make_app(WORKDIR, args.page_kb)
+        clients = {
+            'Flask app': app.test_client(),
+            'SiteMirror': Client(SiteMirror(sites_dir)),
+        }
+        
+        print(f"Serving a published site ({args.iterations} requests, ~{args.page_kb} KB pages, best of 5)\n")
+        print(f"{'path':<10} {'server':<12} {'µs/req':>10} {'req/s':>10} {'speedup':>8}")
+        for path in ('/', '/about'):
+            timings = {name: _per_request_us(client, path, args.iterations) for name, client in clients.items()}
+            base = timings['Flask app']
+            for name, us in timings.items():
+                print(f"{path:<10} {name:<12} {us:>10.1f} {1e6 / us:>10.0f} {base / us:>7.1f}x")
+        get_page_view_buffer(app).stop()
+    finally:
+        shutil.rmtree(WORKDIR, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+Build the asset usage index and collect unused assets.
+
+Pages saved before the index existed are indexed first (--rebuild-all
+re-scans every page). Then assets that no page references and that are
+older than --min-age-days are listed; with --delete they are removed
+(files, variants and rows) through AssetService.delete_asset.
+
+Usage:
+    python scripts/maintenance/asset_usage.py [--site ID] [--min-age-days 7] [--delete]
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from app import create_app
+from app.services.asset_usage_service import AssetUsageService
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--site', type=int, help='Only collect assets of this site')
+    parser.add_argument('--min-age-days', type=int, default=7, help='Keep assets uploaded in the last N days')
+    parser.add_argument('--rebuild-all', action='store_true', help='Re-index every page, not only new ones')
+    parser.add_argument('--delete', action='store_true', help='Delete unused assets (default: report only)')
+    args = parser.parse_args()
+    
+    app = create_app(os.environ.get('FLASK_ENV', 'development'))
+    with app.app_context():
+        stats = AssetUsageService.rebuild(all_pages=args.rebuild_all)
+        print(f"Indexed pages: {stats['pages']} (+{stats['added']} / -{stats['removed']} references)")
+        
+        report = AssetUsageService.collect_garbage(
+            app.static_folder, site_id=args.site, min_age_days=args.min_age_days, delete=args.delete
+        )
+    
+    for asset in report['unused']:
+        print(f"unused  site={asset['site_id']:<6} {asset['filename']}  {asset['file_size']} bytes  ({asset['original_name']})")
+    
+    print(f"\nUnused assets: {len(report['unused'])} ({report['unused_bytes']} bytes)")
+    if args.delete:
+        print(f"Deleted:       {report['deleted']}")
+        for failure in report['failed']:
+            print(f"failed  asset={failure['id']}: {failure['error']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+"""
+Move existing uploads into the content-addressed store.
+
+Hashes every Asset that has no content_hash yet and hard-links its file to
+uploads/.blobs/, replacing duplicates with links to a single copy. Safe to
+run repeatedly; already hashed assets are skipped.
+
+Usage:
+    python scripts/maintenance/dedupe_assets.py [--batch-size 500]
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from app import create_app
+from app.services.content_store import ContentStore
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--batch-size', type=int, default=500)
+    args = parser.parse_args()
+    
+    app = create_app(os.environ.get('FLASK_ENV', 'development'))
+    with app.app_context():
+        stats = ContentStore.dedupe_existing(app.static_folder, batch_size=args.batch_size)
+    
+    print(f"Hashed:        {stats['hashed']}")
+    print(f"Deduplicated:  {stats['deduplicated']}")
+    print(f"Missing files: {stats['missing']}")
+    print(f"Bytes saved:   {stats['bytes_saved']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,35 @@
+#!/usr/bin/env python3
+"""
+Write the host map used by the static mirror (mirror_wsgi.py).
+
+The app rewrites _hosts.json in site storage on every publish event; run
+this once before starting the mirror for the first time, or after
+restoring a database.
+
+Usage:
+    python scripts/maintenance/host_map.py
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from app import create_app
+from app.services.host_map import HostMap
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.parse_args()
+    
+    app = create_app(os.environ.get('FLASK_ENV', 'development'))
+    with app.app_context():
+        changed = HostMap.write()
+        hosts = HostMap.build()['hosts']
+    
+    print(f"Published sites: {len(hosts)} ({'written' if changed else 'unchanged'})")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Reconcile the uploads volume with the Asset table.
+
+Reports files on disk that no Asset references (orphans) and Asset files
+that are missing from disk. With --quarantine, orphans are moved to
+static/uploads/.quarantine/<timestamp>/ instead of being deleted, so they
+can be restored or removed after review.
+
+Usage:
+    python scripts/maintenance/reconcile_uploads.py [--quarantine] [--json report.json]
+"""
+import argparse
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from app import create_app
+from app.services.upload_reconciler import UploadReconciler
+
+
+def print_progress(progress):
+    sys.stderr.write(
+        f"\r[{progress['phase']:<12}] assets: {progress['assets']:>8}  files: {progress['scanned']:>8}"
+    )
+    sys.stderr.flush()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--quarantine', action='store_true', help='Move orphaned files to uploads/.quarantine/')
+    parser.add_argument('--json', metavar='PATH', help='Write the full report as JSON')
+    parser.add_argument('--grace', type=int, default=300, help='Ignore files changed in the last N seconds')
+    args = parser.parse_args()
+    
+    app = create_app(os.environ.get('FLASK_ENV', 'development'))
+    with app.app_context():
+        reconciler = UploadReconciler(app.static_folder, progress=print_progress, grace_seconds=args.grace)
+        report = reconciler.run(quarantine=args.quarantine)
+    sys.stderr.write('\n')
+    
+    for path in report['orphaned']:
+        print(f"orphaned  {path}")
+    for path in report['missing']:
+        print(f"missing   {path}")
+    
+    print(f"\nAssets:        {report['assets']}")
+    print(f"Files scanned: {report['scanned_files']}")
+    print(f"Orphaned:      {len(report['orphaned'])} ({report['orphaned_bytes']} bytes)")
+    print(f"Missing:       {len(report['missing'])}")
+    print(f"Stale uploads: {report['incoming_removed']} removed ({report['incoming_bytes']} bytes)")
+    if report['quarantine_dir']:
+        print(f"Quarantined to {report['quarantine_dir']}")
+    
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+"""
+Build the full-text search index for existing pages and assets.
+
+Pages and assets are indexed as they are saved; run this once after the
+search_index migration, or after restoring a database, to index what was
+saved before. Documents are rewritten in place, so it is safe to re-run.
+
+Usage:
+    python scripts/maintenance/search_index.py [--batch-size 200]
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from app import create_app
+from app.services.search_service import SearchService, get_search_index
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--batch-size', type=int, default=200, help='Rows indexed per transaction')
+    args = parser.parse_args()
+    
+    app = create_app(os.environ.get('FLASK_ENV', 'development'))
+    with app.app_context():
+        if get_search_index() is None:
+            sys.exit("Full-text search is not supported on this database")
+        stats = SearchService.rebuild(batch_size=args.batch_size)
+    
+    print(f"Indexed pages:  {stats['pages']}")
+    print(f"Indexed assets: {stats['assets']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -20,7 +20,7 @@ else
     . venv/bin/activate
     
     echo "📦 Installing dependencies..."
-    pip install Flask==2.3.3 Flask-SQLAlchemy==3.0.5 Flask-Login==0.6.3 Flask-Migrate==4.0.5 flask-cors==6.0.1 python-dotenv==1.0.0 Authlib==1.2.1 requests==2.31.0 redis==5.0.0
+    pip install Flask==2.3.3 Flask-SQLAlchemy==3.0.5 Flask-Login==0.6.3 Flask-Migrate==4.0.5 python-dotenv==1.0.0 Authlib==1.2.1 requests==2.31.0 redis==5.0.0
 fi
 
 # Activate virtual environment
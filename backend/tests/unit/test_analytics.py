@@ -0,0 +1,126 @@
+"""Unit tests for buffered page view counting."""
+from datetime import datetime, timedelta
+
+import pytest
+from flask import Flask
+
+from app.models import db, User, Site, Page, PageViewDaily
+from app.repositories.page_view_repository import PageViewRepository
+from app.services.analytics_service import PageViewBuffer, PageViewService
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{tmp_path / 'views.db'}"
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+        user = User(email='a@example.com', name='A')
+        db.session.add(user)
+        db.session.flush()
+        site = Site(title='Shop', subdomain='shop', user_id=user.id)
+        db.session.add(site)
+        db.session.flush()
+        db.session.add_all([
+            Page(id=1, title='Home', slug='home', site_id=site.id, user_id=user.id),
+            Page(id=2, title='About', slug='about', site_id=site.id, user_id=user.id),
+        ])
+        db.session.commit()
+    return app
+
+
+def _rows(app):
+    with app.app_context():
+        return {(row.page_id, row.views) for row in PageViewDaily.query}
+
+
+class TestPageViewBuffer:
+    
+    def test_flush_aggregates_hits(self, app):
+        buffer = PageViewBuffer(app, flush_interval=0)
+        for _ in range(3):
+            buffer.record(1, 1)
+        buffer.record(2, 1)
+        
+        assert buffer.pending() == 4
+        assert buffer.flush() == 4
+        assert buffer.pending() == 0
+        assert _rows(app) == {(1, 3), (2, 1)}
+    
+    def test_flushes_add_to_existing_rows(self, app):
+        buffers = [PageViewBuffer(app, flush_interval=0) for _ in range(2)]  # two workers
+        buffers[0].record(1, 1)
+        buffers[1].record(1, 1)
+        buffers[1].record(1, 1)
+        
+        buffers[0].flush()
+        buffers[1].flush()
+        
+        assert _rows(app) == {(1, 3)}
+    
+    def test_full_buffer_drops_hits(self, app):
+        buffer = PageViewBuffer(app, flush_interval=0, max_buffer=2)
+        for _ in range(5):
+            buffer.record(1, 1)
+        
+        assert buffer.dropped == 3
+        assert buffer.flush() == 2
+    
+    def test_deleted_pages_are_skipped(self, app):
+        buffer = PageViewBuffer(app, flush_interval=0)
+        buffer.record(99, 1)
+        buffer.record(1, 1)
+        
+        assert buffer.flush() == 1
+        assert _rows(app) == {(1, 1)}
+    
+    def test_failed_flush_is_retried(self, app, monkeypatch):
+        buffer = PageViewBuffer(app, flush_interval=0)
+        buffer.record(1, 1)
+        
+        def fail(counts):
+            raise RuntimeError('database down')
+        monkeypatch.setattr(PageViewRepository, 'add_counts', staticmethod(fail))
+        assert buffer.flush() == 0
+        assert buffer.pending() == 1
+        
+        monkeypatch.undo()
+        buffer.record(1, 1)
+        assert buffer.flush() == 2
+        assert _rows(app) == {(1, 2)}
+    
+    def test_background_flush(self, app):
+        buffer = PageViewBuffer(app, flush_interval=0.01)
+        buffer.record(2, 1)
+        
+        buffer.stop()
+        
+        assert _rows(app) == {(2, 1)}
+
+
+class TestPageViewService:
+    
+    def test_daily_series_and_total(self, app):
+        today = datetime.utcnow().date()
+        with app.app_context():
+            PageViewRepository.add_counts({
+                (1, 1, today): 4,
+                (1, 1, today - timedelta(days=2)): 2,
+                (1, 1, today - timedelta(days=30)): 10,
+                (2, 1, today): 1,
+            })
+            db.session.commit()
+            
+            stats = PageViewService.get_page_views(1, days=3)
+            site_stats = PageViewService.get_site_views(1, days=1)
+        
+        assert stats == {
+            'daily': {
+                (today - timedelta(days=2)).isoformat(): 2,
+                (today - timedelta(days=1)).isoformat(): 0,
+                today.isoformat(): 4,
+            },
+            'total': 16,
+        }
+        assert site_stats == {'daily': {today.isoformat(): 5}, 'total': 17}
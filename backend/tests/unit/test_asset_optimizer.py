@@ -0,0 +1,171 @@
+"""Unit tests for upload optimization (PNG/JPEG/GIF/SVG)."""
+import io
+import os
+import struct
+import zlib
+
+import pytest
+from PIL import Image
+
+from app.services.asset_optimizer import AssetOptimizer, SvgSanitizeError
+
+
+def _png(path, mode='RGBA', size=(200, 120), colors=4):
+    image = Image.new(mode, size)
+    pixels = image.load()
+    for x in range(size[0]):
+        for y in range(size[1]):
+            shade = (x // (size[0] // colors)) * 60
+            pixels[x, y] = (shade, 255 - shade, 80, 255)[:len(mode)]
+    # Unoptimized encoding, like many editors produce
+    image.save(path, 'PNG', compress_level=1)
+    return image
+
+
+class TestRasterOptimization:
+    
+    def test_png_is_lossless_and_smaller(self, tmp_path):
+        source = str(tmp_path / 'a.png')
+        dest = str(tmp_path / 'a.opt.png')
+        original = _png(source)
+        
+        assert AssetOptimizer.optimize_png(source, dest) is True
+        
+        assert os.path.getsize(dest) < os.path.getsize(source)
+        with Image.open(dest) as optimized:
+            # Opaque alpha dropped and few colors -> exact palette
+            assert optimized.mode == 'P'
+            assert list(optimized.convert('RGBA').getdata()) == list(original.getdata())
+    
+    def test_png_keeps_real_transparency(self, tmp_path):
+        source = str(tmp_path / 'a.png')
+        dest = str(tmp_path / 'a.opt.png')
+        image = Image.new('RGBA', (50, 50), (255, 0, 0, 128))
+        image.save(source, 'PNG', compress_level=1)
+        
+        AssetOptimizer.optimize_png(source, dest)
+        
+        with Image.open(dest) as optimized:
+            assert optimized.mode == 'RGBA'
+            assert optimized.getpixel((10, 10)) == (255, 0, 0, 128)
+    
+    def test_16_bit_png_is_left_alone(self, tmp_path):
+        # Pillow cannot write 16-bit RGB, so build the file by hand
+        def chunk(kind, data):
+            return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data))
+        
+        width, height = 20, 10
+        rows = b''.join(b'\x00' + struct.pack('>3H', 1000, 2000, 3000 + y) * width for y in range(height))
+        source = tmp_path / 'deep.png'
+        source.write_bytes(
+            b'\x89PNG\r\n\x1a\n'
+            + chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 16, 2, 0, 0, 0))
+            + chunk(b'IDAT', zlib.compress(rows, 0))
+            + chunk(b'IEND', b'')
+        )
+        dest = str(tmp_path / 'deep.opt.png')
+        
+        assert AssetOptimizer.optimize_png(str(source), dest) is False
+        assert not os.path.exists(dest)
+        
+        grey = str(tmp_path / 'grey.png')
+        Image.new('I;16', (20, 10), 40000).save(grey, 'PNG')
+        assert AssetOptimizer.optimize_png(grey, dest) is False
+    
+    def test_jpeg_keeps_quantization_and_exif(self, tmp_path):
+        source = str(tmp_path / 'a.jpg')
+        dest = str(tmp_path / 'a.opt.jpg')
+        exif = Image.Exif()
+        exif[0x0112] = 6
+        Image.new('RGB', (64, 64), (10, 120, 200)).save(source, 'JPEG', quality=90, exif=exif)
+        
+        assert AssetOptimizer.optimize_jpeg(source, dest) is True
+        
+        with Image.open(source) as before, Image.open(dest) as after:
+            assert after.quantization == before.quantization
+            assert after.getexif()[0x0112] == 6
+            assert after.info.get('progressive') or after.info.get('progression')
+    
+    def test_gif_to_animated_webp(self, tmp_path):
+        source = str(tmp_path / 'a.gif')
+        dest = str(tmp_path / 'a.webp')
+        frames = [Image.new('RGB', (40, 30), color) for color in ('red', 'green', 'blue')]
+        frames[0].save(source, 'GIF', save_all=True, append_images=frames[1:], duration=100, loop=0)
+        
+        width, height, animated = AssetOptimizer.gif_to_webp(source, dest, quality=80)
+        
+        assert (width, height, animated) == (40, 30, True)
+        with Image.open(dest) as webp:
+            assert webp.format == 'WEBP'
+            assert webp.n_frames == 3
+    
+    def test_is_optimizable(self):
+        assert AssetOptimizer.is_optimizable('a.JPEG')
+        assert AssetOptimizer.is_optimizable('a.gif')
+        assert not AssetOptimizer.is_optimizable('a.svg')
+        assert not AssetOptimizer.is_optimizable('a.webp')
+
+
+class TestSvgSanitize:
+    
+    def test_minifies_and_drops_editor_metadata(self):
+        svg = b'''<?xml version="1.0"?>
+<!-- Created with Inkscape -->
+<svg xmlns="http://www.w3.org/2000/svg"
+     xmlns:inkscape="http://www.inkscape.org/namespaces/inkscape"
+     width="10" height="10" inkscape:version="1.2">
+  <metadata><rdf /></metadata>
+  <g>
+    <rect width="10" height="10" fill="red" />
+  </g>
+</svg>'''
+        
+        cleaned = AssetOptimizer.sanitize_svg(svg)
+        
+        assert cleaned == (
+            b'<svg xmlns="http://www.w3.org/2000/svg" width="10" height="10">'
+            b'<g><rect width="10" height="10" fill="red" /></g></svg>'
+        )
+    
+    def test_removes_scripts_and_handlers(self):
+        svg = b'''<svg xmlns="http://www.w3.org/2000/svg" xmlns:xlink="http://www.w3.org/1999/xlink" onload="alert(1)">
+  <script>alert(1)</script>
+  <foreignObject><div>x</div></foreignObject>
+  <a xlink:href=" java&#x09;script:alert(1)"><circle r="1" onclick="x()" /></a>
+  <a href="https://example.com"><rect width="1" height="1" /></a>
+  <set attributeName="href" to="javascript:alert(1)" />
+</svg>'''
+        
+        cleaned = AssetOptimizer.sanitize_svg(svg).decode('utf-8')
+        
+        assert 'script' not in cleaned.lower()
+        assert 'onload' not in cleaned and 'onclick' not in cleaned
+        assert 'foreignObject' not in cleaned
+        assert '<set' not in cleaned
+        assert 'href="https://example.com"' in cleaned
+    
+    def test_keeps_text_whitespace(self):
+        svg = b'<svg xmlns="http://www.w3.org/2000/svg"><text x="0">Hello <tspan>big</tspan> world</text></svg>'
+        
+        cleaned = AssetOptimizer.sanitize_svg(svg)
+        
+        assert b'<text x="0">Hello <tspan>big</tspan> world</text>' in cleaned
+    
+    @pytest.mark.parametrize('data', [
+        b'<!DOCTYPE svg [<!ENTITY a "aaaa">]><svg xmlns="http://www.w3.org/2000/svg">&a;</svg>',
+        b'<svg xmlns="http://www.w3.org/2000/svg"><g></svg>',
+        b'<html><svg /></html>',
+    ])
+    def test_rejects_unsafe_or_invalid(self, data):
+        with pytest.raises(SvgSanitizeError):
+            AssetOptimizer.sanitize_svg(data)
+    
+    def test_optimize_svg_file_in_place(self, tmp_path):
+        path = tmp_path / 'icon.svg'
+        path.write_bytes(b'<svg xmlns="http://www.w3.org/2000/svg">\n  <rect width="1" height="1"/>\n</svg>\n')
+        
+        result = AssetOptimizer.optimize_svg_file(str(path))
+        
+        assert path.read_bytes() == b'<svg xmlns="http://www.w3.org/2000/svg"><rect width="1" height="1" /></svg>'
+        assert result['size'] == len(path.read_bytes())
+        assert len(result['sha256']) == 64
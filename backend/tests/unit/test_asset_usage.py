@@ -0,0 +1,191 @@
+"""Unit tests for the asset usage index."""
+import json
+import os
+from datetime import datetime, timedelta
+
+import pytest
+from flask import Flask
+
+from app.models import db, User, Site, Page, Asset, AssetUsage
+from app.services.asset_usage_service import AssetUsageService
+
+STEM = 'a' * 32
+OTHER = '0123456789abcdef' * 2
+THIRD = 'f' * 32
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = Flask(__name__, static_folder=str(tmp_path / 'static'))
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{tmp_path / 'usage.db'}"
+    app.config['STORAGE_BACKEND'] = 'local'
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+        user = User(email='a@example.com', name='A')
+        db.session.add(user)
+        db.session.flush()
+        db.session.add_all([
+            Site(id=3, title='Shop', subdomain='shop', user_id=user.id),
+            Site(id=4, title='Blog', subdomain='blog', user_id=user.id),
+        ])
+        db.session.flush()
+        old = datetime.utcnow() - timedelta(days=30)
+        for asset_id, site_id, stem in [(1, 3, STEM), (2, 3, OTHER), (3, 3, THIRD), (4, 4, STEM)]:
+            db.session.add(Asset(
+                id=asset_id, filename=f'{stem}.png', original_name=f'{asset_id}.png', file_size=100,
+                file_type='image/png', url=f'/api/assets/uploads/{site_id}/{stem}.png',
+                site_id=site_id, user_id=user.id, created_at=old
+            ))
+            path = os.path.join(app.static_folder, 'uploads', str(site_id), f'{stem}.png')
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'wb') as f:
+                f.write(b'x' * 100)
+        db.session.add_all([
+            Page(id=1, title='Home', slug='home', site_id=3, user_id=user.id),
+            Page(id=2, title='About', slug='about', site_id=3, user_id=user.id),
+        ])
+        db.session.commit()
+        yield app
+
+
+def _content(*urls):
+    return json.dumps({'gjs-html': ''.join(f'<img src="{url}">' for url in urls)})
+
+
+def _usage():
+    return {(row.asset_id, row.page_id) for row in AssetUsage.query}
+
+
+class TestExtractRefs:
+    
+    def test_finds_urls_in_grapesjs_content(self):
+        content = json.dumps({
+            'gjs-html': f'<img src="https://app.pagemade.site/api/assets/uploads/3/{STEM}.png">',
+            'gjs-css': f'.hero{{background:url("/api/assets/uploads/3/{OTHER}.jpg")}}',
+            'gjs-components': [{'type': 'image', 'attributes': {
+                'srcset': f'/api/assets/uploads/3/variants/{STEM}_w320.webp 320w'
+            }}],
+            'gjs-assets': [{'src': 'https://app.pagemade.site/api/assets/uploads/4/' + OTHER + '.gif'}],
+        })
+        
+        refs = AssetUsageService.extract_refs(content)
+        
+        assert refs == {(3, STEM), (3, OTHER), (4, OTHER)}
+    
+    def test_variants_and_resize_urls_map_to_original(self):
+        text = (
+            f'/api/assets/uploads/7/variants/{STEM}.webp '
+            f'/api/assets/uploads/7/{STEM}.jpg?w=640&fmt=webp'
+        )
+        
+        assert AssetUsageService.extract_refs(text) == {(7, STEM)}
+    
+    def test_escaped_slashes(self):
+        text = '{"src": "\\/api\\/assets\\/uploads\\/2\\/' + STEM + '.png"}'
+        
+        assert AssetUsageService.extract_refs(text) == {(2, STEM)}
+    
+    def test_ignores_other_urls_and_empty_fields(self):
+        text = '<img src="https://cdn.example.com/uploads/3/logo.png"><img src="/static/img/a.png">'
+        
+        assert AssetUsageService.extract_refs(text, None, '') == set()
+
+
+class TestResolve:
+    
+    def test_matches_filename_and_site(self, app):
+        refs = {(3, STEM), (3, OTHER), (4, STEM)}
+        
+        assert AssetUsageService.resolve(refs) == {1, 2, 4}
+    
+    def test_ignores_other_sites_and_unknown_files(self, app):
+        refs = {(4, OTHER), (3, 'b' * 32)}
+        
+        assert AssetUsageService.resolve(refs) == set()
+
+
+class TestSyncPage:
+    
+    def test_adds_and_removes_only_the_difference(self, app):
+        page = db.session.get(Page, 1)
+        page.content = _content(f'/api/assets/uploads/3/{STEM}.png', f'/api/assets/uploads/3/{OTHER}.png')
+        
+        assert AssetUsageService.sync_page(page) == ({1, 2}, set())
+        db.session.commit()
+        assert _usage() == {(1, 1), (2, 1)}
+        assert page.assets_indexed_at is not None
+        
+        page.content = _content(f'/api/assets/uploads/3/variants/{OTHER}_w320.webp',
+                                f'/api/assets/uploads/3/{THIRD}.png?w=640')
+        
+        assert AssetUsageService.sync_page(page) == ({3}, {1})
+        db.session.commit()
+        assert _usage() == {(2, 1), (3, 1)}
+    
+    def test_empty_content_clears_the_page(self, app):
+        page = db.session.get(Page, 1)
+        page.content = _content(f'/api/assets/uploads/3/{STEM}.png')
+        AssetUsageService.sync_page(page)
+        db.session.commit()
+        
+        page.content = None
+        
+        assert AssetUsageService.sync_page(page) == (set(), {1})
+        db.session.commit()
+        assert _usage() == set()
+
+
+class TestFindUnused:
+    
+    def test_incomplete_until_every_page_is_indexed(self, app):
+        page = db.session.get(Page, 1)
+        page.content = _content(f'/api/assets/uploads/3/{STEM}.png')
+        AssetUsageService.sync_page(page)
+        db.session.commit()
+        
+        assets, complete = AssetUsageService.find_unused(site_id=3)
+        assert [asset.id for asset in assets] == [2, 3]
+        assert complete is False
+        
+        assert AssetUsageService.rebuild()['pages'] == 1
+        assert AssetUsageService.find_unused(site_id=3)[1] is True
+    
+    def test_min_age_skips_recent_uploads(self, app):
+        db.session.get(Asset, 3).created_at = datetime.utcnow()
+        db.session.commit()
+        
+        assets, _ = AssetUsageService.find_unused(site_id=3, min_age_days=7)
+        
+        assert [asset.id for asset in assets] == [1, 2]
+
+
+class TestCollectGarbage:
+    
+    def test_refuses_to_delete_while_incomplete(self, app):
+        with pytest.raises(RuntimeError):
+            AssetUsageService.collect_garbage(app.static_folder, site_id=3, delete=True)
+        
+        assert Asset.query.count() == 4
+    
+    def test_report_without_delete(self, app):
+        report = AssetUsageService.collect_garbage(app.static_folder, site_id=3)
+        
+        assert [asset['id'] for asset in report['unused']] == [1, 2, 3]
+        assert report['unused_bytes'] == 300
+        assert report['deleted'] == 0
+        assert report['complete'] is False
+    
+    def test_deletes_only_unused_assets(self, app):
+        page = db.session.get(Page, 1)
+        page.content = _content(f'/api/assets/uploads/3/{STEM}.png')
+        db.session.commit()
+        AssetUsageService.rebuild()
+        
+        report = AssetUsageService.collect_garbage(app.static_folder, site_id=3, delete=True)
+        
+        assert report['deleted'] == 2
+        assert report['failed'] == []
+        assert {asset.id for asset in Asset.query} == {1, 4}
+        uploads = os.path.join(app.static_folder, 'uploads', '3')
+        assert os.listdir(uploads) == [f'{STEM}.png']
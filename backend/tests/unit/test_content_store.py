@@ -0,0 +1,59 @@
+"""Unit tests for content-addressed asset storage."""
+import hashlib
+import os
+
+from app.services.content_store import ContentStore
+
+
+def _store(static_folder, site_id, name, data):
+    site_dir = os.path.join(static_folder, 'uploads', str(site_id))
+    os.makedirs(site_dir, exist_ok=True)
+    path = os.path.join(site_dir, name)
+    with open(path, 'wb') as f:
+        f.write(data)
+    return path, hashlib.sha256(data).hexdigest()
+
+
+class TestContentStore:
+    
+    def test_blob_path_is_sharded(self, tmp_path):
+        digest = 'ab' * 32
+        path = ContentStore.blob_path(str(tmp_path), digest)
+        
+        assert path == os.path.join(str(tmp_path), 'uploads', '.blobs', 'ab', 'ab', digest)
+    
+    def test_first_upload_becomes_blob(self, tmp_path):
+        path, digest = _store(str(tmp_path), 1, 'a.png', b'logo')
+        
+        assert ContentStore.adopt(str(tmp_path), path, digest) is False
+        
+        blob = ContentStore.blob_path(str(tmp_path), digest)
+        assert os.path.samefile(path, blob)
+    
+    def test_duplicate_is_linked_to_existing_blob(self, tmp_path):
+        first, digest = _store(str(tmp_path), 1, 'a.png', b'logo')
+        second, _ = _store(str(tmp_path), 2, 'b.png', b'logo')
+        ContentStore.adopt(str(tmp_path), first, digest)
+        
+        assert ContentStore.adopt(str(tmp_path), second, digest) is True
+        
+        assert os.path.samefile(first, second)
+        assert os.stat(second).st_nlink == 3
+        with open(second, 'rb') as f:
+            assert f.read() == b'logo'
+    
+    def test_release_keeps_blob_while_referenced(self, tmp_path, monkeypatch):
+        path, digest = _store(str(tmp_path), 1, 'a.png', b'logo')
+        ContentStore.adopt(str(tmp_path), path, digest)
+        blob = ContentStore.blob_path(str(tmp_path), digest)
+        
+        monkeypatch.setattr(ContentStore, 'refcount', staticmethod(lambda h: 1))
+        assert ContentStore.release(str(tmp_path), digest) is False
+        assert os.path.exists(blob)
+        
+        monkeypatch.setattr(ContentStore, 'refcount', staticmethod(lambda h: 0))
+        assert ContentStore.release(str(tmp_path), digest) is True
+        assert not os.path.exists(blob)
+    
+    def test_release_without_hash_is_noop(self, tmp_path):
+        assert ContentStore.release(str(tmp_path), None) is False
@@ -0,0 +1,174 @@
+"""Unit tests for CORSMiddleware."""
+
+import pytest
+from flask import Flask, jsonify
+from app.middlewares.cors_middleware import CORSMiddleware, configure_cors
+
+
+ORIGINS = [
+    'https://editor.pagemade.site',
+    'http://localhost:3000',
+    '*.partner.example'
+]
+
+
+@pytest.fixture
+def cors_app():
+    """Bare Flask app with the CORS layer configured."""
+    app = Flask(__name__)
+    app.config['CORS_ORIGINS'] = ORIGINS
+    app.config['CORS_ALLOWED_HEADERS'] = ['Content-Type', 'Authorization']
+    app.config['CORS_ALLOWED_METHODS'] = ['GET', 'POST', 'OPTIONS']
+    app.config['CORS_EXPOSE_HEADERS'] = ['Set-Cookie']
+    app.config['DOMAIN'] = 'pagemade.site'
+    
+    @app.route('/api/ping', methods=['GET', 'POST'])
+    def ping():
+        return jsonify({'ok': True})
+    
+    @app.route('/fonts/a.woff2')
+    def font():
+        return 'font'
+    
+    @app.route('/about')
+    def about():
+        return 'page'
+    
+    configure_cors(app)
+    return app
+
+
+class TestOriginLookup:
+    """Tests for origin matching."""
+    
+    def test_exact_origins_use_frozenset(self, cors_app):
+        """Test exact origins are stored in a frozenset."""
+        middleware = cors_app.extensions['cors_middleware']
+        assert isinstance(middleware._origins, frozenset)
+        assert 'https://editor.pagemade.site' in middleware._origins
+    
+    def test_wildcard_pattern(self, cors_app):
+        """Test *.domain patterns match subdomains only."""
+        middleware = cors_app.extensions['cors_middleware']
+        assert middleware._is_origin_allowed('https://a.partner.example')
+        assert not middleware._is_origin_allowed('https://evilpartner.example')
+        assert not middleware._is_origin_allowed(None)
+    
+    def test_page_host_detection(self, cors_app):
+        """Test user subdomains are told apart from app hosts."""
+        middleware = cors_app.extensions['cors_middleware']
+        assert middleware.is_page_host('shop.pagemade.site')
+        assert middleware.is_page_host('shop.pagemade.site:443')
+        assert not middleware.is_page_host('app.pagemade.site')
+        assert not middleware.is_page_host('editor.pagemade.site')
+        assert not middleware.is_page_host('localhost:5000')
+
+
+class TestPreflight:
+    """Tests for cached preflight responses."""
+    
+    def test_allowed_preflight(self, cors_app):
+        """Test preflight from allowed origin gets full CORS headers."""
+        client = cors_app.test_client()
+        response = client.options('/api/ping', headers={
+            'Origin': 'https://editor.pagemade.site',
+            'Access-Control-Request-Method': 'POST'
+        })
+        
+        assert response.status_code == 204
+        assert response.headers['Access-Control-Allow-Origin'] == 'https://editor.pagemade.site'
+        assert response.headers['Access-Control-Allow-Credentials'] == 'true'
+        assert response.headers['Access-Control-Allow-Methods'] == 'GET, POST, OPTIONS'
+        assert response.headers['Access-Control-Allow-Headers'] == 'Content-Type, Authorization'
+        assert response.headers['Access-Control-Max-Age'] == '3600'
+    
+    def test_preflight_response_is_cached(self, cors_app):
+        """Test the same response object answers every preflight for an origin."""
+        middleware = cors_app.extensions['cors_middleware']
+        first = middleware._preflight_for('https://editor.pagemade.site')
+        second = middleware._preflight_for('https://editor.pagemade.site')
+        assert first is second
+    
+    def test_rejected_preflight(self, cors_app):
+        """Test preflight from unknown origin has no CORS headers."""
+        client = cors_app.test_client()
+        response = client.options('/api/ping', headers={
+            'Origin': 'https://evil.example',
+            'Access-Control-Request-Method': 'POST'
+        })
+        
+        assert 'Access-Control-Allow-Origin' not in response.headers
+    
+    def test_plain_options_reaches_flask(self, cors_app):
+        """Test OPTIONS without preflight headers is handled by Flask."""
+        client = cors_app.test_client()
+        response = client.options('/api/ping')
+        
+        assert response.status_code == 200
+        assert 'POST' in response.headers['Allow']
+
+
+class TestResponseHeaders:
+    """Tests for headers added to actual responses."""
+    
+    def test_api_allowed_origin(self, cors_app):
+        """Test API responses echo allowed origin with credentials."""
+        client = cors_app.test_client()
+        response = client.get('/api/ping', headers={'Origin': 'http://localhost:3000'})
+        
+        assert response.headers['Access-Control-Allow-Origin'] == 'http://localhost:3000'
+        assert response.headers['Access-Control-Allow-Credentials'] == 'true'
+        assert response.headers['Access-Control-Expose-Headers'] == 'Set-Cookie'
+        assert 'Origin' in response.headers['Vary']
+    
+    def test_api_disallowed_origin(self, cors_app):
+        """Test API responses get no CORS headers for unknown origins."""
+        client = cors_app.test_client()
+        response = client.get('/api/ping', headers={'Origin': 'https://evil.example'})
+        
+        assert 'Access-Control-Allow-Origin' not in response.headers
+    
+    def test_static_wildcard(self, cors_app):
+        """Test non-API responses use wildcard origin without credentials."""
+        client = cors_app.test_client()
+        response = client.get('/fonts/a.woff2', headers={
+            'Host': 'app.pagemade.site',
+            'Origin': 'https://shop.pagemade.site'
+        })
+        
+        assert response.headers['Access-Control-Allow-Origin'] == '*'
+        assert 'Access-Control-Allow-Credentials' not in response.headers
+    
+    def test_no_origin_skipped(self, cors_app):
+        """Test same-origin navigation gets no CORS headers."""
+        client = cors_app.test_client()
+        response = client.get('/fonts/a.woff2')
+        
+        assert 'Access-Control-Allow-Origin' not in response.headers
+    
+    def test_same_origin_skipped(self, cors_app):
+        """Test same-origin fetch with Origin header gets no CORS headers."""
+        client = cors_app.test_client()
+        response = client.post('/api/ping', headers={
+            'Host': 'app.pagemade.site',
+            'Origin': 'https://app.pagemade.site'
+        })
+        
+        assert 'Access-Control-Allow-Origin' not in response.headers
+    
+    def test_subdomain_page_skipped(self, cors_app):
+        """Test published subdomain pages get no CORS headers."""
+        client = cors_app.test_client()
+        response = client.get('/about', headers={
+            'Host': 'shop.pagemade.site',
+            'Origin': 'https://other.pagemade.site'
+        })
+        
+        assert 'Access-Control-Allow-Origin' not in response.headers
+
+
+def test_middleware_defaults_without_app():
+    """Test middleware can be built standalone from a config dict."""
+    middleware = CORSMiddleware(config={'CORS_ORIGINS': ['https://a.example']})
+    assert middleware._is_origin_allowed('https://a.example')
+    assert not middleware._is_origin_allowed('https://b.example')
@@ -0,0 +1,88 @@
+"""Unit tests for the header-only image probe."""
+import pytest
+from PIL import Image
+
+from app.utils.image_probe import probe_image
+
+
+def _save(tmp_path, name, size=(123, 45), mode='RGB', **kwargs):
+    path = tmp_path / name
+    Image.new(mode, size, (10, 20, 30) if mode == 'RGB' else (10, 20, 30, 128)).save(path, **kwargs)
+    return str(path)
+
+
+class TestRasterFormats:
+    
+    @pytest.mark.parametrize('name,kwargs,mode', [
+        ('a.png', {}, 'RGB'),
+        ('a.gif', {}, 'RGB'),
+        ('a.bmp', {}, 'RGB'),
+        ('a.jpg', {}, 'RGB'),
+        ('p.jpg', {'progressive': True}, 'RGB'),
+        ('lossy.webp', {'quality': 80}, 'RGB'),
+        ('lossless.webp', {'lossless': True}, 'RGB'),
+        ('alpha.webp', {'quality': 80}, 'RGBA'),
+    ])
+    def test_dimensions_match_pillow(self, tmp_path, name, kwargs, mode):
+        path = _save(tmp_path, name, size=(1234, 567), mode=mode, **kwargs)
+        
+        info = probe_image(path)
+        
+        with Image.open(path) as img:
+            assert (info.width, info.height) == img.size
+        assert info.mime == Image.MIME[Image.open(path).format]
+    
+    def test_ico(self, tmp_path):
+        path = _save(tmp_path, 'a.ico', size=(32, 32))
+        
+        info = probe_image(path)
+        
+        assert (info.format, info.width, info.height) == ('ico', 32, 32)
+    
+    def test_jpeg_exif_orientation(self, tmp_path):
+        exif = Image.Exif()
+        exif[0x0112] = 6
+        path = _save(tmp_path, 'rotated.jpg', size=(400, 300), exif=exif.tobytes())
+        
+        info = probe_image(path)
+        
+        assert info.orientation == 6
+        assert (info.width, info.height) == (400, 300)
+        assert info.display_size == (300, 400)
+    
+    def test_unknown_or_truncated(self, tmp_path):
+        junk = tmp_path / 'junk.png'
+        junk.write_bytes(b'not an image at all')
+        truncated = tmp_path / 'cut.jpg'
+        truncated.write_bytes(b'\xff\xd8\xff\xe0\x00')
+        
+        assert probe_image(str(junk)) is None
+        assert probe_image(str(truncated)) is None
+        assert probe_image(str(tmp_path / 'missing.png')) is None
+
+
+class TestSvg:
+    
+    @pytest.mark.parametrize('svg,size', [
+        ('<svg xmlns="http://www.w3.org/2000/svg" width="120" height="40"></svg>', (120, 40)),
+        ('<?xml version="1.0"?>\n<svg viewBox="0 0 300 150"></svg>', (300, 150)),
+        ("<svg width='64px' viewBox='0,0,32,16'></svg>", (64, 32)),
+        ('<svg width="100%" height="100%" viewBox="0 0 24 24"></svg>', (24, 24)),
+    ])
+    def test_sizes(self, tmp_path, svg, size):
+        path = tmp_path / 'a.svg'
+        path.write_text(svg)
+        
+        info = probe_image(str(path))
+        
+        assert info.mime == 'image/svg+xml'
+        assert (info.width, info.height) == size
+    
+    def test_svg_without_size(self, tmp_path):
+        path = tmp_path / 'a.svg'
+        path.write_text('<svg xmlns="http://www.w3.org/2000/svg"><rect/></svg>')
+        
+        info = probe_image(str(path))
+        
+        assert info.format == 'svg'
+        assert (info.width, info.height) == (None, None)
@@ -0,0 +1,166 @@
+"""Unit tests for the on-demand image resize cache."""
+
+import os
+import threading
+import time
+import pytest
+from PIL import Image
+from werkzeug.datastructures import MultiDict
+from app.services.image_service import ImageResizeCache, ResizeParamsError, UnreadableImageError
+
+
+@pytest.fixture
+def source(tmp_path):
+    """A 1000x500 JPEG original."""
+    path = tmp_path / 'photo.jpg'
+    Image.new('RGB', (1000, 500), (10, 120, 200)).save(path)
+    return str(path)
+
+
+@pytest.fixture
+def resize_cache(tmp_path):
+    """Cache with a generous budget."""
+    return ImageResizeCache(str(tmp_path / 'cache'), 10 * 1024 * 1024, [64, 320, 640])
+
+
+class TestParams:
+    """Tests for parameter whitelisting."""
+    
+    def test_defaults(self, resize_cache):
+        """Test fit, quality and format defaults."""
+        params = resize_cache.parse_params(MultiDict({'w': '320'}), 'jpg')
+        assert params == (320, None, 'contain', 80, 'jpg')
+    
+    @pytest.mark.parametrize('args', [
+        {'w': '321'},
+        {'w': '-1'},
+        {'h': 'abc'},
+        {'q': '81'},
+        {'fit': 'stretch'},
+        {'fmt': 'tiff'},
+    ])
+    def test_rejects_values_outside_whitelist(self, resize_cache, args):
+        """Test arbitrary sizes/qualities/formats are rejected."""
+        with pytest.raises(ResizeParamsError):
+            resize_cache.parse_params(MultiDict(args), 'jpg')
+
+
+class TestResize:
+    """Tests for rendering, caching and eviction."""
+    
+    def test_contain_and_cover(self, resize_cache, source):
+        """Test contain keeps aspect ratio and cover crops to the box."""
+        contain = resize_cache.get(source, (320, 320, 'contain', 80, 'webp'))
+        cover = resize_cache.get(source, (320, 320, 'cover', 80, 'jpg'))
+        
+        with Image.open(contain) as image:
+            assert image.size == (320, 160)
+            assert image.format == 'WEBP'
+        with Image.open(cover) as image:
+            assert image.size == (320, 320)
+    
+    def test_cached_between_calls(self, resize_cache, source):
+        """Test a second request reuses the cached file."""
+        first = resize_cache.get(source, (64, None, 'contain', 80, 'jpg'))
+        mtime = os.stat(first).st_mtime_ns
+        second = resize_cache.get(source, (64, None, 'contain', 80, 'jpg'))
+        
+        assert first == second
+        assert len(resize_cache._entries) == 1
+        assert os.stat(second).st_mtime_ns >= mtime
+    
+    def test_source_change_invalidates(self, resize_cache, source):
+        """Test a new source mtime produces a new cache key."""
+        first = resize_cache.get(source, (64, None, 'contain', 80, 'jpg'))
+        os.utime(source, ns=(time.time_ns() + 10**9, time.time_ns() + 10**9))
+        second = resize_cache.get(source, (64, None, 'contain', 80, 'jpg'))
+        
+        assert first != second
+    
+    def test_concurrent_requests_coalesce(self, resize_cache, source, monkeypatch):
+        """Test identical concurrent requests render only once."""
+        calls = []
+        original_render = resize_cache._render
+        
+        def slow_render(*args):
+            calls.append(1)
+            time.sleep(0.1)
+            original_render(*args)
+        
+        monkeypatch.setattr(resize_cache, '_render', slow_render)
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(resize_cache.get(source, (320, None, 'contain', 80, 'jpg'))))
+            for _ in range(5)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        assert len(calls) == 1
+        assert len(set(results)) == 1
+    
+    def test_corrupt_source(self, resize_cache, source):
+        """Test an undecodable source raises UnreadableImageError and leaves nothing behind."""
+        with open(source, 'rb') as f:
+            data = f.read()
+        with open(source, 'wb') as f:
+            f.write(data[:len(data) // 2])
+        
+        with pytest.raises(UnreadableImageError):
+            resize_cache.get(source, (320, None, 'contain', 80, 'jpg'))
+        assert resize_cache._inflight == {}
+        assert not resize_cache._entries
+        assert not [name for _, _, files in os.walk(resize_cache.cache_dir) for name in files]
+    
+    def test_failed_render_releases_waiters(self, resize_cache, tmp_path, monkeypatch):
+        """Test coalesced waiters get the error instead of blocking."""
+        bad = tmp_path / 'bad.png'
+        bad.write_bytes(b'not an image')
+        calls = []
+        original_render = resize_cache._render
+        
+        def slow_render(*args):
+            calls.append(1)
+            time.sleep(0.1)
+            original_render(*args)
+        
+        monkeypatch.setattr(resize_cache, '_render', slow_render)
+        errors = []
+        
+        def request():
+            try:
+                resize_cache.get(str(bad), (64, None, 'contain', 80, 'png'))
+            except UnreadableImageError as e:
+                errors.append(e)
+        
+        threads = [threading.Thread(target=request) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(timeout=5)
+        
+        assert not any(thread.is_alive() for thread in threads)
+        assert len(errors) == 5
+        assert len(calls) == 1
+        assert resize_cache._inflight == {}
+    
+    def test_lru_eviction(self, tmp_path, source):
+        """Test the least recently used entry is evicted over budget."""
+        resize_cache = ImageResizeCache(str(tmp_path / 'small'), 1, [64, 320])
+        first = resize_cache.get(source, (64, None, 'contain', 80, 'jpg'))
+        second = resize_cache.get(source, (320, None, 'contain', 80, 'jpg'))
+        
+        assert not os.path.exists(first)
+        assert os.path.exists(second)
+        assert list(resize_cache._entries) == [second]
+    
+    def test_reload_from_disk(self, tmp_path, source):
+        """Test a new cache instance picks up existing entries."""
+        cache_dir = str(tmp_path / 'persist')
+        path = ImageResizeCache(cache_dir, 10**7, [64]).get(source, (64, None, 'contain', 80, 'jpg'))
+        reloaded = ImageResizeCache(cache_dir, 10**7, [64])
+        
+        assert path in reloaded._entries
+        assert reloaded.total_bytes == os.path.getsize(path)
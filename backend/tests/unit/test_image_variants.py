@@ -0,0 +1,110 @@
+"""Unit tests for responsive image variants."""
+
+import json
+from PIL import Image
+from app.models.asset import Asset
+from app.services.image_service import ImageVariantService
+from app.utils.html_helpers import add_responsive_images
+
+
+def make_image(path, size=(1000, 500), mode='RGB'):
+    """Write a test image with EXIF data."""
+    image = Image.new(mode, size, (200, 10, 10) if mode == 'RGB' else (200, 10, 10, 128))
+    exif = Image.Exif()
+    exif[0x010F] = 'TestCamera'  # Make
+    if path.endswith('.jpg'):
+        image.save(path, exif=exif)
+    else:
+        image.save(path)
+    return path
+
+
+class TestGenerateVariants:
+    """Tests for ImageVariantService.generate_variants."""
+    
+    def test_widths_below_original_only(self, tmp_path):
+        """Test only widths smaller than the original are generated."""
+        source = make_image(str(tmp_path / 'abc.jpg'))
+        variants = ImageVariantService.generate_variants(source, str(tmp_path / 'variants'), [320, 640, 1280])
+        
+        widths = {v['width'] for v in variants}
+        assert widths == {320, 640}
+        assert {v['format'] for v in variants} >= {'jpg', 'webp'}
+        small = next(v for v in variants if v['width'] == 320 and v['format'] == 'jpg')
+        assert small['height'] == 160
+        assert small['filename'] == 'abc_w320.jpg'
+    
+    def test_metadata_stripped(self, tmp_path):
+        """Test EXIF is not copied into variants."""
+        source = make_image(str(tmp_path / 'abc.jpg'))
+        variants = ImageVariantService.generate_variants(source, str(tmp_path), [320])
+        
+        for variant in variants:
+            with Image.open(tmp_path / variant['filename']) as image:
+                assert not image.getexif()
+    
+    def test_alpha_keeps_png_fallback(self, tmp_path):
+        """Test transparent images fall back to PNG, not JPEG."""
+        source = make_image(str(tmp_path / 'logo.png'), mode='RGBA')
+        variants = ImageVariantService.generate_variants(source, str(tmp_path), [320])
+        
+        assert {v['format'] for v in variants} >= {'png', 'webp'}
+        assert 'jpg' not in {v['format'] for v in variants}
+    
+    def test_not_resizable(self):
+        """Test SVG/GIF uploads are skipped."""
+        assert not ImageVariantService.is_resizable('a.svg')
+        assert not ImageVariantService.is_resizable('a.gif')
+        assert ImageVariantService.is_resizable('a.JPG')
+
+
+def make_asset():
+    """Asset with two widths of JPEG and WebP variants."""
+    variants = [
+        {'width': w, 'height': w // 2, 'format': fmt, 'mime': mime, 'filename': f'abc_w{w}.{fmt}', 'size': 1}
+        for fmt, mime in (('jpg', 'image/jpeg'), ('webp', 'image/webp'))
+        for w in (320, 640)
+    ]
+    return Asset(
+        filename='abc.jpg',
+        url='https://app.pagemade.site/api/assets/uploads/7/abc.jpg',
+        width=1000,
+        height=500,
+        variants=json.dumps(variants)
+    )
+
+
+class TestSrcset:
+    """Tests for srcset data and publish-time <img> rewriting."""
+    
+    def test_srcset_includes_original(self):
+        """Test fallback srcset ends with the original at its own width."""
+        srcset = make_asset().srcset()
+        
+        assert srcset == (
+            'https://app.pagemade.site/api/assets/uploads/7/variants/abc_w320.jpg 320w, '
+            'https://app.pagemade.site/api/assets/uploads/7/variants/abc_w640.jpg 640w, '
+            'https://app.pagemade.site/api/assets/uploads/7/abc.jpg 1000w'
+        )
+    
+    def test_srcset_data_sources(self):
+        """Test WebP is offered as a <source>."""
+        data = make_asset().srcset_data()
+        
+        assert [s['type'] for s in data['sources']] == ['image/webp']
+        assert 'abc_w640.webp 640w' in data['sources'][0]['srcset']
+    
+    def test_rewrite_img(self):
+        """Test uploaded images get srcset, size and a <picture> wrapper."""
+        html = '<div><img id="i1" src="https://app.pagemade.site/api/assets/uploads/7/abc.jpg"/></div>'
+        result = add_responsive_images(html, {'abc.jpg': make_asset().srcset_data()})
+        
+        assert result.startswith('<div><picture><source type="image/webp"')
+        assert 'srcset="https://app.pagemade.site/api/assets/uploads/7/variants/abc_w320.jpg 320w' in result
+        assert 'width="1000" height="500"' in result
+        assert result.endswith('/></picture></div>')
+    
+    def test_unrelated_and_existing_srcset_untouched(self):
+        """Test external images and tags with srcset are not changed."""
+        html = '<img src="https://cdn.example/x.jpg"><img src="/api/assets/uploads/7/abc.jpg" srcset="a 1x">'
+        assert add_responsive_images(html, {'abc.jpg': make_asset().srcset_data()}) == html
@@ -0,0 +1,147 @@
+"""Unit tests for request logging middleware."""
+
+import json
+import logging
+import queue
+import pytest
+from flask import Flask, jsonify
+from app.middlewares.logging_middleware import (
+    JSONLineFormatter,
+    NonBlockingQueueHandler,
+    RequestLoggingMiddleware,
+    setup_logging
+)
+
+
+class CaptureHandler(logging.Handler):
+    """Collects records emitted to the middleware logger."""
+    
+    def __init__(self):
+        super().__init__(logging.DEBUG)
+        self.records = []
+    
+    def emit(self, record):
+        self.records.append(record)
+
+
+@pytest.fixture
+def captured():
+    """Capture records from the logging middleware module logger."""
+    target = logging.getLogger('app.middlewares.logging_middleware')
+    handler = CaptureHandler()
+    old_level = target.level
+    target.addHandler(handler)
+    target.setLevel(logging.INFO)
+    yield handler
+    target.removeHandler(handler)
+    target.setLevel(old_level)
+
+
+def make_app(sample_rate):
+    """Bare Flask app with request logging."""
+    app = Flask(__name__)
+    app.config['LOG_SUCCESS_SAMPLE_RATE'] = sample_rate
+    
+    @app.route('/ok')
+    def ok():
+        return jsonify({'ok': True})
+    
+    @app.route('/missing')
+    def missing():
+        return jsonify({'error': 'nope'}), 404
+    
+    RequestLoggingMiddleware(app)
+    return app
+
+
+class TestJSONLineFormatter:
+    """Tests for compact JSON log lines."""
+    
+    def test_single_compact_line_with_fields(self):
+        """Test fields are merged into a single-line JSON object."""
+        record = logging.LogRecord('app.x', logging.INFO, __file__, 1, 'hello %s', ('world',), None)
+        record.fields = {'status': 200, 'path': '/ok'}
+        line = JSONLineFormatter().format(record)
+        
+        assert '\n' not in line
+        assert ', ' not in line
+        entry = json.loads(line)
+        assert entry['msg'] == 'hello world'
+        assert entry['status'] == 200
+        assert entry['level'] == 'INFO'
+
+
+class TestNonBlockingQueueHandler:
+    """Tests for the queue handler used by request threads."""
+    
+    def test_full_queue_drops_instead_of_blocking(self):
+        """Test records are dropped and counted when the queue is full."""
+        handler = NonBlockingQueueHandler(queue.Queue(maxsize=1))
+        record = logging.LogRecord('app.x', logging.INFO, __file__, 1, 'msg', None, None)
+        handler.handle(record)
+        handler.handle(record)
+        
+        assert handler.queue.qsize() == 1
+        assert handler.dropped == 1
+    
+    def test_setup_again_stops_the_previous_listener(self, tmp_path):
+        """Test a second app factory call does not leak the first listener."""
+        first_app = Flask('app', root_path=str(tmp_path / 'app'))
+        setup_logging(first_app)
+        first = [h for h in first_app.logger.handlers if isinstance(h, NonBlockingQueueHandler)][0]
+        first_listener = first.listener
+        
+        second_app = Flask('app', root_path=str(tmp_path / 'app'))
+        setup_logging(second_app)
+        handlers = [h for h in second_app.logger.handlers if isinstance(h, NonBlockingQueueHandler)]
+        
+        try:
+            assert handlers != [first] and len(handlers) == 1
+            assert first_listener._thread is None
+            assert all(getattr(h, 'stream', None) is None for h in first_listener.handlers[:2])
+            with open(tmp_path / 'logs' / 'app.log') as f:
+                assert 'Logging configured' in f.read()
+        finally:
+            second_app.logger.removeHandler(handlers[0])
+            handlers[0].close()
+    
+    def test_prepare_keeps_fields_unformatted(self):
+        """Test structured fields are left for the listener to serialize."""
+        handler = NonBlockingQueueHandler(queue.Queue())
+        record = logging.LogRecord('app.x', logging.INFO, __file__, 1, 'a=%d', (1,), None)
+        record.fields = {'k': 'v'}
+        prepared = handler.prepare(record)
+        
+        assert prepared.msg == 'a=1'
+        assert prepared.args is None
+        assert prepared.fields == {'k': 'v'}
+
+
+class TestRequestSampling:
+    """Tests for sampling of successful responses."""
+    
+    def test_successes_skipped_at_zero_rate(self, captured):
+        """Test successful responses are not logged with sample rate 0."""
+        client = make_app(0.0).test_client()
+        client.get('/ok')
+        
+        assert [r for r in captured.records if getattr(r, 'fields', {}).get('event') == 'response'] == []
+    
+    def test_errors_always_logged(self, captured):
+        """Test 4xx responses are logged regardless of sample rate."""
+        client = make_app(0.0).test_client()
+        client.get('/missing')
+        
+        responses = [r for r in captured.records if getattr(r, 'fields', {}).get('event') == 'response']
+        assert len(responses) == 1
+        assert responses[0].levelno == logging.WARNING
+        assert responses[0].fields['status'] == 404
+    
+    def test_request_details_only_in_debug(self, captured):
+        """Test request details are not collected when DEBUG is off."""
+        client = make_app(1.0).test_client()
+        client.get('/ok')
+        
+        events = [getattr(r, 'fields', {}).get('event') for r in captured.records]
+        assert 'request' not in events
+        assert 'response' in events
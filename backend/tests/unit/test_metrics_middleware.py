@@ -0,0 +1,117 @@
+"""Unit tests for request metrics."""
+
+import time
+import pytest
+from flask import Flask, jsonify
+from app.middlewares.metrics_middleware import (
+    LatencyHistogram,
+    MetricsMiddleware,
+    collapse_stack
+)
+
+
+@pytest.fixture
+def metrics_app():
+    """Bare Flask app with metrics collection and a slow route."""
+    app = Flask(__name__)
+    app.config['SLOW_REQUEST_THRESHOLD'] = 0.05
+    
+    @app.route('/fast')
+    def fast():
+        return jsonify({'ok': True})
+    
+    @app.route('/slow')
+    def slow():
+        time.sleep(0.2)
+        return jsonify({'ok': True})
+    
+    @app.route('/boom')
+    def boom():
+        raise RuntimeError('boom')
+    
+    MetricsMiddleware(app)
+    return app
+
+
+class TestLatencyHistogram:
+    """Tests for bucketed percentile estimation."""
+    
+    def test_empty(self):
+        """Test percentiles of an empty histogram are None."""
+        assert LatencyHistogram().percentile(0.5) is None
+    
+    def test_percentiles_within_bucket_error(self):
+        """Test estimates stay within one bucket of the exact value."""
+        histogram = LatencyHistogram()
+        samples = [i / 1000 for i in range(1, 1001)]  # 1ms .. 1s
+        for value in samples:
+            histogram.observe(value)
+        
+        for q, exact in ((0.5, 0.5), (0.95, 0.95), (0.99, 0.99)):
+            estimate = histogram.percentile(q)
+            assert exact / 1.5 < estimate < exact * 1.5
+        assert histogram.count == 1000
+    
+    def test_overflow_bucket(self):
+        """Test values above the last bound are reported at the last bound."""
+        histogram = LatencyHistogram(bounds=(0.1, 1.0))
+        histogram.observe(5.0)
+        assert histogram.percentile(0.99) == 1.0
+
+
+class TestMetricsMiddleware:
+    """Tests for request hooks and exposition."""
+    
+    def test_counts_status_and_latency(self, metrics_app):
+        """Test requests are counted per endpoint and status."""
+        client = metrics_app.test_client()
+        client.get('/fast')
+        client.get('/fast')
+        client.get('/does-not-exist')
+        
+        registry = metrics_app.extensions['metrics'].registry
+        assert registry.requests_total[('fast', 'GET', 200)] == 2
+        assert registry.requests_total[('unmatched', 'GET', 404)] == 1
+        assert registry.in_flight['fast'] == 0
+        assert registry.snapshot()['fast']['count'] == 2
+    
+    def test_unhandled_exception_counts_as_500(self, metrics_app):
+        """Test requests that raise are recorded with status 500."""
+        client = metrics_app.test_client()
+        client.get('/boom')
+        
+        registry = metrics_app.extensions['metrics'].registry
+        assert registry.requests_total[('boom', 'GET', 500)] == 1
+        assert registry.in_flight['boom'] == 0
+    
+    def test_slow_request_gets_stack_samples(self, metrics_app):
+        """Test requests over the threshold keep collapsed stacks."""
+        client = metrics_app.test_client()
+        client.get('/slow')
+        
+        samples = list(metrics_app.extensions['metrics'].registry.slow_samples)
+        assert len(samples) == 1
+        assert samples[0]['endpoint'] == 'slow'
+        assert samples[0]['stacks']
+        assert samples[0]['stacks'][0].endswith('test_metrics_middleware.py:slow')
+    
+    def test_prometheus_exposition(self, metrics_app):
+        """Test exposition contains counters, buckets and quantiles."""
+        client = metrics_app.test_client()
+        client.get('/fast')
+        
+        text = metrics_app.extensions['metrics'].registry.render_prometheus()
+        assert 'pagemade_http_requests_total{endpoint="fast",method="GET",status="200"} 1' in text
+        assert 'pagemade_http_request_duration_seconds_bucket{endpoint="fast",le="+Inf"} 1' in text
+        assert 'pagemade_http_request_latency_seconds{endpoint="fast",quantile="0.99"}' in text
+
+
+def test_collapse_stack_root_first():
+    """Test collapsed stacks list the caller before the callee."""
+    import sys
+    
+    def inner():
+        return collapse_stack(sys._getframe())
+    
+    stack = inner()
+    assert stack.endswith('test_metrics_middleware.py:test_collapse_stack_root_first;test_metrics_middleware.py:inner')
@@ -0,0 +1,62 @@
+"""Unit tests for server-side preview storage."""
+import os
+import time
+
+import pytest
+
+from app.services.preview_store import DiskPreviewStore, CachePreviewStore
+from cache import SimpleCacheManager
+
+TOKEN = 'tok_' + 'a' * 40
+
+
+@pytest.fixture(params=['disk', 'cache'])
+def store(request, tmp_path):
+    if request.param == 'disk':
+        return DiskPreviewStore(str(tmp_path))
+    return CachePreviewStore(SimpleCacheManager())
+
+
+class TestPreviewStore:
+    
+    def test_save_and_open(self, store):
+        expires_at = store.save(7, TOKEN, '<p>Xin chào</p>', ttl=60)
+        
+        assert store.expires_at(7, TOKEN) == pytest.approx(expires_at, abs=1)
+        with store.open(7, TOKEN) as f:
+            assert f.read().decode('utf-8') == '<p>Xin chào</p>'
+    
+    def test_previews_are_per_owner(self, store):
+        store.save(7, TOKEN, 'x', ttl=60)
+        
+        assert store.expires_at(8, TOKEN) is None
+        with pytest.raises(FileNotFoundError):
+            store.open(8, TOKEN)
+    
+    def test_delete(self, store):
+        store.save(7, TOKEN, 'x', ttl=60)
+        
+        store.delete(7, TOKEN)
+        
+        assert store.expires_at(7, TOKEN) is None
+
+
+class TestDiskPreviewStore:
+    
+    def test_rejects_path_tokens(self, tmp_path):
+        store = DiskPreviewStore(str(tmp_path))
+        
+        with pytest.raises(ValueError):
+            store.save(7, '../../etc/passwd', 'x', ttl=60)
+        assert store.expires_at(7, '../' + TOKEN) is None
+    
+    def test_purge_removes_expired_previews_only(self, tmp_path):
+        store = DiskPreviewStore(str(tmp_path))
+        store.save(1, 'fresh_' + 'b' * 40, 'new', ttl=60)  # first save runs a sweep
+        store.save(1, TOKEN, 'old', ttl=-10)
+        leftover = tmp_path / '1' / 'x.html.123.tmp'
+        leftover.write_text('partial')
+        os.utime(leftover, (time.time() - 7200, time.time() - 7200))
+        
+        assert store.purge_expired() == 1
+        assert sorted(os.listdir(tmp_path / '1')) == ['fresh_' + 'b' * 40 + '.html']
@@ -0,0 +1,84 @@
+"""Unit tests for the sampling profiler."""
+
+import threading
+from app.utils.profiler import SamplingProfiler
+
+
+def busy_loop(stop):
+    """Spin until stop is set."""
+    while not stop.is_set():
+        sum(range(100))
+
+
+def run_profiled(requests_only):
+    """Profile a busy thread registered as serving 'pages.busy'."""
+    stop = threading.Event()
+    worker = threading.Thread(target=busy_loop, args=(stop,))
+    worker.start()
+    active = {worker.ident: {'endpoint': 'pages.busy'}}
+    
+    profiler = SamplingProfiler(0.2, interval=0.005, active_requests=active, requests_only=requests_only)
+    profiler.start()
+    assert profiler.wait(timeout=5)
+    
+    stop.set()
+    worker.join()
+    return profiler
+
+
+class TestSamplingProfiler:
+    """Tests for stack attribution and output formats."""
+    
+    def test_attributes_samples_to_endpoint(self):
+        """Test stacks are prefixed with the endpoint of the sampled thread."""
+        profiler = run_profiled(requests_only=True)
+        
+        assert profiler.sample_count > 0
+        assert set(profiler.endpoint_samples) == {'pages.busy'}
+        assert all(stack.startswith('pages.busy;') for stack in profiler.stacks)
+    
+    def test_collapsed_output_is_flamegraph_ready(self):
+        """Test every collapsed line ends with a sample count."""
+        profiler = run_profiled(requests_only=True)
+        
+        lines = profiler.to_collapsed().splitlines()
+        assert lines
+        for line in lines:
+            stack, count = line.rsplit(' ', 1)
+            assert int(count) > 0
+            assert 'test_profiler.py:busy_loop' in stack
+    
+    def test_all_threads_includes_idle(self):
+        """Test threads outside requests are reported when asked for."""
+        profiler = run_profiled(requests_only=False)
+        
+        assert SamplingProfiler.IDLE in profiler.endpoint_samples
+    
+    def test_summary(self):
+        """Test summary reports endpoints and hottest frames."""
+        profiler = run_profiled(requests_only=True)
+        summary = profiler.summary()
+        
+        assert summary['running'] is False
+        assert 'pages.busy' in summary['samples_by_endpoint']
+        assert summary['top_frames'][0]['samples'] > 0
+    
+    def test_summary_while_running(self):
+        """Test the output can be read while the sampler is still adding stacks."""
+        stop = threading.Event()
+        worker = threading.Thread(target=busy_loop, args=(stop,))
+        worker.start()
+        profiler = SamplingProfiler(0.3, interval=0.001, active_requests={worker.ident: {'endpoint': 'pages.busy'}},
+                                    requests_only=False)
+        profiler.start()
+        try:
+            while profiler.running:
+                profiler.summary()
+                profiler.to_collapsed()
+        finally:
+            stop.set()
+            worker.join()
+        
+        summary = profiler.summary()
+        assert summary['running'] is False
+        assert sum(summary['samples_by_endpoint'].values()) == sum(profiler.stacks.values())
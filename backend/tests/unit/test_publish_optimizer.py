@@ -0,0 +1,177 @@
+"""Unit tests for publish-time HTML/CSS optimization."""
+from types import SimpleNamespace
+
+from app.services.publish_optimizer import PublishOptimizer
+from app.services.storage_backend import LocalStorage
+from app.utils.css_optimizer import parse_css, dedupe_rules, critical_rules, minify_css
+from app.utils.html_helpers import minify_html, find_fold_offset, collect_selectors, add_lazy_loading
+
+
+class TestMinifyCss:
+    
+    def test_strips_comments_and_whitespace(self):
+        css = '/* hero */\n.hero  > a ,\n.hero b {\n  color : red ;\n  margin: 0 auto  !important;\n}\n'
+        
+        assert minify_css(css) == '.hero>a,.hero b{color:red;margin:0 auto!important}'
+    
+    def test_strings_and_urls_are_untouched(self):
+        css = '.a{content:"a  ;}  b"}.b{background:url(data:image/png;base64,AA==)}'
+        
+        assert minify_css(css) == css
+    
+    def test_drops_empty_rules_and_keeps_at_rules(self):
+        css = '@import url("x.css");.empty{}@media (max-width: 480px){.a{color:red}.b{}}@media print{.c{}}'
+        
+        assert minify_css(css) == '@import url("x.css");@media (max-width: 480px){.a{color:red}}'
+
+
+class TestDedupeRules:
+    
+    def test_exact_duplicates_keep_the_last_copy(self):
+        css = '#a{color:red}.x{color:blue}#a{color:red}'
+        
+        assert minify_css(css) == '.x{color:blue}#a{color:red}'
+    
+    def test_merges_id_rules_with_identical_bodies(self):
+        css = '#i1{padding:10px}#i2{padding:10px}.x{margin:0}#i3{padding: 10px}'
+        sheet = parse_css(css)
+        
+        sheet.items = dedupe_rules(sheet.items)
+        
+        assert sheet.serialize() == '#i1,#i2,#i3{padding:10px}.x{margin:0}'
+        assert sheet.rule_count() == 2
+    
+    def test_does_not_merge_across_a_rule_targeting_the_id(self):
+        css = '#i1{color:red}#i2:hover{color:blue}#i2{color:red}'
+        
+        assert minify_css(css) == css
+    
+    def test_merges_inside_media_blocks_only(self):
+        css = '#i1{color:red}@media (max-width:480px){#i2{color:red}#i3{color:red}}'
+        
+        assert minify_css(css) == '#i1{color:red}@media (max-width:480px){#i2,#i3{color:red}}'
+
+
+class TestCriticalRules:
+    
+    def test_selects_rules_matching_above_the_fold_elements(self):
+        sheet = parse_css(
+            'body{margin:0}.hero{color:red}.footer{color:blue}'
+            '.nav a:hover{color:green}#i9{top:0}'
+            '@media (max-width:480px){.hero{padding:0}.footer{padding:0}}'
+            '@font-face{font-family:x;src:url(x.woff2)}@keyframes spin{to{opacity:1}}'
+        )
+        
+        items = critical_rules(sheet.items, {'html', 'body', 'a'}, set(), {'hero', 'nav'})
+        
+        assert sheet.serialize(items) == (
+            'body{margin:0}.hero{color:red}.nav a:hover{color:green}'
+            '@media (max-width:480px){.hero{padding:0}}'
+            '@font-face{font-family:x;src:url(x.woff2)}'
+        )
+
+
+class TestMinifyHtml:
+    
+    def test_collapses_whitespace_and_comments(self):
+        html = '<div>\n  <!-- note -->\n  <p>Hello   <b>big</b>\n world</p>\n</div>\n'
+        
+        assert minify_html(html) == '<div><p>Hello <b>big</b> world</p></div>'
+    
+    def test_preserves_pre_script_and_conditional_comments(self):
+        html = '<pre>  a\n   b</pre>\n<script>\nvar s = "  x  ";\n</script><!--[if IE]>x<![endif]-->'
+        
+        assert minify_html(html) == html.replace('</pre>\n<script>', '</pre> <script>')
+    
+    def test_keeps_spaces_between_inline_elements(self):
+        assert minify_html('<span>a</span> <span>b</span>') == '<span>a</span> <span>b</span>'
+
+
+class TestFoldAndLazyImages:
+    
+    HTML = (
+        '<header class="nav"><img src="/logo.png"></header>\n'
+        '<section id="hero"><img src="/hero.jpg"><br></section>\n'
+        '<section class="features"><img src="/a.jpg"><img src="/b.jpg" loading="eager"></section>'
+    )
+    
+    def test_fold_is_after_the_first_top_level_elements(self):
+        offset = find_fold_offset(self.HTML, 2)
+        
+        assert self.HTML[:offset].endswith('</section>')
+        assert '/a.jpg' in self.HTML[offset:]
+        assert find_fold_offset(self.HTML, 5) == len(self.HTML)
+    
+    def test_body_wrapper_from_get_html(self):
+        html = f'<body id="i8rk" class="gjs-body">{self.HTML}</body>'
+        offset = find_fold_offset(html, 2)
+        
+        assert html[:offset].endswith('<br></section>')
+        assert add_lazy_loading(html, offset)[1] == 2
+    
+    def test_lazy_loading_only_below_the_fold(self):
+        html, count = add_lazy_loading(self.HTML, find_fold_offset(self.HTML, 2))
+        
+        assert count == 2
+        assert '<img src="/hero.jpg">' in html
+        assert '<img src="/a.jpg" loading="lazy" decoding="async">' in html
+        assert '<img src="/b.jpg" loading="eager" decoding="async">' in html
+    
+    def test_collect_selectors(self):
+        tags, ids, classes = collect_selectors(self.HTML[:find_fold_offset(self.HTML, 2)])
+        
+        assert {'header', 'img', 'section', 'body'} <= tags
+        assert ids == {'hero'}
+        assert classes == {'nav'}
+
+
+class TestPublishOptimizer:
+    
+    def _app(self, **config):
+        return SimpleNamespace(config=config)
+    
+    def test_small_css_is_inlined_whole(self):
+        result = PublishOptimizer.optimize(self._app(), 1, '<div id="i1">x</div>', '#i1{ color: red; }#i1{ color: red; }')
+        
+        assert result['head'] == '<style>#i1{color:red}</style>'
+        assert result['stats']['rules_before'] == 2
+        assert result['stats']['rules_after'] == 1
+        assert result['stats']['deferred_css_bytes'] == 0
+    
+    def test_large_css_is_split_into_critical_and_deferred(self, tmp_path, monkeypatch):
+        storage = LocalStorage(str(tmp_path))
+        monkeypatch.setattr('app.services.storage_backend.get_storage', lambda name: storage)
+        html = '<header class="top">x</header><section class="hero">y</section><footer class="end">z</footer>'
+        css = '.top{color:red}.end{color:blue}' + ''.join(f'.unused{i}{{margin:{i}px}}' for i in range(50))
+        
+        result = PublishOptimizer.optimize(self._app(PUBLISH_INLINE_CSS_MAX_BYTES=100), 7, html, css)
+        
+        assert result['head'].startswith('<style>.top{color:red}</style><link rel="preload" href="/assets/styles.')
+        assert '<noscript><link rel="stylesheet"' in result['head']
+        stored = list((tmp_path / '7' / 'assets').iterdir())
+        assert len(stored) == 1
+        assert stored[0].read_text() == minify_css(css)
+        assert result['stats']['inline_css_bytes'] == len('.top{color:red}')
+    
+    def test_get_html_body_wrapper(self, tmp_path, monkeypatch):
+        storage = LocalStorage(str(tmp_path))
+        monkeypatch.setattr('app.services.storage_backend.get_storage', lambda name: storage)
+        html = ('<body id="ivxd"><header class="top"><img src="/logo.png"></header>'
+                '<section class="hero"><img src="/hero.jpg"></section>'
+                '<footer class="end"><img src="/map.png"></footer></body>')
+        css = '.top{color:red}.end{color:blue}' + ''.join(f'.unused{i}{{margin:{i}px}}' for i in range(50))
+        
+        result = PublishOptimizer.optimize(self._app(PUBLISH_INLINE_CSS_MAX_BYTES=100), 7, html, css)
+        
+        assert result['stats']['lazy_images'] == 1
+        assert '<img src="/map.png" loading="lazy" decoding="async">' in result['html']
+        assert result['head'].startswith('<style>.top{color:red}</style>')
+    
+    def test_store_stylesheet_is_content_addressed(self, tmp_path, monkeypatch):
+        storage = LocalStorage(str(tmp_path))
+        monkeypatch.setattr('app.services.storage_backend.get_storage', lambda name: storage)
+        
+        first = PublishOptimizer.store_stylesheet(3, 'styles', '.a{}')
+        
+        assert PublishOptimizer.store_stylesheet(3, 'styles', '.a{}') == first
+        assert PublishOptimizer.store_stylesheet(3, 'styles', '.b{}') != first
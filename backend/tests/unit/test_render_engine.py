@@ -0,0 +1,109 @@
+"""Unit tests for the published page render engine."""
+import os
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+from jinja2 import TemplateNotFound
+from markupsafe import Markup
+
+from app.services.render_engine import RenderEngine
+
+LAYOUT_FOLDER = os.path.join(os.path.dirname(__file__), '..', '..', 'templates', 'published')
+
+
+def _site(**fields):
+    values = {'id': 1, 'title': 'Shop', 'subdomain': 'shop', 'updated_at': datetime(2025, 1, 1)}
+    values.update(fields)
+    return SimpleNamespace(**values)
+
+
+def _page(**fields):
+    values = {'id': 5, 'title': 'About', 'slug': 'about', 'description': None,
+              'is_homepage': False, 'template': 'default'}
+    values.update(fields)
+    return SimpleNamespace(**values)
+
+
+@pytest.fixture
+def engine():
+    return RenderEngine(LAYOUT_FOLDER)
+
+
+class TestRender:
+    
+    def test_editor_layout(self, engine):
+        html = engine.render('editor', _site(), _page(), body='<h1 class="p-4">Hi</h1>', css='h1{color:red}')
+        
+        assert html.startswith('<!DOCTYPE html>\n<html lang="vi">')
+        assert '<title>About - Shop</title>' in html
+        assert 'cdn.tailwindcss.com' in html
+        assert '<style>\nh1{color:red}\n    </style>' in html
+        assert '<body>\n<h1 class="p-4">Hi</h1>\n</body>' in html
+    
+    def test_site_overrides_and_head(self, engine):
+        html = engine.render(
+            'editor', _site(), _page(), body='x', head='<style>.a{}</style>',
+            site_overrides={'tailwind_tag': Markup('<link rel="stylesheet" href="/assets/tailwind.1.css">')}
+        )
+        
+        assert 'cdn.tailwindcss.com' not in html
+        assert '<link rel="stylesheet" href="/assets/tailwind.1.css">' in html
+        assert '<style>.a{}</style>' in html
+        assert '<style>\n' not in html
+    
+    def test_titles_are_escaped(self, engine):
+        html = engine.render('editor', _site(title='A & B'), _page(title='<script>', description='"q"'), body='x')
+        
+        assert '<title>&lt;script&gt; - A &amp; B</title>' in html
+        assert '<meta name="description" content="&#34;q&#34;">' in html
+    
+    def test_legacy_layout_placeholder(self, engine):
+        html = engine.render('legacy', _site(), _page(is_homepage=True))
+        
+        assert 'bootstrap.min.css' in html
+        assert '<h1 class="display-4 mb-4">About</h1>' in html
+        assert '<meta property="og:url" content="https://shop.pagemade.site">' in html
+        assert 'bootstrap.bundle.min.js' in html
+
+
+class TestLayouts:
+    
+    def test_template_type_falls_back_to_default(self, engine):
+        assert engine.get_layout('editor', 'landing-product').name == 'editor/default.html'
+        assert engine.get_layout('editor', '../base').name == 'editor/default.html'
+        assert engine.get_layout('editor', 'landing-product') is engine.get_layout('editor', 'landing-product')
+    
+    def test_template_type_layout_is_used(self, tmp_path):
+        (tmp_path / 'editor').mkdir()
+        (tmp_path / 'base.html').write_text('{% block body %}{% endblock %}')
+        (tmp_path / 'editor' / 'default.html').write_text('{% extends "base.html" %}{% block body %}D{% endblock %}')
+        (tmp_path / 'editor' / 'shop.html').write_text('{% extends "base.html" %}{% block body %}S{{ body }}{% endblock %}')
+        engine = RenderEngine(str(tmp_path))
+        
+        assert engine.render('editor', _site(), _page(template='shop'), body='!') == 'S!'
+        assert engine.render('editor', _site(), _page(template='blank')) == 'D'
+    
+    def test_unknown_kind(self, engine):
+        with pytest.raises(TemplateNotFound):
+            engine.get_layout('missing')
+
+
+class TestSiteContext:
+    
+    def test_cached_until_site_changes(self, engine):
+        site = _site()
+        
+        first = engine.site_context(site)
+        assert engine.site_context(site) is first
+        
+        site.title, site.updated_at = 'New', datetime(2025, 2, 1)
+        assert engine.site_context(site)['title'] == 'New'
+    
+    def test_cache_is_bounded(self):
+        engine = RenderEngine(LAYOUT_FOLDER, site_cache_size=2)
+        
+        for site_id in range(5):
+            engine.site_context(_site(id=site_id))
+        
+        assert len(engine._site_contexts) == 2
@@ -0,0 +1,169 @@
+"""Unit tests for full-text search over pages and assets."""
+import json
+
+import pytest
+from flask import Flask
+
+from app.models import db, User, Site, Page, Asset
+from app.services.search_service import SearchIndex, SearchService, get_search_index
+from app.utils.html_helpers import extract_text
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{tmp_path / 'search.db'}"
+    db.init_app(app)
+    with app.app_context():
+        db.create_all()
+        db.session.add_all([User(id=1, email='a@example.com', name='A'), User(id=2, email='b@example.com', name='B')])
+        db.session.add_all([
+            Site(id=1, title='Shop', subdomain='shop', user_id=1),
+            Site(id=2, title='Blog', subdomain='blog', user_id=1),
+            Site(id=3, title='Other', subdomain='other', user_id=2),
+        ])
+        db.session.commit()
+        yield app
+
+
+def _page(id, title, html='', site_id=1, user_id=1, **kwargs):
+    page = Page(id=id, title=title, slug=f'p{id}', site_id=site_id, user_id=user_id, html_content=html, **kwargs)
+    db.session.add(page)
+    db.session.flush()
+    SearchService.index_page(page)
+    return page
+
+
+def _titles(items):
+    return [item['title'] for item in items]
+
+
+class TestExtractText:
+    
+    def test_visible_text_only(self):
+        html = ('<head><title>x</title><style>p{}</style></head>'
+                '<h1>Xin chào</h1><p>Giá<b>tốt</b></p><script>var a;</script>'
+                '<img src="a.png" alt="Ảnh"><div>end</div>')
+        
+        assert extract_text(html) == 'Xin chào Giátốt Ảnh end'
+    
+    def test_max_chars(self):
+        assert extract_text('<p>' + 'word ' * 100 + '</p>', max_chars=20) == 'word word word word'
+
+
+class TestSearch:
+    
+    def test_ranks_title_matches_first(self, app):
+        _page(1, 'Liên hệ', '<p>Gọi cho chúng tôi về giá bán</p>')
+        _page(2, 'Bảng giá', '<p>Giá sản phẩm</p>')
+        db.session.commit()
+        
+        items, total = SearchService.search(1, 'giá')
+        
+        assert total == 2
+        assert _titles(items) == ['Bảng giá', 'Liên hệ']
+        assert items[0]['type'] == 'page' and items[0]['id'] == 2
+    
+    def test_folds_diacritics_and_matches_prefixes(self, app):
+        _page(1, 'Trang chủ')
+        db.session.commit()
+        
+        assert _titles(SearchService.search(1, 'trang chu')[0]) == ['Trang chủ']
+        assert _titles(SearchService.search(1, 'tra')[0]) == ['Trang chủ']
+        assert SearchService.search(1, 'trang khac') == ([], 0)
+    
+    def test_scoped_to_user_site_and_type(self, app):
+        _page(1, 'Sale', site_id=1)
+        _page(2, 'Sale', site_id=2)
+        _page(3, 'Sale', site_id=3, user_id=2)
+        asset = Asset(id=1, filename='x.png', original_name='sale-banner.png', file_size=1, file_type='image/png',
+                      url='/x.png', site_id=1, user_id=1)
+        db.session.add(asset)
+        db.session.flush()
+        SearchService.index_asset(asset)
+        db.session.commit()
+        
+        assert SearchService.search(1, 'sale')[1] == 3
+        assert SearchService.search(2, 'sale')[1] == 1
+        assert SearchService.search(1, 'sale', site_id=1)[1] == 2
+        items, total = SearchService.search(1, 'sale', kind='asset')
+        assert total == 1 and items[0]['type'] == 'asset' and items[0]['title'] == 'sale-banner.png'
+    
+    def test_pagination(self, app):
+        for i in range(1, 6):
+            _page(i, f'Page {i}')
+        db.session.commit()
+        
+        first, total = SearchService.search(1, 'page', per_page=2)
+        last, _ = SearchService.search(1, 'page', page=3, per_page=2)
+        
+        assert total == 5
+        assert len(first) == 2 and len(last) == 1
+        assert not set(_titles(first)) & set(_titles(last))
+    
+    def test_snippet_is_escaped_and_highlighted(self, app):
+        _page(1, 'Code', '<p>use &lt;script&gt; for widgets</p>')
+        db.session.commit()
+        
+        snippet = SearchService.search(1, 'widgets')[0][0]['snippet']
+        
+        assert '&lt;script&gt;' in snippet
+        assert '<mark>widgets</mark>' in snippet
+    
+    def test_reads_editor_json_content(self, app):
+        _page(1, 'Home', content=json.dumps({'gjs-html': '<p>khuyến mãi</p>'}))
+        db.session.commit()
+        
+        assert SearchService.search(1, 'khuyen')[1] == 1
+    
+    def test_editor_content_wins_over_template_html(self, app):
+        _page(1, 'Home', html='<p>template placeholder</p>',
+              content=json.dumps({'gjs-html': '<p>edited widgets</p>'}))
+        db.session.commit()
+        
+        assert SearchService.search(1, 'widgets')[1] == 1
+        assert SearchService.search(1, 'placeholder')[1] == 0
+    
+    def test_update_and_remove(self, app):
+        page = _page(1, 'Old title')
+        db.session.commit()
+        
+        page.title = 'New title'
+        SearchService.index_page(page)
+        db.session.commit()
+        assert SearchService.search(1, 'old') == ([], 0)
+        assert SearchService.search(1, 'new')[1] == 1
+        
+        SearchService.remove('page', 1)
+        db.session.commit()
+        assert SearchService.search(1, 'new') == ([], 0)
+    
+    def test_remove_site(self, app):
+        _page(1, 'Sale', site_id=1)
+        _page(2, 'Sale', site_id=2)
+        db.session.commit()
+        
+        SearchService.remove_site(1)
+        db.session.commit()
+        
+        assert [item['site_id'] for item in SearchService.search(1, 'sale')[0]] == [2]
+    
+    def test_query_without_terms(self, app):
+        assert SearchIndex.terms('  "*:- ') == []
+        assert SearchService.search(1, '"*') == ([], 0)
+    
+    def test_failed_write_keeps_the_change(self, app, monkeypatch):
+        page = _page(1, 'Kept')
+        monkeypatch.setattr(type(get_search_index()), 'upsert', lambda self, doc: 1 / 0)
+        
+        assert SearchService.index_page(page) is False
+        db.session.commit()
+        
+        assert db.session.get(Page, 1).title == 'Kept'
+    
+    def test_rebuild(self, app):
+        db.session.add(Page(id=1, title='Unindexed', slug='u', site_id=1, user_id=1))
+        db.session.commit()
+        
+        assert SearchService.rebuild(batch_size=1) == {'pages': 1, 'assets': 0}
+        assert SearchService.search(1, 'unindexed')[1] == 1
@@ -0,0 +1,103 @@
+"""Unit tests for the Server-Timing span API."""
+
+import pytest
+from flask import Flask, jsonify, render_template_string
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+from app.middlewares import server_timing_middleware
+from app.middlewares.server_timing_middleware import ServerTimingMiddleware, span, timed
+
+
+def parse(header):
+    """Server-Timing header -> {name: params}."""
+    entries = {}
+    for part in header.split(', '):
+        name, _, params = part.partition(';')
+        entries[name] = params
+    return entries
+
+
+@pytest.fixture
+def timing_app():
+    """Bare Flask app with Server-Timing enabled."""
+    app = Flask(__name__)
+    engine = create_engine('sqlite://')
+    
+    @timed('auth')
+    def load_user():
+        with span('auth'):  # nested span of the same name counts once
+            return 'user'
+    
+    @app.route('/json')
+    def json_view():
+        load_user()
+        with engine.connect() as conn:
+            conn.execute(text('select 1'))
+            conn.execute(text('select 2'))
+        with span('storage'):
+            pass
+        return jsonify({'ok': True})
+    
+    @app.route('/failing')
+    def failing_view():
+        with engine.connect() as conn:
+            for _ in range(3):
+                with pytest.raises(OperationalError):
+                    conn.execute(text('select * from missing'))
+            conn.execute(text('select 1'))
+            app.config['TEST_CONNECTION_INFO'] = dict(conn.info)
+        return jsonify({'ok': True})
+    
+    @app.route('/html')
+    def html_view():
+        return render_template_string('<p>{{ x }}</p>', x=1)
+    
+    ServerTimingMiddleware(app)
+    yield app
+    server_timing_middleware._enabled = False
+
+
+class TestServerTiming:
+    """Tests for the Server-Timing header."""
+    
+    def test_breakdown(self, timing_app):
+        """Test spans, DB events and jsonify are reported in order."""
+        response = timing_app.test_client().get('/json')
+        entries = parse(response.headers['Server-Timing'])
+        
+        assert list(entries) == ['auth', 'db', 'storage', 'serialization', 'total']
+        assert 'desc' not in entries['auth']
+        assert entries['db'].endswith('desc="2x"')
+    
+    def test_failed_statements_leave_nothing_on_the_connection(self, timing_app):
+        """Test a statement that raises does not leave its start time behind."""
+        response = timing_app.test_client().get('/failing')
+        entries = parse(response.headers['Server-Timing'])
+        
+        assert 'desc' not in entries['db']
+        assert timing_app.config['TEST_CONNECTION_INFO'] == {}
+    
+    def test_template_render(self, timing_app):
+        """Test Jinja rendering is reported as render."""
+        response = timing_app.test_client().get('/html')
+        entries = parse(response.headers['Server-Timing'])
+        
+        assert 'render' in entries
+        assert 'total' in entries
+
+
+def test_disabled_is_noop():
+    """Test spans are shared no-ops and no header is added when disabled."""
+    app = Flask(__name__)
+    app.config['SERVER_TIMING_ENABLED'] = False
+    
+    @app.route('/')
+    def index():
+        assert span('db') is span('auth')
+        return jsonify({'ok': True})
+    
+    ServerTimingMiddleware(app)
+    response = app.test_client().get('/')
+    
+    assert response.status_code == 200
+    assert 'Server-Timing' not in response.headers
@@ -0,0 +1,136 @@
+"""Unit tests for the streamed whole-site ZIP export."""
+import io
+import zipfile
+from datetime import datetime
+
+import pytest
+from flask import Flask
+
+from app.models import db, User, Site, Page, Asset
+from app.services.site_export_service import SiteExportService, SiteExportError
+from app.services.storage_backend import LocalStorage
+
+IMAGE = 'a' * 32 + '.png'
+HOME = (
+    '<html><head><link rel="stylesheet" href="/assets/tailwind.1f2e.css"></head><body>'
+    '<a href="/about">About</a> <a href="https://shop.pagemade.site/">Home</a> <a href="/missing">x</a>'
+    f'<img src="https://app.pagemade.site/api/assets/uploads/1/{IMAGE}?w=640" '
+    f'srcset="/api/assets/uploads/1/variants/{"a" * 32}_w640.webp 640w">'
+    '<img src="https://app.pagemade.site/api/assets/uploads/2/other.png"></body></html>'
+)
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{tmp_path / 'export.db'}"
+    db.init_app(app)
+    sites, uploads = LocalStorage(str(tmp_path / 'sites')), LocalStorage(str(tmp_path / 'uploads'))
+    app.extensions['storage'] = {'sites': sites, 'uploads': uploads}
+    with app.app_context():
+        db.create_all()
+        db.session.add(User(id=1, email='a@example.com', name='A'))
+        db.session.add(Site(id=1, title='Shop', subdomain='shop', user_id=1, is_published=True))
+        published = datetime(2026, 10, 1, 8, 30)
+        db.session.add_all([
+            Page(id=1, title='Home', slug='home', site_id=1, user_id=1, is_homepage=True,
+                 is_published=True, published_at=published),
+            Page(id=2, title='About', slug='about', site_id=1, user_id=1, is_published=True, published_at=published),
+            Page(id=3, title='Draft', slug='draft', site_id=1, user_id=1),
+        ])
+        db.session.commit()
+        
+        sites.save('1/index.html', HOME)
+        sites.save('1/about.html', '<a href="/">Back</a>')
+        sites.save('1/draft.html', 'draft')
+        sites.save('1/assets/tailwind.1f2e.css', f'.hero{{background:url(/api/assets/uploads/1/{IMAGE})}}')
+        uploads.save(f'1/{IMAGE}', b'\x89PNG' + bytes(range(256)) * 40)
+        uploads.save(f"1/variants/{'a' * 32}_w640.webp", b'RIFF')
+        yield app
+
+
+def _site():
+    return db.session.get(Site, 1)
+
+
+def _archive(manifest, start=0, stop=None):
+    return b''.join(SiteExportService.stream(manifest, start, stop))
+
+
+class TestRewrite:
+    
+    def test_urls_point_into_the_archive(self, app):
+        manifest = SiteExportService.get_manifest(_site())
+        
+        home = SiteExportService.rewrite(HOME, manifest['links'])
+        
+        assert 'href="assets/tailwind.1f2e.css"' in home
+        assert 'href="about.html"' in home and 'href="index.html"' in home
+        assert 'href="/missing"' in home
+        assert f'src="assets/uploads/{IMAGE}"' in home
+        assert f'srcset="assets/uploads/variants/{"a" * 32}_w640.webp 640w"' in home
+        assert 'https://app.pagemade.site/api/assets/uploads/2/other.png' in home
+
+
+class TestArchive:
+    
+    def test_zip_contents(self, app):
+        manifest = SiteExportService.get_manifest(_site())
+        
+        archive = zipfile.ZipFile(io.BytesIO(_archive(manifest)))
+        
+        assert archive.testzip() is None
+        assert archive.namelist() == [
+            'shop/index.html', 'shop/about.html', 'shop/assets/tailwind.1f2e.css',
+            f'shop/assets/uploads/{IMAGE}', f"shop/assets/uploads/variants/{'a' * 32}_w640.webp",
+        ]
+        assert archive.read('shop/about.html') == b'<a href="index.html">Back</a>'
+        assert archive.read('shop/assets/tailwind.1f2e.css') == f'.hero{{background:url(../assets/uploads/{IMAGE})}}'.encode()
+        assert archive.getinfo('shop/index.html').date_time == (2026, 10, 1, 8, 30, 0)
+        assert manifest['size'] == len(_archive(manifest))
+    
+    def test_ranges_concatenate_to_the_archive(self, app):
+        manifest = SiteExportService.get_manifest(_site())
+        full = _archive(manifest)
+        
+        cuts = [0, 7, 30, 31, 500, 10000, len(full) - 22, len(full)]
+        parts = [_archive(manifest, a, b) for a, b in zip(cuts, cuts[1:])]
+        
+        assert [len(part) for part in parts] == [b - a for a, b in zip(cuts, cuts[1:])]
+        assert b''.join(parts) == full
+    
+    def test_nothing_published(self, app):
+        Page.query.update({'is_published': False})
+        
+        with pytest.raises(SiteExportError) as error:
+            SiteExportService.get_manifest(_site())
+        assert error.value.status == 404
+
+
+class TestManifest:
+    
+    def test_cached_until_the_site_changes(self, app, monkeypatch):
+        first = SiteExportService.get_manifest(_site())
+        build = SiteExportService.build_manifest
+        monkeypatch.setattr(SiteExportService, 'build_manifest', None)
+        
+        assert SiteExportService.get_manifest(_site()) == first
+        
+        checksums = []
+        monkeypatch.setattr(SiteExportService, 'build_manifest', staticmethod(build))
+        monkeypatch.setattr(SiteExportService, '_checksum', staticmethod(lambda storage, key: checksums.append(key)))
+        db.session.get(Page, 2).published_at = datetime(2026, 10, 2)
+        db.session.commit()
+        
+        second = SiteExportService.get_manifest(_site())
+        
+        assert second['fingerprint'] != first['fingerprint']
+        assert checksums == []  # upload CRCs were reused
+    
+    def test_changed_file_aborts_the_stream(self, app):
+        manifest = SiteExportService.get_manifest(_site())
+        app.extensions['storage']['sites'].save('1/about.html', '<p>republished</p>')
+        
+        with pytest.raises(SiteExportError):
+            _archive(manifest)
+        assert not app.extensions['storage']['sites'].exists(f'1/{SiteExportService.MANIFEST_KEY}')
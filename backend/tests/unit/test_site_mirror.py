@@ -0,0 +1,166 @@
+"""Unit tests for the mirror host map and the static mirror WSGI app."""
+import hashlib
+import json
+import os
+
+import pytest
+from flask import Flask
+from werkzeug.test import Client
+
+from app.models import db, User, Site, Page
+from app.services.host_map import HostMap
+from app.services.storage_backend import LocalStorage
+from mirror_wsgi import SiteMirror
+
+HOST = {'Host': 'shop.pagemade.site'}
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{tmp_path / 'mirror.db'}"
+    db.init_app(app)
+    storage = LocalStorage(str(tmp_path / 'sites'))
+    app.extensions['storage'] = {'sites': storage}
+    with app.app_context():
+        db.create_all()
+        db.session.add(User(id=1, email='a@example.com', name='A'))
+        db.session.add_all([
+            Site(id=1, title='Shop', subdomain='Shop', user_id=1, is_published=True),
+            Site(id=2, title='Draft', subdomain='draft', user_id=1),
+        ])
+        db.session.add_all([
+            Page(id=1, title='Home', slug='home', site_id=1, user_id=1, is_homepage=True, is_published=True),
+            Page(id=2, title='About', slug='about', site_id=1, user_id=1, is_published=True),
+            Page(id=3, title='Old', slug='old', site_id=1, user_id=1),
+            Page(id=4, title='Home', slug='home', site_id=2, user_id=1, is_homepage=True, is_published=True),
+        ])
+        db.session.commit()
+        
+        storage.save('1/index.html', '<h1>Home</h1>')
+        storage.save('1/about.html', '<h1>About</h1>')
+        storage.save('1/old.html', '<h1>Unpublished</h1>')
+        storage.save('1/assets/tailwind.1f2e.css', 'body{}')
+        storage.save('1/sitemap.xml', '<urlset/>')
+        HostMap.write()
+        yield app
+
+
+@pytest.fixture
+def mirror(app, tmp_path):
+    return SiteMirror(str(tmp_path / 'sites'), reload_interval=0)
+
+
+class TestHostMap:
+    
+    def test_lists_published_sites_and_pages(self, app, tmp_path):
+        with open(tmp_path / 'sites' / HostMap.KEY) as f:
+            data = json.load(f)
+        
+        assert data == {'hosts': {'shop.pagemade.site': {'dir': '1', 'home': True, 'pages': ['about']}}}
+    
+    def test_rewritten_only_when_changed(self, app):
+        assert HostMap.write() is False
+        
+        db.session.get(Page, 3).is_published = True
+        db.session.commit()
+        
+        assert HostMap.write() is True
+        assert HostMap.build()['hosts']['shop.pagemade.site']['pages'] == ['about', 'old']
+    
+    def test_update_site_only_touches_that_site(self, app, tmp_path):
+        map_path = tmp_path / 'sites' / HostMap.KEY
+        data = json.loads(map_path.read_text())
+        # Another site's entry is left exactly as stored, without a query
+        data['hosts']['other.pagemade.site'] = {'dir': '9', 'home': True, 'pages': []}
+        map_path.write_text(json.dumps(data))
+        
+        db.session.get(Page, 3).is_published = True
+        site = db.session.get(Site, 1)
+        site.subdomain = 'store'
+        db.session.commit()
+        
+        assert HostMap.update_site(1) is True
+        hosts = json.loads(map_path.read_text())['hosts']
+        assert hosts == {
+            'store.pagemade.site': {'dir': '1', 'home': True, 'pages': ['about', 'old']},
+            'other.pagemade.site': {'dir': '9', 'home': True, 'pages': []},
+        }
+        assert HostMap.update_site(1) is False
+    
+    def test_update_site_removes_unpublished_site(self, app, tmp_path):
+        db.session.get(Site, 1).is_published = False
+        db.session.commit()
+        
+        assert HostMap.sync(1) is True
+        assert json.loads((tmp_path / 'sites' / HostMap.KEY).read_text()) == {'hosts': {}}
+    
+    def test_update_site_rebuilds_a_missing_map(self, app, tmp_path):
+        map_path = tmp_path / 'sites' / HostMap.KEY
+        map_path.unlink()
+        
+        assert HostMap.update_site(2) is True
+        assert list(json.loads(map_path.read_text())['hosts']) == ['shop.pagemade.site']
+
+
+class TestSiteMirror:
+    
+    def test_serves_published_files(self, mirror):
+        client = Client(mirror)
+        
+        home = client.get('/', headers=HOST)
+        assert home.status_code == 200 and home.data == b'<h1>Home</h1>'
+        assert home.headers['Content-Type'] == 'text/html; charset=utf-8'
+        assert client.get('/about', headers={'Host': 'SHOP.pagemade.site:443'}).data == b'<h1>About</h1>'
+        
+        css = client.get('/assets/tailwind.1f2e.css', headers=HOST)
+        assert css.headers['Content-Type'] == 'text/css; charset=utf-8'
+        assert 'immutable' in css.headers['Cache-Control']
+        assert client.get('/sitemap.xml', headers=HOST).headers['Content-Type'] == 'application/xml; charset=utf-8'
+    
+    @pytest.mark.parametrize('host, path', [
+        ('shop.pagemade.site', '/old'),             # unpublished page, file still in storage
+        ('shop.pagemade.site', '/contact'),         # no such page
+        ('shop.pagemade.site', '/robots.txt'),      # not generated yet
+        ('shop.pagemade.site', '/assets/../../x'),
+        ('shop.pagemade.site', '/_hosts.json'),
+        ('draft.pagemade.site', '/'),               # unpublished site
+        ('pagemade.site', '/'),
+    ])
+    def test_everything_else_is_not_found(self, mirror, host, path):
+        assert Client(mirror).get(path, headers={'Host': host}).status_code == 404
+    
+    def test_conditional_and_head_requests(self, mirror):
+        client = Client(mirror)
+        etag = client.get('/about', headers=HOST).headers['ETag']
+        
+        assert client.get('/about', headers={**HOST, 'If-None-Match': etag}).status_code == 304
+        head = client.head('/about', headers=HOST)
+        assert head.status_code == 200 and head.data == b'' and head.headers['Content-Length'] == '14'
+        assert client.post('/about', headers=HOST).status_code == 405
+    
+    def test_root_files_use_the_apps_etag(self, mirror):
+        client = Client(mirror)
+        response = client.get('/sitemap.xml', headers=HOST)
+        
+        assert response.headers['ETag'] == f'"{hashlib.md5(b"<urlset/>").hexdigest()}"'
+        assert response.data == b'<urlset/>'
+        assert client.get('/sitemap.xml', headers={**HOST, 'If-None-Match': response.headers['ETag']}).status_code == 304
+    
+    def test_reloads_after_publish(self, app, mirror, tmp_path):
+        client = Client(mirror)
+        assert client.get('/old', headers=HOST).status_code == 404
+        
+        db.session.get(Page, 3).is_published = True
+        db.session.commit()
+        HostMap.write()
+        map_path = tmp_path / 'sites' / HostMap.KEY
+        os.utime(map_path, ns=(0, os.stat(map_path).st_mtime_ns + 1))  # coarse mtime clocks
+        
+        assert client.get('/old', headers=HOST).status_code == 200
+    
+    def test_bad_map_keeps_the_previous_one(self, mirror, tmp_path):
+        (tmp_path / 'sites' / HostMap.KEY).write_text('{not json')
+        
+        assert mirror.reload() is False
+        assert Client(mirror).get('/', headers=HOST).status_code == 200
@@ -0,0 +1,103 @@
+"""Unit tests for per-site sitemap.xml and robots.txt generation."""
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+from flask import Flask
+
+from app.repositories.page_repository import PageRepository
+from app.services.sitemap_service import SitemapService
+from app.services.storage_backend import LocalStorage
+
+
+def _page(id, slug, is_homepage=False, is_published=True, published_at=datetime(2026, 10, 1, 8, 30, 15, 999)):
+    return SimpleNamespace(id=id, slug=slug, is_homepage=is_homepage, is_published=is_published,
+                           published_at=published_at)
+
+
+SITE = SimpleNamespace(id=3, subdomain='shop')
+
+
+@pytest.fixture
+def storage(tmp_path):
+    app = Flask(__name__)
+    storage = LocalStorage(str(tmp_path))
+    app.extensions['storage'] = {'sites': storage}
+    with app.app_context():
+        yield storage
+
+
+@pytest.fixture
+def published(monkeypatch):
+    pages = [_page(1, 'index', is_homepage=True), _page(2, 'about')]
+    monkeypatch.setattr(PageRepository, 'find_published_by_site', staticmethod(lambda site_id: list(pages)))
+    return pages
+
+
+class TestRender:
+    
+    def test_sitemap(self):
+        xml = SitemapService.render_sitemap([
+            {'loc': 'https://shop.pagemade.site/z&b'},
+            {'loc': 'https://shop.pagemade.site', 'lastmod': '2026-10-01T08:30:15+00:00'},
+        ])
+        
+        assert xml.splitlines() == [
+            '<?xml version="1.0" encoding="UTF-8"?>',
+            '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">',
+            '  <url><loc>https://shop.pagemade.site</loc><lastmod>2026-10-01T08:30:15+00:00</lastmod></url>',
+            '  <url><loc>https://shop.pagemade.site/z&amp;b</loc></url>',
+            '</urlset>',
+        ]
+    
+    def test_robots_points_at_sitemap(self):
+        assert 'Sitemap: https://shop.pagemade.site/sitemap.xml\n' in SitemapService.render_robots(SITE)
+
+
+class TestSync:
+    
+    def test_rebuild_writes_files(self, storage, published):
+        assert SitemapService.rebuild(SITE) == 2
+        
+        xml = storage.read_text('3/sitemap.xml')
+        assert '<loc>https://shop.pagemade.site</loc><lastmod>2026-10-01T08:30:15+00:00</lastmod>' in xml
+        assert '<loc>https://shop.pagemade.site/about</loc>' in xml
+        assert storage.read_text('3/robots.txt') == SitemapService.render_robots(SITE)
+    
+    def test_update_is_incremental(self, storage, published, monkeypatch):
+        SitemapService.rebuild(SITE)
+        monkeypatch.setattr(PageRepository, 'find_published_by_site', None)  # no full rebuild
+        
+        assert SitemapService.update_page(SITE, _page(5, 'contact')) is True
+        assert SitemapService.update_page(SITE, _page(5, 'contact')) is False
+        assert '/contact</loc>' in storage.read_text('3/sitemap.xml')
+        
+        assert SitemapService.update_page(SITE, _page(5, 'lien-he')) is True
+        xml = storage.read_text('3/sitemap.xml')
+        assert '/lien-he</loc>' in xml and '/contact</loc>' not in xml
+        
+        assert SitemapService.update_page(SITE, _page(2, 'about', is_published=False)) is True
+        assert SitemapService.remove_page(SITE, 5) is True
+        assert SitemapService.remove_page(SITE, 5) is False
+        assert storage.read_text('3/sitemap.xml').count('<url>') == 1
+    
+    def test_missing_manifest_rebuilds(self, storage, published):
+        assert SitemapService.update_page(SITE, published[1]) is True
+        
+        assert storage.read_text('3/sitemap.xml').count('<url>') == 2
+    
+    def test_subdomain_change_rebuilds(self, storage, published):
+        SitemapService.rebuild(SITE)
+        renamed = SimpleNamespace(id=3, subdomain='store')
+        
+        SitemapService.update_page(renamed, published[1])
+        
+        assert 'https://shop.' not in storage.read_text('3/sitemap.xml')
+        assert 'https://store.pagemade.site/sitemap.xml' in storage.read_text('3/robots.txt')
+    
+    def test_sync_never_raises(self, storage, monkeypatch):
+        def fail(site_id):
+            raise RuntimeError('database down')
+        monkeypatch.setattr(PageRepository, 'find_published_by_site', staticmethod(fail))
+        
+        assert SitemapService.sync(SITE) is False
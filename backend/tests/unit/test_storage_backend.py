@@ -0,0 +1,153 @@
+"""Unit tests for the storage backends."""
+import pytest
+
+from app.services.storage_backend import LocalStorage, S3Storage, StorageNotFoundError
+
+
+class FakeS3Error(Exception):
+    """Shaped like botocore's ClientError."""
+    
+    def __init__(self, code):
+        super().__init__(code)
+        self.response = {'Error': {'Code': code}}
+
+
+class FakeBody:
+    
+    def __init__(self, data):
+        self.data = data
+        self.closed = False
+    
+    def read(self):
+        return self.data
+    
+    def iter_chunks(self, chunk_size):
+        for i in range(0, len(self.data), chunk_size):
+            yield self.data[i:i + chunk_size]
+    
+    def close(self):
+        self.closed = True
+
+
+class FakeS3Client:
+    """In-memory stand-in for the subset of the S3 API the driver uses."""
+    
+    def __init__(self):
+        self.objects = {}
+        self.uploads = []
+    
+    def _get(self, Bucket, Key):
+        if (Bucket, Key) not in self.objects:
+            raise FakeS3Error('NoSuchKey')
+        return self.objects[(Bucket, Key)]
+    
+    def put_object(self, Bucket, Key, Body, ContentType=None):
+        self.objects[(Bucket, Key)] = (Body, ContentType)
+    
+    def upload_file(self, Filename, Bucket, Key, ExtraArgs=None, Config=None):
+        with open(Filename, 'rb') as f:
+            self.objects[(Bucket, Key)] = (f.read(), (ExtraArgs or {}).get('ContentType'))
+        self.uploads.append((Key, Config))
+    
+    def get_object(self, Bucket, Key, Range=None):
+        data = self._get(Bucket, Key)[0]
+        if Range:
+            start, end = Range[len('bytes='):].split('-')
+            data = data[int(start):int(end) + 1 if end else None]
+        return {'Body': FakeBody(data)}
+    
+    def head_object(self, Bucket, Key):
+        if (Bucket, Key) not in self.objects:
+            raise FakeS3Error('404')
+        return {'ContentLength': len(self.objects[(Bucket, Key)][0]), 'ETag': '"abc"'}
+    
+    def delete_object(self, Bucket, Key):
+        self.objects.pop((Bucket, Key), None)
+    
+    def get_paginator(self, name):
+        client = self
+        
+        class Paginator:
+            def paginate(self, Bucket, Prefix):
+                keys = sorted(k for b, k in client.objects if b == Bucket and k.startswith(Prefix))
+                yield {'Contents': [{'Key': k} for k in keys]}
+        
+        return Paginator()
+
+
+@pytest.fixture(params=['local', 's3'])
+def storage(request, tmp_path):
+    if request.param == 'local':
+        return LocalStorage(str(tmp_path / 'root'))
+    return S3Storage('bucket', prefix='uploads/', client=FakeS3Client(), transfer_config=object())
+
+
+class TestStorageBackends:
+    
+    def test_save_and_read(self, storage):
+        storage.save('7/index.html', '<h1>Hi</h1>', 'text/html')
+        
+        assert storage.read_text('7/index.html') == '<h1>Hi</h1>'
+        assert storage.stat('7/index.html')['size'] == 11
+        assert storage.exists('7/index.html')
+    
+    def test_range_reads(self, storage):
+        storage.save('1/a.bin', b'0123456789')
+        
+        assert storage.read('1/a.bin', 2, 5) == b'2345'
+        assert storage.read('1/a.bin', 7) == b'789'
+        assert b''.join(storage.iter_chunks('1/a.bin', 1, 8, chunk_size=3)) == b'12345678'
+    
+    def test_missing_key(self, storage):
+        with pytest.raises(StorageNotFoundError):
+            storage.read('1/missing.png')
+        with pytest.raises(FileNotFoundError):
+            storage.stat('1/missing.png')
+        assert not storage.exists('1/missing.png')
+        storage.delete('1/missing.png')
+    
+    def test_save_file_download_and_list(self, storage, tmp_path):
+        source = tmp_path / 'src.png'
+        source.write_bytes(b'png-bytes')
+        
+        storage.save_file('3/a.png', str(source), 'image/png')
+        storage.save('3/variants/a_w320.webp', b'webp')
+        storage.download('3/a.png', str(tmp_path / 'copy.png'))
+        
+        assert (tmp_path / 'copy.png').read_bytes() == b'png-bytes'
+        assert sorted(storage.list('3/')) == ['3/a.png', '3/variants/a_w320.webp']
+        
+        storage.delete('3/a.png')
+        assert not storage.exists('3/a.png')
+
+
+class TestLocalStorage:
+    
+    def test_rejects_keys_outside_root(self, tmp_path):
+        storage = LocalStorage(str(tmp_path))
+        
+        with pytest.raises(ValueError):
+            storage.read('../secret')
+
+
+class TestS3Storage:
+    
+    def test_upload_uses_transfer_config_and_prefix(self, tmp_path):
+        client = FakeS3Client()
+        transfer_config = object()
+        storage = S3Storage('bucket', prefix='sites/', client=client, transfer_config=transfer_config)
+        source = tmp_path / 'big.bin'
+        source.write_bytes(b'x' * 10)
+        
+        storage.save_file('1/big.bin', str(source))
+        
+        assert client.uploads == [('sites/1/big.bin', transfer_config)]
+        assert ('bucket', 'sites/1/big.bin') in client.objects
+    
+    def test_other_errors_propagate(self):
+        client = FakeS3Client()
+        client.get_object = lambda **kwargs: (_ for _ in ()).throw(FakeS3Error('AccessDenied'))
+        storage = S3Storage('bucket', client=client)
+        
+        with pytest.raises(FakeS3Error):
+            storage.read('1/a.png')
@@ -0,0 +1,82 @@
+"""Unit tests for publish-time Tailwind compilation."""
+import sys
+import textwrap
+from types import SimpleNamespace
+
+import pytest
+
+from app.services.tailwind_service import TailwindService, TailwindBuildError
+
+
+def _fake_cli(tmp_path, exit_code=0):
+    """A stand-in for the Tailwind CLI: one rule per class in --content."""
+    script = tmp_path / 'fake_tailwind.py'
+    script.write_text(textwrap.dedent(f'''
+        import re, sys
+        args = sys.argv[1:]
+        content = open(args[args.index('--content') + 1]).read()
+        classes = re.findall(r'class="([^"]+)"', content)
+        with open(args[args.index('-o') + 1], 'w') as f:
+            f.write(''.join('.%s{{}}' % c for c in classes))
+        sys.exit({exit_code})
+    '''))
+    return [sys.executable, str(script)]
+
+
+def _app(tmp_path, **config):
+    return SimpleNamespace(config=config, instance_path=str(tmp_path))
+
+
+class TestExtractClasses:
+    
+    def test_collects_tokens_from_both_quote_styles(self):
+        html = '<div class="flex md:grid  p-4"><span class=\'text-[13px] hover:underline\'>x</span></div>'
+        
+        assert TailwindService.extract_classes(html) == {
+            'flex', 'md:grid', 'p-4', 'text-[13px]', 'hover:underline'
+        }
+    
+    def test_empty(self):
+        assert TailwindService.extract_classes('') == set()
+        assert TailwindService.extract_classes('<p>no classes</p>') == set()
+
+
+class TestCompile:
+    
+    def test_cache_key_ignores_order(self):
+        cli = ['tailwindcss']
+        
+        assert TailwindService.cache_key({'a', 'b'}, cli) == TailwindService.cache_key({'b', 'a'}, cli)
+        assert TailwindService.cache_key({'a'}, cli) != TailwindService.cache_key({'a', 'b'}, cli)
+    
+    def test_compile_runs_cli_with_class_list(self, tmp_path):
+        css = TailwindService.compile({'p-4', 'flex'}, _fake_cli(tmp_path))
+        
+        assert css == '.flex{}.p-4{}'
+    
+    def test_compile_failure_raises(self, tmp_path):
+        with pytest.raises(TailwindBuildError):
+            TailwindService.compile({'flex'}, _fake_cli(tmp_path, exit_code=1))
+    
+    def test_get_css_uses_cache(self, tmp_path, monkeypatch):
+        app = _app(tmp_path)
+        cli = _fake_cli(tmp_path)
+        first = TailwindService.get_css(app, {'flex'}, cli)
+        
+        def fail(*args, **kwargs):
+            raise AssertionError("CLI should not run on a cache hit")
+        monkeypatch.setattr(TailwindService, 'compile', staticmethod(fail))
+        
+        assert TailwindService.get_css(app, {'flex'}, cli) == first
+    
+    def test_no_cli_falls_back_to_cdn(self, tmp_path, monkeypatch):
+        monkeypatch.setattr('shutil.which', lambda name: None)
+        app = _app(tmp_path)
+        
+        assert TailwindService.get_cli(app) is None
+        assert TailwindService.stylesheet_tag(app, None, None, '<div class="flex">') == TailwindService.CDN_TAG
+    
+    def test_disabled(self, tmp_path):
+        app = _app(tmp_path, TAILWIND_COMPILE_ENABLED=False, TAILWIND_CLI='tailwindcss')
+        
+        assert TailwindService.get_cli(app) is None
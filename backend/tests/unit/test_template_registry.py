@@ -0,0 +1,103 @@
+"""Unit tests for the cached template catalogue."""
+import os
+import json
+
+import pytest
+
+from app.services.template_registry import TemplateRegistry
+
+
+def _write(directory, stem, **data):
+    path = directory / f'{stem}.json'
+    path.write_text(json.dumps(data))
+    return path
+
+
+def _touch(path, mtime):
+    os.utime(path, ns=(mtime, mtime))
+
+
+@pytest.fixture
+def template_dir(tmp_path):
+    (tmp_path / 'thumbnails').mkdir()
+    (tmp_path / 'thumbnails' / 'shop.svg').write_text('<svg/>')
+    _touch(tmp_path / 'thumbnails' / 'shop.svg', 0xabc)
+    _write(tmp_path, 'shop', id='shop', name='Shop', category='store',
+           thumbnail='/static/templates/thumbnails/shop.svg',
+           content={'html': '<h1>Shop</h1>', 'css': 'h1{}'})
+    _write(tmp_path, 'blank', id='blank', name='Blank', content={'html': '', 'css': ''})
+    (tmp_path / 'README.md').write_text('not a template')
+    return tmp_path
+
+
+class TestTemplateRegistry:
+    
+    def test_list_returns_metadata_only(self, template_dir):
+        registry = TemplateRegistry(str(template_dir), check_interval=0)
+        
+        templates, etag = registry.list()
+        
+        assert [t['id'] for t in templates] == ['blank', 'shop']
+        assert templates[1] == {
+            'id': 'shop', 'name': 'Shop', 'description': None, 'category': 'store',
+            'thumbnail': '/api/templates/thumbnails/shop.svg?v=abc'
+        }
+        assert etag
+    
+    def test_unchanged_files_are_not_reparsed(self, template_dir, monkeypatch):
+        registry = TemplateRegistry(str(template_dir), check_interval=0)
+        _, etag = registry.list()
+        
+        def fail(*args):
+            raise AssertionError('template re-read')
+        monkeypatch.setattr(registry, '_load_entry', fail)
+        
+        assert registry.list()[1] == etag
+        assert registry.get('shop')[0]['name'] == 'Shop'
+    
+    def test_changed_file_is_reloaded(self, template_dir):
+        registry = TemplateRegistry(str(template_dir), check_interval=0)
+        _, list_etag = registry.list()
+        _, shop_etag = registry.get('shop')
+        
+        path = _write(template_dir, 'shop', id='shop', name='Shop v2', content={'html': 'v2', 'css': ''})
+        _touch(path, 10 ** 18)
+        
+        templates, new_list_etag = registry.list()
+        data, new_shop_etag = registry.get('shop')
+        assert templates[1]['name'] == 'Shop v2'
+        assert data['content']['html'] == 'v2'
+        assert new_list_etag != list_etag and new_shop_etag != shop_etag
+    
+    def test_check_interval_none_loads_once(self, template_dir):
+        registry = TemplateRegistry(str(template_dir), check_interval=None)
+        registry.list()
+        
+        _write(template_dir, 'new', id='new', name='New')
+        assert 'new' not in [t['id'] for t in registry.list()[0]]
+        
+        registry.reload()
+        assert 'new' in [t['id'] for t in registry.list()[0]]
+    
+    def test_body_cache_is_bounded(self, template_dir):
+        registry = TemplateRegistry(str(template_dir), check_interval=0, body_cache_size=1)
+        
+        registry.get('shop')
+        registry.get('blank')
+        
+        assert list(registry._bodies) == ['blank']
+        assert registry.get_content('shop') == ('<h1>Shop</h1>', 'h1{}')
+    
+    def test_unknown_template(self, template_dir):
+        registry = TemplateRegistry(str(template_dir), check_interval=0)
+        
+        assert registry.get('missing') == (None, None)
+        assert registry.get_content('../shop') == (None, None)
+    
+    def test_thumbnail_lookup(self, template_dir):
+        registry = TemplateRegistry(str(template_dir), check_interval=0)
+        
+        assert registry.thumbnail_version('shop.svg') == 'abc'
+        assert registry.thumbnail_version('missing.svg') is None
+        with pytest.raises(ValueError):
+            registry.thumbnail_path('../shop.json')
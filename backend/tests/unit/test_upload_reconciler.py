@@ -0,0 +1,125 @@
+"""Unit tests for upload reconciliation."""
+import json
+import os
+import time
+
+import pytest
+
+from app.services.upload_reconciler import UploadReconciler
+
+
+def _touch(root, path, data=b'x', age=3600):
+    full = os.path.join(root, 'uploads', path)
+    os.makedirs(os.path.dirname(full), exist_ok=True)
+    with open(full, 'wb') as f:
+        f.write(data)
+    old = time.time() - age
+    os.utime(full, (old, old))
+    return full
+
+
+@pytest.fixture
+def reconciler(tmp_path, monkeypatch):
+    rows = [
+        (1, 'a.png', 'https://app.pagemade.site/api/assets/uploads/1/a.png',
+         json.dumps([{'filename': 'a_w320.webp'}]), 'ab' * 32),
+        (2, 'gone.png', '/api/assets/uploads/2/gone.png', None, None),
+    ]
+    reconciler = UploadReconciler(str(tmp_path), grace_seconds=0)
+    monkeypatch.setattr(reconciler, 'load_known', lambda: _known(reconciler, rows))
+    return reconciler
+
+
+def _known(reconciler, rows):
+    files, blobs = set(), set()
+    for site_id, filename, url, variants, content_hash in rows:
+        files.add(reconciler._relative_path(site_id, filename, url))
+        for variant in json.loads(variants or '[]'):
+            files.add(f"{site_id}/variants/{variant['filename']}")
+        if content_hash:
+            blobs.add(content_hash)
+    reconciler.stats['assets'] = len(rows)
+    return files, blobs
+
+
+class TestUploadReconciler:
+    
+    def test_relative_path_from_url_formats(self):
+        assert UploadReconciler._relative_path(1, 'a.png', 'https://x/api/assets/uploads/1/a.png') == '1/a.png'
+        assert UploadReconciler._relative_path(1, 'a.png', '/static/uploads/1/old.png') == '1/old.png'
+        assert UploadReconciler._relative_path(3, 'c.png', 'c.png') == '3/c.png'
+    
+    def test_reports_orphans_and_missing(self, reconciler, tmp_path):
+        root = str(tmp_path)
+        _touch(root, '1/a.png')
+        _touch(root, '1/variants/a_w320.webp')
+        _touch(root, '1/stray.png', b'12345')
+        _touch(root, '.blobs/ab/ab/' + 'ab' * 32)
+        _touch(root, '.blobs/cd/cd/' + 'cd' * 32)
+        _touch(root, '.incoming/tmp.part')
+        _touch(root, 'assets/legacy.png')
+        
+        report = reconciler.run()
+        
+        assert report['orphaned'] == ['1/stray.png', '.blobs/cd/cd/' + 'cd' * 32]
+        assert report['missing'] == ['2/gone.png']
+        assert report['orphaned_bytes'] == 6
+        assert report['quarantine_dir'] is None
+    
+    def test_recent_files_are_left_alone(self, reconciler, tmp_path):
+        _touch(str(tmp_path), '1/new.png', age=0)
+        reconciler.grace_seconds = 300
+        
+        report = reconciler.run()
+        
+        assert '1/new.png' not in report['orphaned']
+        assert report['skipped_recent'] == 1
+    
+    def test_quarantine_moves_orphans(self, reconciler, tmp_path):
+        root = str(tmp_path)
+        _touch(root, '1/a.png')
+        stray = _touch(root, '1/stray.png')
+        
+        report = reconciler.run(quarantine=True)
+        
+        assert not os.path.exists(stray)
+        assert os.path.exists(os.path.join(report['quarantine_dir'], '1', 'stray.png'))
+        assert os.path.exists(os.path.join(root, 'uploads', '1', 'a.png'))
+        
+        # Quarantined files are not reported again
+        assert reconciler.run()['orphaned'] == []
+    
+    def test_avatars_are_not_orphans(self, reconciler, tmp_path):
+        root = str(tmp_path)
+        _touch(root, '1/a.png')
+        avatar = _touch(root, 'avatars/0f3a_me.png')
+        
+        report = reconciler.run(quarantine=True)
+        
+        assert report['orphaned'] == []
+        assert report['quarantine_dir'] is None
+        assert os.path.exists(avatar)
+    
+    def test_stale_incoming_parts_are_deleted(self, reconciler, tmp_path):
+        root = str(tmp_path)
+        stale = _touch(root, '.incoming/tmpold.part', b'12345')
+        active = _touch(root, '.incoming/tmpnew.part', age=0)
+        reconciler.grace_seconds = 300
+        
+        report = reconciler.run()
+        
+        assert not os.path.exists(stale)
+        assert os.path.exists(active)
+        assert report['incoming_removed'] == 1
+        assert report['incoming_bytes'] == 5
+        assert report['orphaned'] == []
+    
+    def test_progress_callback(self, tmp_path, monkeypatch):
+        phases = []
+        reconciler = UploadReconciler(str(tmp_path), progress=lambda p: phases.append(p['phase']))
+        monkeypatch.setattr(reconciler, 'load_known', lambda: (set(), set()))
+        
+        reconciler.run()
+        
+        assert phases[-1] == 'done'
+        assert 'scanning' in phases
@@ -0,0 +1,179 @@
+"""Unit tests for streaming uploads."""
+import hashlib
+import io
+import os
+
+import pytest
+from flask import Flask, request, jsonify
+
+from app.services.asset_service import AssetService
+from app.utils.upload_stream import HashingUploadFile, StreamingUploadRequest, sniff_mime, upload_limit
+
+
+PNG_HEADER = b'\x89PNG\r\n\x1a\n' + b'\x00' * 24
+
+
+@pytest.fixture
+def app(tmp_path):
+    app = Flask(__name__, static_folder=str(tmp_path / 'static'))
+    app.request_class = StreamingUploadRequest
+    app.config['UPLOAD_MAX_FILE_SIZE'] = 1024
+    
+    @app.route('/upload', methods=['POST'])
+    def upload():
+        file = request.files['file']
+        dest = str(tmp_path / 'stored.bin')
+        file.stream.commit(dest)
+        return jsonify({
+            'size': file.stream.size,
+            'sha256': file.stream.sha256,
+            'mime_type': file.stream.mime_type,
+        })
+    
+    @app.route('/upload/batch', methods=['POST'])
+    @upload_limit('UPLOAD_MAX_BATCH_SIZE')
+    def upload_batch():
+        results = []
+        for index, file in enumerate(request.files.getlist('files')):
+            info, error = AssetService.store_upload(file, str(tmp_path / f'{index}.bin'))
+            results.append(error or info['size'])
+        return jsonify({'count': len(results), 'results': results})
+    
+    return app
+
+
+class TestSniffMime:
+    
+    def test_known_images(self):
+        assert sniff_mime(PNG_HEADER) == 'image/png'
+        assert sniff_mime(b'\xff\xd8\xff\xe0') == 'image/jpeg'
+        assert sniff_mime(b'GIF89a') == 'image/gif'
+        assert sniff_mime(b'RIFF\x00\x00\x00\x00WEBPVP8 ') == 'image/webp'
+        assert sniff_mime(b'<?xml version="1.0"?>\n<svg xmlns="x">') == 'image/svg+xml'
+    
+    def test_unknown_content(self):
+        assert sniff_mime(b'<html><body>') is None
+        assert sniff_mime(b'MZ\x90\x00') is None
+
+
+class TestHashingUploadFile:
+    
+    def test_hash_and_head_collected_while_writing(self, tmp_path):
+        upload = HashingUploadFile(str(tmp_path), max_size=None)
+        upload.write(PNG_HEADER)
+        upload.write(b'rest')
+        
+        assert upload.size == len(PNG_HEADER) + 4
+        assert upload.sha256 == hashlib.sha256(PNG_HEADER + b'rest').hexdigest()
+        assert upload.mime_type == 'image/png'
+        upload.close()
+    
+    def test_close_without_commit_removes_temp_file(self, tmp_path):
+        upload = HashingUploadFile(str(tmp_path), max_size=None)
+        upload.write(b'data')
+        path = upload.path
+        
+        upload.close()
+        
+        assert not os.path.exists(path)
+    
+    def test_commit_moves_file(self, tmp_path):
+        upload = HashingUploadFile(str(tmp_path), max_size=None)
+        upload.write(b'data')
+        dest = str(tmp_path / 'final.bin')
+        
+        upload.commit(dest)
+        upload.close()
+        
+        with open(dest, 'rb') as f:
+            assert f.read() == b'data'
+
+
+class TestStreamingUploadRequest:
+    
+    def test_upload_is_hashed_and_committed(self, app, tmp_path):
+        body = PNG_HEADER + b'x' * 100
+        response = app.test_client().post(
+            '/upload', data={'file': (io.BytesIO(body), 'a.png')},
+            content_type='multipart/form-data'
+        )
+        
+        assert response.status_code == 200
+        assert response.json['sha256'] == hashlib.sha256(body).hexdigest()
+        assert response.json['size'] == len(body)
+        assert response.json['mime_type'] == 'image/png'
+        with open(tmp_path / 'stored.bin', 'rb') as f:
+            assert f.read() == body
+        assert os.listdir(tmp_path / 'static' / 'uploads' / '.incoming') == []
+    
+    def test_oversized_upload_aborts_with_413(self, app, tmp_path):
+        response = app.test_client().post(
+            '/upload', data={'file': (io.BytesIO(PNG_HEADER + b'x' * 2048), 'big.png')},
+            content_type='multipart/form-data'
+        )
+        
+        assert response.status_code == 413
+        assert os.listdir(tmp_path / 'static' / 'uploads' / '.incoming') == []
+    
+    def test_aborted_parse_removes_temp_files(self, app, tmp_path):
+        body = (
+            b'--X\r\nContent-Disposition: form-data; name="a"; filename="a.png"\r\n\r\n'
+            + PNG_HEADER + b'\r\n'
+            b'--X\r\nContent-Disposition: form-data; name="b"; filename="b.png"\r\n\r\n'
+            + PNG_HEADER
+        )
+        # Client disconnects mid-way through the second part
+        response = app.test_client().post(
+            '/upload', data=body, content_type='multipart/form-data; boundary=X',
+            environ_overrides={'CONTENT_LENGTH': str(len(body) + 512)}
+        )
+        
+        assert response.status_code == 400
+        assert os.listdir(tmp_path / 'static' / 'uploads' / '.incoming') == []
+    
+    def test_upload_limit_raises_body_limit_for_one_view(self, app):
+        app.config['MAX_CONTENT_LENGTH'] = 2048
+        app.config['UPLOAD_MAX_BATCH_SIZE'] = 64 * 1024
+        files = [(io.BytesIO(PNG_HEADER + b'x' * 900), f'{i}.png') for i in range(4)]
+        client = app.test_client()
+        
+        response = client.post('/upload/batch', data={'files': files}, content_type='multipart/form-data')
+        assert response.status_code == 200
+        assert response.json['count'] == 4
+        
+        response = client.post(
+            '/upload', data={'file': (io.BytesIO(PNG_HEADER + b'x' * 900), 'a.png'),
+                             'pad': 'x' * 2048},
+            content_type='multipart/form-data'
+        )
+        assert response.status_code == 413
+    
+    def test_oversized_part_in_batch_is_a_per_file_error(self, app, tmp_path):
+        app.config['UPLOAD_MAX_BATCH_SIZE'] = 64 * 1024
+        files = [
+            (io.BytesIO(PNG_HEADER + b'x' * 100), 'small.png'),
+            (io.BytesIO(PNG_HEADER + b'x' * 4096), 'big.png'),
+            (io.BytesIO(PNG_HEADER + b'x' * 200), 'other.png'),
+        ]
+        
+        response = app.test_client().post('/upload/batch', data={'files': files},
+                                          content_type='multipart/form-data')
+        
+        assert response.status_code == 200
+        small, big, other = response.json['results']
+        assert small == len(PNG_HEADER) + 100
+        assert big.startswith('File too large')
+        assert other == len(PNG_HEADER) + 200
+        assert os.path.exists(tmp_path / '0.bin')
+        assert not os.path.exists(tmp_path / '1.bin')
+        assert os.path.exists(tmp_path / '2.bin')
+        assert os.listdir(tmp_path / 'static' / 'uploads' / '.incoming') == []
+    
+    def test_batch_over_total_limit_is_413(self, app):
+        app.config['UPLOAD_MAX_BATCH_SIZE'] = 2048
+        files = [(io.BytesIO(PNG_HEADER + b'x' * 900), f'{i}.png') for i in range(4)]
+        
+        response = app.test_client().post('/upload/batch', data={'files': files},
+                                          content_type='multipart/form-data')
+        
+        assert response.status_code == 413